@@ -4,7 +4,17 @@
 from dataclasses import dataclass
 from typing import List, Dict, Any, Optional
 from datetime import datetime
-import math
+
+import numpy as np
+
+from holdings import (
+    Holdings,
+    parse_numbers,
+    group_allocation,
+    concentration_weights,
+    top_n_sum,
+    std_dev,
+)
 
 
 # ============================================
@@ -83,32 +93,10 @@ class AssetAllocationResult:
 
 def parse_number(value: Any) -> float:
     """Parse various number formats to float."""
-    if value is None or value == '':
-        return 0.0
-    if isinstance(value, (int, float)):
-        return 0.0 if math.isnan(value) else float(value)
-    
-    s = str(value)
-    for char in ['$', '€', '£', '¥', '₩', ',', ' ']:
-        s = s.replace(char, '')
-    
-    if s.startswith('(') and s.endswith(')'):
-        s = '-' + s[1:-1]
-    
-    try:
-        return float(s)
-    except ValueError:
-        return 0.0
+    return float(parse_numbers([value])[0])
 
 
-def calculate_std_dev(values: List[float]) -> float:
-    """Calculate standard deviation."""
-    if len(values) < 2:
-        return 0.0
-    mean = sum(values) / len(values)
-    squared_diffs = [(v - mean) ** 2 for v in values]
-    variance = sum(squared_diffs) / (len(values) - 1)
-    return math.sqrt(variance)
+calculate_std_dev = std_dev
 
 
 # ============================================
@@ -139,8 +127,6 @@ def calculate_asset_allocation(
     
     # Extract column names
     ticker_col = columns.get('ticker', '')
-    sector_col = columns.get('sector', '')
-    asset_class_col = columns.get('asset_class', '')
     shares_col = columns.get('shares', '')
     avg_cost_col = columns.get('avg_cost', '')
     current_price_col = columns.get('current_price', '')
@@ -149,40 +135,21 @@ def calculate_asset_allocation(
         return _create_empty_result("Missing required columns")
     
     # ----------------------------------------
-    # 1. PARSE HOLDINGS AND CALCULATE VALUES
+    # 1. PARSE HOLDINGS AND CALCULATE VALUES (columnar)
     # ----------------------------------------
-    holdings = []
-    
-    for row in data:
-        shares = parse_number(row.get(shares_col, 0))
-        if shares <= 0:
-            continue
-            
-        avg_cost = parse_number(row.get(avg_cost_col, 0))
-        current_price = parse_number(row.get(current_price_col, 0))
-        
-        market_value = shares * current_price
-        cost_basis = shares * avg_cost
-        
-        holdings.append({
-            'ticker': str(row.get(ticker_col, 'Unknown')),
-            'sector': str(row.get(sector_col, 'Unclassified')) if sector_col else 'Unclassified',
-            'asset_class': str(row.get(asset_class_col, 'Equity')) if asset_class_col else 'Equity',
-            'shares': shares,
-            'avg_cost': avg_cost,
-            'current_price': current_price,
-            'market_value': market_value,
-            'cost_basis': cost_basis
-        })
+    holdings = Holdings.from_rows(data, columns)
     
-    if not holdings:
+    if len(holdings) == 0:
         return _create_empty_result("No valid holdings found")
     
+    market_value = holdings.market_value
+    cost_basis = holdings.cost_basis
+    
     # ----------------------------------------
     # 2. CALCULATE TOTALS
     # ----------------------------------------
-    total_value = sum(h['market_value'] for h in holdings)
-    total_cost = sum(h['cost_basis'] for h in holdings)
+    total_value = float(market_value.sum())
+    total_cost = float(cost_basis.sum())
     
     if total_value <= 0:
         return _create_empty_result("Total portfolio value is zero or negative")
@@ -190,76 +157,28 @@ def calculate_asset_allocation(
     # ----------------------------------------
     # 3. SECTOR ALLOCATION
     # ----------------------------------------
-    sector_map: Dict[str, Dict] = {}
-    
-    for h in holdings:
-        sector = h['sector']
-        if sector not in sector_map:
-            sector_map[sector] = {'value': 0, 'cost': 0, 'holdings': []}
-        
-        sector_map[sector]['value'] += h['market_value']
-        sector_map[sector]['cost'] += h['cost_basis']
-        sector_map[sector]['holdings'].append(h['ticker'])
-    
-    sector_allocation = []
-    for sector, data in sector_map.items():
-        value = data['value']
-        cost = data['cost']
-        gain = value - cost
-        
-        sector_allocation.append({
-            'sector': sector,
-            'value': value,
-            'cost': cost,
-            'weight': (value / total_value * 100) if total_value > 0 else 0,
-            'holding_count': len(data['holdings']),
-            'gain': gain,
-            'gain_pct': (gain / cost * 100) if cost > 0 else 0,
-            'holdings': data['holdings']
-        })
-    
-    # Sort by weight descending
-    sector_allocation.sort(key=lambda x: x['weight'], reverse=True)
+    sector_allocation = group_allocation(
+        holdings.sector, holdings.ticker, total_value, 'sector', market_value, cost_basis
+    )
     
     # ----------------------------------------
     # 4. ASSET CLASS ALLOCATION
     # ----------------------------------------
-    asset_class_map: Dict[str, Dict] = {}
-    
-    for h in holdings:
-        asset_class = h['asset_class']
-        if asset_class not in asset_class_map:
-            asset_class_map[asset_class] = {'value': 0, 'holdings': []}
-        
-        asset_class_map[asset_class]['value'] += h['market_value']
-        asset_class_map[asset_class]['holdings'].append(h['ticker'])
-    
-    asset_class_allocation = []
-    for asset_class, data in asset_class_map.items():
-        asset_class_allocation.append({
-            'asset_class': asset_class,
-            'value': data['value'],
-            'weight': (data['value'] / total_value * 100) if total_value > 0 else 0,
-            'holding_count': len(data['holdings']),
-            'holdings': data['holdings']
-        })
-    
-    asset_class_allocation.sort(key=lambda x: x['weight'], reverse=True)
+    asset_class_allocation = group_allocation(
+        holdings.asset_class, holdings.ticker, total_value, 'asset_class', market_value
+    )
     
     # ----------------------------------------
     # 5. CONCENTRATION METRICS
     # ----------------------------------------
-    weights = [s['weight'] for s in sector_allocation]
-    weights_decimal = [w / 100 for w in weights]
+    weights = np.array([s['weight'] for s in sector_allocation])
     
     # Herfindahl-Hirschman Index
-    hhi = sum(w * w for w in weights_decimal)
-    effective_sectors = (1 / hhi) if hhi > 0 else len(sector_allocation)
+    herfindahl_index, effective_sectors = concentration_weights(weights)
     
     # Top N weights
-    sorted_weights = sorted(weights, reverse=True)
-    top3_weight = sum(sorted_weights[:3]) if len(sorted_weights) >= 3 else sum(sorted_weights)
-    top5_weight = sum(sorted_weights[:5]) if len(sorted_weights) >= 5 else sum(sorted_weights)
+    top3_weight = top_n_sum(weights, 3)
+    top5_weight = top_n_sum(weights, 5)
     
     # Concentration level
     if top3_weight >= 70:
@@ -270,20 +189,20 @@ def calculate_asset_allocation(
         concentration_level = 'Low'
     
     concentration = {
-        'herfindahl_index': hhi * 10000,  # Convert to basis points
+        'herfindahl_index': herfindahl_index,  # basis points
         'effective_sectors': effective_sectors,
         'top3_weight': top3_weight,
         'top5_weight': top5_weight,
-        'max_sector_weight': max(weights) if weights else 0,
-        'min_sector_weight': min(weights) if weights else 0,
+        'max_sector_weight': float(weights.max()) if len(weights) else 0,
+        'min_sector_weight': float(weights.min()) if len(weights) else 0,
         'concentration_level': concentration_level
     }
     
     # ----------------------------------------
     # 6. DIVERSIFICATION METRICS
     # ----------------------------------------
-    avg_weight = sum(weights) / len(weights) if weights else 0
-    weight_std = calculate_std_dev(weights)
+    avg_weight = float(weights.mean()) if len(weights) else 0
+    weight_std = std_dev(weights)
     diversification_ratio = effective_sectors / len(sector_allocation) if sector_allocation else 0
     
     diversification = {
@@ -0,0 +1,336 @@
+# backend/finance/holdings.py
+# Columnar holdings + NumPy kernels shared by the finance modules
+
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# ============================================
+# VECTORIZED PARSING
+# ============================================
+
+CURRENCY_CHARS = '$€£¥₩, '
+
+
+# Separator used to clean every string cell in one pass over a joined buffer.
+_CELL_SEPARATOR = '\x1f'
+
+
+def parse_numbers(values: Any, strip: str = CURRENCY_CHARS) -> np.ndarray:
+    """
+    Vectorized parse_number: '$1,234.50' -> 1234.5, '(12)' -> -12,
+    blanks / None / NaN / unparseable -> 0.
+    """
+    values = list(values)
+    try:
+        # Plain numbers, None and already-clean numeric strings.
+        out = np.array(values, dtype=float)
+        out[np.isnan(out)] = 0.0
+        return out
+    except (TypeError, ValueError):
+        out = np.zeros(len(values))
+
+    text_index = [i for i, v in enumerate(values) if type(v) is str]
+    text_set = set(text_index)
+    other_index = [i for i in range(len(values)) if i not in text_set] if text_index else range(len(values))
+    others = [values[i] for i in other_index]
+    if others:
+        out[list(other_index)] = pd.to_numeric(pd.Series(others, dtype=object), errors='coerce').to_numpy(dtype=float)
+
+    if text_index:
+        # Strip currency symbols from all cells at once instead of per cell.
+        joined = _CELL_SEPARATOR.join(values[i] for i in text_index)
+        for char in strip:
+            joined = joined.replace(char, '')
+        texts = joined.split(_CELL_SEPARATOR)
+        try:
+            parsed = np.array(texts, dtype=float)
+        except ValueError:
+            parsed = pd.to_numeric(pd.Series(texts, dtype=object), errors='coerce').to_numpy(dtype=float)
+            # Accounting negatives '(12.5)' are the only strings worth a retry.
+            for j in np.flatnonzero(np.isnan(parsed)):
+                t = texts[j]
+                if t.startswith('(') and t.endswith(')'):
+                    try:
+                        parsed[j] = float('-' + t[1:-1])
+                    except ValueError:
+                        pass
+        out[text_index] = parsed
+
+    out[np.isnan(out)] = 0.0
+    return out
+
+
+def num_rows(data: Any) -> int:
+    if isinstance(data, dict):
+        return len(next(iter(data.values()), []))
+    return len(data)
+
+
+def _cells(data: Any, col: str, default: Any) -> List[Any]:
+    """Cells of one column from row records or a {column: values} mapping."""
+    if not col:
+        return [default] * num_rows(data)
+    if isinstance(data, dict):
+        return data[col] if col in data else [default] * num_rows(data)
+    return [row.get(col, default) for row in data]
+
+
+def _labels(data: Any, col: str, default: str) -> np.ndarray:
+    """str(row.get(col, default)) for every row."""
+    labels = np.empty(num_rows(data), dtype=object)
+    labels[:] = [str(v) for v in _cells(data, col, default)] if col else default
+    return labels
+
+
+# ============================================
+# COLUMNAR HOLDINGS
+# ============================================
+
+@dataclass
+class Holdings:
+    """One NumPy array per field; row i is one position."""
+    ticker: np.ndarray
+    name: np.ndarray
+    sector: np.ndarray
+    asset_class: np.ndarray
+    shares: np.ndarray
+    avg_cost: np.ndarray
+    current_price: np.ndarray
+    daily_change_pct: np.ndarray
+
+    @classmethod
+    def from_rows(
+        cls,
+        data: Any,
+        columns: Dict[str, str],
+        ticker_default: str = 'Unknown',
+        name_default: Optional[str] = '',
+        require_ticker: bool = False,
+        strip: str = CURRENCY_CHARS
+    ) -> 'Holdings':
+        """
+        Parse raw rows into columns, keeping rows with shares > 0.
+
+        data is either a list of row dicts or a column-oriented
+        {column: [values]} mapping, which skips the per-row dict lookups.
+
+        name_default=None uses the ticker as the name when no name column is mapped.
+        """
+        n = num_rows(data)
+
+        ticker_col = columns.get('ticker', '')
+        name_col = columns.get('name', '')
+        daily_change_col = columns.get('daily_change', '')
+
+        shares = parse_numbers(_cells(data, columns.get('shares', ''), 0), strip)
+        keep = shares > 0
+
+        ticker = _labels(data, ticker_col, ticker_default)
+        if require_ticker:
+            keep &= ticker != ''
+
+        if name_col:
+            name = _labels(data, name_col, '')
+        elif name_default is None:
+            name = ticker.copy()
+        else:
+            name = _labels(data, '', name_default)
+
+        if daily_change_col:
+            daily_change = parse_numbers(_cells(data, daily_change_col, 0), strip)
+        else:
+            daily_change = np.zeros(n)
+
+        return cls(
+            ticker=ticker[keep],
+            name=name[keep],
+            sector=_labels(data, columns.get('sector', ''), 'Unclassified')[keep],
+            asset_class=_labels(data, columns.get('asset_class', ''), 'Equity')[keep],
+            shares=shares[keep],
+            avg_cost=parse_numbers(_cells(data, columns.get('avg_cost', ''), 0), strip)[keep],
+            current_price=parse_numbers(_cells(data, columns.get('current_price', ''), 0), strip)[keep],
+            daily_change_pct=daily_change[keep],
+        )
+
+    def __len__(self) -> int:
+        return len(self.shares)
+
+    @property
+    def market_value(self) -> np.ndarray:
+        return self.shares * self.current_price
+
+    @property
+    def cost_basis(self) -> np.ndarray:
+        return self.shares * self.avg_cost
+
+    def take(self, order: np.ndarray) -> 'Holdings':
+        """Reorder (or subset) every column at once."""
+        return Holdings(**{field: getattr(self, field)[order] for field in self.__dataclass_fields__})
+
+
+def safe_divide(numerator: np.ndarray, denominator: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    """
+    numerator / denominator * scale where denominator > 0, else 0. Divides
+    before scaling, like the scalar code, so results (and sort ties) match bit for bit.
+    """
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    out = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    if scale != 1.0:
+        out *= scale
+    return out
+
+
+def descending_order(values: np.ndarray) -> np.ndarray:
+    """Indices sorting values high to low, ties kept in original order (like list.sort)."""
+    return np.argsort(-np.asarray(values, dtype=float), kind='stable')
+
+
+def group_allocation(
+    keys: np.ndarray,
+    tickers: np.ndarray,
+    total_value: float,
+    key_name: str,
+    value: np.ndarray,
+    cost: Optional[np.ndarray] = None
+) -> List[Dict[str, Any]]:
+    """
+    Per-group value/weight/holdings (plus cost/gain when cost is given),
+    groups in first-appearance order then sorted by weight descending.
+    """
+    codes, uniques = pd.factorize(pd.Series(keys, dtype=object), sort=False)
+    n_groups = len(uniques)
+    group_value = np.bincount(codes, weights=value, minlength=n_groups)
+    counts = np.bincount(codes, minlength=n_groups)
+    weights = safe_divide(group_value, np.full(n_groups, total_value), 100)
+
+    # Tickers of each group in holding order.
+    by_group = np.argsort(codes, kind='stable')
+    members = np.split(tickers[by_group], np.cumsum(counts)[:-1])
+
+    if cost is not None:
+        group_cost = np.bincount(codes, weights=cost, minlength=n_groups)
+        gain = group_value - group_cost
+        gain_pct = safe_divide(gain, group_cost, 100)
+
+    allocation = []
+    for g in descending_order(weights):
+        entry = {key_name: uniques[g], 'value': float(group_value[g])}
+        if cost is not None:
+            entry['cost'] = float(group_cost[g])
+        entry['weight'] = float(weights[g])
+        entry['holding_count'] = int(counts[g])
+        if cost is not None:
+            entry['gain'] = float(gain[g])
+            entry['gain_pct'] = float(gain_pct[g])
+        entry['holdings'] = members[g].tolist()
+        allocation.append(entry)
+    return allocation
+
+
+def concentration_weights(weights_pct: np.ndarray) -> Tuple[float, float]:
+    """(HHI in basis points, effective count 1/HHI) for weights given in percent."""
+    weights_pct = np.asarray(weights_pct, dtype=float)
+    hhi = float(np.sum((weights_pct / 100) ** 2))
+    effective = (1 / hhi) if hhi > 0 else len(weights_pct)
+    return hhi * 10000, effective
+
+
+def top_n_sum(values: np.ndarray, n: int) -> float:
+    """Sum of the n largest values (all of them when fewer than n)."""
+    values = np.asarray(values, dtype=float)
+    if len(values) <= n:
+        return float(values.sum())
+    return float(np.partition(values, len(values) - n)[-n:].sum())
+
+
+# ============================================
+# RETURN / RISK KERNELS
+# ============================================
+
+def std_dev(values: Any) -> float:
+    """Sample standard deviation (ddof=1); 0 for fewer than two values."""
+    values = np.asarray(values, dtype=float)
+    if len(values) < 2:
+        return 0.0
+    return float(np.std(values, ddof=1))
+
+
+def downside_deviation(returns: Any, mar: float = 0) -> float:
+    """Semi-deviation below MAR (population form)."""
+    returns = np.asarray(returns, dtype=float)
+    if len(returns) == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(np.minimum(0, returns - mar) ** 2)))
+
+
+def max_drawdown(values: Any) -> Tuple[float, int]:
+    """Maximum drawdown (%) and the number of steps from its peak to its trough."""
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return 0.0, 0
+
+    running_peak = np.maximum.accumulate(values)
+    # Index of the most recent strict new high (the first point counts as one).
+    new_high = np.empty(len(values), dtype=bool)
+    new_high[0] = True
+    new_high[1:] = values[1:] > running_peak[:-1]
+    peak_index = np.maximum.accumulate(np.where(new_high, np.arange(len(values)), 0))
+
+    drawdown = safe_divide(running_peak - values, running_peak)
+    trough = int(np.argmax(drawdown))
+    if drawdown[trough] <= 0:
+        return 0.0, 0
+    return float(drawdown[trough] * 100), int(trough - peak_index[trough])
+
+
+def value_at_risk(returns: Any, confidence: float = 0.95) -> float:
+    """Historical VaR (%) at the given confidence."""
+    returns = np.sort(np.asarray(returns, dtype=float))
+    if len(returns) == 0:
+        return 0.0
+    index = int((1 - confidence) * len(returns))
+    return float(abs(returns[index]) * 100) if index < len(returns) else 0.0
+
+
+def conditional_var(returns: Any, confidence: float = 0.95) -> float:
+    """Expected shortfall (%): mean of the returns up to the VaR index."""
+    returns = np.sort(np.asarray(returns, dtype=float))
+    if len(returns) == 0:
+        return 0.0
+    index = int((1 - confidence) * len(returns))
+    tail = returns[:index + 1]
+    return float(abs(tail.mean()) * 100) if len(tail) else 0.0
+
+
+def correlation(x: Any, y: Any) -> float:
+    """Pearson correlation; 0 when lengths differ, n < 2 or a series is constant."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) != len(y) or len(x) < 2:
+        return 0.0
+    xc, yc = x - x.mean(), y - y.mean()
+    denom = np.sqrt((xc @ xc) * (yc @ yc))
+    return float((xc @ yc) / denom) if denom > 0 else 0.0
+
+
+def beta(portfolio_returns: Any, benchmark_returns: Any) -> float:
+    """Covariance / benchmark variance; 1.0 when undefined."""
+    p = np.asarray(portfolio_returns, dtype=float)
+    b = np.asarray(benchmark_returns, dtype=float)
+    if len(p) != len(b) or len(p) < 2:
+        return 1.0
+    bc = b - b.mean()
+    var_b = bc @ bc
+    return float(((p - p.mean()) @ bc) / var_b) if var_b != 0 else 1.0
+
+
+def compound_values(start_value: float, returns_pct: Any) -> np.ndarray:
+    """Value path start, start*(1+r1), ... for percentage returns."""
+    growth = np.cumprod(1 + np.asarray(returns_pct, dtype=float) / 100)
+    return np.concatenate([[start_value], start_value * growth])
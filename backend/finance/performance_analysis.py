@@ -2,10 +2,28 @@
 # Performance Analysis - Real calculations
 
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 import math
 
+import numpy as np
+
+from holdings import (
+    CURRENCY_CHARS,
+    Holdings,
+    parse_numbers,
+    safe_divide,
+    descending_order,
+    compound_values,
+    std_dev,
+    downside_deviation,
+    max_drawdown,
+    value_at_risk,
+    conditional_var,
+    correlation,
+    beta,
+)
+
 
 # ============================================
 # DATA CLASSES
@@ -110,118 +128,23 @@ class PerformanceAnalysisResult:
 # UTILITY FUNCTIONS
 # ============================================
 
-def parse_number(value: Any) -> float:
-    """Parse various number formats to float."""
-    if value is None or value == '':
-        return 0.0
-    if isinstance(value, (int, float)):
-        return 0.0 if math.isnan(value) else float(value)
-    
-    s = str(value)
-    for char in ['$', '€', '£', '¥', '₩', ',', ' ', '%']:
-        s = s.replace(char, '')
-    
-    if s.startswith('(') and s.endswith(')'):
-        s = '-' + s[1:-1]
-    
-    try:
-        return float(s)
-    except ValueError:
-        return 0.0
-
-
-def calculate_std_dev(values: List[float]) -> float:
-    """Calculate standard deviation."""
-    if len(values) < 2:
-        return 0.0
-    mean = sum(values) / len(values)
-    squared_diffs = [(v - mean) ** 2 for v in values]
-    variance = sum(squared_diffs) / (len(values) - 1)
-    return math.sqrt(variance)
-
-
-def calculate_downside_deviation(returns: List[float], mar: float = 0) -> float:
-    """Calculate downside deviation (semi-deviation below MAR)."""
-    downside_returns = [min(0, r - mar) ** 2 for r in returns]
-    if not downside_returns:
-        return 0.0
-    return math.sqrt(sum(downside_returns) / len(downside_returns))
-
-
-def calculate_max_drawdown(values: List[float]) -> Tuple[float, int]:
-    """Calculate maximum drawdown and its duration."""
-    if not values:
-        return 0.0, 0
-    
-    peak = values[0]
-    max_dd = 0.0
-    max_dd_duration = 0
-    current_dd_start = 0
-    
-    for i, value in enumerate(values):
-        if value > peak:
-            peak = value
-            current_dd_start = i
-        
-        dd = (peak - value) / peak if peak > 0 else 0
-        if dd > max_dd:
-            max_dd = dd
-            max_dd_duration = i - current_dd_start
-    
-    return max_dd * 100, max_dd_duration
-
-
-def calculate_var(returns: List[float], confidence: float = 0.95) -> float:
-    """Calculate Value at Risk."""
-    if not returns:
-        return 0.0
-    sorted_returns = sorted(returns)
-    index = int((1 - confidence) * len(sorted_returns))
-    return abs(sorted_returns[index]) * 100 if index < len(sorted_returns) else 0.0
-
+# Daily change columns are often given as '1.2%'.
+PERFORMANCE_STRIP_CHARS = CURRENCY_CHARS + '%'
 
-def calculate_cvar(returns: List[float], confidence: float = 0.95) -> float:
-    """Calculate Conditional Value at Risk (Expected Shortfall)."""
-    if not returns:
-        return 0.0
-    sorted_returns = sorted(returns)
-    index = int((1 - confidence) * len(sorted_returns))
-    tail_returns = sorted_returns[:index + 1]
-    return abs(sum(tail_returns) / len(tail_returns)) * 100 if tail_returns else 0.0
 
-
-def calculate_correlation(x: List[float], y: List[float]) -> float:
-    """Calculate Pearson correlation coefficient."""
-    if len(x) != len(y) or len(x) < 2:
-        return 0.0
-    
-    n = len(x)
-    mean_x = sum(x) / n
-    mean_y = sum(y) / n
-    
-    cov = sum((x[i] - mean_x) * (y[i] - mean_y) for i in range(n)) / (n - 1)
-    std_x = calculate_std_dev(x)
-    std_y = calculate_std_dev(y)
-    
-    if std_x == 0 or std_y == 0:
-        return 0.0
-    
-    return cov / (std_x * std_y)
+def parse_number(value: Any) -> float:
+    """Parse various number formats to float."""
+    return float(parse_numbers([value], PERFORMANCE_STRIP_CHARS)[0])
 
 
-def calculate_beta(portfolio_returns: List[float], benchmark_returns: List[float]) -> float:
-    """Calculate portfolio beta."""
-    if len(portfolio_returns) != len(benchmark_returns) or len(portfolio_returns) < 2:
-        return 1.0
-    
-    n = len(portfolio_returns)
-    mean_p = sum(portfolio_returns) / n
-    mean_b = sum(benchmark_returns) / n
-    
-    cov = sum((portfolio_returns[i] - mean_p) * (benchmark_returns[i] - mean_b) for i in range(n)) / (n - 1)
-    var_b = sum((b - mean_b) ** 2 for b in benchmark_returns) / (n - 1)
-    
-    return cov / var_b if var_b != 0 else 1.0
+# Array kernels live in holdings.py; the old names stay importable.
+calculate_std_dev = std_dev
+calculate_downside_deviation = downside_deviation
+calculate_max_drawdown = max_drawdown
+calculate_var = value_at_risk
+calculate_cvar = conditional_var
+calculate_correlation = correlation
+calculate_beta = beta
 
 
 # ============================================
@@ -253,59 +176,30 @@ def calculate_performance_analysis(
     
     # Extract columns
     ticker_col = columns.get('ticker', '')
-    name_col = columns.get('name', '')
-    sector_col = columns.get('sector', '')
     shares_col = columns.get('shares', '')
     avg_cost_col = columns.get('avg_cost', '')
     current_price_col = columns.get('current_price', '')
-    daily_change_col = columns.get('daily_change', '')
     
     if not all([ticker_col, shares_col, avg_cost_col, current_price_col]):
         return _create_empty_result("Missing required columns")
     
     # ----------------------------------------
-    # 1. PARSE HOLDINGS
+    # 1. PARSE HOLDINGS (columnar)
     # ----------------------------------------
-    holdings = []
+    holdings = Holdings.from_rows(data, columns, strip=PERFORMANCE_STRIP_CHARS)
     
-    for row in data:
-        shares = parse_number(row.get(shares_col, 0))
-        if shares <= 0:
-            continue
-        
-        avg_cost = parse_number(row.get(avg_cost_col, 0))
-        current_price = parse_number(row.get(current_price_col, 0))
-        daily_change = parse_number(row.get(daily_change_col, 0)) if daily_change_col else 0
-        
-        market_value = shares * current_price
-        cost_basis = shares * avg_cost
-        return_pct = ((current_price - avg_cost) / avg_cost * 100) if avg_cost > 0 else 0
-        
-        holdings.append({
-            'ticker': str(row.get(ticker_col, 'Unknown')),
-            'name': str(row.get(name_col, '')) if name_col else '',
-            'sector': str(row.get(sector_col, 'Unclassified')) if sector_col else 'Unclassified',
-            'shares': shares,
-            'avg_cost': avg_cost,
-            'current_price': current_price,
-            'market_value': market_value,
-            'cost_basis': cost_basis,
-            'return_pct': return_pct,
-            'daily_change_pct': daily_change,
-            'weight': 0  # Calculate after total
-        })
-    
-    if not holdings:
+    if len(holdings) == 0:
         return _create_empty_result("No valid holdings found")
     
+    market_value = holdings.market_value
+    return_pct = safe_divide(holdings.current_price - holdings.avg_cost, holdings.avg_cost, 100)
+    
     # ----------------------------------------
     # 2. CALCULATE TOTALS AND WEIGHTS
     # ----------------------------------------
-    total_value = sum(h['market_value'] for h in holdings)
-    total_cost = sum(h['cost_basis'] for h in holdings)
-    
-    for h in holdings:
-        h['weight'] = (h['market_value'] / total_value * 100) if total_value > 0 else 0
+    total_value = float(market_value.sum())
+    total_cost = float(holdings.cost_basis.sum())
+    weights = safe_divide(market_value, total_value, 100)
     
     # ----------------------------------------
     # 3. RETURN METRICS
@@ -314,18 +208,17 @@ def calculate_performance_analysis(
     total_return_pct = (total_return / total_cost * 100) if total_cost > 0 else 0
     
     # Simulate daily returns based on current holdings' volatility
-    holding_returns = [h['return_pct'] for h in holdings]
-    daily_changes = [h['daily_change_pct'] for h in holdings if h['daily_change_pct'] != 0]
+    daily_changes = holdings.daily_change_pct[holdings.daily_change_pct != 0]
     
-    if not daily_changes:
+    if len(daily_changes) == 0:
         # Generate simulated daily returns
-        daily_changes = [r / 252 + (i % 2 - 0.5) * 0.5 for i, r in enumerate(holding_returns)]
+        daily_changes = return_pct / 252 + (np.arange(len(return_pct)) % 2 - 0.5) * 0.5
     
-    avg_daily_return = sum(daily_changes) / len(daily_changes) if daily_changes else 0
+    avg_daily_return = float(daily_changes.mean())
     annualized_return = avg_daily_return * 252
     
-    positive_days = sum(1 for d in daily_changes if d > 0)
-    negative_days = sum(1 for d in daily_changes if d < 0)
+    positive_days = int((daily_changes > 0).sum())
+    negative_days = int((daily_changes < 0).sum())
     
     returns = {
         'total_return': total_return,
@@ -333,33 +226,30 @@ def calculate_performance_analysis(
         'annualized_return': annualized_return,
         'daily_return_avg': avg_daily_return,
         'monthly_return_avg': avg_daily_return * 21,
-        'best_day': max(daily_changes) if daily_changes else 0,
-        'worst_day': min(daily_changes) if daily_changes else 0,
+        'best_day': float(daily_changes.max()),
+        'worst_day': float(daily_changes.min()),
         'positive_days': positive_days,
         'negative_days': negative_days,
-        'win_rate_daily': (positive_days / len(daily_changes) * 100) if daily_changes else 0
+        'win_rate_daily': positive_days / len(daily_changes) * 100
     }
     
     # ----------------------------------------
     # 4. RISK METRICS
     # ----------------------------------------
-    daily_vol = calculate_std_dev(daily_changes) if daily_changes else 0
+    daily_returns = daily_changes / 100
+    daily_vol = std_dev(daily_changes)
     annual_vol = daily_vol * math.sqrt(252)
     
-    downside_dev = calculate_downside_deviation([d / 100 for d in daily_changes])
+    downside_dev = downside_deviation(daily_returns)
     
     # Simulate portfolio values for drawdown calculation
-    portfolio_values = [total_cost]
-    current_val = total_cost
-    for d in daily_changes:
-        current_val = current_val * (1 + d / 100)
-        portfolio_values.append(current_val)
+    portfolio_values = compound_values(total_cost, daily_changes)
     
-    max_dd, max_dd_duration = calculate_max_drawdown(portfolio_values)
+    max_dd, max_dd_duration = max_drawdown(portfolio_values)
     
-    var_95 = calculate_var([d / 100 for d in daily_changes], 0.95)
-    var_99 = calculate_var([d / 100 for d in daily_changes], 0.99)
-    cvar_95 = calculate_cvar([d / 100 for d in daily_changes], 0.95)
+    var_95 = value_at_risk(daily_returns, 0.95)
+    var_99 = value_at_risk(daily_returns, 0.99)
+    cvar_95 = conditional_var(daily_returns, 0.95)
     
     risk = {
         'volatility_daily': daily_vol,
@@ -396,53 +286,59 @@ def calculate_performance_analysis(
     # 6. BENCHMARK COMPARISON (if provided)
     # ----------------------------------------
     benchmark_comparison = None
-    if benchmark_returns and len(benchmark_returns) == len(daily_changes):
-        portfolio_ret_list = [d / 100 for d in daily_changes]
-        benchmark_ret_list = [b / 100 for b in benchmark_returns]
+    if benchmark_returns is not None and len(benchmark_returns) and len(benchmark_returns) == len(daily_changes):
+        benchmark_pct = np.asarray(benchmark_returns, dtype=float)
+        benchmark_daily = benchmark_pct / 100
         
-        beta = calculate_beta(portfolio_ret_list, benchmark_ret_list)
-        correlation = calculate_correlation(portfolio_ret_list, benchmark_ret_list)
+        portfolio_beta = beta(daily_returns, benchmark_daily)
+        portfolio_corr = correlation(daily_returns, benchmark_daily)
         
-        benchmark_total = sum(benchmark_returns)
+        benchmark_total = float(benchmark_pct.sum())
         excess_return_bench = total_return_pct - benchmark_total
         
-        tracking_errors = [portfolio_ret_list[i] - benchmark_ret_list[i] for i in range(len(portfolio_ret_list))]
-        tracking_error = calculate_std_dev(tracking_errors) * math.sqrt(252) * 100
+        tracking_error = std_dev(daily_returns - benchmark_daily) * math.sqrt(252) * 100
         
         info_ratio = excess_return_bench / tracking_error if tracking_error > 0 else 0
-        alpha = total_return_pct - (risk_free_rate * 100 + beta * (benchmark_total - risk_free_rate * 100))
+        alpha = total_return_pct - (risk_free_rate * 100 + portfolio_beta * (benchmark_total - risk_free_rate * 100))
         
         benchmark_comparison = {
             'portfolio_return': total_return_pct,
             'benchmark_return': benchmark_total,
             'excess_return': excess_return_bench,
             'alpha': alpha,
-            'beta': beta,
-            'correlation': correlation,
-            'r_squared': correlation ** 2,
+            'beta': portfolio_beta,
+            'correlation': portfolio_corr,
+            'r_squared': portfolio_corr ** 2,
             'tracking_error': tracking_error,
             'information_ratio': info_ratio
         }
         
-        risk['beta'] = beta
+        risk['beta'] = portfolio_beta
         risk['tracking_error'] = tracking_error
         risk_adjusted['information_ratio'] = info_ratio
     
     # ----------------------------------------
     # 7. HOLDING PERFORMANCE
     # ----------------------------------------
-    holding_performance = []
-    for h in sorted(holdings, key=lambda x: x['return_pct'], reverse=True):
-        contribution = h['weight'] * h['return_pct'] / 100
-        holding_performance.append({
-            'ticker': h['ticker'],
-            'name': h['name'],
-            'sector': h['sector'],
-            'weight': h['weight'],
-            'return_pct': h['return_pct'],
-            'contribution': contribution,
-            'daily_change_pct': h['daily_change_pct']
-        })
+    order = descending_order(return_pct)
+    contribution = weights * return_pct / 100
+    holding_performance = [
+        {
+            'ticker': ticker,
+            'name': name,
+            'sector': sector,
+            'weight': weight,
+            'return_pct': ret,
+            'contribution': contrib,
+            'daily_change_pct': daily
+        }
+        for ticker, name, sector, weight, ret, contrib, daily in zip(
+            holdings.ticker[order].tolist(), holdings.name[order].tolist(),
+            holdings.sector[order].tolist(), weights[order].tolist(),
+            return_pct[order].tolist(), contribution[order].tolist(),
+            holdings.daily_change_pct[order].tolist()
+        )
+    ]
     
     # ----------------------------------------
     # 8. PERIOD RETURNS (simulated)
@@ -483,9 +379,9 @@ def calculate_performance_analysis(
     if sharpe_ratio < 0.5:
         warnings.append(f"Low risk-adjusted return: Sharpe ratio {sharpe_ratio:.2f}")
     
-    losing_holdings = [h for h in holdings if h['return_pct'] < -20]
+    losing_holdings = int((return_pct < -20).sum())
     if losing_holdings:
-        warnings.append(f"{len(losing_holdings)} holdings down more than 20%")
+        warnings.append(f"{losing_holdings} holdings down more than 20%")
     
     # ----------------------------------------
     # RETURN RESULT
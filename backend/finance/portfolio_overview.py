@@ -7,6 +7,20 @@ import math
 from datetime import datetime
 from typing import List, Dict, Any
 
+import numpy as np
+
+from holdings import (
+    Holdings,
+    num_rows,
+    parse_numbers,
+    safe_divide,
+    descending_order,
+    group_allocation,
+    concentration_weights,
+    top_n_sum,
+    std_dev,
+)
+
 
 # ============================================
 # UTILITY FUNCTIONS
@@ -14,34 +28,10 @@ from typing import List, Dict, Any
 
 def parse_number(value: Any) -> float:
     """Parse various number formats to float."""
-    if value is None or value == '':
-        return 0.0
-    if isinstance(value, (int, float)):
-        if isinstance(value, float) and math.isnan(value):
-            return 0.0
-        return float(value)
-    
-    s = str(value)
-    for char in ['$', '€', '£', '¥', '₩', ',', ' ']:
-        s = s.replace(char, '')
-    
-    if s.startswith('(') and s.endswith(')'):
-        s = '-' + s[1:-1]
-    
-    try:
-        return float(s)
-    except ValueError:
-        return 0.0
+    return float(parse_numbers([value])[0])
 
 
-def calculate_std_dev(values: List[float]) -> float:
-    """Calculate standard deviation."""
-    if len(values) < 2:
-        return 0.0
-    mean = sum(values) / len(values)
-    squared_diffs = [(v - mean) ** 2 for v in values]
-    variance = sum(squared_diffs) / (len(values) - 1)
-    return math.sqrt(variance)
+calculate_std_dev = std_dev
 
 
 def _to_native_type(obj):
@@ -66,185 +56,127 @@ def calculate_portfolio_overview(data: List[Dict[str, Any]], columns: Dict[str,
     
     # Extract column names
     ticker_col = columns.get('ticker', '')
-    name_col = columns.get('name', '')
-    sector_col = columns.get('sector', '')
-    asset_class_col = columns.get('asset_class', '')
     shares_col = columns.get('shares', '')
     avg_cost_col = columns.get('avg_cost', '')
     current_price_col = columns.get('current_price', '')
-    daily_change_col = columns.get('daily_change', '')
     
     if not all([ticker_col, shares_col, avg_cost_col, current_price_col]):
         return _create_empty_result("Missing required columns")
     
     # ----------------------------------------
-    # 1. PARSE HOLDINGS
+    # 1. PARSE HOLDINGS (columnar)
     # ----------------------------------------
-    holdings = []
-    
-    for row in data:
-        ticker = str(row.get(ticker_col, ''))
-        if not ticker:
-            continue
-            
-        shares = parse_number(row.get(shares_col, 0))
-        if shares <= 0:
-            continue
-            
-        avg_cost = parse_number(row.get(avg_cost_col, 0))
-        current_price = parse_number(row.get(current_price_col, 0))
-        daily_change = parse_number(row.get(daily_change_col, 0)) if daily_change_col else 0
-        
-        market_value = shares * current_price
-        cost_basis = shares * avg_cost
-        unrealized_gain = market_value - cost_basis
-        unrealized_gain_pct = (unrealized_gain / cost_basis * 100) if cost_basis > 0 else 0
-        
-        holdings.append({
-            'ticker': ticker,
-            'name': str(row.get(name_col, '')) if name_col else ticker,
-            'sector': str(row.get(sector_col, 'Unclassified')) if sector_col else 'Unclassified',
-            'asset_class': str(row.get(asset_class_col, 'Equity')) if asset_class_col else 'Equity',
-            'shares': shares,
-            'avg_cost': avg_cost,
-            'current_price': current_price,
-            'market_value': market_value,
-            'cost_basis': cost_basis,
-            'unrealized_gain': unrealized_gain,
-            'unrealized_gain_pct': unrealized_gain_pct,
-            'daily_change': daily_change * current_price * shares / 100 if daily_change else 0,
-            'daily_change_pct': daily_change,
-            'weight': 0
-        })
+    h = Holdings.from_rows(data, columns, ticker_default='', name_default=None, require_ticker=True)
     
-    if not holdings:
+    if len(h) == 0:
         return _create_empty_result("No valid holdings found")
     
+    market_value = h.market_value
+    cost_basis = h.cost_basis
+    
     # ----------------------------------------
     # 2. CALCULATE TOTALS
     # ----------------------------------------
-    total_value = sum(h['market_value'] for h in holdings)
-    total_cost = sum(h['cost_basis'] for h in holdings)
+    total_value = float(market_value.sum())
+    total_cost = float(cost_basis.sum())
     total_gain = total_value - total_cost
     total_gain_pct = (total_gain / total_cost * 100) if total_cost > 0 else 0
     
-    daily_change = sum(h['daily_change'] for h in holdings)
+    daily_change_value = h.daily_change_pct * market_value / 100
+    daily_change = float(daily_change_value.sum())
     daily_change_pct = (daily_change / total_value * 100) if total_value > 0 else 0
     
-    # Calculate weights
-    for h in holdings:
-        h['weight'] = (h['market_value'] / total_value * 100) if total_value > 0 else 0
+    weights = safe_divide(market_value, total_value, 100)
     
     # Sort by weight
-    holdings.sort(key=lambda x: x['weight'], reverse=True)
+    order = descending_order(weights)
+    h = h.take(order)
+    market_value, cost_basis = market_value[order], cost_basis[order]
+    daily_change_value, weights = daily_change_value[order], weights[order]
+    unrealized_gain = market_value - cost_basis
+    unrealized_gain_pct = safe_divide(unrealized_gain, cost_basis, 100)
+    
+    holdings = [
+        {
+            'ticker': ticker,
+            'name': name,
+            'sector': sector,
+            'asset_class': asset_class,
+            'shares': shares,
+            'avg_cost': avg_cost,
+            'current_price': current_price,
+            'market_value': mv,
+            'cost_basis': cb,
+            'unrealized_gain': gain,
+            'unrealized_gain_pct': gain_pct,
+            'daily_change': dcv,
+            'daily_change_pct': dcp,
+            'weight': weight
+        }
+        for ticker, name, sector, asset_class, shares, avg_cost, current_price,
+            mv, cb, gain, gain_pct, dcv, dcp, weight in zip(
+            h.ticker.tolist(), h.name.tolist(), h.sector.tolist(), h.asset_class.tolist(),
+            h.shares.tolist(), h.avg_cost.tolist(), h.current_price.tolist(),
+            market_value.tolist(), cost_basis.tolist(), unrealized_gain.tolist(),
+            unrealized_gain_pct.tolist(), daily_change_value.tolist(),
+            h.daily_change_pct.tolist(), weights.tolist()
+        )
+    ]
     
     # ----------------------------------------
     # 3. SECTOR ALLOCATION
     # ----------------------------------------
-    sector_map: Dict[str, Dict] = {}
-    
-    for h in holdings:
-        sector = h['sector']
-        if sector not in sector_map:
-            sector_map[sector] = {'value': 0, 'cost': 0, 'holdings': []}
-        sector_map[sector]['value'] += h['market_value']
-        sector_map[sector]['cost'] += h['cost_basis']
-        sector_map[sector]['holdings'].append(h['ticker'])
-    
-    sector_allocation = []
-    for sector, sdata in sector_map.items():
-        value = sdata['value']
-        cost = sdata['cost']
-        gain = value - cost
-        
-        sector_allocation.append({
-            'sector': sector,
-            'value': value,
-            'cost': cost,
-            'weight': (value / total_value * 100) if total_value > 0 else 0,
-            'holding_count': len(sdata['holdings']),
-            'gain': gain,
-            'gain_pct': (gain / cost * 100) if cost > 0 else 0,
-            'holdings': sdata['holdings']
-        })
-    
-    sector_allocation.sort(key=lambda x: x['weight'], reverse=True)
+    sector_allocation = group_allocation(h.sector, h.ticker, total_value, 'sector', market_value, cost_basis)
     
     # ----------------------------------------
     # 4. ASSET CLASS ALLOCATION
     # ----------------------------------------
-    asset_class_map: Dict[str, Dict] = {}
-    
-    for h in holdings:
-        asset_class = h['asset_class']
-        if asset_class not in asset_class_map:
-            asset_class_map[asset_class] = {'value': 0, 'holdings': []}
-        asset_class_map[asset_class]['value'] += h['market_value']
-        asset_class_map[asset_class]['holdings'].append(h['ticker'])
-    
-    asset_class_allocation = []
-    for asset_class, adata in asset_class_map.items():
-        asset_class_allocation.append({
-            'asset_class': asset_class,
-            'value': adata['value'],
-            'weight': (adata['value'] / total_value * 100) if total_value > 0 else 0,
-            'holding_count': len(adata['holdings']),
-            'holdings': adata['holdings']
-        })
-    
-    asset_class_allocation.sort(key=lambda x: x['weight'], reverse=True)
+    asset_class_allocation = group_allocation(h.asset_class, h.ticker, total_value, 'asset_class', market_value)
     
     # ----------------------------------------
     # 5. CONCENTRATION METRICS
     # ----------------------------------------
-    weights = [h['weight'] for h in holdings]
-    weights_decimal = [w / 100 for w in weights]
-    
-    hhi_sum = sum(w * w for w in weights_decimal)
-    herfindahl_index = hhi_sum * 10000
-    effective_holdings = (1 / hhi_sum) if hhi_sum > 0 else len(holdings)
-    
-    sorted_weights = sorted(weights, reverse=True)
-    top5_weight = sum(sorted_weights[:5]) if len(sorted_weights) >= 5 else sum(sorted_weights)
-    top10_weight = sum(sorted_weights[:10]) if len(sorted_weights) >= 10 else sum(sorted_weights)
+    herfindahl_index, effective_holdings = concentration_weights(weights)
+    top5_weight = top_n_sum(weights, 5)
+    top10_weight = top_n_sum(weights, 10)
     
     concentration = {
         'herfindahl_index': herfindahl_index,
         'effective_num_holdings': effective_holdings,
         'top5_weight': top5_weight,
         'top10_weight': top10_weight,
-        'max_weight': max(weights) if weights else 0,
-        'min_weight': min(weights) if weights else 0,
-        'weight_std_dev': calculate_std_dev(weights)
+        'max_weight': float(weights.max()),
+        'min_weight': float(weights.min()),
+        'weight_std_dev': std_dev(weights)
     }
     
     # ----------------------------------------
     # 6. GAIN/LOSS BREAKDOWN
     # ----------------------------------------
-    gainers = [h for h in holdings if h['unrealized_gain'] > 0]
-    losers = [h for h in holdings if h['unrealized_gain'] < 0]
-    unchanged = [h for h in holdings if h['unrealized_gain'] == 0]
+    gainers = unrealized_gain > 0
+    losers = unrealized_gain < 0
+    n_gainers, n_losers = int(gainers.sum()), int(losers.sum())
     
     gain_loss = {
-        'total_gainers': len(gainers),
-        'total_losers': len(losers),
-        'total_unchanged': len(unchanged),
-        'gainers_value': sum(h['market_value'] for h in gainers),
-        'losers_value': sum(h['market_value'] for h in losers),
-        'gainers_gain': sum(h['unrealized_gain'] for h in gainers),
-        'losers_loss': sum(h['unrealized_gain'] for h in losers),
-        'avg_gainer_return': (sum(h['unrealized_gain_pct'] for h in gainers) / len(gainers)) if gainers else 0,
-        'avg_loser_return': (sum(h['unrealized_gain_pct'] for h in losers) / len(losers)) if losers else 0,
-        'win_rate': (len(gainers) / len(holdings) * 100) if holdings else 0
+        'total_gainers': n_gainers,
+        'total_losers': n_losers,
+        'total_unchanged': int((unrealized_gain == 0).sum()),
+        'gainers_value': float(market_value[gainers].sum()),
+        'losers_value': float(market_value[losers].sum()),
+        'gainers_gain': float(unrealized_gain[gainers].sum()),
+        'losers_loss': float(unrealized_gain[losers].sum()),
+        'avg_gainer_return': float(unrealized_gain_pct[gainers].mean()) if n_gainers else 0,
+        'avg_loser_return': float(unrealized_gain_pct[losers].mean()) if n_losers else 0,
+        'win_rate': n_gainers / len(h) * 100
     }
     
     # ----------------------------------------
     # 7. SUMMARY
     # ----------------------------------------
-    top_holding = holdings[0] if holdings else None
-    sorted_by_gain = sorted(holdings, key=lambda x: x['unrealized_gain_pct'], reverse=True)
-    top_gainer = sorted_by_gain[0] if sorted_by_gain else None
-    top_loser = sorted_by_gain[-1] if sorted_by_gain else None
+    # Stable descending sort by gain: first maximum is the top gainer,
+    # last minimum is the top loser.
+    top_gainer = int(np.argmax(unrealized_gain_pct))
+    top_loser = len(h) - 1 - int(np.argmin(unrealized_gain_pct[::-1]))
     
     summary = {
         'total_value': total_value,
@@ -253,27 +185,27 @@ def calculate_portfolio_overview(data: List[Dict[str, Any]], columns: Dict[str,
         'total_gain_pct': total_gain_pct,
         'daily_change': daily_change,
         'daily_change_pct': daily_change_pct,
-        'num_holdings': len(holdings),
+        'num_holdings': len(h),
         'num_sectors': len(sector_allocation),
-        'top_holding': {'ticker': top_holding['ticker'], 'weight': top_holding['weight']} if top_holding else None,
-        'top_gainer': {'ticker': top_gainer['ticker'], 'gain_pct': top_gainer['unrealized_gain_pct']} if top_gainer else None,
-        'top_loser': {'ticker': top_loser['ticker'], 'gain_pct': top_loser['unrealized_gain_pct']} if top_loser else None,
-        'avg_holding_size': total_value / len(holdings) if holdings else 0,
-        'largest_position': max(h['market_value'] for h in holdings) if holdings else 0,
-        'smallest_position': min(h['market_value'] for h in holdings) if holdings else 0
+        'top_holding': {'ticker': h.ticker[0], 'weight': float(weights[0])},
+        'top_gainer': {'ticker': h.ticker[top_gainer], 'gain_pct': float(unrealized_gain_pct[top_gainer])},
+        'top_loser': {'ticker': h.ticker[top_loser], 'gain_pct': float(unrealized_gain_pct[top_loser])},
+        'avg_holding_size': total_value / len(h),
+        'largest_position': float(market_value.max()),
+        'smallest_position': float(market_value.min())
     }
     
     # ----------------------------------------
     # 8. WARNINGS
     # ----------------------------------------
     if concentration['max_weight'] > 25:
-        warnings.append(f"High concentration: {holdings[0]['ticker']} represents {concentration['max_weight']:.1f}% of portfolio")
+        warnings.append(f"High concentration: {h.ticker[0]} represents {concentration['max_weight']:.1f}% of portfolio")
     
     if top5_weight > 70:
         warnings.append(f"Top 5 holdings represent {top5_weight:.1f}% of portfolio")
     
-    if effective_holdings < len(holdings) / 2:
-        warnings.append(f"Low diversification: Effective holdings ({effective_holdings:.1f}) much lower than actual ({len(holdings)})")
+    if effective_holdings < len(h) / 2:
+        warnings.append(f"Low diversification: Effective holdings ({effective_holdings:.1f}) much lower than actual ({len(h)})")
     
     if gain_loss['win_rate'] < 30:
         warnings.append(f"Low win rate: Only {gain_loss['win_rate']:.1f}% of holdings are profitable")
@@ -283,7 +215,7 @@ def calculate_portfolio_overview(data: List[Dict[str, Any]], columns: Dict[str,
     # ----------------------------------------
     return {
         'timestamp': datetime.now().isoformat(),
-        'data_points': len(data),
+        'data_points': num_rows(data),
         'holdings': holdings,
         'summary': summary,
         'sector_allocation': sector_allocation,
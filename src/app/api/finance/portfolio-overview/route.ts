@@ -1,71 +1,11 @@
 import { NextRequest, NextResponse } from 'next/server';
-import { spawn } from 'child_process';
-import path from 'path';
+import { proxyToWorker } from '../../proxy';
 
 export const dynamic = "force-dynamic";  // 👈 이 줄 추가
 
 
-export async function POST(req: NextRequest) {
-    try {
-        const body = await req.json();
-        
-        const pythonExecutable = path.resolve(process.cwd(), 'backend', 'venv', 'bin', 'python');
-        const scriptPath = path.resolve(process.cwd(), 'backend', 'finance', 'portfolio_overview.py');
-
-        const pythonProcess = spawn(pythonExecutable, [scriptPath]);
-
-        let result = '';
-        let error = '';
-
-        pythonProcess.stdout.on('data', (data) => {
-            result += data.toString();
-        });
-
-        pythonProcess.stderr.on('data', (data) => {
-            error += data.toString();
-        });
-
-        pythonProcess.stdin.write(JSON.stringify(body));
-        pythonProcess.stdin.end();
-
-        return new Promise<NextResponse>((resolve) => {
-            pythonProcess.on('close', (code) => {
-                if (code !== 0) {
-                    console.error(`Script exited with code ${code}`);
-                    console.error(error);
-                    try {
-                        const errorJson = JSON.parse(error);
-                        resolve(NextResponse.json(
-                            { error: errorJson.error || 'Unknown error in Python script.' },
-                            { status: 500 }
-                        ));
-                    } catch {
-                        resolve(NextResponse.json(
-                            { error: `Script failed: ${error}` },
-                            { status: 500 }
-                        ));
-                    }
-                } else {
-                    try {
-                        const jsonResult = JSON.parse(result);
-                        if (jsonResult.error) {
-                            resolve(NextResponse.json({ error: jsonResult.error }, { status: 400 }));
-                        } else {
-                            resolve(NextResponse.json(jsonResult));
-                        }
-                    } catch (e) {
-                        console.error('Failed to parse script output:', result);
-                        resolve(NextResponse.json(
-                            { error: `Failed to parse script output: ${result}` },
-                            { status: 500 }
-                        ));
-                    }
-                }
-            });
-        });
-    } catch (e: any) {
-        return NextResponse.json({ error: e.message }, { status: 500 });
-    }
+export async function POST(request: NextRequest) {
+    return proxyToWorker(request, 'portfolio_overview');
 }
 
 export async function GET() {
@@ -73,4 +13,4 @@ export async function GET() {
         message: 'Portfolio Overview API',
         usage: 'POST with { data: [...], columns: { ticker, shares, avg_cost, current_price, ... } }'
     });
-}
\ No newline at end of file
+}
@@ -32,3 +32,36 @@ export async function proxyToPython(request: NextRequest, endpoint: string) {
         return NextResponse.json({ error: error.message }, { status: 500 });
     }
 }
+
+// Runs one of the stdin/stdout analysis scripts (e.g. 'anova_analysis') on the
+// warm worker pool instead of spawning a fresh Python interpreter per request.
+export async function proxyToWorker(request: NextRequest, script: string) {
+    try {
+        const body = await request.text();
+
+        const response = await fetch(`${PYTHON_API_URL}/api/run/${script}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body,
+        });
+
+        if (!response.ok) {
+            const errorText = await response.text();
+            let error = errorText;
+            try {
+                error = JSON.parse(errorText).detail ?? errorText;
+            } catch(e) {
+                // Not a JSON error, use the raw text
+            }
+            console.error(`Error from worker pool for script ${script}:`, error);
+            return NextResponse.json({ error }, { status: response.status });
+        }
+
+        const data = await response.json();
+        return NextResponse.json(data);
+
+    } catch (error: any) {
+        console.error(`Error proxying to script ${script}:`, error);
+        return NextResponse.json({ error: error.message }, { status: 500 });
+    }
+}
@@ -213,75 +213,78 @@ def geometric_mean_of_matrices(matrices):
                 
     return geo_mean_matrix
 
-def main():
-    try:
-        input_data = sys.stdin.read()
-        
-        if not input_data.strip():
-            raise ValueError("Empty input received")
-        
-        payload = json.loads(input_data)
-        
-        hierarchy = payload.get('hierarchy')
-        matrices_by_respondent = payload.get('matrices')
-        alternatives = payload.get('alternatives')
-        goal = payload.get('goal', 'Goal')
+def run_ahp_analysis(payload):
+    hierarchy = payload.get('hierarchy')
+    matrices_by_respondent = payload.get('matrices')
+    alternatives = payload.get('alternatives')
+    goal = payload.get('goal', 'Goal')
 
-        print("="*60, file=sys.stderr)
-        print("AHP ANALYSIS STARTED", file=sys.stderr)
-        print("="*60, file=sys.stderr)
-        print(f"Number of matrix sets: {len(matrices_by_respondent)}", file=sys.stderr)
-        print(f"Matrix keys: {list(matrices_by_respondent.keys())}", file=sys.stderr)
+    print("="*60, file=sys.stderr)
+    print("AHP ANALYSIS STARTED", file=sys.stderr)
+    print("="*60, file=sys.stderr)
+    print(f"Number of matrix sets: {len(matrices_by_respondent)}", file=sys.stderr)
+    print(f"Matrix keys: {list(matrices_by_respondent.keys())}", file=sys.stderr)
 
-        if not hierarchy or not isinstance(hierarchy, list) or len(hierarchy) == 0:
-            raise ValueError(f"Invalid or missing hierarchy data. Received: {hierarchy}")
-        
-        if not matrices_by_respondent or not isinstance(matrices_by_respondent, dict):
-            raise ValueError("Invalid or missing matrices data")
+    if not hierarchy or not isinstance(hierarchy, list) or len(hierarchy) == 0:
+        raise ValueError(f"Invalid or missing hierarchy data. Received: {hierarchy}")
 
-        criteria_nodes = []
-        if 'nodes' in hierarchy[0]:
-            for node in hierarchy[0]['nodes']:
-                criteria_nodes.append(node['name'])
+    if not matrices_by_respondent or not isinstance(matrices_by_respondent, dict):
+        raise ValueError("Invalid or missing matrices data")
 
-        if not criteria_nodes:
-            raise ValueError("No criteria found in hierarchy structure.")
+    criteria_nodes = []
+    if 'nodes' in hierarchy[0]:
+        for node in hierarchy[0]['nodes']:
+            criteria_nodes.append(node['name'])
 
-        print(f"Criteria found: {criteria_nodes}", file=sys.stderr)
-        print(f"Alternatives: {alternatives}", file=sys.stderr)
+    if not criteria_nodes:
+        raise ValueError("No criteria found in hierarchy structure.")
 
-        has_alternatives = bool(alternatives and len(alternatives) > 0)
-        
-        ahp = AHPAnalysis(criteria_nodes, alternatives if has_alternatives else None)
-        
-        agg_matrices = {}
-        for key, matrix_list in matrices_by_respondent.items():
-            if matrix_list and len(matrix_list) > 0:
-                print(f"\nAggregating matrices for key: {key}", file=sys.stderr)
-                agg_matrices[key] = geometric_mean_of_matrices(matrix_list)
+    print(f"Criteria found: {criteria_nodes}", file=sys.stderr)
+    print(f"Alternatives: {alternatives}", file=sys.stderr)
 
-        if 'criteria' in agg_matrices:
-             ahp.set_criteria_matrix(agg_matrices['criteria'])
-        elif 'goal' in agg_matrices:
-            ahp.set_criteria_matrix(agg_matrices['goal'])
-        else:
-            raise ValueError("Criteria comparison matrix for 'goal' or 'criteria' not found in matrices")
+    has_alternatives = bool(alternatives and len(alternatives) > 0)
 
-        if has_alternatives:
-            for criterion in criteria_nodes:
-                matrix_key = f"alt_{criterion}"
-                if matrix_key in agg_matrices:
-                    ahp.set_alternative_matrix(criterion, agg_matrices[matrix_key])
+    ahp = AHPAnalysis(criteria_nodes, alternatives if has_alternatives else None)
 
-        ahp.analyze()
-        results_data = ahp.get_results()
+    agg_matrices = {}
+    for key, matrix_list in matrices_by_respondent.items():
+        if matrix_list and len(matrix_list) > 0:
+            print(f"\nAggregating matrices for key: {key}", file=sys.stderr)
+            agg_matrices[key] = geometric_mean_of_matrices(matrix_list)
 
-        response = {"results": results_data}
+    if 'criteria' in agg_matrices:
+         ahp.set_criteria_matrix(agg_matrices['criteria'])
+    elif 'goal' in agg_matrices:
+        ahp.set_criteria_matrix(agg_matrices['goal'])
+    else:
+        raise ValueError("Criteria comparison matrix for 'goal' or 'criteria' not found in matrices")
+
+    if has_alternatives:
+        for criterion in criteria_nodes:
+            matrix_key = f"alt_{criterion}"
+            if matrix_key in agg_matrices:
+                ahp.set_alternative_matrix(criterion, agg_matrices[matrix_key])
+
+    ahp.analyze()
+    results_data = ahp.get_results()
+
+    response = {"results": results_data}
+
+    print("\n" + "="*60, file=sys.stderr)
+    print("ANALYSIS COMPLETE", file=sys.stderr)
+    print("="*60 + "\n", file=sys.stderr)
+    return response
+
+
+def main():
+    try:
+        input_data = sys.stdin.read()
         
-        print("\n" + "="*60, file=sys.stderr)
-        print("ANALYSIS COMPLETE", file=sys.stderr)
-        print("="*60 + "\n", file=sys.stderr)
+        if not input_data.strip():
+            raise ValueError("Empty input received")
         
+        payload = json.loads(input_data)
+        response = run_ahp_analysis(payload)
         print(json.dumps(response, cls=NumpyEncoder, ensure_ascii=False, indent=2))
 
     except Exception as e:
@@ -12,6 +12,7 @@ import warnings
 import io
 import base64
 import math
+from dataset_io import load_frame, has_data
 
 warnings.filterwarnings('ignore')
 
@@ -167,26 +168,30 @@ class AncovaAnalysis:
         
         return f"data:image/png;base64,{base64.b64encode(buf.read()).decode('utf-8')}"
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        data = payload.get('data')
-        dependent_var = payload.get('dependentVar')
-        factor_var = payload.get('factorVar')
-        covariate_vars = payload.get('covariateVars')
+def run_ancova_analysis(payload):
+    data = load_frame(payload)
+    dependent_var = payload.get('dependentVar')
+    factor_var = payload.get('factorVar')
+    covariate_vars = payload.get('covariateVars')
 
-        if not all([data, dependent_var, factor_var, covariate_vars]):
-            raise ValueError("Missing data, dependentVar, factorVar, or covariateVars")
+    if not all([has_data(payload), dependent_var, factor_var, covariate_vars]):
+        raise ValueError("Missing data, dependentVar, factorVar, or covariateVars")
 
-        ancova = AncovaAnalysis(data, dependent_var, factor_var, covariate_vars)
-        ancova.run_analysis()
-        plot_image = ancova.plot_results()
+    ancova = AncovaAnalysis(data, dependent_var, factor_var, covariate_vars)
+    ancova.run_analysis()
+    plot_image = ancova.plot_results()
 
-        response = {
-            'results': ancova.results,
-            'plot': plot_image
-        }
-        
+    response = {
+        'results': ancova.results,
+        'plot': plot_image
+    }
+    return response
+
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_ancova_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
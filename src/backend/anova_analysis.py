@@ -11,6 +11,10 @@ import io
 import base64
 import warnings
 import math
+
+import chart_service
+from dataset_io import load_frame, has_data
+
 warnings.filterwarnings('ignore')
 
 def _to_native_type(obj):
@@ -258,26 +262,33 @@ class OneWayANOVA:
         image_base64 = base64.b64encode(buf.read()).decode('utf-8')
         return f"data:image/png;base64,{image_base64}"
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        data = payload.get('data')
-        independent_var = payload.get('independentVar')
-        dependent_var = payload.get('dependentVar')
+def run_anova_analysis(payload):
+    data = load_frame(payload)
+    independent_var = payload.get('independentVar')
+    dependent_var = payload.get('dependentVar')
 
-        if not all([data, independent_var, dependent_var]):
-            raise ValueError("Missing 'data', 'independentVar', or 'dependentVar'")
+    if not all([has_data(payload), independent_var, dependent_var]):
+        raise ValueError("Missing 'data', 'independentVar', or 'dependentVar'")
 
-        anova = OneWayANOVA(data=data, group_col=independent_var, value_col=dependent_var)
-        anova.analyze()
-        
+    anova = OneWayANOVA(data=data, group_col=independent_var, value_col=dependent_var)
+    anova.analyze()
+
+    # Charts are skipped for plotMode 'none' (API / batch callers).
+    plot_image = None
+    if chart_service.resolve_plot_mode(payload.get('plotMode')) != 'none':
         plot_image = anova.plot_results()
-        
-        response = {
-            'results': anova.results,
-            'plot': plot_image
-        }
 
+    response = {
+        'results': anova.results,
+        'plot': plot_image
+    }
+    return response
+
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_anova_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
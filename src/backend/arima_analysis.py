@@ -8,6 +8,7 @@ from statsmodels.tsa.arima.model import ARIMA
 import io
 import base64
 import warnings
+from dataset_io import load_frame, has_data
 
 warnings.filterwarnings('ignore')
 
@@ -24,66 +25,69 @@ def _to_native_type(obj):
         return obj.tolist()
     return obj
 
+def run_arima_analysis(payload):
+    time_col = payload.get('timeCol')
+    value_col = payload.get('valueCol')
+    order = payload.get('order')  # (p, d, q)
+    forecast_periods = int(payload.get('forecastPeriods', 12))
+
+    if not all([has_data(payload), time_col, value_col, order]):
+        raise ValueError("Missing required parameters: data, timeCol, valueCol, or order")
+
+    df = load_frame(payload)
+    df[time_col] = pd.to_datetime(df[time_col], errors='coerce')
+    df = df.dropna(subset=[time_col, value_col]).set_index(time_col).sort_index()
+
+    if len(df) < sum(order):
+        raise ValueError("Not enough data to fit the ARIMA model.")
+
+    series = df[value_col]
+
+    # Fit ARIMA model
+    model = ARIMA(series, order=order)
+    model_fit = model.fit()
+
+    # Generate forecast
+    forecast = model_fit.get_forecast(steps=forecast_periods)
+    forecast_df = forecast.summary_frame(alpha=0.05)
+    forecast_df.index.name = 'forecast_date'
+
+    # Generate diagnostic plots
+    fig = model_fit.plot_diagnostics(figsize=(15, 12))
+    plt.tight_layout()
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png')
+    plt.close(fig)
+    buf.seek(0)
+    plot_image = base64.b64encode(buf.read()).decode('utf-8')
+
+    # Prepare results
+    summary_obj = model_fit.summary()
+    summary_data = []
+    for table in summary_obj.tables:
+        table_data = [list(row) for row in table.data]
+        summary_data.append({
+            'caption': getattr(table, 'title', None),
+            'data': table_data
+        })
+
+    response = {
+        'results': {
+            'summary_data': summary_data,
+            'aic': model_fit.aic,
+            'bic': model_fit.bic,
+            'hqic': model_fit.hqic,
+            'forecast': forecast_df.reset_index().to_dict('records')
+        },
+        'plot': f"data:image/png;base64,{plot_image}"
+    }
+    return response
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        data = payload.get('data')
-        time_col = payload.get('timeCol')
-        value_col = payload.get('valueCol')
-        order = payload.get('order')  # (p, d, q)
-        forecast_periods = int(payload.get('forecastPeriods', 12))
-
-        if not all([data, time_col, value_col, order]):
-            raise ValueError("Missing required parameters: data, timeCol, valueCol, or order")
-
-        df = pd.DataFrame(data)
-        df[time_col] = pd.to_datetime(df[time_col], errors='coerce')
-        df = df.dropna(subset=[time_col, value_col]).set_index(time_col).sort_index()
-
-        if len(df) < sum(order):
-            raise ValueError("Not enough data to fit the ARIMA model.")
-
-        series = df[value_col]
-
-        # Fit ARIMA model
-        model = ARIMA(series, order=order)
-        model_fit = model.fit()
-
-        # Generate forecast
-        forecast = model_fit.get_forecast(steps=forecast_periods)
-        forecast_df = forecast.summary_frame(alpha=0.05)
-        forecast_df.index.name = 'forecast_date'
-
-        # Generate diagnostic plots
-        fig = model_fit.plot_diagnostics(figsize=(15, 12))
-        plt.tight_layout()
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png')
-        plt.close(fig)
-        buf.seek(0)
-        plot_image = base64.b64encode(buf.read()).decode('utf-8')
-
-        # Prepare results
-        summary_obj = model_fit.summary()
-        summary_data = []
-        for table in summary_obj.tables:
-            table_data = [list(row) for row in table.data]
-            summary_data.append({
-                'caption': getattr(table, 'title', None),
-                'data': table_data
-            })
-
-        response = {
-            'results': {
-                'summary_data': summary_data,
-                'aic': model_fit.aic,
-                'bic': model_fit.bic,
-                'hqic': model_fit.hqic,
-                'forecast': forecast_df.reset_index().to_dict('records')
-            },
-            'plot': f"data:image/png;base64,{plot_image}"
-        }
-
+        response = run_arima_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
@@ -0,0 +1,440 @@
+"""
+Shared chart rendering for the analysis scripts.
+
+Analyses describe their charts as compact specs instead of drawing them:
+
+    {'type': 'histogram', 'data': {...}, 'options': {...}}
+    {'type': 'figure', 'layout': [rows, cols], 'panels': [<panel spec>, ...], ...}
+
+A spec is rendered to PNG only when it is needed, and PNGs are cached by a
+hash of the spec (the chart id), so the same chart is never drawn twice.
+
+Plot modes (payload 'plotMode', default from the PLOT_MODE env var):
+
+- 'inline': render now and embed the base64 PNG in the response (previous behaviour)
+- 'spec':   return {'chartId', 'spec'}; clients render through POST /api/charts/render,
+            which runs on ChartRenderer's own process pool
+- 'none':   no charts at all, for API and batch callers
+"""
+
+import io
+import os
+import json
+import base64
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, Future
+
+import numpy as np
+
+PLOT_MODES = ('inline', 'spec', 'none')
+DEFAULT_PLOT_MODE = os.environ.get('PLOT_MODE', 'inline')
+
+# Rendered PNGs kept in memory per process; CHART_CACHE_DIR adds a disk cache
+# shared by every process on the machine.
+CHART_CACHE_BYTES = int(os.environ.get('CHART_CACHE_BYTES', 256 * 1024 * 1024))
+CHART_CACHE_DIR = os.environ.get('CHART_CACHE_DIR')
+
+# Upper bounds on what a spec carries, to keep responses small.
+CHART_MAX_POINTS = 5000
+BOX_MAX_FLIERS = 500
+KDE_MAX_POINTS = 20000
+KDE_GRID_SIZE = 200
+SIGNIFICANT_DIGITS = 6
+
+DEFAULT_FIGSIZE = (10, 6)
+DEFAULT_DPI = 100
+
+
+def resolve_plot_mode(mode=None):
+    mode = mode or DEFAULT_PLOT_MODE
+    if mode not in PLOT_MODES:
+        raise ValueError(f"Unknown plotMode '{mode}'. Must be one of {', '.join(PLOT_MODES)}")
+    return mode
+
+
+# ============================================
+# SPEC BUILDERS
+# ============================================
+
+def compact(values, digits=SIGNIFICANT_DIGITS):
+    """Floats rounded to a few significant digits (non-finite -> None), as a list."""
+    return [float(f'{v:.{digits}g}') if np.isfinite(v) else None for v in np.asarray(values, dtype=float).ravel()]
+
+
+def sample_indices(n, max_points=CHART_MAX_POINTS, random_state=42):
+    """Sorted random subset of range(n) with at most max_points entries."""
+    if n <= max_points:
+        return np.arange(n)
+    return np.sort(np.random.default_rng(random_state).choice(n, max_points, replace=False))
+
+
+def histogram_spec(values, xlabel='', ylabel='Frequency', kde=True, color='#1f77b4', **options):
+    """Bin counts (numpy 'auto' bins, as seaborn) plus a KDE curve scaled to counts."""
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    edges = np.histogram_bin_edges(values, bins='auto')
+    counts, edges = np.histogram(values, bins=edges)
+    data = {'edges': compact(edges), 'counts': counts.tolist()}
+
+    if kde and len(values) > 1 and values.std() > 0:
+        from scipy.stats import gaussian_kde
+        sample = values[sample_indices(len(values), KDE_MAX_POINTS)]
+        grid = np.linspace(values.min(), values.max(), KDE_GRID_SIZE)
+        density = gaussian_kde(sample)(grid) * len(values) * np.diff(edges).mean()
+        data['kde'] = {'x': compact(grid), 'y': compact(density)}
+
+    return {'type': 'histogram', 'data': data,
+            'options': {'xlabel': xlabel, 'ylabel': ylabel, 'color': color, **options}}
+
+
+def box_spec(groups, labels=None, ylabel='', color='#bcd4e6', **options):
+    """Five-number summaries (matplotlib's boxplot_stats, whis=1.5) instead of raw values."""
+    from matplotlib import cbook
+    groups = [np.asarray(g, dtype=float) for g in groups]
+    stats = cbook.boxplot_stats(groups, labels=labels)
+    boxes = []
+    for s in stats:
+        fliers = np.sort(np.asarray(s['fliers'], dtype=float))
+        if len(fliers) > BOX_MAX_FLIERS:
+            fliers = fliers[np.linspace(0, len(fliers) - 1, BOX_MAX_FLIERS).astype(int)]
+        box = {key: compact([s[key]])[0] for key in ('med', 'q1', 'q3', 'whislo', 'whishi')}
+        box['fliers'] = compact(fliers)
+        if labels is not None:
+            box['label'] = str(s['label'])
+        boxes.append(box)
+    return {'type': 'box', 'data': {'boxes': boxes},
+            'options': {'ylabel': ylabel, 'color': color, **options}}
+
+
+def bar_spec(labels, values, xlabel='', ylabel='', horizontal=False, palette=None, **options):
+    return {'type': 'bar', 'data': {'labels': [str(l) for l in labels], 'values': compact(values)},
+            'options': {'xlabel': xlabel, 'ylabel': ylabel, 'horizontal': horizontal,
+                        'palette': palette, **options}}
+
+
+def pie_spec(labels, values, donut=False, legend_title='Categories', palette='vlag', **options):
+    return {'type': 'pie', 'data': {'labels': [str(l) for l in labels], 'values': compact(values)},
+            'options': {'donut': donut, 'legend_title': legend_title, 'palette': palette, **options}}
+
+
+def scatter_spec(x, y, xlabel='', ylabel='', diagonal=False, text=None, label=None, **options):
+    """Scatter of at most CHART_MAX_POINTS points; diagonal adds the y = x reference line."""
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    shown = sample_indices(len(x))
+    data = {'x': compact(x[shown]), 'y': compact(y[shown])}
+    if diagonal and len(x):
+        data['diagonal'] = compact([x.min(), x.max()])
+    return {'type': 'scatter', 'data': data,
+            'options': {'xlabel': xlabel, 'ylabel': ylabel, 'text': text, 'label': label, **options}}
+
+
+def line_spec(x, series, xlabel='', ylabel='', **options):
+    """series: {label: y values}, or (label, y values) pairs where label may be None."""
+    pairs = series.items() if isinstance(series, dict) else series
+    return {'type': 'line',
+            'data': {'x': compact(x), 'series': [{'label': label, 'y': compact(y)} for label, y in pairs]},
+            'options': {'xlabel': xlabel, 'ylabel': ylabel, **options}}
+
+
+def heatmap_spec(matrix, xlabels, ylabels, annot=True, cmap='coolwarm', **options):
+    return {'type': 'heatmap',
+            'data': {'matrix': [compact(row) for row in np.asarray(matrix, dtype=float)],
+                     'xlabels': [str(l) for l in xlabels], 'ylabels': [str(l) for l in ylabels]},
+            'options': {'annot': annot, 'cmap': cmap, **options}}
+
+
+def figure_spec(panels, layout=None, title=None, figsize=None, style=None):
+    """Several panels in one image (rows x cols, filled row by row)."""
+    return {'type': 'figure', 'panels': panels, 'layout': list(layout or (len(panels), 1)),
+            'title': title, 'figsize': list(figsize) if figsize else None, 'style': style}
+
+
+def chart_id(spec):
+    """Content hash of a spec; identical specs share one cached PNG."""
+    canonical = json.dumps(spec, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+# ============================================
+# RENDERING
+# ============================================
+
+def _apply_common(ax, options):
+    if options.get('title'):
+        ax.set_title(options['title'], fontsize=12, fontweight='bold')
+    if options.get('xlabel') is not None:
+        ax.set_xlabel(options['xlabel'], fontsize=12)
+    if options.get('ylabel') is not None:
+        ax.set_ylabel(options['ylabel'], fontsize=12)
+    if options.get('xscale'):
+        ax.set_xscale(options['xscale'])
+    if options.get('grid'):
+        ax.grid(True, alpha=0.3)
+    if options.get('text'):
+        ax.text(0.05, 0.95, options['text'], transform=ax.transAxes, fontsize=10, verticalalignment='top',
+                bbox=dict(boxstyle='round,pad=0.5', fc='wheat', alpha=0.5))
+    if options.get('legend') and ax.get_legend_handles_labels()[0]:
+        ax.legend()
+
+
+def _draw_histogram(ax, data, options):
+    edges = np.asarray(data['edges'], dtype=float)
+    ax.bar(edges[:-1], data['counts'], width=np.diff(edges), align='edge', color=options.get('color'),
+           alpha=0.6, edgecolor='white')
+    if data.get('kde'):
+        ax.plot(data['kde']['x'], data['kde']['y'], color=options.get('color'), lw=2)
+
+
+def _draw_box(ax, data, options):
+    boxes = [dict(box, fliers=box.get('fliers', [])) for box in data['boxes']]
+    artists = ax.bxp(boxes, patch_artist=True, showfliers=True)
+    for patch in artists['boxes']:
+        patch.set_facecolor(options.get('color'))
+        patch.set_alpha(0.7)
+    if len(boxes) == 1 and 'label' not in boxes[0]:
+        ax.set_xticks([])
+
+
+def _draw_bar(ax, data, options):
+    import seaborn as sns
+    labels, values = data['labels'], data['values']
+    colors = sns.color_palette(options['palette'], n_colors=len(labels)) if options.get('palette') else None
+    if options.get('horizontal'):
+        ax.barh(range(len(labels)), values, color=colors)
+        ax.set_yticks(range(len(labels)), labels)
+        ax.invert_yaxis()
+    else:
+        ax.bar(range(len(labels)), values, color=colors)
+        ax.set_xticks(range(len(labels)), labels, rotation=options.get('rotation', 0))
+
+
+def _draw_pie(ax, data, options):
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+    colors = sns.color_palette(options.get('palette') or 'vlag', n_colors=len(data['values']))
+    wedges, _, _ = ax.pie(data['values'], autopct='%1.1f%%', colors=colors, startangle=90)
+    if options.get('donut'):
+        ax.add_artist(plt.Circle((0, 0), 0.70, fc='white'))
+    ax.legend(wedges, data['labels'], title=options.get('legend_title'), loc='center left',
+              bbox_to_anchor=(1, 0, 0.5, 1))
+
+
+def _draw_scatter(ax, data, options):
+    ax.scatter(data['x'], data['y'], alpha=options.get('alpha', 0.5), s=options.get('size'),
+               c=data.get('c'), cmap=options.get('cmap'), label=options.get('label'))
+    if data.get('diagonal'):
+        lo, hi = data['diagonal']
+        ax.plot([lo, hi], [lo, hi], 'r--', lw=2, label='45° Line (Perfect Fit)')
+
+
+def _draw_line(ax, data, options):
+    for series in data['series']:
+        ax.plot(data['x'], series['y'], label=series.get('label'))
+
+
+def _draw_heatmap(ax, data, options):
+    import seaborn as sns
+    sns.heatmap(np.array(data['matrix'], dtype=float), annot=options.get('annot', True), fmt='.2f',
+                cmap=options.get('cmap', 'coolwarm'), xticklabels=data['xlabels'],
+                yticklabels=data['ylabels'], ax=ax)
+
+
+PANEL_RENDERERS = {
+    'histogram': _draw_histogram,
+    'box': _draw_box,
+    'bar': _draw_bar,
+    'pie': _draw_pie,
+    'scatter': _draw_scatter,
+    'line': _draw_line,
+    'heatmap': _draw_heatmap,
+}
+
+
+def _draw_panel(ax, panel):
+    draw = PANEL_RENDERERS.get(panel.get('type'))
+    if draw is None:
+        raise ValueError(f"Unknown chart type '{panel.get('type')}'")
+    options = panel.get('options') or {}
+    draw(ax, panel['data'], options)
+    _apply_common(ax, options)
+
+
+def render_png(spec, dpi=DEFAULT_DPI):
+    """Draw a spec with matplotlib and return the PNG bytes."""
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    import matplotlib.pyplot as plt
+
+    # A spec-level seaborn style (e.g. 'darkgrid') applies only to this figure.
+    if spec.get('style'):
+        import seaborn as sns
+        with sns.axes_style(spec['style']):
+            return _render_figure(plt, spec, dpi)
+    return _render_figure(plt, spec, dpi)
+
+
+def _render_figure(plt, spec, dpi):
+    if spec.get('type') == 'figure':
+        rows, cols = spec.get('layout') or (len(spec['panels']), 1)
+        figsize = spec.get('figsize') or (DEFAULT_FIGSIZE[0] * cols * 0.8, DEFAULT_FIGSIZE[1] * rows)
+        fig, axes = plt.subplots(rows, cols, figsize=figsize, squeeze=False)
+        for ax, panel in zip(axes.ravel(), spec['panels']):
+            _draw_panel(ax, panel)
+        for ax in axes.ravel()[len(spec['panels']):]:
+            ax.set_axis_off()
+        if spec.get('title'):
+            fig.suptitle(spec['title'], fontsize=16)
+        plt.tight_layout(rect=[0, 0.03, 1, 0.95] if spec.get('title') else None)
+    else:
+        fig, ax = plt.subplots(figsize=(spec.get('options') or {}).get('figsize') or DEFAULT_FIGSIZE)
+        _draw_panel(ax, spec)
+        plt.tight_layout()
+
+    buf = io.BytesIO()
+    try:
+        fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight')
+    finally:
+        plt.close(fig)
+    return buf.getvalue()
+
+
+# ============================================
+# CACHE
+# ============================================
+
+class PngCache:
+    """LRU of rendered PNGs bounded by total bytes, optionally backed by a directory."""
+
+    def __init__(self, max_bytes=CHART_CACHE_BYTES, directory=CHART_CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.png')
+
+    def get(self, key):
+        with self._lock:
+            png = self._items.get(key)
+            if png is not None:
+                self._items.move_to_end(key)
+                return png
+        if self.directory and os.path.exists(self._path(key)):
+            with open(self._path(key), 'rb') as f:
+                png = f.read()
+            self._remember(key, png)
+            return png
+        return None
+
+    def put(self, key, png):
+        self._remember(key, png)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = self._path(key) + f'.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(png)
+            os.replace(tmp, self._path(key))
+
+    def _remember(self, key, png):
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = png
+            self._bytes += len(png)
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+
+_cache = PngCache()
+
+
+def render_cached(spec):
+    """(chart id, PNG bytes), rendering only on a cache miss."""
+    key = chart_id(spec)
+    png = _cache.get(key)
+    if png is None:
+        png = render_png(spec)
+        _cache.put(key, png)
+    return key, png
+
+
+def chart_output(spec, mode=None, data_uri=True):
+    """What a response carries for one chart in the given plot mode."""
+    mode = resolve_plot_mode(mode)
+    if mode == 'none' or spec is None:
+        return None
+    if mode == 'spec':
+        return {'chartId': chart_id(spec), 'spec': spec}
+    _, png = render_cached(spec)
+    encoded = base64.b64encode(png).decode('utf-8')
+    return f"data:image/png;base64,{encoded}" if data_uri else encoded
+
+
+# ============================================
+# RENDER POOL
+# ============================================
+
+def _warm_renderer():
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    import matplotlib.pyplot  # noqa: F401
+    import seaborn  # noqa: F401
+
+
+class ChartRenderer:
+    """
+    Renders specs on a dedicated process pool, separate from the analysis
+    workers, so drawing never holds up analyses. Results are cached by chart
+    id and concurrent requests for the same chart share one render.
+    """
+
+    def __init__(self, max_workers=None, cache=None):
+        self.max_workers = max_workers or int(os.environ.get('CHART_WORKERS', 2))
+        self.cache = cache or _cache
+        self._executor = None
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_warm_renderer,
+            )
+        return self
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def cached(self, key):
+        return self.cache.get(key)
+
+    def submit(self, spec):
+        """(chart id, Future of the PNG bytes)."""
+        key = chart_id(spec)
+        png = self.cache.get(key)
+        if png is not None:
+            done = Future()
+            done.set_result(png)
+            return key, done
+
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self.start()._executor.submit(render_png, spec)
+                self._pending[key] = future
+                future.add_done_callback(lambda f, key=key: self._finish(key, f))
+        return key, future
+
+    def _finish(self, key, future):
+        with self._lock:
+            self._pending.pop(key, None)
+        if future.exception() is None:
+            self.cache.put(key, future.result())
@@ -4,7 +4,9 @@ import sys
 import json
 import numpy as np
 import pandas as pd
-from scipy.stats import pearsonr, spearmanr, kendalltau
+from scipy import stats
+from scipy.stats import kendalltau
+from functools import lru_cache
 import math
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -12,6 +14,7 @@ import io
 import base64
 import plotly.graph_objects as go
 import plotly.io as pio
+from dataset_io import load_frame, has_data
 
 
 def _to_native_type(obj):
@@ -30,6 +33,217 @@ def _to_native_type(obj):
         return str(obj)
     return obj
 
+# Approximate costs (seconds) used to pick the Kendall path. The sign-product
+# path touches every observation pair of every variable (~n^2 p elements); the
+# per-pair path pays scipy's kendalltau overhead plus O(n log n) for each of
+# the p(p-1)/2 variable pairs. Sign products win for many variables and
+# small n, scipy for large n.
+KENDALL_SIGN_COST = 10e-9
+KENDALL_PAIR_OVERHEAD = 270e-6
+KENDALL_PAIR_COST = 12e-9
+
+# Upper bound on (pairs in a block) x (variables) for the Kendall sign blocks.
+KENDALL_BLOCK_ELEMENTS = 4_000_000
+
+
+def _t_pvalues(r, n):
+    """Two-sided p-values of correlations via t = r * sqrt((n - 2) / (1 - r^2))."""
+    r = np.asarray(r, dtype=float)
+    df = np.asarray(n, dtype=float) - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = r * np.sqrt(df / ((1.0 - r) * (1.0 + r)))
+        p = 2 * stats.t.sf(np.abs(t), df)
+    # Two observations always fit perfectly (scipy reports p = 1).
+    p = np.where(df == 0, 1.0, p)
+    return np.where(np.isnan(r) | (df < 0), np.nan, p)
+
+
+def _pearson_complete(X):
+    """Pearson r for fully observed columns: one standardisation and one matmul."""
+    Z = X - X.mean(axis=0)
+    norms = np.sqrt(np.einsum('ij,ij->j', Z, Z))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Z = Z / norms
+        R = Z.T @ Z
+    # Constant columns have no defined correlation.
+    R[norms == 0, :] = np.nan
+    R[:, norms == 0] = np.nan
+    return np.clip(R, -1.0, 1.0)
+
+
+def _pearson_pairwise(X):
+    """
+    Pearson r on pairwise-complete observations via mask matmuls.
+
+    Returns (R, N) where N[a, b] is the number of rows observed in both a and b.
+    """
+    M = (~np.isnan(X)).astype(float)
+    # Centre on the column means first to keep the sums well conditioned.
+    X0 = np.where(M > 0, X - np.nanmean(X, axis=0), 0.0)
+    N = M.T @ M
+    S = X0.T @ M                   # S[a, b] = sum of a over rows where b is observed
+    Q = (X0 * X0).T @ M            # sums of squares of a over rows where b is observed
+    P = X0.T @ X0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = P - S * S.T / N
+        var_a = Q - S * S / N
+        R = cov / np.sqrt(var_a * var_a.T)
+        R[(N < 2) | ~(var_a > 1e-12 * Q) | ~(var_a.T > 1e-12 * Q.T)] = np.nan
+    return np.clip(R, -1.0, 1.0), N
+
+
+def _tie_counts(X):
+    """Per column: (tied pairs, sum t(t-1)(t-2), sum t(t-1)(2t+5)) over tie groups."""
+    counts = []
+    for col in X.T:
+        _, t = np.unique(col, return_counts=True)
+        t = t.astype(float)
+        counts.append(((t * (t - 1) / 2).sum(), (t * (t - 1) * (t - 2)).sum(), (t * (t - 1) * (2 * t + 5)).sum()))
+    return np.array(counts).T
+
+
+def _kendall_use_sign_products(n, p):
+    """Whether the blocked sign-product path is estimated cheaper than per-pair kendalltau."""
+    sign_cost = KENDALL_SIGN_COST * n * n * p
+    pair_cost = p * (p - 1) / 2 * (KENDALL_PAIR_OVERHEAD + KENDALL_PAIR_COST * n * math.log2(max(n, 2)))
+    return sign_cost < pair_cost
+
+
+@lru_cache(maxsize=4096)
+def _kendall_exact_pvalue(n, c):
+    """Two-sided exact p-value for n untied pairs with c discordant pairs (as scipy)."""
+    c = int(min(c, n * (n - 1) // 2 - c))
+    if n <= 2:
+        return 1.0
+    if 4 * c == n * (n - 1):
+        return 1.0
+    if c == 0:
+        return min(1.0, 2.0 / math.factorial(n)) if n < 171 else 0.0
+    if c == 1:
+        return min(1.0, 2.0 / math.factorial(n - 1)) if n < 172 else 0.0
+    # Mahonian numbers: permutations of j items with k inversions, k <= c.
+    counts = np.zeros(c + 1)
+    counts[0:2] = 1.0
+    for j in range(3, n + 1):
+        counts = np.cumsum(counts) / j
+        if j <= c:
+            counts[j:] -= counts[:c + 1 - j]
+    return float(np.clip(np.sum(counts), 0, 1))
+
+
+def _kendall_complete(X):
+    """
+    Kendall tau-b and p-values for fully observed columns.
+
+    sign(x_i - x_k) over all pairs i < k, stacked for every variable, gives
+    concordant-minus-discordant counts for all variable pairs as one product.
+    That costs O(n^2 p), so when the estimate says otherwise each pair goes
+    through scipy's O(n log n) kendalltau instead.
+    """
+    n, p = X.shape
+    tot = n * (n - 1) / 2
+    if not _kendall_use_sign_products(n, p):
+        R, P = np.eye(p), np.zeros((p, p))
+        for a in range(p):
+            for b in range(a + 1, p):
+                R[a, b], P[a, b] = kendalltau(X[:, a], X[:, b])
+                R[b, a], P[b, a] = R[a, b], P[a, b]
+        return R, P
+
+    C = np.zeros((p, p))
+    block = max(1, KENDALL_BLOCK_ELEMENTS // max(n * p, 1))
+    for start in range(0, n - 1, block):
+        stop = min(start + block, n - 1)
+        rows = np.arange(start, stop)
+        S = np.sign(X[start:stop, None, :] - X[None, :, :])
+        # Keep only pairs (i, k) with k > i.
+        S *= (np.arange(n)[None, :] > rows[:, None])[:, :, None]
+        S = S.reshape(-1, p)
+        C += S.T @ S
+
+    xtie, x0, x1 = _tie_counts(X)
+    untied = np.diag(C)            # tot - ties, per variable
+    with np.errstate(divide='ignore', invalid='ignore'):
+        R = np.clip(C / np.sqrt(np.outer(untied, untied)), -1.0, 1.0)
+        m = n * (n - 1.0)
+        var = ((m * (2 * n + 5) - x1[:, None] - x1[None, :]) / 18
+               + 2 * np.outer(xtie, xtie) / m + np.outer(x0, x0) / (9 * m * (n - 2)))
+        P = 2 * stats.norm.sf(np.abs(C) / np.sqrt(var))
+
+    # scipy's 'auto' rule: exact distribution when neither variable has ties
+    # and either n is small or the ordering is (almost) perfect.
+    no_ties = xtie == 0
+    for a, b in zip(*np.nonzero(np.triu(np.outer(no_ties, no_ties), 1))):
+        dis = (tot - C[a, b]) / 2
+        if n <= 33 or min(dis, tot - dis) <= 1:
+            P[a, b] = P[b, a] = _kendall_exact_pvalue(n, int(round(dis)))
+
+    degenerate = untied == 0
+    R[degenerate, :] = R[:, degenerate] = np.nan
+    P[np.isnan(R)] = np.nan
+    return R, P
+
+
+def _complete_matrix(X, method):
+    n = X.shape[0]
+    if method == 'kendall':
+        return _kendall_complete(X)
+    if method == 'spearman':
+        X = stats.rankdata(X, axis=0)
+    R = _pearson_complete(X)
+    return R, _t_pvalues(R, n)
+
+
+def correlation_matrix(X, method='pearson', missing='listwise'):
+    """
+    Correlations, p-values and pair counts for every column pair of X.
+
+    X is an (n, p) float array; NaN marks a missing value. 'listwise' expects
+    NaN-free input; 'pairwise' uses every row observed in both columns.
+    Pearson/Spearman use a single matmul (on ranks for Spearman); Kendall
+    uses blocked sign products. Returns (R, P, N) with R's diagonal 1 and
+    P's diagonal 0.
+    """
+    if method not in ('pearson', 'spearman', 'kendall'):
+        raise ValueError(f"Unknown correlation method: {method}")
+    X = np.asarray(X, dtype=float)
+    n, p = X.shape
+    observed = ~np.isnan(X)
+
+    if missing != 'pairwise' or observed.all():
+        R, P = _complete_matrix(X, method)
+        N = np.full((p, p), float(n))
+    elif method == 'pearson':
+        R, N = _pearson_pairwise(X)
+        P = _t_pvalues(R, N)
+    else:
+        # Ranks depend on the rows shared by a pair: fully observed columns
+        # are ranked together once, pairs touching missing values one by one.
+        N = observed.T.astype(float) @ observed.astype(float)
+        R = np.full((p, p), np.nan)
+        P = np.full((p, p), np.nan)
+        full = np.flatnonzero(observed.all(axis=0))
+        if len(full) > 1:
+            R_full, P_full = _complete_matrix(X[:, full], method)
+            R[np.ix_(full, full)] = R_full
+            P[np.ix_(full, full)] = P_full
+        full_set = set(full.tolist())
+        for a in range(p):
+            for b in range(a + 1, p):
+                if a in full_set and b in full_set:
+                    continue
+                rows = observed[:, a] & observed[:, b]
+                if rows.sum() < 2:
+                    continue
+                R_ab, P_ab = _complete_matrix(X[rows][:, [a, b]], method)
+                R[a, b] = R[b, a] = R_ab[0, 1]
+                P[a, b] = P[b, a] = P_ab[0, 1]
+
+    np.fill_diagonal(R, 1.0)
+    np.fill_diagonal(P, 0.0)
+    return R, P, N
+
+
 def _interpret_correlation_magnitude(r):
     """Interpret the magnitude of correlation coefficient"""
     abs_r = abs(r)
@@ -131,107 +345,106 @@ def generate_heatmap_plotly(df, title='Correlation Matrix'):
     return pio.to_json(fig)
 
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        
-        data = payload.get('data')
-        variables = payload.get('variables')
-        group_var = payload.get('groupVar') # New parameter for hue
-        method = payload.get('method', 'pearson')
-        alpha = payload.get('alpha', 0.05)
+def run_correlation_analysis(payload):
+    variables = payload.get('variables')
+    group_var = payload.get('groupVar') # New parameter for hue
+    method = payload.get('method', 'pearson')
+    alpha = payload.get('alpha', 0.05)
+    missing = payload.get('missing', 'listwise')  # 'listwise' or 'pairwise'
+    top_k = payload.get('topK')  # keep only the k strongest pairs in the pair list
 
-        if not data or not variables:
-            raise ValueError("Missing 'data' or 'variables'")
+    if not has_data(payload) or not variables:
+        raise ValueError("Missing 'data' or 'variables'")
 
-        df = pd.DataFrame(data)
-        
-        # Prepare columns for analysis
-        analysis_cols = variables + ([group_var] if group_var else [])
-        df_clean = df[list(set(analysis_cols))].copy()
+    # Prepare columns for analysis; file datasets are read for these columns only
+    analysis_cols = variables + ([group_var] if group_var else [])
+    df_clean = load_frame(payload, columns=list(set(analysis_cols)), zero_copy=True).copy()
 
-        for col in variables: # Only convert main variables to numeric
-            df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
-        
-        df_clean.dropna(subset=variables, inplace=True)
-        
-        if df_clean.shape[0] < 2:
-            raise ValueError("Not enough valid data points for analysis.")
+    for col in variables: # Only convert main variables to numeric
+        df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
 
-        # Correlation matrix on numeric variables only
-        numeric_df = df_clean[variables]
-        n_vars = len(numeric_df.columns)
-        current_vars = numeric_df.columns.tolist()
-
-        corr_matrix = pd.DataFrame(np.eye(n_vars), index=current_vars, columns=current_vars)
-        p_value_matrix = pd.DataFrame(np.zeros((n_vars, n_vars)), index=current_vars, columns=current_vars)
-        
-        all_correlations = []
-
-        for i in range(n_vars):
-            for j in range(i + 1, n_vars):
-                var1 = current_vars[i]
-                var2 = current_vars[j]
-                
-                corr, p_value = np.nan, np.nan
-
-                try:
-                    col1 = numeric_df[var1]
-                    col2 = numeric_df[var2]
-                    if method == 'pearson':
-                        corr, p_value = pearsonr(col1, col2)
-                    elif method == 'spearman':
-                        corr, p_value = spearmanr(col1, col2)
-                    elif method == 'kendall':
-                        corr, p_value = kendalltau(col1, col2)
-                    else:
-                        raise ValueError(f"Unknown correlation method: {method}")
-                    
-                    corr_matrix.loc[var1, var2] = corr_matrix.loc[var2, var1] = corr
-                    p_value_matrix.loc[var1, var2] = p_value_matrix.loc[var2, var1] = p_value
-                    
-                    if not np.isnan(corr) and not np.isnan(p_value):
-                        all_correlations.append({
-                            'variable_1': var1,
-                            'variable_2': var2,
-                            'correlation': corr,
-                            'p_value': p_value,
-                            'significant': bool(p_value < alpha)
-                        })
-                except Exception:
-                    continue
+    if missing == 'pairwise':
+        df_clean.dropna(subset=variables, how='all', inplace=True)
+    else:
+        df_clean.dropna(subset=variables, inplace=True)
 
-        if len(all_correlations) > 0:
-            correlations_only = [c['correlation'] for c in all_correlations if c.get('correlation') is not None]
-            summary_stats = {
-                'mean_correlation': np.mean(correlations_only) if correlations_only else 0,
-                'median_correlation': np.median(correlations_only) if correlations_only else 0,
-                'std_dev': np.std(correlations_only) if correlations_only else 0,
-                'range': [np.min(correlations_only), np.max(correlations_only)] if correlations_only else [0,0],
-                'significant_correlations': sum(1 for c in all_correlations if c['significant']),
-                'total_pairs': len(all_correlations)
-            }
-        else:
-            summary_stats = { 'mean_correlation': 0,'median_correlation': 0,'std_dev': 0,'range': [0, 0],'significant_correlations': 0,'total_pairs': 0}
-        
-        strongest_correlations = sorted(all_correlations, key=lambda x: abs(x.get('correlation', 0)), reverse=True)
-        
-        interpretation = _generate_interpretation(all_correlations, len(df_clean), method)
-
-        # Generate plots
-        pairs_plot_json = generate_pairs_plot_plotly(df_clean[variables + ([group_var] if group_var else [])], group_var=group_var)
-        heatmap_plot_json = generate_heatmap_plotly(corr_matrix, title=f'{method.capitalize()} Correlation Matrix')
-
-        response = {
-            "correlation_matrix": corr_matrix.to_dict(),
-            "p_value_matrix": p_value_matrix.to_dict(),
-            "summary_statistics": summary_stats,
-            "strongest_correlations": strongest_correlations[:10],
-            "interpretation": interpretation,
-            "pairs_plot": pairs_plot_json,
-            "heatmap_plot": heatmap_plot_json,
+    if df_clean.shape[0] < 2:
+        raise ValueError("Not enough valid data points for analysis.")
+
+    # Correlation matrix on numeric variables only
+    numeric_df = df_clean[variables]
+    current_vars = numeric_df.columns.tolist()
+
+    R, P, N = correlation_matrix(numeric_df.to_numpy(dtype=float), method=method, missing=missing)
+    corr_matrix = pd.DataFrame(R, index=current_vars, columns=current_vars)
+    p_value_matrix = pd.DataFrame(P, index=current_vars, columns=current_vars)
+
+    # Upper-triangle pairs in row-major order, dropping undefined ones.
+    rows, cols = np.triu_indices(len(current_vars), k=1)
+    r_pairs, p_pairs = R[rows, cols], P[rows, cols]
+    valid = ~np.isnan(r_pairs) & ~np.isnan(p_pairs)
+    rows, cols, r_pairs, p_pairs = rows[valid], cols[valid], r_pairs[valid], p_pairs[valid]
+    n_pairs = N[rows, cols]
+
+    # Strongest first; ties keep row-major order like a stable sort.
+    by_strength = np.argsort(-np.abs(r_pairs), kind='stable')
+    if top_k:
+        selected = by_strength[:int(top_k)]
+    else:
+        selected = np.arange(len(r_pairs))
+
+    all_correlations = []
+    for idx in selected:
+        entry = {
+            'variable_1': current_vars[rows[idx]],
+            'variable_2': current_vars[cols[idx]],
+            'correlation': r_pairs[idx],
+            'p_value': p_pairs[idx],
+            'significant': bool(p_pairs[idx] < alpha)
         }
+        if missing == 'pairwise':
+            entry['n'] = int(n_pairs[idx])
+        all_correlations.append(entry)
+
+    if len(r_pairs) > 0:
+        summary_stats = {
+            'mean_correlation': np.mean(r_pairs),
+            'median_correlation': np.median(r_pairs),
+            'std_dev': np.std(r_pairs),
+            'range': [np.min(r_pairs), np.max(r_pairs)],
+            'significant_correlations': int(np.sum(p_pairs < alpha)),
+            'total_pairs': len(r_pairs)
+        }
+    else:
+        summary_stats = { 'mean_correlation': 0,'median_correlation': 0,'std_dev': 0,'range': [0, 0],'significant_correlations': 0,'total_pairs': 0}
+
+    if top_k:
+        strongest_correlations = all_correlations
+    else:
+        strongest_correlations = [all_correlations[i] for i in by_strength[:10]]
+
+    interpretation = _generate_interpretation(all_correlations, len(df_clean), method)
+
+    # Generate plots
+    pairs_plot_json = generate_pairs_plot_plotly(df_clean[variables + ([group_var] if group_var else [])], group_var=group_var)
+    heatmap_plot_json = generate_heatmap_plotly(corr_matrix, title=f'{method.capitalize()} Correlation Matrix')
+
+    response = {
+        "correlation_matrix": corr_matrix.to_dict(),
+        "p_value_matrix": p_value_matrix.to_dict(),
+        "summary_statistics": summary_stats,
+        "strongest_correlations": strongest_correlations[:10],
+        "interpretation": interpretation,
+        "pairs_plot": pairs_plot_json,
+        "heatmap_plot": heatmap_plot_json,
+    }
+    return response
+
 
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_correlation_analysis(payload)
         print(json.dumps(response, default=_to_native_type, ensure_ascii=False))
 
     except Exception as e:
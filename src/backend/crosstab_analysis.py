@@ -7,6 +7,10 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import io
 import base64
+from dataset_io import load_frame, has_data
+
+# Contingency statistics are exact for a given payload; results can be cached.
+CACHEABLE = True
 
 def _to_native_type(obj):
     if isinstance(obj, np.integer):
@@ -60,104 +64,107 @@ def get_full_interpretation(chi2_stat, p_val, df, cramers_v, n_total, row_var, c
     return interpretation
 
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        data = payload.get('data')
-        row_var = payload.get('rowVar')
-        col_var = payload.get('colVar')
+def run_crosstab_analysis(payload):
+    row_var = payload.get('rowVar')
+    col_var = payload.get('colVar')
 
-        if not all([data, row_var, col_var]):
-            raise ValueError("Missing 'data', 'rowVar', or 'colVar'")
+    if not all([has_data(payload), row_var, col_var]):
+        raise ValueError("Missing 'data', 'rowVar', or 'colVar'")
 
-        df = pd.DataFrame(data)
-        
-        # Track original indices before any operations
-        original_length = len(df)
-        df['__original_index__'] = range(original_length)
-        
-        # Select relevant columns
-        df_subset = df[[row_var, col_var, '__original_index__']].copy()
-        
-        # Track missing data
-        missing_mask = df_subset[[row_var, col_var]].isnull().any(axis=1)
-        dropped_indices = df_subset.loc[missing_mask, '__original_index__'].tolist()
-        
-        # Drop missing values
-        df_clean = df_subset.dropna(subset=[row_var, col_var])
-        
-        # Store dropped row information
-        n_dropped = len(dropped_indices)
-        dropped_rows = sorted(dropped_indices)
-        
-        # Remove tracking column
-        df_clean = df_clean.drop(columns=['__original_index__'])
-        
-        if len(df_clean) < 2:
-            raise ValueError("Not enough valid data points for analysis after removing missing values")
-        
-        # Create contingency table
-        contingency_table = pd.crosstab(df_clean[row_var], df_clean[col_var])
-        
-        # --- Chi-squared test ---
-        chi2_stat, p_val, dof, expected = chi2_contingency(contingency_table)
-        
-        # Standardized residuals
-        residuals = contingency_table - expected
-        standardized_residuals = residuals / np.sqrt(expected)
+    df = load_frame(payload)
 
-        total = contingency_table.sum().sum()
+    # Track original indices before any operations
+    original_length = len(df)
+    df['__original_index__'] = range(original_length)
 
-        phi2 = chi2_stat / total if total > 0 else 0
-        phi = np.sqrt(phi2)
-        contingency_coeff = np.sqrt(chi2_stat / (chi2_stat + total)) if (chi2_stat + total) > 0 else 0
+    # Select relevant columns
+    df_subset = df[[row_var, col_var, '__original_index__']].copy()
 
-        # Cramer's V
-        n_rows, n_cols = contingency_table.shape
-        min_dim = min(n_rows - 1, n_cols - 1)
-        cramers_v = np.sqrt(phi2 / min_dim) if min_dim > 0 else 0
-        
-        interpretation = get_full_interpretation(chi2_stat, p_val, dof, cramers_v, total, row_var, col_var, standardized_residuals)
-
-        # --- Plotting ---
-        plt.figure(figsize=(8, 5))
-        sns.countplot(data=df_clean, x=row_var, hue=col_var, palette='viridis')
-        plt.title(f'Grouped Bar Chart: {row_var} vs {col_var}', fontsize=12)
-        plt.xlabel(row_var, fontsize=10)
-        plt.ylabel('Count', fontsize=10)
-        plt.xticks(rotation=45, ha='right', fontsize=9)
-        plt.legend(title=col_var, fontsize=9)
-        plt.tight_layout()
-        
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-        plt.close()
-        buf.seek(0)
-        plot_image = base64.b64encode(buf.read()).decode('utf-8')
-
-        response = {
-            'results': {
-                'contingency_table': contingency_table.to_dict(),
-                'chi_squared': {
-                    'statistic': chi2_stat,
-                    'p_value': p_val,
-                    'degrees_of_freedom': dof
-                },
-                'phi_coefficient': phi,
-                'contingency_coefficient': contingency_coeff,
-                'cramers_v': cramers_v,
-                'interpretation': interpretation,
-                'row_var': row_var,
-                'col_var': col_var,
-                'row_levels': contingency_table.index.tolist(),
-                'col_levels': contingency_table.columns.tolist(),
-                'expected_frequencies': expected.tolist(),
-                'n_dropped': n_dropped,
-                'dropped_rows': dropped_rows
+    # Track missing data
+    missing_mask = df_subset[[row_var, col_var]].isnull().any(axis=1)
+    dropped_indices = df_subset.loc[missing_mask, '__original_index__'].tolist()
+
+    # Drop missing values
+    df_clean = df_subset.dropna(subset=[row_var, col_var])
+
+    # Store dropped row information
+    n_dropped = len(dropped_indices)
+    dropped_rows = sorted(dropped_indices)
+
+    # Remove tracking column
+    df_clean = df_clean.drop(columns=['__original_index__'])
+
+    if len(df_clean) < 2:
+        raise ValueError("Not enough valid data points for analysis after removing missing values")
+
+    # Create contingency table
+    contingency_table = pd.crosstab(df_clean[row_var], df_clean[col_var])
+
+    # --- Chi-squared test ---
+    chi2_stat, p_val, dof, expected = chi2_contingency(contingency_table)
+
+    # Standardized residuals
+    residuals = contingency_table - expected
+    standardized_residuals = residuals / np.sqrt(expected)
+
+    total = contingency_table.sum().sum()
+
+    phi2 = chi2_stat / total if total > 0 else 0
+    phi = np.sqrt(phi2)
+    contingency_coeff = np.sqrt(chi2_stat / (chi2_stat + total)) if (chi2_stat + total) > 0 else 0
+
+    # Cramer's V
+    n_rows, n_cols = contingency_table.shape
+    min_dim = min(n_rows - 1, n_cols - 1)
+    cramers_v = np.sqrt(phi2 / min_dim) if min_dim > 0 else 0
+
+    interpretation = get_full_interpretation(chi2_stat, p_val, dof, cramers_v, total, row_var, col_var, standardized_residuals)
+
+    # --- Plotting ---
+    plt.figure(figsize=(8, 5))
+    sns.countplot(data=df_clean, x=row_var, hue=col_var, palette='viridis')
+    plt.title(f'Grouped Bar Chart: {row_var} vs {col_var}', fontsize=12)
+    plt.xlabel(row_var, fontsize=10)
+    plt.ylabel('Count', fontsize=10)
+    plt.xticks(rotation=45, ha='right', fontsize=9)
+    plt.legend(title=col_var, fontsize=9)
+    plt.tight_layout()
+
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
+    plt.close()
+    buf.seek(0)
+    plot_image = base64.b64encode(buf.read()).decode('utf-8')
+
+    response = {
+        'results': {
+            'contingency_table': contingency_table.to_dict(),
+            'chi_squared': {
+                'statistic': chi2_stat,
+                'p_value': p_val,
+                'degrees_of_freedom': dof
             },
-            'plot': f"data:image/png;base64,{plot_image}"
-        }
+            'phi_coefficient': phi,
+            'contingency_coefficient': contingency_coeff,
+            'cramers_v': cramers_v,
+            'interpretation': interpretation,
+            'row_var': row_var,
+            'col_var': col_var,
+            'row_levels': contingency_table.index.tolist(),
+            'col_levels': contingency_table.columns.tolist(),
+            'expected_frequencies': expected.tolist(),
+            'n_dropped': n_dropped,
+            'dropped_rows': dropped_rows
+        },
+        'plot': f"data:image/png;base64,{plot_image}"
+    }
+    return response
 
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_crosstab_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
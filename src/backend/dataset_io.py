@@ -0,0 +1,178 @@
+"""
+Dataset ingestion for the analysis scripts.
+
+Analyses used to receive their table only as a JSON list of row dicts in
+payload['data']. load_frame(payload) additionally accepts:
+
+- payload['datasetId'], a dataset stored once in dataset_registry
+- payload['data'] as a dict of columns ({col: [values]}), cheaper than rows
+- payload['dataPath'], a server-side file, memory-mapped where possible:
+    Arrow IPC file/stream (.arrow, .feather, .ipc), Parquet (.parquet, .pq)
+    or CSV (.csv); Arrow files can be viewed without copying (zero_copy)
+
+The HTTP layer spools Arrow/Parquet request bodies into SPOOL_DIR and hands
+the analyses a dataPath, so large tables never pass through JSON.
+dataPath must point inside SPOOL_DIR or one of DATASET_ROOTS. Files an
+analysis writes (incremental state, exported tables) live in WORK_DIR.
+"""
+
+import os
+import tempfile
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+SPOOL_DIR = os.environ.get('DATASET_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'statistica-datasets'))
+
+# Extra directories analyses may read datasets from (os.pathsep separated).
+DATASET_ROOTS = [p for p in os.environ.get('DATASET_ROOTS', '').split(os.pathsep) if p]
+
+# The only directory analyses may write to (and read back their own state from).
+WORK_DIR = os.environ.get('DATASET_WORK_DIR', os.path.join(tempfile.gettempdir(), 'statistica-work'))
+
+# Content types accepted as binary request bodies -> dataset format.
+BINARY_CONTENT_TYPES = {
+    'application/vnd.apache.arrow.file': 'arrow',
+    'application/vnd.apache.arrow.stream': 'arrow',
+    'application/vnd.apache.parquet': 'parquet',
+    'application/x-parquet': 'parquet',
+}
+
+FORMAT_EXTENSIONS = {
+    '.arrow': 'arrow', '.feather': 'arrow', '.ipc': 'arrow',
+    '.parquet': 'parquet', '.pq': 'parquet',
+    '.csv': 'csv',
+}
+
+ARROW_FILE_MAGIC = b'ARROW1'
+PARQUET_MAGIC = b'PAR1'
+
+
+def binary_format(content_type):
+    """Dataset format for a request Content-Type, or None for JSON/other bodies."""
+    return BINARY_CONTENT_TYPES.get((content_type or '').split(';')[0].strip().lower())
+
+
+def has_data(payload):
+    """Whether the payload carries a dataset (rows/columns, a dataPath or a registered datasetId)."""
+    return bool(payload.get('data') or payload.get('dataPath') or payload.get('datasetId'))
+
+
+def spool(body, fmt):
+    """Write a binary request body into SPOOL_DIR; returns the file path (caller deletes it)."""
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    suffix = '.parquet' if fmt == 'parquet' else '.arrow'
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=SPOOL_DIR)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(body)
+    return path
+
+
+def resolve_path(path):
+    """Real path of a dataPath, which must lie in SPOOL_DIR or DATASET_ROOTS."""
+    real = os.path.realpath(path)
+    for root in [SPOOL_DIR] + DATASET_ROOTS:
+        root = os.path.realpath(root)
+        if os.path.commonpath([real, root]) == root:
+            return real
+    raise ValueError(f"dataPath '{path}' is outside the allowed dataset directories.")
+
+
+def resolve_work_path(path):
+    """
+    Real path of a file an analysis reads back or writes (state, output),
+    which must lie in WORK_DIR; relative paths are taken inside WORK_DIR.
+    """
+    root = os.path.realpath(WORK_DIR)
+    real = os.path.realpath(os.path.join(root, path))
+    if real == root or os.path.commonpath([real, root]) != root:
+        raise ValueError(f"Path '{path}' is outside the allowed work directory.")
+    os.makedirs(os.path.dirname(real), exist_ok=True)
+    return real
+
+
+def _detect_format(path):
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    if head.startswith(ARROW_FILE_MAGIC):
+        return 'arrow'
+    if head.startswith(PARQUET_MAGIC):
+        return 'parquet'
+    fmt = FORMAT_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Unrecognized dataset format for '{path}'.")
+    return fmt
+
+
+def _require_pyarrow():
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow is required to read Arrow/Parquet datasets.")
+
+
+def read_arrow(path, columns=None):
+    """Arrow IPC file or stream via a memory map; buffers stay backed by the file."""
+    _require_pyarrow()
+    source = pa.memory_map(path, 'r')
+    if source.read(6) == ARROW_FILE_MAGIC:
+        source.seek(0)
+        table = ipc.open_file(source).read_all()
+    else:
+        source.seek(0)
+        table = ipc.open_stream(source).read_all()
+    if columns is not None:
+        table = table.select(columns)
+    return table
+
+
+def read_table(path, columns=None, fmt=None):
+    """pyarrow Table of a dataset file (Arrow or Parquet)."""
+    fmt = fmt or _detect_format(path)
+    if fmt == 'arrow':
+        return read_arrow(path, columns)
+    if fmt == 'parquet':
+        _require_pyarrow()
+        return pq.read_table(path, columns=columns, memory_map=True)
+    raise ValueError(f"Cannot read '{path}' as an Arrow table.")
+
+
+def table_to_frame(table, zero_copy=False):
+    """
+    DataFrame of an Arrow table. zero_copy keeps one block per column so
+    numeric columns without nulls are read-only views on the Arrow buffers;
+    only analyses that never modify the frame in place should ask for it.
+    """
+    if zero_copy:
+        return table.to_pandas(split_blocks=True, self_destruct=False)
+    return table.to_pandas()
+
+
+def read_frame(path, columns=None, zero_copy=False):
+    """DataFrame of a dataset file, reading only `columns` when given."""
+    fmt = _detect_format(path)
+    if fmt == 'csv':
+        return pd.read_csv(path, usecols=columns)
+    return table_to_frame(read_table(path, columns, fmt), zero_copy)
+
+
+def load_frame(payload, columns=None, zero_copy=False):
+    """
+    The payload's dataset as a DataFrame: a registered dataset
+    (payload['datasetId'], see dataset_registry), JSON rows or columns from
+    payload['data'], or the file at payload['dataPath'].
+    """
+    if payload.get('datasetId'):
+        from dataset_registry import get_registry
+        return get_registry().load(payload['datasetId'], columns, copy=not zero_copy)
+    path = payload.get('dataPath')
+    if path:
+        return read_frame(resolve_path(path), columns, zero_copy)
+    data = payload.get('data')
+    df = pd.DataFrame(data) if data is not None else pd.DataFrame()
+    return df[columns] if columns is not None else df
@@ -0,0 +1,259 @@
+"""
+Server-side dataset registry.
+
+An uploaded dataset is typed once (numeric-looking columns converted with
+pd.to_numeric) and stored under a content-hash id in a columnar on-disk
+cache, so repeated analyses send only {'datasetId': ..., <column names>}
+instead of the whole table:
+
+    <DATASET_CACHE_DIR>/<id>.arrow   Arrow IPC file (pickle without pyarrow)
+    <DATASET_CACHE_DIR>/<id>.json    columns, types, row count
+
+Every process keeps recently used frames in memory up to
+DATASET_MEMORY_BYTES; files on disk are evicted least-recently-used first
+once they exceed DATASET_DISK_BYTES.
+"""
+
+import io
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import dataset_io
+
+CACHE_DIR = os.environ.get('DATASET_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'statistica-registry'))
+MEMORY_BYTES = int(os.environ.get('DATASET_MEMORY_BYTES', 1024 * 1024 * 1024))
+DISK_BYTES = int(os.environ.get('DATASET_DISK_BYTES', 8 * 1024 * 1024 * 1024))
+
+# columnTypes values (DataPayload) that mean a numeric column.
+NUMERIC_TYPES = {'number', 'numeric', 'integer', 'float'}
+
+
+class DatasetNotFoundError(LookupError):
+    """Raised for an unknown or evicted dataset id."""
+
+
+def content_id(*parts):
+    """Content hash of the uploaded bytes (and their format)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def type_columns(df, column_types=None):
+    """
+    Convert text columns that hold numbers to numeric dtypes, once. Explicit
+    column_types ({name: 'number' | 'string' | ...}) take precedence.
+    """
+    column_types = column_types or {}
+    typed = {}
+    for col in df.columns:
+        series = df[col]
+        declared = column_types.get(col)
+        if declared is not None:
+            if declared in NUMERIC_TYPES:
+                series = pd.to_numeric(series, errors='coerce')
+            elif declared in ('date', 'datetime'):
+                series = pd.to_datetime(series, errors='coerce')
+        elif series.dtype == object:
+            # Numeric only if every non-empty value parses.
+            present = series.mask(series.astype(str).str.strip() == '')
+            numeric = pd.to_numeric(present, errors='coerce')
+            if numeric.notna().any() and numeric.notna().sum() == present.notna().sum():
+                series = numeric
+        typed[col] = series
+    return pd.DataFrame(typed, index=pd.RangeIndex(len(df)))
+
+
+def describe_columns(df):
+    return [
+        {'name': str(col), 'type': str(df[col].dtype), 'missing': int(df[col].isna().sum())}
+        for col in df.columns
+    ]
+
+
+def frame_from_upload(body, content_type=None, filename=None):
+    """DataFrame of an uploaded body: Arrow/Parquet, CSV, or JSON (DataPayload or records)."""
+    fmt = dataset_io.binary_format(content_type)
+    if fmt is not None:
+        path = dataset_io.spool(body, fmt)
+        try:
+            return dataset_io.read_frame(path), {}
+        finally:
+            os.remove(path)
+
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type == 'text/csv' or (filename or '').lower().endswith('.csv'):
+        return pd.read_csv(io.BytesIO(body)), {}
+
+    payload = json.loads(body)
+    if isinstance(payload, dict) and 'headers' in payload:
+        # DataPayload from the preprocessing flow: headers, rows, optional columnTypes.
+        df = pd.DataFrame(payload.get('rows') or [], columns=payload['headers'])
+        types = payload.get('columnTypes') or []
+        return df, dict(zip(payload['headers'], types))
+    if isinstance(payload, dict) and 'data' in payload:
+        payload = payload['data']
+    return pd.DataFrame(payload), {}
+
+
+def _frame_bytes(df):
+    return int(df.memory_usage(index=False, deep=True).sum())
+
+
+class DatasetRegistry:
+    """Content-addressed dataset store: columnar files on disk plus a per-process LRU of frames."""
+
+    def __init__(self, directory=CACHE_DIR, memory_bytes=MEMORY_BYTES, disk_bytes=DISK_BYTES):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._frames = OrderedDict()
+        self._sizes = {}
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def _path(self, dataset_id, ext):
+        if not dataset_id or not all(c in '0123456789abcdef' for c in dataset_id):
+            raise DatasetNotFoundError(f"Invalid dataset id '{dataset_id}'")
+        return os.path.join(self.directory, f'{dataset_id}{ext}')
+
+    def _data_path(self, dataset_id):
+        return self._path(dataset_id, '.arrow' if dataset_io.PYARROW_AVAILABLE else '.pkl')
+
+    # ---------- registration ----------
+
+    def register(self, body, content_type=None, filename=None):
+        """Store an upload once; returns its metadata (with datasetId). Re-uploads are free."""
+        dataset_id = content_id(body, (content_type or '').split(';')[0], filename or '')
+        if os.path.exists(self._path(dataset_id, '.json')):
+            return self.info(dataset_id)
+        df, column_types = frame_from_upload(body, content_type, filename)
+        return self.register_frame(df, column_types, dataset_id)
+
+    def register_frame(self, df, column_types=None, dataset_id=None):
+        df = type_columns(df, column_types)
+        df.columns = [str(col) for col in df.columns]
+        if dataset_id is None:
+            dataset_id = content_id(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes(), *df.columns)
+        os.makedirs(self.directory, exist_ok=True)
+
+        data_path = self._data_path(dataset_id)
+        tmp = f'{data_path}.{os.getpid()}.tmp'
+        if dataset_io.PYARROW_AVAILABLE:
+            table = dataset_io.pa.Table.from_pandas(df, preserve_index=False)
+            # Uncompressed so readers can memory-map it.
+            with dataset_io.ipc.new_file(tmp, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            df.to_pickle(tmp)
+        os.replace(tmp, data_path)
+
+        info = {'datasetId': dataset_id, 'nRows': len(df), 'columns': describe_columns(df)}
+        with open(self._path(dataset_id, '.json'), 'w', encoding='utf-8') as f:
+            json.dump(info, f)
+        self._remember(dataset_id, df)
+        self._evict_disk(keep=dataset_id)
+        return info
+
+    # ---------- lookup ----------
+
+    def info(self, dataset_id):
+        try:
+            with open(self._path(dataset_id, '.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise DatasetNotFoundError(f"Dataset '{dataset_id}' not found") from None
+
+    def load(self, dataset_id, columns=None, copy=True):
+        """
+        The typed frame (only `columns` when given). copy=False returns the
+        cached frame itself, for callers that never modify it in place.
+        """
+        with self._lock:
+            df = self._frames.get(dataset_id)
+            if df is not None:
+                self._frames.move_to_end(dataset_id)
+        if df is not None and not os.path.exists(self._path(dataset_id, '.json')):
+            # Deleted or evicted on disk (possibly by another process).
+            self.delete(dataset_id)
+            df = None
+        if df is None:
+            df = self._read(dataset_id)
+            self._remember(dataset_id, df)
+        if columns is not None:
+            df = df[list(columns)]
+        return df.copy() if copy else df
+
+    def _read(self, dataset_id):
+        path = self._data_path(dataset_id)
+        if not os.path.exists(path):
+            raise DatasetNotFoundError(f"Dataset '{dataset_id}' not found")
+        os.utime(path)  # recency for disk eviction
+        if path.endswith('.pkl'):
+            return pd.read_pickle(path)
+        return dataset_io.table_to_frame(dataset_io.read_arrow(path))
+
+    def delete(self, dataset_id):
+        with self._lock:
+            if dataset_id in self._frames:
+                del self._frames[dataset_id]
+                self._used -= self._sizes.pop(dataset_id)
+        found = False
+        for ext in ('.arrow', '.pkl', '.json'):
+            try:
+                os.remove(self._path(dataset_id, ext))
+                found = True
+            except FileNotFoundError:
+                pass
+        return found
+
+    # ---------- limits ----------
+
+    def _remember(self, dataset_id, df):
+        size = _frame_bytes(df)
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            if dataset_id in self._frames:
+                return
+            self._frames[dataset_id] = df
+            self._sizes[dataset_id] = size
+            self._used += size
+            while self._used > self.memory_bytes:
+                evicted, _ = self._frames.popitem(last=False)
+                self._used -= self._sizes.pop(evicted)
+
+    def _evict_disk(self, keep=None):
+        entries = []
+        for name in os.listdir(self.directory):
+            dataset_id, ext = os.path.splitext(name)
+            if ext in ('.arrow', '.pkl'):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, dataset_id))
+        total = sum(size for _, size, _ in entries)
+        for _, size, dataset_id in sorted(entries):
+            if total <= self.disk_bytes:
+                break
+            if dataset_id != keep:
+                self.delete(dataset_id)
+                total -= size
+
+
+_registry = None
+
+
+def get_registry():
+    """Process-wide registry."""
+    global _registry
+    if _registry is None:
+        _registry = DatasetRegistry()
+    return _registry
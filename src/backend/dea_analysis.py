@@ -5,17 +5,34 @@ import numpy as np
 import pandas as pd
 import warnings
 import matplotlib.pyplot as plt
+import seaborn as sns
 import io
 import base64
+from contextlib import nullcontext
+
+import chart_service
+from parallelism import nested_jobs, process_pool
 
 try:
     from scipy.optimize import linprog
+    from scipy import sparse
     SCIPY_AVAILABLE = True
 except ImportError:
     SCIPY_AVAILABLE = False
 
+try:
+    # Optional: drive HiGHS directly so the model is loaded once and every
+    # re-solve warm-starts from the previous basis.
+    import highspy
+    HIGHSPY_AVAILABLE = True
+except ImportError:
+    HIGHSPY_AVAILABLE = False
+
 warnings.filterwarnings('ignore')
 
+# LP solutions depend only on the payload, so results can be cached.
+CACHEABLE = True
+
 def _to_native_type(obj):
     if isinstance(obj, np.integer):
         return int(obj)
@@ -27,6 +44,201 @@ def _to_native_type(obj):
         return obj.tolist()
     return obj
 
+# DMU count above which the per-DMU LPs are spread over a process pool.
+PARALLEL_MIN_DMUS = 500
+
+
+def dominated_units(inputs, outputs, chunk_size=256):
+    """
+    Boolean mask of Pareto-dominated DMUs: some other unit uses no more of
+    every input and produces no less of every output, strictly better in at
+    least one. Such columns never change the optimum of the envelopment LP
+    (another unit can always take their lambda), so they can be dropped.
+    """
+    n = len(inputs)
+    dominated = np.zeros(n, dtype=bool)
+    for start in range(0, n, chunk_size):
+        x_j = inputs[start:start + chunk_size, None, :]
+        y_j = outputs[start:start + chunk_size, None, :]
+        weakly = (inputs[None, :, :] <= x_j).all(axis=2) & (outputs[None, :, :] >= y_j).all(axis=2)
+        strictly = (inputs[None, :, :] < x_j).any(axis=2) | (outputs[None, :, :] > y_j).any(axis=2)
+        dominated[start:start + chunk_size] = (weakly & strictly).any(axis=1)
+    return dominated
+
+
+class DEAEngine:
+    """
+    Envelopment-form DEA LP built once per reference technology.
+
+    Between evaluated units only column 0 (theta/phi) and the right-hand side
+    change, so the sparse constraint block is assembled once and those
+    entries are patched in place before each HiGHS solve.
+    """
+
+    def __init__(self, ref_inputs, ref_outputs, orientation='input', rts='crs'):
+        self.ref_inputs = np.asarray(ref_inputs, dtype=float)
+        self.ref_outputs = np.asarray(ref_outputs, dtype=float)
+        self.orientation = orientation
+        self.rts = rts
+        self.n_ref, self.n_inputs = self.ref_inputs.shape
+        self.n_outputs = self.ref_outputs.shape[1]
+
+        n_rows = self.n_inputs + self.n_outputs
+        # Column 0 only touches the input rows (input orientation) or the
+        # output rows (output orientation); reserve those slots explicitly.
+        if orientation == 'input':
+            patch_rows = np.arange(self.n_inputs)
+        else:
+            patch_rows = np.arange(self.n_inputs, n_rows)
+        col0 = sparse.csc_matrix(
+            (np.ones(len(patch_rows)), (patch_rows, np.zeros(len(patch_rows), dtype=int))),
+            shape=(n_rows, 1)
+        )
+        body = sparse.csc_matrix(np.vstack([self.ref_inputs.T, -self.ref_outputs.T]))
+        self.A_ub = sparse.hstack([col0, body], format='csc')
+        self.A_ub.sort_indices()
+        self._patch = slice(self.A_ub.indptr[0], self.A_ub.indptr[1])
+        self.b_ub = np.zeros(n_rows)
+
+        self.c = np.zeros(self.n_ref + 1)
+        self.c[0] = 1 if orientation == 'input' else -1
+
+        if rts == 'vrs':
+            self.A_eq = sparse.csc_matrix(np.r_[0.0, np.ones(self.n_ref)][None, :])
+            self.b_eq = np.array([1.0])
+        else:  # CRS
+            self.A_eq = None
+            self.b_eq = None
+
+        self.bounds = np.zeros((self.n_ref + 1, 2))
+        self.bounds[:, 1] = np.inf
+
+        self._highs = self._build_highs() if HIGHSPY_AVAILABLE else None
+        self._excluded = None
+
+    def _build_highs(self):
+        lp = highspy.HighsLp()
+        lp.num_col_ = self.n_ref + 1
+        A = self.A_ub if self.A_eq is None else sparse.vstack([self.A_ub, self.A_eq], format='csc')
+        lp.num_row_ = A.shape[0]
+        lp.col_cost_ = self.c
+        lp.col_lower_ = self.bounds[:, 0]
+        lp.col_upper_ = np.full(self.n_ref + 1, highspy.kHighsInf)
+        row_lower = np.full(A.shape[0], -highspy.kHighsInf)
+        row_upper = np.zeros(A.shape[0])
+        if self.A_eq is not None:
+            row_lower[-1] = row_upper[-1] = 1.0
+        lp.row_lower_ = row_lower
+        lp.row_upper_ = row_upper
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+        lp.a_matrix_.start_ = A.indptr
+        lp.a_matrix_.index_ = A.indices
+        lp.a_matrix_.value_ = A.data
+        highs = highspy.Highs()
+        highs.setOptionValue('output_flag', False)
+        highs.passModel(lp)
+        self._patch_rows = self.A_ub.indices[self._patch]
+        return highs
+
+    def _solve_highs(self, exclude):
+        highs = self._highs
+        for row, value in zip(self._patch_rows, self.A_ub.data[self._patch]):
+            highs.changeCoeff(int(row), 0, float(value))
+        for row, value in enumerate(self.b_ub):
+            highs.changeRowBounds(row, -highspy.kHighsInf, float(value))
+        if self._excluded != exclude:
+            if self._excluded is not None:
+                highs.changeColBounds(self._excluded + 1, 0, highspy.kHighsInf)
+            if exclude is not None:
+                highs.changeColBounds(exclude + 1, 0, 0)
+            self._excluded = exclude
+        highs.run()
+        if highs.getModelStatus() != highspy.HighsModelStatus.kOptimal:
+            return None, None
+        return highs.getInfo().objective_function_value, np.asarray(highs.getSolution().col_value)
+
+    def solve(self, x_k, y_k, exclude=None):
+        """
+        Score the unit (x_k, y_k) against the reference technology.
+        `exclude` removes one reference column (super-efficiency).
+        Returns (efficiency, lambdas) with efficiency = theta or 1/phi.
+        """
+        if self.orientation == 'input':
+            self.A_ub.data[self._patch] = -x_k
+            self.b_ub[:self.n_inputs] = 0
+            self.b_ub[self.n_inputs:] = -y_k
+        else:
+            self.A_ub.data[self._patch] = y_k
+            self.b_ub[:self.n_inputs] = x_k
+            self.b_ub[self.n_inputs:] = 0
+
+        if self._highs is not None:
+            fun, x = self._solve_highs(exclude)
+        else:
+            bounds = self.bounds
+            if exclude is not None:
+                bounds = bounds.copy()
+                bounds[exclude + 1, 1] = 0
+            res = linprog(self.c, A_ub=self.A_ub, b_ub=self.b_ub, A_eq=self.A_eq, b_eq=self.b_eq,
+                          bounds=bounds, method='highs')
+            fun, x = (res.fun, res.x) if res.success else (None, None)
+
+        if fun is None:
+            return np.nan, None
+        if self.orientation == 'input':
+            return fun, x[1:]
+        phi = -fun
+        return (1 / phi if phi != 0 else np.inf), x[1:]
+
+    def solve_many(self, eval_inputs, eval_outputs, exclude=None):
+        scores = np.full(len(eval_inputs), np.nan)
+        lambdas = []
+        for k in range(len(eval_inputs)):
+            score, lam = self.solve(eval_inputs[k], eval_outputs[k], exclude=None if exclude is None else exclude[k])
+            scores[k] = score
+            lambdas.append(lam)
+        return scores, lambdas
+
+
+def _solve_chunk(ref_inputs, ref_outputs, orientation, rts, eval_inputs, eval_outputs, exclude):
+    engine = DEAEngine(ref_inputs, ref_outputs, orientation, rts)
+    return engine.solve_many(eval_inputs, eval_outputs, exclude)
+
+
+def solve_dea(ref_inputs, ref_outputs, eval_inputs, eval_outputs, orientation='input', rts='crs',
+              exclude=None, n_jobs=None, executor=None):
+    """
+    Score every evaluated unit against the reference technology, in parallel
+    chunks for large problems. `exclude[k]` is the reference column removed
+    when scoring unit k (or None). `executor` is an open process pool of
+    n_jobs workers to reuse across calls.
+    """
+    n_eval = len(eval_inputs)
+    if exclude is None:
+        exclude = [None] * n_eval
+
+    if executor is None:
+        n_jobs = nested_jobs(n_jobs, worthwhile=n_eval >= PARALLEL_MIN_DMUS)
+        if n_jobs <= 1:
+            return _solve_chunk(ref_inputs, ref_outputs, orientation, rts, eval_inputs, eval_outputs, exclude)
+        with process_pool(n_jobs) as executor:
+            return solve_dea(ref_inputs, ref_outputs, eval_inputs, eval_outputs, orientation, rts,
+                             exclude, n_jobs, executor)
+
+    bounds = np.linspace(0, n_eval, min(n_jobs * 4, n_eval) + 1).astype(int)
+    futures = [
+        executor.submit(_solve_chunk, ref_inputs, ref_outputs, orientation, rts,
+                        eval_inputs[a:b], eval_outputs[a:b], exclude[a:b])
+        for a, b in zip(bounds[:-1], bounds[1:]) if b > a
+    ]
+    scores, lambdas = [], []
+    for future in futures:
+        chunk_scores, chunk_lambdas = future.result()
+        scores.append(chunk_scores)
+        lambdas.extend(chunk_lambdas)
+    return np.concatenate(scores), lambdas
+
+
 class DEAAnalyzer:
     def __init__(self, data: pd.DataFrame, input_cols: list, output_cols: list, dmu_col: str):
         self.dmu_names = data[dmu_col].tolist()
@@ -94,90 +306,35 @@ class DEAAnalyzer:
         return interpretation
 
 
-    def analyze(self, orientation='input', rts='crs'):
+    def analyze(self, orientation='input', rts='crs', mode='standard', prescreen=True, n_jobs=None):
         if not SCIPY_AVAILABLE:
             raise ImportError("SciPy library is not installed. Please install it via 'pip install scipy'.")
         
-        n_dmus, n_inputs = self.inputs.shape
-        n_outputs = self.outputs.shape[1]
-        
-        efficiencies = np.zeros(n_dmus)
+        n_dmus = self.inputs.shape[0]
+
+        # Dominated units can never carry weight in the envelopment LP. They are
+        # kept for super-efficiency, where a unit's only dominator may be the
+        # unit being excluded.
+        ref_idx = np.arange(n_dmus)
+        if prescreen and mode == 'standard' and n_dmus > 2:
+            ref_idx = np.flatnonzero(~dominated_units(self.inputs, self.outputs))
+
+        exclude = None
+        if mode == 'super':
+            exclude = list(range(n_dmus))
+
+        efficiencies, ref_lambdas = solve_dea(
+            self.inputs[ref_idx], self.outputs[ref_idx], self.inputs, self.outputs,
+            orientation, rts, exclude=exclude, n_jobs=n_jobs
+        )
+
         lambdas_list = []
+        for lam in ref_lambdas:
+            full = np.full(n_dmus, np.nan) if lam is None else np.zeros(n_dmus)
+            if lam is not None:
+                full[ref_idx] = lam
+            lambdas_list.append(full.tolist())
 
-        for k in range(n_dmus):
-            if orientation == 'input':
-                # Objective function: minimize theta
-                c = np.zeros(n_dmus + 1)
-                c[0] = 1
-
-                # Constraints
-                A_ub = np.zeros((n_inputs, n_dmus + 1))
-                A_ub[:, 1:] = self.inputs.T
-                A_ub[:, 0] = -self.inputs[k, :]
-                b_ub = np.zeros(n_inputs)
-
-                A_ub_output = np.zeros((n_outputs, n_dmus + 1))
-                A_ub_output[:, 1:] = -self.outputs.T
-                b_ub_output = -self.outputs[k, :]
-
-                A_ub = np.vstack([A_ub, A_ub_output])
-                b_ub = np.concatenate([b_ub, b_ub_output])
-
-                if rts == 'vrs':
-                    A_eq = np.ones((1, n_dmus + 1))
-                    A_eq[0, 0] = 0
-                    b_eq = np.array([1])
-                else: # CRS
-                    A_eq = None
-                    b_eq = None
-
-                bounds = [(0, None)] + [(0, None) for _ in range(n_dmus)]
-
-                res = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=bounds, method='highs')
-
-                if res.success:
-                    efficiencies[k] = res.fun
-                    lambdas_list.append(res.x[1:].tolist())
-                else:
-                    efficiencies[k] = np.nan
-                    lambdas_list.append([np.nan] * n_dmus)
-            
-            else: # Output-oriented
-                c = np.zeros(n_dmus + 1)
-                c[0] = -1
-
-                A_ub = np.zeros((n_inputs, n_dmus + 1))
-                A_ub[:, 1:] = self.inputs.T
-                b_ub = self.inputs[k, :]
-
-                A_ub_output = np.zeros((n_outputs, n_dmus + 1))
-                A_ub_output[:, 1:] = -self.outputs.T
-                A_ub_output[:, 0] = self.outputs[k, :]
-                b_ub_output = np.zeros(n_outputs)
-                
-                A_ub = np.vstack([A_ub, A_ub_output])
-                b_ub = np.concatenate([b_ub, b_ub_output])
-                
-                if rts == 'vrs':
-                    A_eq = np.ones((1, n_dmus + 1))
-                    A_eq[0, 0] = 0
-                    b_eq = np.array([1])
-                else: # CRS
-                    A_eq = None
-                    b_eq = None
-
-                bounds = [(1, None)] + [(0, None) for _ in range(n_dmus)]
-
-                res = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=bounds, method='highs')
-
-                if res.success:
-                    phi = -res.fun
-                    efficiencies[k] = 1/phi if phi != 0 else np.inf
-                    lambdas_list.append(res.x[1:].tolist())
-                else:
-                    efficiencies[k] = np.nan
-                    lambdas_list.append([np.nan] * n_dmus)
-        
         efficiency_scores = {self.dmu_names[i]: eff for i, eff in enumerate(efficiencies)}
         lambdas = {self.dmu_names[i]: l for i, l in enumerate(lambdas_list)}
         reference_sets = {dmu: [self.dmu_names[j] for j, l_val in enumerate(lambdas_list[i]) if l_val > 1e-6]
@@ -246,43 +403,119 @@ class DEAAnalyzer:
         return base64.b64encode(buf.read()).decode('utf-8')
 
 
+def malmquist_analysis(df, dmu_col, period_col, input_cols, output_cols, rts='crs', n_jobs=None):
+    """
+    Input-oriented Malmquist productivity index between consecutive periods.
+
+    For periods t and t+1: M = sqrt(D_t(t+1)/D_t(t) * D_t+1(t+1)/D_t+1(t)), split into
+    efficiency change EC = D_t+1(t+1)/D_t(t) and technical change TC = M/EC.
+    All four distance functions reuse the same DEA engine with the reference
+    technology of one period and evaluated units from either period.
+    """
+    periods = sorted(df[period_col].dropna().unique())
+    if len(periods) < 2:
+        raise ValueError("Malmquist index requires at least two periods.")
+
+    by_period = {p: df[df[period_col] == p].drop_duplicates(subset=[dmu_col]).set_index(dmu_col) for p in periods}
+    results = []
+    # One pool for all four distance functions of every period pair.
+    n_jobs = nested_jobs(n_jobs, worthwhile=len(df) >= PARALLEL_MIN_DMUS)
+    with (process_pool(n_jobs) if n_jobs > 1 else nullcontext()) as executor:
+        for t0, t1 in zip(periods[:-1], periods[1:]):
+            common = by_period[t0].index.intersection(by_period[t1].index)
+            if len(common) == 0:
+                continue
+            x0 = by_period[t0].loc[common, input_cols].values.astype(float)
+            y0 = by_period[t0].loc[common, output_cols].values.astype(float)
+            x1 = by_period[t1].loc[common, input_cols].values.astype(float)
+            y1 = by_period[t1].loc[common, output_cols].values.astype(float)
+            ref0 = (by_period[t0][input_cols].values.astype(float), by_period[t0][output_cols].values.astype(float))
+            ref1 = (by_period[t1][input_cols].values.astype(float), by_period[t1][output_cols].values.astype(float))
+
+            d00, _ = solve_dea(*ref0, x0, y0, 'input', rts, n_jobs=n_jobs, executor=executor)
+            d01, _ = solve_dea(*ref0, x1, y1, 'input', rts, n_jobs=n_jobs, executor=executor)
+            d10, _ = solve_dea(*ref1, x0, y0, 'input', rts, n_jobs=n_jobs, executor=executor)
+            d11, _ = solve_dea(*ref1, x1, y1, 'input', rts, n_jobs=n_jobs, executor=executor)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                malmquist = np.sqrt((d01 / d00) * (d11 / d10))
+                efficiency_change = d11 / d00
+                technical_change = malmquist / efficiency_change
+
+            for i, dmu in enumerate(common):
+                results.append({
+                    'dmu': dmu,
+                    'period_from': t0,
+                    'period_to': t1,
+                    'efficiency_from': d00[i],
+                    'efficiency_to': d11[i],
+                    'efficiency_change': efficiency_change[i],
+                    'technical_change': technical_change[i],
+                    'malmquist_index': malmquist[i],
+                })
+
+    summary = {}
+    if results:
+        frame = pd.DataFrame(results)
+        for key in ['efficiency_change', 'technical_change', 'malmquist_index']:
+            values = frame[key].replace([np.inf, -np.inf], np.nan).dropna()
+            # Geometric mean is the conventional average for ratio indices.
+            summary[key] = float(np.exp(np.log(values[values > 0]).mean())) if (values > 0).any() else None
+
+    return {'malmquist': results, 'summary': summary, 'periods': periods}
+
+
+def run_dea_analysis(payload):
+    data_json = payload.get('data')
+    dmu_col = payload.get('dmu_col')
+    input_cols = payload.get('input_cols')
+    output_cols = payload.get('output_cols')
+    orientation = payload.get('orientation', 'input')
+    rts = payload.get('rts', 'crs')
+    mode = payload.get('mode', 'standard')
+    period_col = payload.get('period_col')
+    prescreen = payload.get('prescreen', True)
+
+    if not all([data_json, dmu_col, input_cols, output_cols]):
+        raise ValueError("Missing required parameters.")
+
+    df = pd.DataFrame(data_json)
+
+    for col in input_cols + output_cols:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+        df.dropna(subset=[col], inplace=True)
+        if (df[col] <= 0).any():
+            raise ValueError(f"All values in input/output column '{col}' must be positive for DEA.")
+
+    if df.empty:
+         raise ValueError("No valid numeric data for analysis.")
+
+    if mode == 'malmquist':
+        if not period_col:
+            raise ValueError("Malmquist mode requires 'period_col'.")
+        return {'results': malmquist_analysis(df, dmu_col, period_col, input_cols, output_cols, rts), 'plot': None}
+
+    analyzer = DEAAnalyzer(df, input_cols, output_cols, dmu_col)
+    results = analyzer.analyze(orientation, rts, mode=mode, prescreen=prescreen)
+    results['mode'] = mode
+
+    plot_image = None
+    plot_wanted = chart_service.resolve_plot_mode(payload.get('plotMode')) != 'none'
+    if plot_wanted and len(input_cols) == 1 and len(output_cols) == 1:
+         plot_image = analyzer.plot_frontier(results)
+
+
+    response = {
+        'results': results,
+        'plot': f"data:image/png;base64,{plot_image}" if plot_image else None
+    }
+    return response
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        data_json = payload.get('data')
-        dmu_col = payload.get('dmu_col')
-        input_cols = payload.get('input_cols')
-        output_cols = payload.get('output_cols')
-        orientation = payload.get('orientation', 'input')
-        rts = payload.get('rts', 'crs')
-
-        if not all([data_json, dmu_col, input_cols, output_cols]):
-            raise ValueError("Missing required parameters.")
-            
-        df = pd.DataFrame(data_json)
-        
-        for col in input_cols + output_cols:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-            df.dropna(subset=[col], inplace=True)
-            if (df[col] <= 0).any():
-                raise ValueError(f"All values in input/output column '{col}' must be positive for DEA.")
-
-        if df.empty:
-             raise ValueError("No valid numeric data for analysis.")
-
-        analyzer = DEAAnalyzer(df, input_cols, output_cols, dmu_col)
-        results = analyzer.analyze(orientation, rts)
-        
-        plot_image = None
-        if len(input_cols) == 1 and len(output_cols) == 1:
-             plot_image = analyzer.plot_frontier(results)
-
-
-        response = {
-            'results': results,
-            'plot': f"data:image/png;base64,{plot_image}" if plot_image else None
-        }
-        
+        response = run_dea_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
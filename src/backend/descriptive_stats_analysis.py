@@ -2,12 +2,11 @@ import sys
 import json
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import seaborn as sns
-import io
-import base64
 from scipy.stats import skew, kurtosis, mode
 
+import chart_service
+
 # Set seaborn style globally
 sns.set_theme(style="darkgrid")
 sns.set_context("notebook", font_scale=1.1)
@@ -90,129 +89,53 @@ def get_categorical_stats(series):
     
     return {'table': freq_table.to_dict('records'), 'summary': summary}, insights
 
+# Seaborn style the charts are rendered with (matches the global theme above).
+PLOT_STYLE = 'darkgrid'
+
 def create_histogram(series, var_name):
-    """Create histogram with KDE for numeric data"""
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.histplot(series, kde=True, ax=ax, color='#1f77b4')
-    ax.set_xlabel(var_name, fontsize=12)
-    ax.set_ylabel('Frequency', fontsize=12)
-    plt.tight_layout()
-    
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-    plt.close(fig)
-    buf.seek(0)
-    return base64.b64encode(buf.read()).decode('utf-8')
+    """Histogram with KDE spec for numeric data"""
+    return dict(chart_service.histogram_spec(series, xlabel=var_name, ylabel='Frequency'), style=PLOT_STYLE)
 
 def create_boxplot(series, var_name):
-    """Create boxplot for numeric data"""
-    fig, ax = plt.subplots(figsize=(10, 6))
-    bp = sns.boxplot(y=series, ax=ax, color='#bcd4e6')  # Beau blue
-    
-    # Apply alpha (transparency) to the box patches
-    for patch in ax.artists:
-        r, g, b, a = patch.get_facecolor()
-        patch.set_facecolor((r, g, b, 0.7))  # Set alpha to 0.7
-    
-    ax.set_ylabel(var_name, fontsize=12)
-    plt.tight_layout()
-    
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-    plt.close(fig)
-    buf.seek(0)
-    return base64.b64encode(buf.read()).decode('utf-8')
+    """Boxplot spec for numeric data"""
+    return dict(chart_service.box_spec([series], ylabel=var_name), style=PLOT_STYLE)
 
 def create_bar_chart(series, var_name):
-    """Create bar chart for categorical data"""
-    fig, ax = plt.subplots(figsize=(10, 6))
+    """Bar chart spec for categorical data"""
     top_n = series.value_counts().nlargest(20)
-    sns.barplot(x=top_n.values, y=top_n.index, ax=ax, orient='h', palette='crest')
-    ax.set_xlabel('Frequency', fontsize=12)
-    ax.set_ylabel(var_name, fontsize=12)
-    plt.tight_layout()
-    
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-    plt.close(fig)
-    buf.seek(0)
-    return base64.b64encode(buf.read()).decode('utf-8')
+    return dict(chart_service.bar_spec(top_n.index, top_n.values, xlabel='Frequency', ylabel=var_name,
+                                       horizontal=True, palette='crest'), style=PLOT_STYLE)
 
 def create_pie_chart(series, var_name):
-    """Create pie chart for categorical data"""
-    fig, ax = plt.subplots(figsize=(10, 6))
+    """Pie chart spec for categorical data"""
     value_counts = series.value_counts().nlargest(10)  # Top 10 categories
-    colors = sns.color_palette('vlag', n_colors=len(value_counts))
-    
-    # Create pie without labels on the chart
-    wedges, texts, autotexts = ax.pie(
-        value_counts.values, 
-        autopct='%1.1f%%',
-        colors=colors, 
-        startangle=90
-    )
-    
-    # Add legend with labels
-    ax.legend(wedges, value_counts.index, 
-              title="Categories",
-              loc="center left",
-              bbox_to_anchor=(1, 0, 0.5, 1))
-    
-    plt.tight_layout()
-    
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-    plt.close(fig)
-    buf.seek(0)
-    return base64.b64encode(buf.read()).decode('utf-8')
+    return dict(chart_service.pie_spec(value_counts.index, value_counts.values), style=PLOT_STYLE)
 
 def create_donut_chart(series, var_name):
-    """Create donut chart for categorical data"""
-    fig, ax = plt.subplots(figsize=(10, 6))
+    """Donut chart spec for categorical data"""
     value_counts = series.value_counts().nlargest(10)  # Top 10 categories
-    colors = sns.color_palette('vlag', n_colors=len(value_counts))
-    
-    # Create donut without labels on the chart
-    wedges, texts, autotexts = ax.pie(
-        value_counts.values, 
-        autopct='%1.1f%%', 
-        colors=colors, 
-        startangle=90
-    )
-    
-    # Draw circle in center to create donut effect
-    centre_circle = plt.Circle((0, 0), 0.70, fc='white')
-    ax.add_artist(centre_circle)
-    
-    # Add legend with labels
-    ax.legend(wedges, value_counts.index, 
-              title="Categories",
-              loc="center left",
-              bbox_to_anchor=(1, 0, 0.5, 1))
-    
-    plt.tight_layout()
-    
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-    plt.close(fig)
-    buf.seek(0)
-    return base64.b64encode(buf.read()).decode('utf-8')
+    return dict(chart_service.pie_spec(value_counts.index, value_counts.values, donut=True), style=PLOT_STYLE)
+
+def create_plots(series, is_numeric, var_name, plot_mode=None):
+    """
+    All relevant plots for the data type, as raw base64 PNGs ('inline'),
+    chart specs ('spec') or nothing ('none').
+    """
+    plot_mode = chart_service.resolve_plot_mode(plot_mode)
+    if plot_mode == 'none':
+        return {}
 
-def create_plots(series, is_numeric, var_name):
-    """Create all relevant plots for the data type"""
-    plots = {}
-    
     if is_numeric:
-        plots['histogram'] = create_histogram(series, var_name)
-        plots['boxplot'] = create_boxplot(series, var_name)
+        specs = {'histogram': create_histogram(series, var_name), 'boxplot': create_boxplot(series, var_name)}
     else:
-        plots['bar'] = create_bar_chart(series, var_name)
-        plots['pie'] = create_pie_chart(series, var_name)
-        plots['donut'] = create_donut_chart(series, var_name)
-    
-    return plots
-
-def run_descriptive_stats_analysis(data, variables, group_by_var=None):
+        specs = {
+            'bar': create_bar_chart(series, var_name),
+            'pie': create_pie_chart(series, var_name),
+            'donut': create_donut_chart(series, var_name),
+        }
+    return {name: chart_service.chart_output(spec, plot_mode, data_uri=False) for name, spec in specs.items()}
+
+def run_descriptive_stats_analysis(data, variables, group_by_var=None, plot_mode=None):
     """Main function for descriptive statistics analysis."""
     df = pd.DataFrame(data)
     all_results = {}
@@ -231,14 +154,14 @@ def run_descriptive_stats_analysis(data, variables, group_by_var=None):
             numeric_series = pd.to_numeric(series, errors='coerce').dropna()
             if not numeric_series.empty:
                 stats, insights = get_numeric_stats(numeric_series)
-                plots = create_plots(numeric_series, True, var)
+                plots = create_plots(numeric_series, True, var, plot_mode)
                 var_result = {'type': 'numeric', 'stats': stats, 'plots': plots, 'insights': insights}
             else:
                 var_result = {'error': 'No numeric data to analyze.'}
         else:
             if not series.empty:
                 stats, insights = get_categorical_stats(series)
-                plots = create_plots(series, False, var)
+                plots = create_plots(series, False, var, plot_mode)
                 var_result = {'type': 'categorical', **stats, 'plots': plots, 'insights': insights}
             else:
                 var_result = {'error': 'No categorical data to analyze.'}
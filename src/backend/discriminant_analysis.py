@@ -11,6 +11,7 @@ from scipy import stats
 import io
 import base64
 import warnings
+from dataset_io import load_frame, has_data
 
 warnings.filterwarnings('ignore')
 
@@ -185,266 +186,269 @@ def _generate_interpretation(results, group_var, n_obs, n_predictors):
     
     return "\n".join(interpretation_parts)
 
-def main():
+def run_discriminant_analysis(payload):
+    group_var = payload.get('groupVar')
+    predictor_vars = payload.get('predictorVars')
+
+    if not all([has_data(payload), group_var, predictor_vars]):
+        raise ValueError("Missing data, groupVar, or predictorVars")
+
+    df = load_frame(payload)
+
+    # Clean data
+    all_vars = [group_var] + predictor_vars
+    df_clean = df[all_vars].dropna()
+
+    if len(df_clean) < 10:
+        raise ValueError("Not enough valid observations after removing missing values")
+
+    X = df_clean[predictor_vars].values.astype(float)
+
+    le = LabelEncoder()
+    y = le.fit_transform(df_clean[group_var])
+    group_names = le.classes_.tolist()
+    n_groups = len(group_names)
+
+    if n_groups < 2:
+        raise ValueError("Need at least 2 groups for discriminant analysis")
+
+    n_components = min(n_groups - 1, len(predictor_vars))
+
+    # Fit LDA
+    lda = LinearDiscriminantAnalysis(n_components=n_components, store_covariance=True)
+    lda.fit(X, y)
+
+    y_pred = lda.predict(X)
+    X_lda = lda.transform(X)
+
+    # Classification metrics
+    accuracy = accuracy_score(y, y_pred)
+    precision = precision_score(y, y_pred, average='weighted', zero_division=0)
+    recall = recall_score(y, y_pred, average='weighted', zero_division=0)
+    f1 = f1_score(y, y_pred, average='weighted', zero_division=0)
+    conf_matrix = confusion_matrix(y, y_pred)
+
+    # Wilks' Lambda
+    n = len(y)
+    p = len(predictor_vars)
+    k = n_groups
+
+    eigenvalues = lda.explained_variance_ratio_ * np.sum(lda.explained_variance_ratio_) if hasattr(lda, 'explained_variance_ratio_') else []
+
+    # Calculate Wilks' Lambda from eigenvalues
+    if len(lda.explained_variance_ratio_) > 0:
+        lambda_vals = 1 / (1 + lda.explained_variance_ratio_ * (n - k) / (k - 1))
+        wilks_lambda = np.prod(lambda_vals)
+    else:
+        wilks_lambda = 1.0
+
+    # F approximation for Wilks' Lambda
+    df1 = p * (k - 1)
+    df2 = n - k - p + 1
+
+    if wilks_lambda < 1 and df2 > 0:
+        f_stat = ((1 - wilks_lambda) / wilks_lambda) * (df2 / df1)
+        p_value = 1 - stats.f.cdf(f_stat, df1, df2)
+    else:
+        f_stat = 0
+        p_value = 1.0
+
+    # Canonical correlations
+    canonical_corrs = np.sqrt(lda.explained_variance_ratio_).tolist() if hasattr(lda, 'explained_variance_ratio_') else []
+
+    # Standardized coefficients
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    lda_scaled = LinearDiscriminantAnalysis(n_components=n_components)
+    lda_scaled.fit(X_scaled, y)
+    std_coeffs = lda_scaled.scalings_.tolist()
+
+    # Structure matrix (correlations between predictors and discriminant functions)
+    structure_matrix = []
+    for i in range(X.shape[1]):
+        corrs = []
+        for j in range(X_lda.shape[1]):
+            corr = np.corrcoef(X[:, i], X_lda[:, j])[0, 1]
+            corrs.append(corr if not np.isnan(corr) else 0)
+        structure_matrix.append(corrs)
+
+    # Group centroids
+    centroids = []
+    for g in range(n_groups):
+        centroid = X_lda[y == g].mean(axis=0).tolist()
+        centroids.append(centroid)
+
+    # Eigenvalue details
+    eigenvalue_details = []
+    cumulative = 0
+    for i, ev in enumerate(lda.explained_variance_ratio_):
+        cumulative += ev
+        eigenvalue_details.append({
+            'function': f'LD{i+1}',
+            'eigenvalue': float(ev * (n - k) / (k - 1)),
+            'variance_explained': float(ev),
+            'cumulative_variance': float(cumulative),
+            'canonical_correlation': float(np.sqrt(ev)) if ev > 0 else 0
+        })
+
+    # Group statistics
+    group_stats = {}
+    for i, gname in enumerate(group_names):
+        mask = y == i
+        group_stats[str(gname)] = {
+            'n': int(np.sum(mask)),
+            'means': X[mask].mean(axis=0).tolist(),
+            'stds': X[mask].std(axis=0).tolist(),
+            'predictor_names': predictor_vars
+        }
+
+    # Prior probabilities
+    priors = lda.priors_.tolist()
+
+    # Classification function coefficients
+    class_func_coeffs = {}
+    class_func_intercepts = {}
+    for i, gname in enumerate(group_names):
+        class_func_coeffs[str(gname)] = lda.coef_[i].tolist() if len(lda.coef_) > i else lda.coef_[0].tolist()
+        class_func_intercepts[str(gname)] = float(lda.intercept_[i]) if len(lda.intercept_) > i else float(lda.intercept_[0])
+
+    # Box's M test (simplified approximation)
     try:
-        payload = json.load(sys.stdin)
-        data = payload.get('data')
-        group_var = payload.get('groupVar')
-        predictor_vars = payload.get('predictorVars')
-
-        if not all([data, group_var, predictor_vars]):
-            raise ValueError("Missing data, groupVar, or predictorVars")
-
-        df = pd.DataFrame(data)
-        
-        # Clean data
-        all_vars = [group_var] + predictor_vars
-        df_clean = df[all_vars].dropna()
-        
-        if len(df_clean) < 10:
-            raise ValueError("Not enough valid observations after removing missing values")
-        
-        X = df_clean[predictor_vars].values.astype(float)
-        
-        le = LabelEncoder()
-        y = le.fit_transform(df_clean[group_var])
-        group_names = le.classes_.tolist()
-        n_groups = len(group_names)
-        
-        if n_groups < 2:
-            raise ValueError("Need at least 2 groups for discriminant analysis")
-        
-        n_components = min(n_groups - 1, len(predictor_vars))
-        
-        # Fit LDA
-        lda = LinearDiscriminantAnalysis(n_components=n_components, store_covariance=True)
-        lda.fit(X, y)
-        
-        y_pred = lda.predict(X)
-        X_lda = lda.transform(X)
-        
-        # Classification metrics
-        accuracy = accuracy_score(y, y_pred)
-        precision = precision_score(y, y_pred, average='weighted', zero_division=0)
-        recall = recall_score(y, y_pred, average='weighted', zero_division=0)
-        f1 = f1_score(y, y_pred, average='weighted', zero_division=0)
-        conf_matrix = confusion_matrix(y, y_pred)
-        
-        # Wilks' Lambda
-        n = len(y)
-        p = len(predictor_vars)
-        k = n_groups
-        
-        eigenvalues = lda.explained_variance_ratio_ * np.sum(lda.explained_variance_ratio_) if hasattr(lda, 'explained_variance_ratio_') else []
-        
-        # Calculate Wilks' Lambda from eigenvalues
-        if len(lda.explained_variance_ratio_) > 0:
-            lambda_vals = 1 / (1 + lda.explained_variance_ratio_ * (n - k) / (k - 1))
-            wilks_lambda = np.prod(lambda_vals)
-        else:
-            wilks_lambda = 1.0
-        
-        # F approximation for Wilks' Lambda
-        df1 = p * (k - 1)
-        df2 = n - k - p + 1
-        
-        if wilks_lambda < 1 and df2 > 0:
-            f_stat = ((1 - wilks_lambda) / wilks_lambda) * (df2 / df1)
-            p_value = 1 - stats.f.cdf(f_stat, df1, df2)
-        else:
-            f_stat = 0
-            p_value = 1.0
-        
-        # Canonical correlations
-        canonical_corrs = np.sqrt(lda.explained_variance_ratio_).tolist() if hasattr(lda, 'explained_variance_ratio_') else []
-        
-        # Standardized coefficients
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
-        lda_scaled = LinearDiscriminantAnalysis(n_components=n_components)
-        lda_scaled.fit(X_scaled, y)
-        std_coeffs = lda_scaled.scalings_.tolist()
-        
-        # Structure matrix (correlations between predictors and discriminant functions)
-        structure_matrix = []
-        for i in range(X.shape[1]):
-            corrs = []
-            for j in range(X_lda.shape[1]):
-                corr = np.corrcoef(X[:, i], X_lda[:, j])[0, 1]
-                corrs.append(corr if not np.isnan(corr) else 0)
-            structure_matrix.append(corrs)
-        
-        # Group centroids
-        centroids = []
-        for g in range(n_groups):
-            centroid = X_lda[y == g].mean(axis=0).tolist()
-            centroids.append(centroid)
-        
-        # Eigenvalue details
-        eigenvalue_details = []
-        cumulative = 0
-        for i, ev in enumerate(lda.explained_variance_ratio_):
-            cumulative += ev
-            eigenvalue_details.append({
-                'function': f'LD{i+1}',
-                'eigenvalue': float(ev * (n - k) / (k - 1)),
-                'variance_explained': float(ev),
-                'cumulative_variance': float(cumulative),
-                'canonical_correlation': float(np.sqrt(ev)) if ev > 0 else 0
-            })
-        
-        # Group statistics
-        group_stats = {}
-        for i, gname in enumerate(group_names):
-            mask = y == i
-            group_stats[str(gname)] = {
-                'n': int(np.sum(mask)),
-                'means': X[mask].mean(axis=0).tolist(),
-                'stds': X[mask].std(axis=0).tolist(),
-                'predictor_names': predictor_vars
-            }
-        
-        # Prior probabilities
-        priors = lda.priors_.tolist()
-        
-        # Classification function coefficients
-        class_func_coeffs = {}
-        class_func_intercepts = {}
-        for i, gname in enumerate(group_names):
-            class_func_coeffs[str(gname)] = lda.coef_[i].tolist() if len(lda.coef_) > i else lda.coef_[0].tolist()
-            class_func_intercepts[str(gname)] = float(lda.intercept_[i]) if len(lda.intercept_) > i else float(lda.intercept_[0])
-        
-        # Box's M test (simplified approximation)
-        try:
-            cov_matrices = []
-            for i in range(n_groups):
-                cov_matrices.append(np.cov(X[y == i].T))
-            
-            pooled_cov = np.zeros_like(cov_matrices[0])
-            ns = [np.sum(y == i) for i in range(n_groups)]
-            for i, cov in enumerate(cov_matrices):
-                pooled_cov += (ns[i] - 1) * cov
-            pooled_cov /= (n - n_groups)
-            
-            M = 0
-            for i, cov in enumerate(cov_matrices):
-                if ns[i] > 1:
-                    det_ratio = np.linalg.det(cov) / np.linalg.det(pooled_cov)
-                    if det_ratio > 0:
-                        M += (ns[i] - 1) * np.log(det_ratio)
-            
-            box_df = (n_groups - 1) * p * (p + 1) / 2
-            box_p = 1 - stats.chi2.cdf(abs(M), box_df) if box_df > 0 else 1
-            
-            box_m_test = {
-                'statistic': float(abs(M)),
-                'df': float(box_df),
-                'p_value': float(box_p),
-                'homogeneous': box_p > 0.05
-            }
-        except:
-            box_m_test = {'statistic': None, 'df': None, 'p_value': None, 'homogeneous': None}
-        
-        results = {
-            'meta': {
-                'groups': [str(g) for g in group_names],
-                'n_components': n_components,
-                'predictor_vars': predictor_vars
-            },
-            'classification_metrics': {
-                'accuracy': accuracy,
-                'precision': precision,
-                'recall': recall,
-                'f1_score': f1,
-                'confusion_matrix': conf_matrix.tolist(),
-                'true_labels': y.tolist(),
-                'predicted_labels': y_pred.tolist()
-            },
-            'eigenvalues': lda.explained_variance_ratio_.tolist(),
-            'eigenvalue_details': eigenvalue_details,
-            'canonical_correlations': canonical_corrs,
-            'wilks_lambda': {
-                'lambda': wilks_lambda,
-                'F': f_stat,
-                'df1': df1,
-                'df2': df2,
-                'p_value': p_value
-            },
-            'standardized_coeffs': std_coeffs,
-            'structure_matrix': structure_matrix,
-            'group_centroids': centroids,
-            'lda_transformed_data': X_lda.tolist(),
-            'true_labels_full': y.tolist(),
-            'group_stats': group_stats,
-            'priors': priors,
-            'classification_function_coeffs': class_func_coeffs,
-            'classification_function_intercepts': class_func_intercepts,
-            'box_m_test': box_m_test
+        cov_matrices = []
+        for i in range(n_groups):
+            cov_matrices.append(np.cov(X[y == i].T))
+
+        pooled_cov = np.zeros_like(cov_matrices[0])
+        ns = [np.sum(y == i) for i in range(n_groups)]
+        for i, cov in enumerate(cov_matrices):
+            pooled_cov += (ns[i] - 1) * cov
+        pooled_cov /= (n - n_groups)
+
+        M = 0
+        for i, cov in enumerate(cov_matrices):
+            if ns[i] > 1:
+                det_ratio = np.linalg.det(cov) / np.linalg.det(pooled_cov)
+                if det_ratio > 0:
+                    M += (ns[i] - 1) * np.log(det_ratio)
+
+        box_df = (n_groups - 1) * p * (p + 1) / 2
+        box_p = 1 - stats.chi2.cdf(abs(M), box_df) if box_df > 0 else 1
+
+        box_m_test = {
+            'statistic': float(abs(M)),
+            'df': float(box_df),
+            'p_value': float(box_p),
+            'homogeneous': box_p > 0.05
         }
-        
-        # Generate interpretation
-        interpretation = _generate_interpretation(
-            results=results,
-            group_var=group_var,
-            n_obs=len(df_clean),
-            n_predictors=len(predictor_vars)
-        )
-        results['interpretation'] = interpretation
-        
-        # Create visualization
-        fig, axes = plt.subplots(2, 2, figsize=(14, 12))
-        
-        # 1. Scatter plot of first two discriminant functions
-        ax1 = axes[0, 0]
-        colors = plt.cm.Set1(np.linspace(0, 1, n_groups))
-        for i, gname in enumerate(group_names):
-            mask = y == i
-            if n_components >= 2:
-                ax1.scatter(X_lda[mask, 0], X_lda[mask, 1], c=[colors[i]], label=str(gname), alpha=0.6, s=50)
-            else:
-                ax1.scatter(X_lda[mask, 0], np.zeros(np.sum(mask)), c=[colors[i]], label=str(gname), alpha=0.6, s=50)
-        
-        ax1.set_xlabel('LD1', fontsize=12)
-        ax1.set_ylabel('LD2' if n_components >= 2 else '', fontsize=12)
-        ax1.set_title('Discriminant Function Scores', fontsize=14, fontweight='bold')
-        ax1.legend()
-        
-        # 2. Group centroids
-        ax2 = axes[0, 1]
-        centroid_df = pd.DataFrame(centroids, columns=[f'LD{i+1}' for i in range(n_components)], index=group_names)
-        centroid_df.plot(kind='bar', ax=ax2, colormap='Set2')
-        ax2.set_title('Group Centroids', fontsize=14, fontweight='bold')
-        ax2.set_xlabel('Group', fontsize=12)
-        ax2.set_ylabel('Centroid Value', fontsize=12)
-        ax2.tick_params(axis='x', rotation=45)
-        ax2.legend(title='Function')
-        
-        # 3. Confusion matrix
-        ax3 = axes[1, 0]
-        sns.heatmap(conf_matrix, annot=True, fmt='d', cmap='Blues', ax=ax3,
-                    xticklabels=group_names, yticklabels=group_names)
-        ax3.set_title('Confusion Matrix', fontsize=14, fontweight='bold')
-        ax3.set_xlabel('Predicted', fontsize=12)
-        ax3.set_ylabel('Actual', fontsize=12)
-        
-        # 4. Structure matrix heatmap
-        ax4 = axes[1, 1]
-        struct_df = pd.DataFrame(structure_matrix, 
-                                  index=predictor_vars, 
-                                  columns=[f'LD{i+1}' for i in range(n_components)])
-        sns.heatmap(struct_df, annot=True, fmt='.3f', cmap='RdBu_r', center=0, ax=ax4)
-        ax4.set_title('Structure Matrix (Loadings)', fontsize=14, fontweight='bold')
-        
-        plt.tight_layout()
-        plot_image = fig_to_base64(fig)
-        
-        response = {
-            'results': clean_json(results),
-            'plots': {
-                'lda_analysis': plot_image
-            }
+    except:
+        box_m_test = {'statistic': None, 'df': None, 'p_value': None, 'homogeneous': None}
+
+    results = {
+        'meta': {
+            'groups': [str(g) for g in group_names],
+            'n_components': n_components,
+            'predictor_vars': predictor_vars
+        },
+        'classification_metrics': {
+            'accuracy': accuracy,
+            'precision': precision,
+            'recall': recall,
+            'f1_score': f1,
+            'confusion_matrix': conf_matrix.tolist(),
+            'true_labels': y.tolist(),
+            'predicted_labels': y_pred.tolist()
+        },
+        'eigenvalues': lda.explained_variance_ratio_.tolist(),
+        'eigenvalue_details': eigenvalue_details,
+        'canonical_correlations': canonical_corrs,
+        'wilks_lambda': {
+            'lambda': wilks_lambda,
+            'F': f_stat,
+            'df1': df1,
+            'df2': df2,
+            'p_value': p_value
+        },
+        'standardized_coeffs': std_coeffs,
+        'structure_matrix': structure_matrix,
+        'group_centroids': centroids,
+        'lda_transformed_data': X_lda.tolist(),
+        'true_labels_full': y.tolist(),
+        'group_stats': group_stats,
+        'priors': priors,
+        'classification_function_coeffs': class_func_coeffs,
+        'classification_function_intercepts': class_func_intercepts,
+        'box_m_test': box_m_test
+    }
+
+    # Generate interpretation
+    interpretation = _generate_interpretation(
+        results=results,
+        group_var=group_var,
+        n_obs=len(df_clean),
+        n_predictors=len(predictor_vars)
+    )
+    results['interpretation'] = interpretation
+
+    # Create visualization
+    fig, axes = plt.subplots(2, 2, figsize=(14, 12))
+
+    # 1. Scatter plot of first two discriminant functions
+    ax1 = axes[0, 0]
+    colors = plt.cm.Set1(np.linspace(0, 1, n_groups))
+    for i, gname in enumerate(group_names):
+        mask = y == i
+        if n_components >= 2:
+            ax1.scatter(X_lda[mask, 0], X_lda[mask, 1], c=[colors[i]], label=str(gname), alpha=0.6, s=50)
+        else:
+            ax1.scatter(X_lda[mask, 0], np.zeros(np.sum(mask)), c=[colors[i]], label=str(gname), alpha=0.6, s=50)
+
+    ax1.set_xlabel('LD1', fontsize=12)
+    ax1.set_ylabel('LD2' if n_components >= 2 else '', fontsize=12)
+    ax1.set_title('Discriminant Function Scores', fontsize=14, fontweight='bold')
+    ax1.legend()
+
+    # 2. Group centroids
+    ax2 = axes[0, 1]
+    centroid_df = pd.DataFrame(centroids, columns=[f'LD{i+1}' for i in range(n_components)], index=group_names)
+    centroid_df.plot(kind='bar', ax=ax2, colormap='Set2')
+    ax2.set_title('Group Centroids', fontsize=14, fontweight='bold')
+    ax2.set_xlabel('Group', fontsize=12)
+    ax2.set_ylabel('Centroid Value', fontsize=12)
+    ax2.tick_params(axis='x', rotation=45)
+    ax2.legend(title='Function')
+
+    # 3. Confusion matrix
+    ax3 = axes[1, 0]
+    sns.heatmap(conf_matrix, annot=True, fmt='d', cmap='Blues', ax=ax3,
+                xticklabels=group_names, yticklabels=group_names)
+    ax3.set_title('Confusion Matrix', fontsize=14, fontweight='bold')
+    ax3.set_xlabel('Predicted', fontsize=12)
+    ax3.set_ylabel('Actual', fontsize=12)
+
+    # 4. Structure matrix heatmap
+    ax4 = axes[1, 1]
+    struct_df = pd.DataFrame(structure_matrix, 
+                              index=predictor_vars, 
+                              columns=[f'LD{i+1}' for i in range(n_components)])
+    sns.heatmap(struct_df, annot=True, fmt='.3f', cmap='RdBu_r', center=0, ax=ax4)
+    ax4.set_title('Structure Matrix (Loadings)', fontsize=14, fontweight='bold')
+
+    plt.tight_layout()
+    plot_image = fig_to_base64(fig)
+
+    response = {
+        'results': clean_json(results),
+        'plots': {
+            'lda_analysis': plot_image
         }
-        
+    }
+    return response
+
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_discriminant_analysis(payload)
         print(json.dumps(response))
 
     except Exception as e:
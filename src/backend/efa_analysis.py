@@ -1,22 +1,54 @@
 import sys
 import json
 import numpy as np
-import pandas as pd
-from sklearn.decomposition import FactorAnalysis, PCA
-from sklearn.preprocessing import StandardScaler
 import matplotlib.pyplot as plt
 import seaborn as sns
 import io
 import base64
 from scipy.stats import chi2
-from scipy.linalg import inv
+from scipy.linalg import cho_factor, cho_solve, eigh
 import warnings
+from dataset_io import load_frame, has_data
 
 warnings.filterwarnings('ignore')
 
+# Parallel analysis and the ML fit use fixed seeds, so a payload always
+# gives the same result; main.py may serve it from the result cache.
+CACHEABLE = True
+
 sns.set_theme(style="darkgrid")
 sns.set_context("notebook", font_scale=1.1)
 
+# EM settings of the maximum-likelihood extraction (same as sklearn's FactorAnalysis).
+FA_MAX_ITER = 1000
+FA_TOL = 1e-2
+SMALL = 1e-12
+
+# From this many items the EM loop tracks only the leading eigenvectors with
+# subspace iteration warm-started from the previous step, instead of a full
+# eigendecomposition per step.
+SUBSPACE_MIN_ITEMS = 200
+SUBSPACE_OVERSAMPLE = 10
+SUBSPACE_INITIAL_STEPS = 8
+SUBSPACE_STEPS = 2
+
+ROTATIONS = ['varimax', 'quartimax', 'promax', 'oblimin']
+PROMAX_POWER = 4
+
+# Parallel analysis: random correlation matrices are simulated in batches of
+# at most PARALLEL_BATCH_ELEMENTS floats, and the number of iterations is cut
+# (down to PARALLEL_MIN_ITERATIONS) so iterations * p^3 stays under
+# PARALLEL_MAX_WORK.
+PARALLEL_ITERATIONS = 100
+PARALLEL_MIN_ITERATIONS = 20
+PARALLEL_PERCENTILE = 95
+PARALLEL_BATCH_ELEMENTS = 20_000_000
+PARALLEL_MAX_WORK = 2e10
+
+# Scree bars and item labels drawn at most.
+PLOT_MAX_EIGENVALUES = 50
+PLOT_MAX_LABELS = 100
+
 
 def _to_native_type(obj):
     if isinstance(obj, np.integer):
@@ -39,38 +71,253 @@ def _interpret_kmo(kmo):
     if kmo >= 0.5: return 'Poor'
     return 'Unacceptable'
 
-def _calculate_kmo(X):
-    try:
-        corr_matrix = np.corrcoef(X, rowvar=False)
-        inv_corr = inv(corr_matrix)
-        partial_corr = -inv_corr / np.sqrt(np.outer(np.diag(inv_corr), np.diag(inv_corr)))
-        np.fill_diagonal(partial_corr, 0)
 
-        sum_r2 = np.sum(np.triu(corr_matrix, 1)**2)
-        sum_a2 = np.sum(np.triu(partial_corr, 1)**2)
+def correlation_matrix(X):
+    """Pearson correlation of the columns of X, computed once and shared by every step."""
+    X = np.asarray(X, dtype=float)
+    Z = X - X.mean(axis=0)
+    std = Z.std(axis=0)
+    Z /= std
+    R = (Z.T @ Z) / len(Z)
+    R = (R + R.T) / 2
+    np.fill_diagonal(R, 1.0)
+    return R
 
-        if sum_r2 + sum_a2 == 0:
-            return 0.0
 
-        return sum_r2 / (sum_r2 + sum_a2)
+def _inverse_and_logdet(R):
+    """R^-1 and log|R| from one Cholesky factorization (slogdet/inv when R is not positive definite)."""
+    try:
+        factor = cho_factor(R, lower=True)
+        logdet = 2 * np.sum(np.log(np.diag(factor[0])))
+        return cho_solve(factor, np.eye(len(R))), logdet
+    except (np.linalg.LinAlgError, ValueError):
+        pass
+    sign, logdet = np.linalg.slogdet(R)
+    try:
+        inv_R = np.linalg.inv(R)
     except np.linalg.LinAlgError:
-        return 0.0
+        inv_R = None
+    return inv_R, (logdet if sign > 0 else None)
+
+
+def adequacy_statistics(R, n):
+    """
+    KMO (overall and per-item MSA) and Bartlett's test of sphericity.
+
+    Partial correlations come from the Cholesky inverse of R and the
+    determinant is taken as a log, so 1000+ items neither overflow nor
+    underflow.
+    """
+    p = len(R)
+    inv_R, logdet = _inverse_and_logdet(R)
+
+    kmo, msa = 0.0, np.zeros(p)
+    if inv_R is not None:
+        scale = 1 / np.sqrt(np.diag(inv_R))
+        partial = -inv_R * np.outer(scale, scale)
+        np.fill_diagonal(partial, 0)
+        off_diagonal = R.copy()
+        np.fill_diagonal(off_diagonal, 0)
+
+        r2 = np.sum(off_diagonal ** 2, axis=0)
+        a2 = np.sum(partial ** 2, axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            msa = np.where(r2 + a2 > 0, r2 / (r2 + a2), 0.0)
+        if r2.sum() + a2.sum() > 0:
+            kmo = float(r2.sum() / (r2.sum() + a2.sum()))
+
+    bartlett_stat, bartlett_p, bartlett_significant = None, None, False
+    if p >= 2 and logdet is not None:
+        bartlett_stat = float(-(n - 1 - (2 * p + 5) / 6) * logdet)
+        bartlett_p = float(chi2.sf(bartlett_stat, p * (p - 1) // 2))
+        bartlett_significant = bartlett_p < 0.05
+
+    return {
+        'kmo': kmo,
+        'msa': msa,
+        'bartlett_statistic': bartlett_stat,
+        'bartlett_p_value': bartlett_p,
+        'bartlett_significant': bartlett_significant,
+    }
+
+
+def _random_correlations(rng, size, n, p):
+    """size correlation matrices of n independent standard normal observations of p variables."""
+    if n - 1 >= p:
+        # Bartlett decomposition: the centred cross-product matrix is Wishart(n - 1, I),
+        # so it is drawn in O(p^2) random numbers instead of n * p.
+        A = np.tril(rng.standard_normal((size, p, p)), -1)
+        diagonal = np.sqrt(rng.chisquare(n - 1 - np.arange(p), size=(size, p)))
+        A[:, np.arange(p), np.arange(p)] = diagonal
+        W = np.matmul(A, A.transpose(0, 2, 1))
+    else:
+        Z = rng.standard_normal((size, n, p))
+        Z -= Z.mean(axis=1, keepdims=True)
+        W = np.matmul(Z.transpose(0, 2, 1), Z)
+    scale = 1 / np.sqrt(np.einsum('bii->bi', W))
+    return W * scale[:, :, None] * scale[:, None, :]
 
-def _bartlett_sphericity(X):
-    n, p = X.shape
-    if p < 2: return None, None, False
-    try:
-        corr_matrix = np.corrcoef(X, rowvar=False)
-        det_corr = np.linalg.det(corr_matrix)
-        
-        if det_corr <= 0: return None, None, False
 
-        statistic = - (n - 1 - (2 * p + 5) / 6) * np.log(det_corr)
-        dof = p * (p - 1) // 2
-        p_value = chi2.sf(statistic, dof)
-        return statistic, p_value, p_value < 0.05
-    except Exception:
-        return None, None, False
+def parallel_analysis(eigenvalues, n, iterations=PARALLEL_ITERATIONS,
+                      percentile=PARALLEL_PERCENTILE, random_state=42):
+    """
+    Horn's parallel analysis: retain the leading factors whose eigenvalue
+    beats the given percentile of eigenvalues from random data of the same
+    shape. Random matrices are simulated and decomposed in batches.
+    """
+    eigenvalues = np.asarray(eigenvalues, dtype=float)
+    p = len(eigenvalues)
+    iterations = int(min(iterations, max(PARALLEL_MIN_ITERATIONS, PARALLEL_MAX_WORK // p ** 3)))
+    rng = np.random.default_rng(random_state)
+
+    per_matrix = p * p * (1 if n - 1 >= p else max(1, n // p + 1))
+    batch = max(1, min(iterations, PARALLEL_BATCH_ELEMENTS // per_matrix))
+    simulated = np.empty((iterations, p))
+    for start in range(0, iterations, batch):
+        size = min(batch, iterations - start)
+        simulated[start:start + size] = np.linalg.eigvalsh(_random_correlations(rng, size, n, p))[:, ::-1]
+
+    threshold = np.percentile(simulated, percentile, axis=0)
+    above = eigenvalues > threshold
+    suggested = int(np.argmin(above)) if not above.all() else p
+
+    return {
+        'iterations': iterations,
+        'percentile': percentile,
+        'random_mean': simulated.mean(axis=0),
+        'random_threshold': threshold,
+        'suggested_factors': suggested,
+    }
+
+
+def _leading_eigenpairs(M, k, basis, rng):
+    """Top-k eigenvalues/vectors of symmetric M (descending) and the basis to warm-start the next call."""
+    p = len(M)
+    if p < SUBSPACE_MIN_ITEMS:
+        values, vectors = eigh(M, subset_by_index=[p - k, p - 1])
+        return values[::-1], vectors[:, ::-1], None
+
+    steps = SUBSPACE_STEPS
+    if basis is None:
+        basis = rng.standard_normal((p, min(p, k + SUBSPACE_OVERSAMPLE)))
+        steps = SUBSPACE_INITIAL_STEPS
+    for _ in range(steps):
+        basis, _ = np.linalg.qr(M @ basis)
+    values, vectors = np.linalg.eigh(basis.T @ M @ basis)
+    basis = basis @ vectors[:, ::-1]
+    return values[::-1][:k], basis[:, :k], basis
+
+
+def factor_analysis_ml(R, n, n_factors, max_iter=FA_MAX_ITER, tol=FA_TOL, random_state=42):
+    """
+    Maximum-likelihood factor analysis of a correlation matrix.
+
+    Runs the EM algorithm of sklearn's FactorAnalysis on standardized data,
+    but each step decomposes the p x p matrix Psi^-1/2 R Psi^-1/2 rather
+    than taking an SVD of the n x p data. Returns the p x k loadings.
+    """
+    p = len(R)
+    rng = np.random.default_rng(random_state)
+    variances = np.diag(R).copy()
+    psi = np.ones(p)
+    llconst = p * np.log(2 * np.pi) + n_factors
+    old_ll = -np.inf
+    basis = None
+
+    for _ in range(max_iter):
+        sqrt_psi = np.sqrt(psi) + SMALL
+        M = R / np.outer(sqrt_psi, sqrt_psi)
+        s, V, basis = _leading_eigenpairs(M, n_factors, basis, rng)
+        unexplained = np.trace(M) - np.sum(s)
+        W = (np.sqrt(np.maximum(s - 1.0, 0.0))[:, np.newaxis] * V.T) * sqrt_psi
+
+        ll = -n / 2 * (llconst + np.sum(np.log(s)) + unexplained + np.sum(np.log(psi)))
+        if ll - old_ll < tol:
+            break
+        old_ll = ll
+        psi = np.maximum(variances - np.sum(W ** 2, axis=0), SMALL)
+
+    return W.T
+
+
+def _ortho_rotation(loadings, method='varimax', tol=1e-6, max_iter=100):
+    """Varimax / quartimax rotation (same iteration as sklearn)."""
+    nrow, ncol = loadings.shape
+    rotation_matrix = np.eye(ncol)
+    var = 0
+    for _ in range(max_iter):
+        rotated = loadings @ rotation_matrix
+        tmp = rotated * ((rotated ** 2).sum(axis=0) / nrow) if method == 'varimax' else 0
+        u, s, v = np.linalg.svd(loadings.T @ (rotated ** 3 - tmp))
+        rotation_matrix = u @ v
+        var_new = np.sum(s)
+        if var != 0 and var_new < var * (1 + tol):
+            break
+        var = var_new
+    return loadings @ rotation_matrix
+
+
+def _promax(loadings, power=PROMAX_POWER):
+    """Promax: varimax, then an oblique fit to the loadings raised to `power`."""
+    rotated = _ortho_rotation(loadings, 'varimax')
+    target = rotated * np.abs(rotated) ** (power - 1)
+    U = np.linalg.lstsq(rotated, target, rcond=None)[0]
+    U = U * np.sqrt(np.diag(np.linalg.inv(U.T @ U)))
+    return rotated @ U, np.linalg.inv(U.T @ U)
+
+
+def _oblimin_criterion(L, gamma):
+    L2 = L ** 2
+    X = L2 @ (1 - np.eye(L.shape[1]))
+    if gamma:
+        X = X - gamma * X.mean(axis=0)
+    return np.sum(L2 * X) / 4, L * X
+
+
+def _oblimin(loadings, gamma=0.0, tol=1e-5, max_iter=1000):
+    """Direct oblimin (quartimin for gamma=0) by gradient projection."""
+    T = np.eye(loadings.shape[1])
+    L = loadings
+    f, Gq = _oblimin_criterion(L, gamma)
+    G = -(L.T @ Gq @ np.linalg.inv(T)).T
+    step = 1.0
+    for _ in range(max_iter):
+        Gp = G - T * np.sum(T * G, axis=0)
+        s = np.linalg.norm(Gp)
+        if s < tol:
+            break
+        step *= 2
+        for _ in range(11):
+            X = T - step * Gp
+            T_new = X / np.sqrt(np.sum(X ** 2, axis=0))
+            T_inv = np.linalg.inv(T_new)
+            L = loadings @ T_inv.T
+            f_new, Gq = _oblimin_criterion(L, gamma)
+            if f - f_new > 0.5 * s ** 2 * step:
+                break
+            step /= 2
+        T, f = T_new, f_new
+        G = -(L.T @ Gq @ T_inv).T
+    return L, T.T @ T
+
+
+def rotate_loadings(loadings, rotation):
+    """Rotated loadings and factor correlations (None for orthogonal rotations)."""
+    if rotation in ('varimax', 'quartimax'):
+        rotated, phi = _ortho_rotation(loadings, rotation), None
+    elif rotation == 'promax':
+        rotated, phi = _promax(loadings)
+    elif rotation == 'oblimin':
+        rotated, phi = _oblimin(loadings)
+    else:
+        return loadings, None
+
+    # Orient every factor so its loadings sum to a positive value.
+    signs = np.where(rotated.sum(axis=0) < 0, -1.0, 1.0)
+    rotated = rotated * signs
+    if phi is not None:
+        phi = phi * np.outer(signs, signs)
+    return rotated, phi
 
 
 def _generate_interpretation(results):
@@ -91,7 +338,7 @@ def _generate_interpretation(results):
     bartlett_p = adequacy.get('bartlett_p_value')
     bartlett_stat = adequacy.get('bartlett_statistic')
     
-    total_variance = variance_explained['cumulative'][-1] if variance_explained['cumulative'] else 0
+    total_variance = variance_explained['cumulative'][-1] if len(variance_explained['cumulative']) else 0
     avg_communality = np.mean(communalities) if len(communalities) > 0 else 0
     
     # --- Overall Assessment ---
@@ -127,6 +374,15 @@ def _generate_interpretation(results):
     interpretation_parts.append(
         f"→ **{n_factors} factor(s)** extracted, explaining **{total_variance:.1f}%** of total variance."
     )
+
+    parallel = results.get('parallel_analysis')
+    if parallel:
+        suggested = parallel['suggested_factors']
+        interpretation_parts.append(
+            f"→ Parallel analysis ({parallel['iterations']} random datasets, {parallel['percentile']}th percentile) "
+            f"suggests retaining **{suggested} factor(s)**"
+            + (" (matches the extracted solution)." if suggested == n_factors else ".")
+        )
     
     # --- Statistical Insights ---
     interpretation_parts.append("")
@@ -203,6 +459,14 @@ def _generate_interpretation(results):
     interpretation_parts.append("")
     interpretation_parts.append("**Recommendations**")
     
+    item_msa = adequacy.get('item_msa', [])
+    low_msa_items = [results['variables'][i] for i, value in enumerate(item_msa) if value < 0.5]
+    if low_msa_items:
+        interpretation_parts.append(
+            f"→ {len(low_msa_items)} item(s) have individual MSA < .50 "
+            f"({', '.join(low_msa_items[:5])}{'...' if len(low_msa_items) > 5 else ''}); consider removing them first."
+        )
+
     if kmo < 0.6:
         interpretation_parts.append(
             "→ Low KMO suggests: (1) increase sample size, (2) remove items with low correlations, "
@@ -246,10 +510,11 @@ def _generate_interpretation(results):
     return "\n".join(interpretation_parts)
 
 
-def plot_efa_results(eigenvalues, loadings, variables):
+def plot_efa_results(eigenvalues, loadings, variables, random_threshold=None):
     fig, axes = plt.subplots(1, 2, figsize=(15, 6))
     fig.suptitle('Exploratory Factor Analysis Results', fontsize=16, fontweight='bold')
 
+    eigenvalues = np.asarray(eigenvalues)[:PLOT_MAX_EIGENVALUES]
     n_comps = len(eigenvalues)
     ax = axes[0]
     
@@ -258,10 +523,14 @@ def plot_efa_results(eigenvalues, loadings, variables):
     ax.bar(range(1, n_comps + 1), eigenvalues, alpha=0.7, align='center', 
            color=colors, edgecolor='black', label='Eigenvalues')
     ax.axhline(y=1, color='red', linestyle='--', alpha=0.7, label='Eigenvalue = 1 (Kaiser rule)')
+    if random_threshold is not None:
+        ax.plot(range(1, n_comps + 1), np.asarray(random_threshold)[:n_comps], color='orange',
+                marker='o', markersize=3, label='Parallel analysis')
     ax.set_xlabel('Factors', fontsize=12)
     ax.set_ylabel('Eigenvalues', fontsize=12)
     ax.set_title('Scree Plot', fontsize=12, fontweight='bold')
-    ax.set_xticks(range(1, n_comps + 1))
+    if n_comps <= 30:
+        ax.set_xticks(range(1, n_comps + 1))
     ax.legend()
     ax.grid(True, alpha=0.3)
 
@@ -274,10 +543,11 @@ def plot_efa_results(eigenvalues, loadings, variables):
         ax.set_ylabel('Factor 2 Loadings', fontsize=12)
         ax.set_title('Factor Loadings (F1 vs F2)', fontsize=12, fontweight='bold')
         ax.grid(True, alpha=0.3)
-        for i, var in enumerate(variables):
-            ax.annotate(var, (loadings[i, 0], loadings[i, 1]), 
-                       textcoords="offset points", xytext=(0,5), 
-                       ha='center', fontsize=9)
+        if len(variables) <= PLOT_MAX_LABELS:
+            for i, var in enumerate(variables):
+                ax.annotate(var, (loadings[i, 0], loadings[i, 1]), 
+                           textcoords="offset points", xytext=(0,5), 
+                           ha='center', fontsize=9)
     else:
         ax.text(0.5, 0.5, 'Not enough factors to plot.', 
                ha='center', va='center', fontsize=12)
@@ -292,94 +562,118 @@ def plot_efa_results(eigenvalues, loadings, variables):
     return f"data:image/png;base64,{base64.b64encode(buf.read()).decode('utf-8')}"
 
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        
-        data = payload.get('data')
-        items = payload.get('items')
-        n_factors = payload.get('nFactors')
-        rotation = payload.get('rotation', 'varimax')
-        method = payload.get('method', 'principal')
+def run_efa_analysis(payload):
+    items = payload.get('items')
+    n_factors = payload.get('nFactors')
+    rotation = payload.get('rotation', 'varimax')
+    method = payload.get('method', 'principal')
+    run_parallel = payload.get('parallelAnalysis', True)
+    parallel_iterations = int(payload.get('parallelIterations', PARALLEL_ITERATIONS))
 
-        if not all([data, items, n_factors]):
-            raise ValueError("Missing 'data', 'items', or 'nFactors'")
+    if not all([has_data(payload), items, n_factors]):
+        raise ValueError("Missing 'data', 'items', or 'nFactors'")
 
-        df = pd.DataFrame(data)
-        
-        df_items = df[items].copy().dropna()
-        
-        if df_items.shape[0] < df_items.shape[1]:
-            raise ValueError("The number of observations must be greater than the number of variables.")
+    df = load_frame(payload)
 
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(df_items)
+    df_items = df[items].copy().dropna()
 
-        kmo_overall = _calculate_kmo(X_scaled)
-        kmo_interpretation = _interpret_kmo(kmo_overall)
-        
-        bartlett_stat, bartlett_p, bartlett_significant = _bartlett_sphericity(X_scaled)
-
-        if method == 'pca':
-            model = PCA(n_components=n_factors, random_state=42) if n_factors else PCA(random_state=42)
-            model.fit(X_scaled)
-            loadings = model.components_.T * np.sqrt(model.explained_variance_)
-            eigenvalues_full = model.explained_variance_
-            variance_explained = model.explained_variance_ratio_ * 100
-        else:
-            fa_rotation = rotation if rotation in ['varimax', 'quartimax', 'promax', 'oblimin'] and rotation != 'none' else None
-            model = FactorAnalysis(n_components=n_factors, rotation=fa_rotation, random_state=42)
-            model.fit(X_scaled)
-            loadings = model.components_.T
-            
-            corr_matrix = np.corrcoef(X_scaled, rowvar=False)
-            eigenvalues_full, _ = np.linalg.eigh(corr_matrix)
-            eigenvalues_full = sorted(eigenvalues_full, reverse=True)
-            
-            ss_loadings_sklearn = np.sum(loadings**2, axis=0)
-            variance_explained = (ss_loadings_sklearn / len(items)) * 100
+    if df_items.shape[0] < df_items.shape[1]:
+        raise ValueError("The number of observations must be greater than the number of variables.")
+    if n_factors > len(items):
+        raise ValueError("'nFactors' cannot exceed the number of items.")
+
+    X = df_items.to_numpy(dtype=float)
+    constant = [item for item, std in zip(items, X.std(axis=0)) if std == 0]
+    if constant:
+        raise ValueError(f"Items with zero variance: {', '.join(constant)}")
+
+    # The correlation matrix is computed once and shared by the adequacy tests,
+    # factor extraction and parallel analysis.
+    n = X.shape[0]
+    R = correlation_matrix(X)
+    eigenvalues_all, eigenvectors = np.linalg.eigh(R)
+    eigenvalues_all, eigenvectors = eigenvalues_all[::-1], eigenvectors[:, ::-1]
+
+    adequacy = adequacy_statistics(R, n)
+    kmo_overall = adequacy['kmo']
+    kmo_interpretation = _interpret_kmo(kmo_overall)
+
+    parallel = None
+    if run_parallel:
+        parallel = parallel_analysis(eigenvalues_all, n, iterations=parallel_iterations)
 
+    factor_correlations = None
+    if method == 'pca':
+        # Principal components of the standardized data (sample variance, ddof=1).
+        eigenvalues_full = eigenvalues_all[:n_factors] * n / (n - 1)
+        components = eigenvectors[:, :n_factors]
+        components = components * np.where(components[np.abs(components).argmax(axis=0), np.arange(n_factors)] < 0, -1.0, 1.0)
+        loadings = components * np.sqrt(eigenvalues_full)
+        variance_explained = eigenvalues_all[:n_factors] / eigenvalues_all.sum() * 100
         communalities = np.sum(loadings**2, axis=1)
-        
-        cumulative_variance = np.cumsum(variance_explained)
-
-        interpretation_data = {}
-        for i in range(n_factors):
-            factor_loadings = loadings[:, i]
-            high_loadings_indices = np.where(np.abs(factor_loadings) >= 0.4)[0]
-            
-            interpretation_data[f'Factor {i+1}'] = {
-                'variables': [items[j] for j in high_loadings_indices],
-                'loadings': [factor_loadings[j] for j in high_loadings_indices]
-            }
-        
-        plot_image = plot_efa_results(eigenvalues_full[:len(items)], loadings, items)
-
-        response = {
-            "adequacy": {
-                "kmo": kmo_overall,
-                "kmo_interpretation": kmo_interpretation,
-                "bartlett_statistic": bartlett_stat,
-                "bartlett_p_value": bartlett_p,
-                "bartlett_significant": bartlett_significant
-            },
-            "eigenvalues": eigenvalues_full,
-            "factor_loadings": loadings,
-            "variance_explained": {
-                "per_factor": variance_explained,
-                "cumulative": cumulative_variance
-            },
-            "communalities": communalities,
-            "interpretation": interpretation_data,
-            "variables": items,
-            "n_factors": n_factors,
-            "plot": plot_image
+    else:
+        unrotated = factor_analysis_ml(R, n, n_factors)
+        # Communalities do not depend on the rotation.
+        communalities = np.sum(unrotated**2, axis=1)
+        loadings, factor_correlations = rotate_loadings(unrotated, rotation if rotation in ROTATIONS else None)
+        eigenvalues_full = eigenvalues_all
+
+        ss_loadings = np.sum(loadings**2, axis=0)
+        variance_explained = (ss_loadings / len(items)) * 100
+
+    cumulative_variance = np.cumsum(variance_explained)
+
+    interpretation_data = {}
+    for i in range(n_factors):
+        factor_loadings = loadings[:, i]
+        high_loadings_indices = np.where(np.abs(factor_loadings) >= 0.4)[0]
+
+        interpretation_data[f'Factor {i+1}'] = {
+            'variables': [items[j] for j in high_loadings_indices],
+            'loadings': [factor_loadings[j] for j in high_loadings_indices]
         }
-        
-        response['full_interpretation'] = _generate_interpretation(response)
-        
-        cleaned_response = json.loads(json.dumps(response, default=_to_native_type))
-        print(json.dumps(cleaned_response))
+
+    plot_image = plot_efa_results(
+        eigenvalues_full[:len(items)], loadings, items,
+        parallel['random_threshold'] if parallel and method != 'pca' else None
+    )
+
+    response = {
+        "adequacy": {
+            "kmo": kmo_overall,
+            "kmo_interpretation": kmo_interpretation,
+            "item_msa": adequacy['msa'],
+            "bartlett_statistic": adequacy['bartlett_statistic'],
+            "bartlett_p_value": adequacy['bartlett_p_value'],
+            "bartlett_significant": adequacy['bartlett_significant']
+        },
+        "eigenvalues": eigenvalues_full,
+        "factor_loadings": loadings,
+        "variance_explained": {
+            "per_factor": variance_explained,
+            "cumulative": cumulative_variance
+        },
+        "communalities": communalities,
+        "interpretation": interpretation_data,
+        "variables": items,
+        "n_factors": n_factors,
+        "rotation": rotation if method != 'pca' and rotation in ROTATIONS else 'none',
+        "factor_correlations": factor_correlations,
+        "parallel_analysis": parallel,
+        "plot": plot_image
+    }
+
+    response['full_interpretation'] = _generate_interpretation(response)
+
+    cleaned_response = json.loads(json.dumps(response, default=_to_native_type))
+    return cleaned_response
+
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_efa_analysis(payload)
+        print(json.dumps(response))
 
     except Exception as e:
         print(json.dumps({"error": str(e)}), file=sys.stderr)
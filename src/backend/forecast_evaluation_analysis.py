@@ -1,15 +1,43 @@
 
 import sys
 import json
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
 import pandas as pd
 import numpy as np
-from statsmodels.tsa.api import SimpleExpSmoothing, Holt, ExponentialSmoothing
+from statsmodels.tsa.exponential_smoothing.ets import ETSModel
 from statsmodels.tsa.statespace.sarimax import SARIMAX
 from sklearn.metrics import mean_squared_error, mean_absolute_error
 import warnings
 
+from parallelism import nested_jobs
+
 warnings.filterwarnings('ignore')
 
+# Tournament entrants, in report order. Naive Seasonal needs no fitting.
+MODELS = ['SARIMA', 'ETS(A,Ad,A)', 'Simple Exp Smoothing', "Holt's Linear", 'Naive Seasonal']
+
+# MASE is scaled by the seasonal naive forecast for these models, by the
+# one-step naive forecast for the rest.
+SEASONAL_MASE_MODELS = {'SARIMA', 'Naive Seasonal'}
+
+DEFAULT_HORIZON = 12
+DEFAULT_SEASONAL_PERIOD = 12
+MIN_SERIES_LENGTH = 24
+
+# Seconds one model may spend on one series across all its folds. By default
+# evaluate_model only stops between folds once the budget is spent. When the
+# request sets modelTimeout explicitly the fits run on the tournament pool and
+# an overrunning model is reported as timed out (its worker is killed).
+DEFAULT_MODEL_TIMEOUT = 60
+
+# Model x series x fold fits from which the tournament runs on a process pool.
+PARALLEL_MIN_FITS = 8
+
+_tournament_pool = None
+_tournament_pool_size = 0
+
 def _to_native_type(obj):
     if isinstance(obj, np.integer):
         return int(obj)
@@ -40,90 +68,343 @@ def mean_absolute_scaled_error(y_true, y_pred, y_train, seasonality=1):
     return mae_pred / mae_naive
 
 
-def fit_and_evaluate(model_name, model_func, train, test):
-    try:
-        model_fit = model_func(train).fit(disp=False)
-        forecast_result = model_fit.get_forecast(steps=len(test))
-        forecast = forecast_result.predicted_mean
-        
-        conf_int = forecast_result.conf_int()
-        
-        rmse = np.sqrt(mean_squared_error(test, forecast))
-        mae = mean_absolute_error(test, forecast)
-        mape = mean_absolute_percentage_error(test, forecast)
-        
-        # Using a default seasonality of 1 for MASE for non-seasonal models
-        seasonality = 12 if 'SARIMA' in model_name or 'Holt-Winters' in model_name else 1
-        mase = mean_absolute_scaled_error(test, forecast, train, seasonality=seasonality)
-
-        coverage = np.mean((test >= conf_int.iloc[:, 0]) & (test <= conf_int.iloc[:, 1])) * 100
-
-        return {
-            "Method": model_name,
-            "RMSE": _to_native_type(rmse),
-            "MAE": _to_native_type(mae),
-            "MAPE (%)": _to_native_type(mape),
-            "MASE": _to_native_type(mase),
-            "Coverage (95% PI)": _to_native_type(coverage)
-        }
-    except Exception as e:
-        return {
-            "Method": model_name,
-            "RMSE": None, "MAE": None, "MAPE (%)": None, "MASE": None, "Coverage (95% PI)": None,
-            "error": str(e)
-        }
+def build_model(name, train, period):
+    if name == 'SARIMA':
+        return SARIMAX(train.to_numpy(), order=(1, 1, 1), seasonal_order=(1, 1, 1, period),
+                       enforce_stationarity=False, enforce_invertibility=False)
+    if name == 'ETS(A,Ad,A)':
+        return ETSModel(train, error='add', trend='add', damped_trend=True, seasonal='add', seasonal_periods=period)
+    if name == 'Simple Exp Smoothing':
+        return ETSModel(train, error='add')
+    if name == "Holt's Linear":
+        return ETSModel(train, error='add', trend='add')
+    raise ValueError(f"Unknown model: {name}")
 
-def main():
+
+def forecast_model(name, train, steps, period, start_params=None):
+    """
+    Fit one model and forecast `steps` ahead.
+
+    Returns (forecast, 95% interval or None, fitted params). start_params
+    warm-starts the optimizer from a previous fold's estimates; if that
+    fails the model is refitted from its default start.
+    """
+    if name == 'Naive Seasonal':
+        return np.resize(train.to_numpy()[-period:], steps), None, None
+
+    model = build_model(name, train, period)
     try:
-        payload = json.load(sys.stdin)
-        data = payload.get('data')
-        time_col = payload.get('timeCol')
-        value_col = payload.get('valueCol')
-
-        if not all([data, time_col, value_col]):
-            raise ValueError("Missing 'data', 'timeCol', or 'valueCol'")
-
-        df = pd.DataFrame(data)
-        df[time_col] = pd.to_datetime(df[time_col])
-        series = df.set_index(time_col)[value_col].dropna()
-        
-        if len(series) < 24:
-            raise ValueError("At least 24 data points are recommended for robust model comparison.")
-
-        # Split data into training and testing sets
-        train, test = series[:-12], series[-12:]
-
-        # Define models to run
-        models_to_run = {
-            "SARIMA": lambda d: SARIMAX(d, order=(1,1,1), seasonal_order=(1,1,1,12), enforce_stationarity=False, enforce_invertibility=False),
-            "ETS(A,Ad,A)": lambda d: ExponentialSmoothing(d, seasonal_periods=12, trend='add', seasonal='add', damped_trend=True, initialization_method="estimated"),
-            "Simple Exp Smoothing": lambda d: SimpleExpSmoothing(d, initialization_method="estimated"),
-            "Holt's Linear": lambda d: Holt(d, initialization_method="estimated"),
-            # Naive seasonal model needs to be handled separately as it's not a standard fit/predict model in the same way
-        }
-        
-        results = []
-        for name, func in models_to_run.items():
-            result = fit_and_evaluate(name, func, train, test)
-            results.append(result)
-
-        # Handle Naive Seasonal separately
+        model_fit = model.fit(disp=False, start_params=start_params)
+    except Exception:
+        if start_params is None:
+            raise
+        model_fit = model.fit(disp=False)
+
+    if name == 'SARIMA':
+        forecast_result = model_fit.get_forecast(steps=steps)
+        forecast = np.asarray(forecast_result.predicted_mean)
+        interval = np.asarray(forecast_result.conf_int(alpha=0.05))
+    else:
+        prediction = model_fit.get_prediction(start=len(train), end=len(train) + steps - 1)
+        forecast = np.asarray(prediction.predicted_mean)
+        interval = np.asarray(prediction.pred_int(alpha=0.05))
+    return forecast, interval, np.asarray(model_fit.params)
+
+
+def score_forecast(name, train, test, forecast, interval, period):
+    test = np.asarray(test, dtype=float)
+    seasonality = period if name in SEASONAL_MASE_MODELS else 1
+    coverage = None
+    if interval is not None:
+        coverage = np.mean((test >= interval[:, 0]) & (test <= interval[:, 1])) * 100
+    return {
+        "RMSE": np.sqrt(mean_squared_error(test, forecast)),
+        "MAE": mean_absolute_error(test, forecast),
+        "MAPE (%)": mean_absolute_percentage_error(test, forecast),
+        "MASE": mean_absolute_scaled_error(test, forecast, np.asarray(train, dtype=float), seasonality=seasonality),
+        "Coverage (95% PI)": coverage,
+    }
+
+
+def fold_origins(n, folds, horizon, step):
+    """Training-set lengths of each rolling-origin fold (the last fold ends at the series end)."""
+    return [n - horizon - (folds - 1 - i) * step for i in range(folds)]
+
+
+def evaluate_model(name, series, folds, horizon, step, period, timeout=DEFAULT_MODEL_TIMEOUT):
+    """
+    Rolling-origin evaluation of one model on one series. Each refit is
+    warm-started from the previous fold's parameters.
+    """
+    started = time.perf_counter()
+    fold_results = []
+    params = None
+    timed_out = False
+    for fold, train_size in enumerate(fold_origins(len(series), folds, horizon, step)):
+        if timeout and time.perf_counter() - started > timeout:
+            timed_out = True
+            break
+        train, test = series.iloc[:train_size], series.iloc[train_size:train_size + horizon]
+        entry = {"fold": fold + 1, "train_size": train_size}
         try:
-            naive_forecast = train.iloc[-12:].values
-            naive_rmse = np.sqrt(mean_squared_error(test, naive_forecast))
-            naive_mae = mean_absolute_error(test, naive_forecast)
-            naive_mape = mean_absolute_percentage_error(test, naive_forecast)
-            naive_mase = mean_absolute_scaled_error(test, naive_forecast, train, seasonality=12)
-            results.append({
-                "Method": "Naive Seasonal", "RMSE": naive_rmse, "MAE": naive_mae, "MAPE (%)": naive_mape, "MASE": naive_mase, "Coverage (95% PI)": None
-            })
+            forecast, interval, params = forecast_model(name, train, len(test), period, params)
+            entry.update(score_forecast(name, train, test, forecast, interval, period))
         except Exception as e:
-             results.append({ "Method": "Naive Seasonal", "error": str(e), "RMSE": None, "MAE": None, "MAPE (%)": None, "MASE": None, "Coverage (95% PI)": None })
+            entry["error"] = str(e)
+            params = None
+        fold_results.append(entry)
+    return summarize_model(name, fold_results, folds, timed_out, time.perf_counter() - started)
+
+
+def summarize_model(name, fold_results, folds, timed_out, seconds):
+    """One results row: metrics averaged over the folds that succeeded."""
+    scored = [entry for entry in fold_results if "error" not in entry]
+    row = {"Method": name}
+    for metric in ["RMSE", "MAE", "MAPE (%)", "MASE", "Coverage (95% PI)"]:
+        values = [entry[metric] for entry in scored if entry[metric] is not None]
+        row[metric] = _to_native_type(np.mean(values)) if values else None
+    row["folds_completed"] = len(scored)
+    row["fit_seconds"] = seconds
+    row["fold_results"] = [{k: _to_native_type(v) for k, v in entry.items()} for entry in fold_results]
+    if not scored:
+        errors = [entry["error"] for entry in fold_results if "error" in entry]
+        row["error"] = errors[0] if errors else "Timed out before the first fold"
+    if timed_out:
+        row["timed_out"] = True
+        row["warning"] = f"Stopped after {len(fold_results)} of {folds} folds (timeout)."
+    return row
+
+
+def _get_tournament_pool(n_jobs):
+    """Process pool kept alive across requests so workers import statsmodels once."""
+    global _tournament_pool, _tournament_pool_size
+    if _tournament_pool is None or _tournament_pool_size != n_jobs:
+        if _tournament_pool is not None:
+            _tournament_pool.shutdown(wait=False)
+        _tournament_pool_size = n_jobs
+        _tournament_pool = ProcessPoolExecutor(max_workers=n_jobs, mp_context=multiprocessing.get_context('spawn'))
+        # Spawn the workers and import this module now, so startup does not count against model timeouts.
+        for future in [_tournament_pool.submit(_to_native_type, 0) for _ in range(n_jobs)]:
+            future.result()
+    return _tournament_pool
+
+
+def _terminate_tournament_pool():
+    """Kill the pool's workers; a fit that overran its timeout cannot be interrupted otherwise."""
+    global _tournament_pool, _tournament_pool_size
+    pool, _tournament_pool, _tournament_pool_size = _tournament_pool, None, 0
+    if pool is None:
+        return
+    for process in list((getattr(pool, '_processes', None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def timed_out_row(name, folds, timeout):
+    row = summarize_model(name, [], folds, True, timeout)
+    row["error"] = f"Timed out after {timeout:g} seconds."
+    return row
+
+
+def _run_with_deadlines(jobs, series_map, folds, horizon, step, period, timeout, n_jobs):
+    """
+    Run (name, model) jobs on the tournament pool, yielding (name, row) as
+    they finish. At most n_jobs are submitted at once, so each starts on an
+    idle worker and its clock starts at submission; a job still running
+    after `timeout` seconds yields a timed-out row and its worker is given up.
+    """
+    pool = _get_tournament_pool(n_jobs)
+    waiting = list(jobs)
+    running = {}   # future -> (name, model, started)
+    abandoned = []
+    while waiting or running:
+        capacity = n_jobs - len(running) - sum(not future.done() for future in abandoned)
+        if capacity <= 0 and not running:
+            # Every worker is stuck in an overrun fit: start a fresh pool.
+            _terminate_tournament_pool()
+            pool, abandoned = _get_tournament_pool(n_jobs), []
+            continue
+        while waiting and capacity > 0:
+            name, model = waiting.pop(0)
+            future = pool.submit(evaluate_model, model, series_map[name], folds, horizon, step, period, timeout)
+            running[future] = (name, model, time.perf_counter())
+            capacity -= 1
+
+        next_deadline = min(started for _, _, started in running.values()) + timeout
+        done, _ = wait(running, timeout=max(0.0, next_deadline - time.perf_counter()), return_when=FIRST_COMPLETED)
+        for future in done:
+            name, _, _ = running.pop(future)
+            yield name, future.result()
+
+        now = time.perf_counter()
+        for future, (name, model, started) in list(running.items()):
+            if now - started >= timeout and not future.done():
+                del running[future]
+                abandoned.append(future)
+                yield name, timed_out_row(model, folds, timeout)
 
+    if any(not future.done() for future in abandoned):
+        _terminate_tournament_pool()
 
-        response = {
-            "results": results
-        }
+
+def run_tournament(series_map, models, folds, horizon, step, period, timeout=DEFAULT_MODEL_TIMEOUT, n_jobs=None,
+                   enforce_timeout=False):
+    """
+    Evaluate every model on every series, yielding (series name, row) as
+    each model finishes. Model x series jobs run on a process pool when
+    there are enough fits to pay for it. With enforce_timeout they always
+    do, so that a hung fit cannot block the tournament.
+    """
+    timeout = float(timeout) if timeout else None
+    enforce_timeout = bool(enforce_timeout and timeout)
+    jobs = [(name, model) for name in series_map for model in models]
+    fitted = [job for job in jobs if job[1] != 'Naive Seasonal']
+    n_jobs = nested_jobs(n_jobs, worthwhile=len(fitted) * folds >= PARALLEL_MIN_FITS)
+    n_jobs = min(n_jobs, len(fitted) or 1)
+
+    if not fitted or (n_jobs <= 1 and not enforce_timeout):
+        for name, model in jobs:
+            yield name, evaluate_model(model, series_map[name], folds, horizon, step, period, timeout)
+        return
+
+    # The naive baseline is instant; report it before the fits.
+    for name, model in jobs:
+        if model == 'Naive Seasonal':
+            yield name, evaluate_model(model, series_map[name], folds, horizon, step, period, timeout)
+    if enforce_timeout:
+        yield from _run_with_deadlines(fitted, series_map, folds, horizon, step, period, timeout, n_jobs)
+        return
+
+    pool = _get_tournament_pool(n_jobs)
+    futures = {
+        pool.submit(evaluate_model, model, series_map[name], folds, horizon, step, period, timeout): name
+        for name, model in fitted
+    }
+    for future in as_completed(futures):
+        yield futures[future], future.result()
+
+
+def _collect_series(payload):
+    """Name -> time-indexed series from valueCol / valueCols (wide) or seriesCol (long format)."""
+    data = payload.get('data')
+    time_col = payload.get('timeCol')
+    value_col = payload.get('valueCol')
+    value_cols = payload.get('valueCols') or ([value_col] if value_col else [])
+    series_col = payload.get('seriesCol')
+
+    if not all([data, time_col, value_cols]):
+        raise ValueError("Missing 'data', 'timeCol', or 'valueCol'")
+
+    df = pd.DataFrame(data)
+    df[time_col] = pd.to_datetime(df[time_col])
+
+    series_map = {}
+    if series_col:
+        for key, group in df.groupby(series_col, sort=False):
+            series_map[str(key)] = group.set_index(time_col)[value_cols[0]].dropna().sort_index(kind='stable')
+    else:
+        for col in value_cols:
+            series_map[col] = df.set_index(time_col)[col].dropna().sort_index(kind='stable')
+    return series_map
+
+
+def _tournament_settings(payload):
+    horizon = int(payload.get('horizon', DEFAULT_HORIZON))
+    step = int(payload.get('step') or horizon)
+    return {
+        'folds': max(1, int(payload.get('folds', 1))),
+        'horizon': horizon,
+        'step': max(1, step),
+        'period': int(payload.get('seasonalPeriod', DEFAULT_SEASONAL_PERIOD)),
+        'timeout': payload.get('modelTimeout', DEFAULT_MODEL_TIMEOUT),
+        'n_jobs': payload.get('nJobs'),
+        # Killing overrunning fits needs the process pool, so only on request.
+        'enforce_timeout': payload.get('modelTimeout') is not None,
+    }
+
+
+def _validate_series(name, series, settings):
+    if len(series) < MIN_SERIES_LENGTH:
+        raise ValueError("At least 24 data points are recommended for robust model comparison.")
+    first_train = fold_origins(len(series), settings['folds'], settings['horizon'], settings['step'])[0]
+    if first_train < settings['period']:
+        raise ValueError(
+            f"Series '{name}' is too short for {settings['folds']} folds of {settings['horizon']} steps; "
+            f"the first training window would have {first_train} points."
+        )
+
+
+def _prepare(payload):
+    """Valid series to evaluate, errors for the ones skipped, and the tournament settings."""
+    series_map = _collect_series(payload)
+    settings = _tournament_settings(payload)
+    models = [m for m in payload.get('models', MODELS) if m in MODELS] or MODELS
+
+    valid, skipped = {}, {}
+    for name, series in series_map.items():
+        try:
+            _validate_series(name, series, settings)
+            valid[name] = series
+        except ValueError as e:
+            if len(series_map) == 1:
+                raise
+            skipped[name] = str(e)
+    return valid, skipped, models, settings
+
+
+def _best_method(rows):
+    scored = [row for row in rows if row.get("RMSE") is not None]
+    return min(scored, key=lambda row: row["RMSE"])["Method"] if scored else None
+
+
+def run_forecast_evaluation_analysis(payload):
+    series_map, skipped, models, settings = _prepare(payload)
+
+    rows = {name: {} for name in series_map}
+    for name, row in run_tournament(series_map, models, **settings):
+        rows[name][row["Method"]] = row
+
+    series_results = []
+    for name in series_map:
+        ordered = [rows[name][m] for m in models if m in rows[name]]
+        series_results.append({"name": name, "results": ordered, "best_method": _best_method(ordered)})
+    for name, error in skipped.items():
+        series_results.append({"name": name, "results": [], "error": error})
+
+    response = {
+        "results": series_results[0]["results"] if series_results else [],
+        "series": series_results,
+        "folds": settings['folds'],
+        "horizon": settings['horizon'],
+    }
+    return response
+
+
+def stream_forecast_evaluation_analysis(payload, out=sys.stdout):
+    """Write one JSON line per finished model, then a summary line."""
+    series_map, skipped, models, settings = _prepare(payload)
+    for name, error in skipped.items():
+        out.write(json.dumps({"series": name, "error": error}) + '\n')
+        out.flush()
+
+    rows = {name: [] for name in series_map}
+    for name, row in run_tournament(series_map, models, **settings):
+        rows[name].append(row)
+        out.write(json.dumps({"series": name, "result": row}, default=_to_native_type) + '\n')
+        out.flush()
+
+    summary = {name: _best_method(series_rows) for name, series_rows in rows.items()}
+    out.write(json.dumps({"summary": {"best_method": summary, "folds": settings['folds'],
+                                      "horizon": settings['horizon']}}) + '\n')
+
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        if payload.get('stream'):
+            stream_forecast_evaluation_analysis(payload)
+            return
+        response = run_forecast_evaluation_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
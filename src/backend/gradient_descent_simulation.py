@@ -16,7 +16,7 @@ def _to_native_type(obj):
         return bool(obj)
     return obj
 
-def run_gradient_descent_simulation(learning_rate=0.01, start_x=4.0, start_y=4.0, num_steps=50):
+def _simulate(learning_rate=0.01, start_x=4.0, start_y=4.0, num_steps=50):
     # 1. Define the function and its gradient
     def f(x, y):
         return x**2 + y**2
@@ -49,20 +49,23 @@ def run_gradient_descent_simulation(learning_rate=0.01, start_x=4.0, start_y=4.0
     }
 
 
+def run_gradient_descent_simulation(payload):
+    learning_rate = float(payload.get('learning_rate', 0.1))
+    start_x = float(payload.get('start_x', 4.0))
+    start_y = float(payload.get('start_y', 4.0))
+    num_steps = int(payload.get('num_steps', 50))
+
+    simulation_data = _simulate(learning_rate, start_x, start_y, num_steps)
+
+    simulation_data['plot'] = None # No plot generated from backend
+    return simulation_data
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        
-        learning_rate = float(payload.get('learning_rate', 0.1))
-        start_x = float(payload.get('start_x', 4.0))
-        start_y = float(payload.get('start_y', 4.0))
-        num_steps = int(payload.get('num_steps', 50))
-        
-        simulation_data = run_gradient_descent_simulation(learning_rate, start_x, start_y, num_steps)
-        
-        simulation_data['plot'] = None # No plot generated from backend
-        
-        print(json.dumps(simulation_data, default=_to_native_type))
+        response = run_gradient_descent_simulation(payload)
+        print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
         print(json.dumps({"error": str(e)}), file=sys.stderr)
@@ -7,12 +7,14 @@ import seaborn as sns
 from scipy.cluster.hierarchy import dendrogram, linkage, fcluster
 from scipy.spatial.distance import pdist, squareform
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import silhouette_score, calinski_harabasz_score, davies_bouldin_score
+from sklearn.metrics import calinski_harabasz_score, davies_bouldin_score, adjusted_rand_score
 from sklearn.decomposition import PCA
 import warnings
 import io
 import base64
 import math
+from dataset_io import load_frame, has_data
+from parallelism import nested_jobs, process_pool
 
 warnings.filterwarnings('ignore')
 
@@ -33,6 +35,78 @@ def _to_native_type(obj):
         return bool(obj)
     return obj
 
+# Below this many (resamples x samples) the process pool costs more than it saves.
+PARALLEL_STABILITY_MIN_WORK = 50 * 2000
+
+
+def silhouette_from_distances(dist_matrix, labels):
+    """
+    Mean silhouette from a square distance matrix.
+
+    Per-cluster distance sums come from one (n x n) @ (n x k) product, so
+    scoring several candidate labelings against the same matrix only costs
+    one matmul each instead of a fresh pairwise-distance pass.
+    """
+    _, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    k = len(counts)
+    if k < 2:
+        return -1.0
+    n = len(labels)
+    onehot = np.zeros((n, k))
+    onehot[np.arange(n), inverse] = 1.0
+    cluster_sums = dist_matrix @ onehot
+
+    own_counts = counts[inverse]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a = cluster_sums[np.arange(n), inverse] / (own_counts - 1)
+        mean_to_others = cluster_sums / counts
+    mean_to_others[np.arange(n), inverse] = np.inf
+    b = mean_to_others.min(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = (b - a) / np.maximum(a, b)
+    # Singleton clusters score 0, as in sklearn.
+    s = np.where(own_counts > 1, np.nan_to_num(s), 0.0)
+    return float(s.mean())
+
+
+def _cluster_jaccard(reference, labels):
+    """For each reference cluster, the best Jaccard overlap with any resampled cluster."""
+    scores = {}
+    for ref in np.unique(reference):
+        ref_mask = reference == ref
+        best = 0.0
+        for lab in np.unique(labels):
+            lab_mask = labels == lab
+            union = np.sum(ref_mask | lab_mask)
+            if union:
+                best = max(best, np.sum(ref_mask & lab_mask) / union)
+        scores[int(ref)] = best
+    return scores
+
+
+def _stability_resample(values, indices, linkage_method, distance_metric, n_clusters, reference_labels):
+    """One bootstrap resample: a single pdist feeds linkage and silhouette."""
+    sample = values[indices]
+    if linkage_method == 'ward':
+        distances = pdist(sample, metric='euclidean')
+        sil_distances = distances
+    else:
+        distances = pdist(sample, metric=distance_metric)
+        sil_distances = distances if distance_metric == 'euclidean' else pdist(sample, metric='euclidean')
+    labels = fcluster(linkage(distances, method=linkage_method), n_clusters, criterion='maxclust')
+    if len(np.unique(labels)) < 2:
+        return None
+
+    silhouette = silhouette_from_distances(squareform(sil_distances), labels)
+
+    # Compare with the full-data clustering on the distinct resampled points.
+    unique_idx, first = np.unique(indices, return_index=True)
+    ari = adjusted_rand_score(reference_labels[unique_idx], labels[first])
+    jaccard = _cluster_jaccard(reference_labels[unique_idx], labels[first])
+    return silhouette, ari, jaccard
+
+
 class HierarchicalClusterAnalysis:
     def __init__(self, data, feature_cols=None, standardize=True):
         self.data = pd.DataFrame(data)
@@ -65,6 +139,13 @@ class HierarchicalClusterAnalysis:
         else:
             distances = pdist(self.cluster_data_scaled, metric=self.distance_metric)
             self.linkage_matrix = linkage(distances, method=linkage_method)
+
+        # Silhouette is always measured in euclidean space; reuse the linkage
+        # distances when they already are euclidean.
+        if self.distance_metric == 'euclidean':
+            self.euclidean_distances = squareform(distances)
+        else:
+            self.euclidean_distances = squareform(pdist(self.cluster_data_scaled, metric='euclidean'))
         
         if n_clusters is None:
             recommendations = self._find_optimal_clusters()
@@ -87,7 +168,7 @@ class HierarchicalClusterAnalysis:
         for k in k_range:
             labels = fcluster(self.linkage_matrix, k, criterion='maxclust')
             if len(np.unique(labels)) > 1:
-                silhouette_scores.append(silhouette_score(self.cluster_data_scaled, labels))
+                silhouette_scores.append(silhouette_from_distances(self.euclidean_distances, labels))
                 calinski_scores.append(calinski_harabasz_score(self.cluster_data_scaled, labels))
                 davies_bouldin_scores.append(davies_bouldin_score(self.cluster_data_scaled, labels))
             else:
@@ -128,37 +209,55 @@ class HierarchicalClusterAnalysis:
 
         if len(unique_labels) > 1:
             self.results['final_metrics'] = {
-                'silhouette': silhouette_score(self.cluster_data_scaled, self.cluster_labels),
+                'silhouette': silhouette_from_distances(self.euclidean_distances, self.cluster_labels),
                 'calinski_harabasz': calinski_harabasz_score(self.cluster_data_scaled, self.cluster_labels),
                 'davies_bouldin': davies_bouldin_score(self.cluster_data_scaled, self.cluster_labels),
             }
         
         self.results['interpretations'] = self.generate_interpretations()
 
-    def stability_analysis(self, n_bootstrap=50, sample_ratio=0.8):
-        stability_scores = []
-        for _ in range(n_bootstrap):
-            sample_indices = np.random.choice(self.n_samples, int(self.n_samples * sample_ratio), replace=True)
-            bootstrap_data = self.cluster_data_scaled.iloc[sample_indices]
-            
-            if self.linkage_method == 'ward':
-                bootstrap_linkage = linkage(bootstrap_data.values, method='ward')
-            else:
-                bootstrap_distances = pdist(bootstrap_data.values, metric=self.distance_metric)
-                bootstrap_linkage = linkage(bootstrap_distances, method=self.linkage_method)
+    def stability_analysis(self, n_bootstrap=50, sample_ratio=0.8, n_jobs=None, random_state=42):
+        rng = np.random.default_rng(random_state)
+        sample_size = int(self.n_samples * sample_ratio)
+        index_sets = [rng.choice(self.n_samples, sample_size, replace=True) for _ in range(n_bootstrap)]
+        values = self.cluster_data_scaled.values
+        reference = np.asarray(self.cluster_labels)
 
-            bootstrap_labels = fcluster(bootstrap_linkage, self.n_clusters, criterion='maxclust')
-            
-            if len(np.unique(bootstrap_labels)) > 1:
-                stability_scores.append(silhouette_score(bootstrap_data, bootstrap_labels))
-        
-        if stability_scores:
-            mean_stability = np.mean(stability_scores)
-            std_stability = np.std(stability_scores)
-            self.results['stability'] = {
-                'mean': mean_stability,
-                'std': std_stability
-            }
+        n_jobs = nested_jobs(n_jobs, worthwhile=n_bootstrap * self.n_samples >= PARALLEL_STABILITY_MIN_WORK)
+
+        if n_jobs > 1:
+            with process_pool(n_jobs) as executor:
+                futures = [
+                    executor.submit(_stability_resample, values, idx, self.linkage_method,
+                                    self.distance_metric, self.n_clusters, reference)
+                    for idx in index_sets
+                ]
+                outcomes = [f.result() for f in futures]
+        else:
+            outcomes = [
+                _stability_resample(values, idx, self.linkage_method, self.distance_metric, self.n_clusters, reference)
+                for idx in index_sets
+            ]
+
+        outcomes = [o for o in outcomes if o is not None]
+        if not outcomes:
+            return
+
+        silhouettes = np.array([o[0] for o in outcomes])
+        aris = np.array([o[1] for o in outcomes])
+        cluster_jaccard = {
+            f'Cluster {label}': float(np.mean([o[2].get(label, 0.0) for o in outcomes]))
+            for label in np.unique(self.cluster_labels)
+        }
+
+        self.results['stability'] = {
+            'mean': np.mean(silhouettes),
+            'std': np.std(silhouettes),
+            'ari_mean': np.mean(aris),
+            'ari_std': np.std(aris),
+            'cluster_jaccard': cluster_jaccard,
+            'n_resamples': len(outcomes)
+        }
 
     def generate_interpretations(self):
         if 'profiles' not in self.results:
@@ -311,30 +410,34 @@ class HierarchicalClusterAnalysis:
         buf.seek(0)
         return f"data:image/png;base64,{base64.b64encode(buf.read()).decode('utf-8')}"
 
+def run_hca_analysis(payload):
+    data = load_frame(payload)
+    items = payload.get('items')
+    linkage_method = payload.get('linkageMethod', 'ward')
+    distance_metric = payload.get('distanceMetric', 'euclidean')
+    n_clusters = payload.get('nClusters') # Can be None
+
+    if not has_data(payload) or not items:
+        raise ValueError("Missing 'data' or 'items'")
+
+    hca = HierarchicalClusterAnalysis(data=data, feature_cols=items, standardize=True)
+    hca.perform_clustering(linkage_method, distance_metric, n_clusters)
+    hca.analyze_clusters()
+    hca.stability_analysis()
+
+    plot_image = hca.plot_results()
+
+    response = {
+        'results': hca.results,
+        'plot': plot_image
+    }
+    return response
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        data = payload.get('data')
-        items = payload.get('items')
-        linkage_method = payload.get('linkageMethod', 'ward')
-        distance_metric = payload.get('distanceMetric', 'euclidean')
-        n_clusters = payload.get('nClusters') # Can be None
-
-        if not data or not items:
-            raise ValueError("Missing 'data' or 'items'")
-
-        hca = HierarchicalClusterAnalysis(data=data, feature_cols=items, standardize=True)
-        hca.perform_clustering(linkage_method, distance_metric, n_clusters)
-        hca.analyze_clusters()
-        hca.stability_analysis()
-        
-        plot_image = hca.plot_results()
-
-        response = {
-            'results': hca.results,
-            'plot': plot_image
-        }
-        
+        response = run_hca_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
@@ -11,6 +11,7 @@ from sklearn.neighbors import NearestNeighbors
 import io
 import base64
 import warnings
+from dataset_io import load_frame, has_data
 
 warnings.filterwarnings('ignore')
 
@@ -81,143 +82,146 @@ def dbscan_with_probabilities(X, min_cluster_size, min_samples=None):
     
     return labels, probabilities
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        data = payload.get('data')
-        items = payload.get('items')
-        min_cluster_size = int(payload.get('min_cluster_size', 5))
-        min_samples = payload.get('min_samples')
-
-        if not data or not items:
-            raise ValueError("Missing 'data' or 'items'")
-
-        df = pd.DataFrame(data)[items].dropna()
-        
-        if df.shape[0] == 0:
-            raise ValueError("No valid data points for analysis.")
-
-        # Standardize data
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(df)
-
-        # Run clustering
-        if HAS_HDBSCAN:
-            # Use actual HDBSCAN if available
-            clusterer = hdbscan.HDBSCAN(
-                min_cluster_size=min_cluster_size, 
-                min_samples=min_samples if min_samples else None,
-                gen_min_span_tree=True
-            )
-            labels = clusterer.fit_predict(X_scaled)
-            probabilities = clusterer.probabilities_
-        else:
-            # Fall back to DBSCAN with pseudo-probabilities
-            labels, probabilities = dbscan_with_probabilities(
-                X_scaled, min_cluster_size, min_samples
+def run_hdbscan_analysis(payload):
+    items = payload.get('items')
+    min_cluster_size = int(payload.get('min_cluster_size', 5))
+    min_samples = payload.get('min_samples')
+
+    if not has_data(payload) or not items:
+        raise ValueError("Missing 'data' or 'items'")
+
+    df = load_frame(payload)[items].dropna()
+
+    if df.shape[0] == 0:
+        raise ValueError("No valid data points for analysis.")
+
+    # Standardize data
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(df)
+
+    # Run clustering
+    if HAS_HDBSCAN:
+        # Use actual HDBSCAN if available
+        clusterer = hdbscan.HDBSCAN(
+            min_cluster_size=min_cluster_size, 
+            min_samples=min_samples if min_samples else None,
+            gen_min_span_tree=True
+        )
+        labels = clusterer.fit_predict(X_scaled)
+        probabilities = clusterer.probabilities_
+    else:
+        # Fall back to DBSCAN with pseudo-probabilities
+        labels, probabilities = dbscan_with_probabilities(
+            X_scaled, min_cluster_size, min_samples
+        )
+
+    # Analysis Summary
+    n_clusters_ = len(set(labels)) - (1 if -1 in labels else 0)
+    n_noise_ = list(labels).count(-1)
+
+    # Calculate cluster profiles
+    profiles = {}
+    unique_labels = np.unique(labels)
+
+    for label in unique_labels:
+        mask = (labels == label)
+        cluster_data = df[mask]
+
+        cluster_name = f'Cluster {label}' if label != -1 else 'Noise'
+
+        profiles[cluster_name] = {
+            'size': int(mask.sum()),
+            'percentage': float(mask.sum() / len(df) * 100),
+            'centroid': cluster_data.mean().to_dict() if not cluster_data.empty else {},
+        }
+
+    summary = {
+        'n_clusters': n_clusters_,
+        'n_noise': n_noise_,
+        'n_samples': len(df),
+        'min_cluster_size': min_cluster_size,
+        'min_samples': min_samples,
+        'labels': labels.tolist(),
+        'probabilities': probabilities.tolist(),
+        'profiles': profiles,
+    }
+
+    # --- Plotting ---
+    plot_image = None
+    if df.shape[1] >= 2:
+        pca = PCA(n_components=2)
+        X_pca = pca.fit_transform(X_scaled)
+
+        plot_df = pd.DataFrame(X_pca, columns=['PC1', 'PC2'])
+        plot_df['cluster'] = labels
+        plot_df['probability'] = probabilities
+
+        plt.figure(figsize=(10, 8))
+
+        # Use a categorical palette, handle noise points separately
+        unique_labels = sorted(list(set(labels)))
+        if -1 in unique_labels:
+            unique_labels.remove(-1)
+
+        if len(unique_labels) > 0:
+            palette = sns.color_palette("viridis", n_colors=len(unique_labels))
+
+            # Plot non-noise points with size based on probability
+            clustered_points = plot_df[plot_df['cluster'] != -1]
+            if not clustered_points.empty:
+                # Create sizes based on probability
+                sizes = clustered_points['probability'] * 150 + 20
+
+                for i, label in enumerate(unique_labels):
+                    cluster_data = clustered_points[clustered_points['cluster'] == label]
+                    if not cluster_data.empty:
+                        plt.scatter(
+                            cluster_data['PC1'],
+                            cluster_data['PC2'],
+                            s=sizes[clustered_points['cluster'] == label],
+                            c=[palette[i]] * len(cluster_data),
+                            label=f'Cluster {label}',
+                            alpha=0.7
+                        )
+
+        # Plot noise points
+        noise_points = plot_df[plot_df['cluster'] == -1]
+        if not noise_points.empty:
+            plt.scatter(
+                noise_points['PC1'],
+                noise_points['PC2'],
+                color='gray',
+                marker='x',
+                s=50,
+                label='Noise',
+                alpha=0.5
             )
 
-        # Analysis Summary
-        n_clusters_ = len(set(labels)) - (1 if -1 in labels else 0)
-        n_noise_ = list(labels).count(-1)
-
-        # Calculate cluster profiles
-        profiles = {}
-        unique_labels = np.unique(labels)
-        
-        for label in unique_labels:
-            mask = (labels == label)
-            cluster_data = df[mask]
-            
-            cluster_name = f'Cluster {label}' if label != -1 else 'Noise'
-            
-            profiles[cluster_name] = {
-                'size': int(mask.sum()),
-                'percentage': float(mask.sum() / len(df) * 100),
-                'centroid': cluster_data.mean().to_dict() if not cluster_data.empty else {},
-            }
-
-        summary = {
-            'n_clusters': n_clusters_,
-            'n_noise': n_noise_,
-            'n_samples': len(df),
-            'min_cluster_size': min_cluster_size,
-            'min_samples': min_samples,
-            'labels': labels.tolist(),
-            'probabilities': probabilities.tolist(),
-            'profiles': profiles,
-        }
+        title = 'HDBSCAN Clustering (PCA Projection)' if HAS_HDBSCAN else 'Hierarchical Clustering Approximation (PCA Projection)'
+        plt.title(title)
+        plt.xlabel(f'Principal Component 1 ({pca.explained_variance_ratio_[0]:.1%})')
+        plt.ylabel(f'Principal Component 2 ({pca.explained_variance_ratio_[1]:.1%})')
+        plt.legend(title='Cluster', bbox_to_anchor=(1.05, 1), loc='upper left')
+        plt.grid(True, linestyle='--', alpha=0.6)
+        plt.tight_layout()
 
-        # --- Plotting ---
-        plot_image = None
-        if df.shape[1] >= 2:
-            pca = PCA(n_components=2)
-            X_pca = pca.fit_transform(X_scaled)
-            
-            plot_df = pd.DataFrame(X_pca, columns=['PC1', 'PC2'])
-            plot_df['cluster'] = labels
-            plot_df['probability'] = probabilities
+        buf = io.BytesIO()
+        plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
+        plt.close()
+        buf.seek(0)
+        plot_image = base64.b64encode(buf.read()).decode('utf-8')
 
-            plt.figure(figsize=(10, 8))
-            
-            # Use a categorical palette, handle noise points separately
-            unique_labels = sorted(list(set(labels)))
-            if -1 in unique_labels:
-                unique_labels.remove(-1)
-            
-            if len(unique_labels) > 0:
-                palette = sns.color_palette("viridis", n_colors=len(unique_labels))
-                
-                # Plot non-noise points with size based on probability
-                clustered_points = plot_df[plot_df['cluster'] != -1]
-                if not clustered_points.empty:
-                    # Create sizes based on probability
-                    sizes = clustered_points['probability'] * 150 + 20
-                    
-                    for i, label in enumerate(unique_labels):
-                        cluster_data = clustered_points[clustered_points['cluster'] == label]
-                        if not cluster_data.empty:
-                            plt.scatter(
-                                cluster_data['PC1'],
-                                cluster_data['PC2'],
-                                s=sizes[clustered_points['cluster'] == label],
-                                c=[palette[i]] * len(cluster_data),
-                                label=f'Cluster {label}',
-                                alpha=0.7
-                            )
-
-            # Plot noise points
-            noise_points = plot_df[plot_df['cluster'] == -1]
-            if not noise_points.empty:
-                plt.scatter(
-                    noise_points['PC1'],
-                    noise_points['PC2'],
-                    color='gray',
-                    marker='x',
-                    s=50,
-                    label='Noise',
-                    alpha=0.5
-                )
-
-            title = 'HDBSCAN Clustering (PCA Projection)' if HAS_HDBSCAN else 'Hierarchical Clustering Approximation (PCA Projection)'
-            plt.title(title)
-            plt.xlabel(f'Principal Component 1 ({pca.explained_variance_ratio_[0]:.1%})')
-            plt.ylabel(f'Principal Component 2 ({pca.explained_variance_ratio_[1]:.1%})')
-            plt.legend(title='Cluster', bbox_to_anchor=(1.05, 1), loc='upper left')
-            plt.grid(True, linestyle='--', alpha=0.6)
-            plt.tight_layout()
-
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-            plt.close()
-            buf.seek(0)
-            plot_image = base64.b64encode(buf.read()).decode('utf-8')
-
-        response = {
-            'results': summary,
-            'plot': f"data:image/png;base64,{plot_image}" if plot_image else None
-        }
+    response = {
+        'results': summary,
+        'plot': f"data:image/png;base64,{plot_image}" if plot_image else None
+    }
+    return response
 
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_hdbscan_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
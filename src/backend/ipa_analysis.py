@@ -12,6 +12,7 @@ from sklearn.preprocessing import StandardScaler
 import warnings
 import io
 import base64
+from dataset_io import load_frame, has_data
 
 warnings.filterwarnings('ignore')
 plt.rcParams['font.family'] = 'DejaVu Sans'
@@ -109,104 +110,107 @@ def create_dashboard_plot(df, df_ipa, perf_mean, quadrant_colors, attributes, de
     return base64.b64encode(buf.read()).decode('utf-8')
 
 
+def run_ipa_analysis(payload):
+    dependent_var = payload.get('dependentVar', 'Overall_Satisfaction')
+    independent_vars = payload.get('independentVars')
+
+    if not has_data(payload):
+        raise ValueError("Data not provided.")
+
+    df = load_frame(payload)
+
+    all_cols_for_analysis = [dependent_var] + (independent_vars or [])
+    if not independent_vars:
+        independent_vars = [col for col in df.columns if col != dependent_var]
+        all_cols_for_analysis = df.columns.tolist()
+
+    if dependent_var not in df.columns:
+        raise ValueError(f"Dependent variable '{dependent_var}' not found in data.")
+    missing_iv = [iv for iv in independent_vars if iv not in df.columns]
+    if missing_iv:
+         raise ValueError(f"Independent variables not found: {', '.join(missing_iv)}")
+
+    df_analysis = df[all_cols_for_analysis].copy()
+    for col in df_analysis.columns:
+        df_analysis[col] = pd.to_numeric(df_analysis[col], errors='coerce')
+    df_analysis.dropna(inplace=True)
+
+    if df_analysis.shape[0] < len(independent_vars) + 2:
+        raise ValueError(f"Not enough valid data points. Need at least {len(independent_vars) + 2} complete rows for regression.")
+
+    # --- 1. Performance Calculation (Mean) ---
+    performance = df_analysis[independent_vars].mean()
+
+    # --- 2. Importance Calculation (Regression-based) ---
+    X = df_analysis[independent_vars]
+    y = df_analysis[dependent_var]
+
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    model = LinearRegression().fit(X_scaled, y)
+
+    beta_coefficients = pd.DataFrame({'attribute': independent_vars, 'beta': model.coef_})
+
+    total_beta_abs = beta_coefficients['beta'].abs().sum()
+    beta_coefficients['relative_importance'] = (beta_coefficients['beta'].abs() / total_beta_abs) * 100 if total_beta_abs > 0 else 0
+
+    # --- 3. IPA Matrix Data Preparation ---
+    ipa_data = []
+    for attr in independent_vars:
+        perf = performance.get(attr, 0)
+        beta_row = beta_coefficients[beta_coefficients['attribute'] == attr].iloc[0]
+        ipa_data.append({
+            'attribute': attr, 
+            'performance': perf, 
+            'importance': beta_row['beta'], 
+            'relative_importance': beta_row['relative_importance']
+        })
+
+    df_ipa = pd.DataFrame(ipa_data)
+
+    # --- 4. Quadrant Classification ---
+    perf_mean = df_ipa['performance'].mean()
+    imp_mean = 0 # With standardized Beta, 0 is the natural midpoint
+
+    def classify_quadrant(row):
+        if row['importance'] >= imp_mean and row['performance'] >= perf_mean: return 'Q1: Keep Up Good Work'
+        elif row['importance'] >= imp_mean and row['performance'] < perf_mean: return 'Q2: Concentrate Here'
+        elif row['importance'] < imp_mean and row['performance'] < perf_mean: return 'Q3: Low Priority'
+        else: return 'Q4: Possible Overkill'
+
+    df_ipa['quadrant'] = df_ipa.apply(classify_quadrant, axis=1)
+
+    # --- 5. Advanced Metrics ---
+    max_scale_value = df_analysis[independent_vars].max().max() if not df_analysis[independent_vars].empty else 7
+    df_ipa['importance_scaled'] = (df_ipa['relative_importance'] / df_ipa['relative_importance'].max() * max_scale_value) if df_ipa['relative_importance'].max() > 0 else 0
+    df_ipa['gap'] = df_ipa['performance'] - df_ipa['importance_scaled']
+    df_ipa['priority_score'] = df_ipa['relative_importance'] * (max_scale_value - df_ipa['performance'])
+
+    # --- 6. Statistical Validation ---
+    r2 = model.score(X_scaled, y)
+    adj_r2 = 1 - (1 - r2) * (len(y) - 1) / (len(y) - X.shape[1] - 1) if (len(y) - X.shape[1] - 1) > 0 else r2
+    validation_results = {'r2': r2, 'adj_r2': adj_r2, 'beta_coefficients': beta_coefficients.to_dict('records')}
+
+    quadrant_colors = {'Q1: Keep Up Good Work': '#4CAF50', 'Q2: Concentrate Here': '#F44336', 'Q3: Low Priority': '#9E9E9E', 'Q4: Possible Overkill': '#FF9800'}
+
+    main_plot_img = create_main_plot(df_ipa, perf_mean, imp_mean, quadrant_colors)
+    dashboard_plot_img = create_dashboard_plot(df_analysis, df_ipa, perf_mean, quadrant_colors, independent_vars, dependent_var)
+
+    response = {
+        'results': {
+            'ipa_matrix': df_ipa.to_dict('records'),
+            'regression_summary': validation_results,
+        },
+        'main_plot': main_plot_img,
+        'dashboard_plot': dashboard_plot_img,
+    }
+    return response
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        data = payload.get('data')
-        dependent_var = payload.get('dependentVar', 'Overall_Satisfaction')
-        independent_vars = payload.get('independentVars')
-
-        if not data:
-            raise ValueError("Data not provided.")
-
-        df = pd.DataFrame(data)
-
-        all_cols_for_analysis = [dependent_var] + (independent_vars or [])
-        if not independent_vars:
-            independent_vars = [col for col in df.columns if col != dependent_var]
-            all_cols_for_analysis = df.columns.tolist()
-
-        if dependent_var not in df.columns:
-            raise ValueError(f"Dependent variable '{dependent_var}' not found in data.")
-        missing_iv = [iv for iv in independent_vars if iv not in df.columns]
-        if missing_iv:
-             raise ValueError(f"Independent variables not found: {', '.join(missing_iv)}")
-
-        df_analysis = df[all_cols_for_analysis].copy()
-        for col in df_analysis.columns:
-            df_analysis[col] = pd.to_numeric(df_analysis[col], errors='coerce')
-        df_analysis.dropna(inplace=True)
-        
-        if df_analysis.shape[0] < len(independent_vars) + 2:
-            raise ValueError(f"Not enough valid data points. Need at least {len(independent_vars) + 2} complete rows for regression.")
-
-        # --- 1. Performance Calculation (Mean) ---
-        performance = df_analysis[independent_vars].mean()
-
-        # --- 2. Importance Calculation (Regression-based) ---
-        X = df_analysis[independent_vars]
-        y = df_analysis[dependent_var]
-        
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
-        model = LinearRegression().fit(X_scaled, y)
-        
-        beta_coefficients = pd.DataFrame({'attribute': independent_vars, 'beta': model.coef_})
-        
-        total_beta_abs = beta_coefficients['beta'].abs().sum()
-        beta_coefficients['relative_importance'] = (beta_coefficients['beta'].abs() / total_beta_abs) * 100 if total_beta_abs > 0 else 0
-        
-        # --- 3. IPA Matrix Data Preparation ---
-        ipa_data = []
-        for attr in independent_vars:
-            perf = performance.get(attr, 0)
-            beta_row = beta_coefficients[beta_coefficients['attribute'] == attr].iloc[0]
-            ipa_data.append({
-                'attribute': attr, 
-                'performance': perf, 
-                'importance': beta_row['beta'], 
-                'relative_importance': beta_row['relative_importance']
-            })
-        
-        df_ipa = pd.DataFrame(ipa_data)
-        
-        # --- 4. Quadrant Classification ---
-        perf_mean = df_ipa['performance'].mean()
-        imp_mean = 0 # With standardized Beta, 0 is the natural midpoint
-        
-        def classify_quadrant(row):
-            if row['importance'] >= imp_mean and row['performance'] >= perf_mean: return 'Q1: Keep Up Good Work'
-            elif row['importance'] >= imp_mean and row['performance'] < perf_mean: return 'Q2: Concentrate Here'
-            elif row['importance'] < imp_mean and row['performance'] < perf_mean: return 'Q3: Low Priority'
-            else: return 'Q4: Possible Overkill'
-        
-        df_ipa['quadrant'] = df_ipa.apply(classify_quadrant, axis=1)
-        
-        # --- 5. Advanced Metrics ---
-        max_scale_value = df_analysis[independent_vars].max().max() if not df_analysis[independent_vars].empty else 7
-        df_ipa['importance_scaled'] = (df_ipa['relative_importance'] / df_ipa['relative_importance'].max() * max_scale_value) if df_ipa['relative_importance'].max() > 0 else 0
-        df_ipa['gap'] = df_ipa['performance'] - df_ipa['importance_scaled']
-        df_ipa['priority_score'] = df_ipa['relative_importance'] * (max_scale_value - df_ipa['performance'])
-        
-        # --- 6. Statistical Validation ---
-        r2 = model.score(X_scaled, y)
-        adj_r2 = 1 - (1 - r2) * (len(y) - 1) / (len(y) - X.shape[1] - 1) if (len(y) - X.shape[1] - 1) > 0 else r2
-        validation_results = {'r2': r2, 'adj_r2': adj_r2, 'beta_coefficients': beta_coefficients.to_dict('records')}
-
-        quadrant_colors = {'Q1: Keep Up Good Work': '#4CAF50', 'Q2: Concentrate Here': '#F44336', 'Q3: Low Priority': '#9E9E9E', 'Q4: Possible Overkill': '#FF9800'}
-        
-        main_plot_img = create_main_plot(df_ipa, perf_mean, imp_mean, quadrant_colors)
-        dashboard_plot_img = create_dashboard_plot(df_analysis, df_ipa, perf_mean, quadrant_colors, independent_vars, dependent_var)
-
-        response = {
-            'results': {
-                'ipa_matrix': df_ipa.to_dict('records'),
-                'regression_summary': validation_results,
-            },
-            'main_plot': main_plot_img,
-            'dashboard_plot': dashboard_plot_img,
-        }
-
+        response = run_ipa_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
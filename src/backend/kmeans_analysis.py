@@ -6,16 +6,38 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import silhouette_score, davies_bouldin_score, calinski_harabasz_score
 from sklearn.decomposition import PCA
 import warnings
 import io
 import base64
+from joblib import Parallel, delayed
+
+import chart_service
+from dataset_io import load_frame, has_data
+from parallelism import nested_jobs
 
 warnings.filterwarnings('ignore')
 
+# Above these sizes the exact O(n^2) silhouette is replaced by a sampled one,
+# then by the centroid-based simplified silhouette.
+SILHOUETTE_SAMPLE_THRESHOLD = 10000
+SILHOUETTE_SAMPLE_SIZE = 5000
+SIMPLIFIED_SILHOUETTE_THRESHOLD = 100000
+
+# Rows above which 'auto' mode switches to MiniBatchKMeans.
+MINIBATCH_THRESHOLD = 50000
+MINIBATCH_BATCH_SIZE = 4096
+
+# The k-sweep runs in parallel only when n_samples * number of ks exceeds this;
+# below it process start-up costs more than the fits.
+PARALLEL_SWEEP_MIN_WORK = 200000
+
+# Points drawn in the PCA scatter; larger datasets are plotted from a sample.
+PLOT_MAX_POINTS = 5000
+
 def _to_native_type(obj):
     if isinstance(obj, np.integer):
         return int(obj)
@@ -29,8 +51,72 @@ def _to_native_type(obj):
         return bool(obj)
     return obj
 
+def resolve_silhouette_method(n_samples, method='auto'):
+    if method != 'auto':
+        return method
+    if n_samples > SIMPLIFIED_SILHOUETTE_THRESHOLD:
+        return 'simplified'
+    if n_samples > SILHOUETTE_SAMPLE_THRESHOLD:
+        return 'sampled'
+    return 'full'
+
+
+def simplified_silhouette(X, labels, centers):
+    """
+    Centroid-based silhouette: a = distance to the own centroid, b = distance
+    to the nearest other centroid. O(n * k) instead of O(n^2).
+    """
+    X = np.asarray(X, dtype=float)
+    # |x - c|^2 = |x|^2 - 2 x.c + |c|^2 avoids the n x k x d difference tensor.
+    sq = (X ** 2).sum(axis=1)[:, None] - 2 * X @ centers.T + (centers ** 2).sum(axis=1)[None, :]
+    distances = np.sqrt(np.maximum(sq, 0))
+    rows = np.arange(len(X))
+    a = distances[rows, labels]
+    distances[rows, labels] = np.inf
+    b = distances.min(axis=1)
+    denom = np.maximum(a, b)
+    s = np.zeros(len(X))
+    np.divide(b - a, denom, out=s, where=denom > 0)
+    return float(s.mean())
+
+
+def cluster_silhouette(X, labels, method='auto', centers=None, random_state=42):
+    """Silhouette score with the exact, sampled or simplified estimator."""
+    labels = np.asarray(labels)
+    if len(np.unique(labels)) < 2:
+        return -1
+    method = resolve_silhouette_method(len(labels), method)
+    if method == 'simplified':
+        if centers is None:
+            centers = np.vstack([np.asarray(X)[labels == c].mean(axis=0) for c in range(labels.max() + 1)])
+        return simplified_silhouette(X, labels, centers)
+    if method == 'sampled' and len(labels) > SILHOUETTE_SAMPLE_SIZE:
+        return silhouette_score(X, labels, sample_size=SILHOUETTE_SAMPLE_SIZE, random_state=random_state)
+    return silhouette_score(X, labels)
+
+
+def resolve_mode(n_samples, mode='auto'):
+    if mode == 'auto':
+        return 'minibatch' if n_samples > MINIBATCH_THRESHOLD else 'full'
+    return mode
+
+
+def make_kmeans(n_clusters, mode='full', init='k-means++', n_init=10, random_state=42):
+    if mode == 'minibatch':
+        return MiniBatchKMeans(n_clusters=n_clusters, init=init, n_init=3,
+                               batch_size=MINIBATCH_BATCH_SIZE, random_state=random_state)
+    return KMeans(n_clusters=n_clusters, init=init, n_init=n_init, random_state=random_state)
+
+
+def _fit_k(X, k, mode, silhouette_method):
+    """One k of the sweep: fitted model plus its silhouette."""
+    model = make_kmeans(k, mode).fit(X)
+    score = cluster_silhouette(X, model.labels_, silhouette_method, centers=model.cluster_centers_)
+    return k, model, score
+
+
 class KMeansAnalysis:
-    def __init__(self, data, feature_cols, standardize=True):
+    def __init__(self, data, feature_cols, standardize=True, mode='auto', silhouette_method='auto'):
         self.data = pd.DataFrame(data)
         self.feature_cols = feature_cols
         self.cluster_data_raw = self.data[self.feature_cols].copy().dropna()
@@ -42,26 +128,37 @@ class KMeansAnalysis:
             self.cluster_data_scaled = self.cluster_data_raw.copy()
             
         self.n_samples, self.n_features = self.cluster_data_scaled.shape
+        self.mode = resolve_mode(self.n_samples, mode)
+        self.silhouette_method = resolve_silhouette_method(self.n_samples, silhouette_method)
         self.results = {}
+        # Models fitted during the k-sweep, reused by perform_clustering.
+        self._models = {}
 
-    def find_optimal_k(self, max_k=10):
+    def find_optimal_k(self, max_k=10, n_jobs=None):
         k_range = range(2, min(max_k + 1, self.n_samples))
+        X = self.cluster_data_scaled.to_numpy(dtype=float)
+
+        n_jobs = nested_jobs(n_jobs, worthwhile=self.n_samples * len(k_range) >= PARALLEL_SWEEP_MIN_WORK)
+        if n_jobs == 1 or len(k_range) < 2:
+            fitted = [_fit_k(X, k, self.mode, self.silhouette_method) for k in k_range]
+        else:
+            fitted = Parallel(n_jobs=n_jobs)(
+                delayed(_fit_k)(X, k, self.mode, self.silhouette_method) for k in k_range
+            )
+
         inertias = []
         silhouette_scores = []
-        
-        for k in k_range:
-            kmeans = KMeans(n_clusters=k, init='k-means++', n_init=10, random_state=42)
-            kmeans.fit(self.cluster_data_scaled)
-            inertias.append(kmeans.inertia_)
-            if len(np.unique(kmeans.labels_)) > 1:
-                silhouette_scores.append(silhouette_score(self.cluster_data_scaled, kmeans.labels_))
-            else:
-                silhouette_scores.append(-1)
+        for k, model, score in fitted:
+            self._models[k] = model
+            inertias.append(model.inertia_)
+            silhouette_scores.append(score)
         
         self.results['optimal_k'] = {
             'k_range': list(k_range),
             'inertias': inertias,
-            'silhouette_scores': silhouette_scores
+            'silhouette_scores': silhouette_scores,
+            'silhouette_method': self.silhouette_method,
+            'mode': self.mode
         }
         
         if silhouette_scores:
@@ -74,8 +171,14 @@ class KMeansAnalysis:
 
     def perform_clustering(self, n_clusters, init_method='k-means++', n_init=10):
         self.n_clusters = n_clusters
-        kmeans = KMeans(n_clusters=n_clusters, init=init_method, n_init=n_init, random_state=42)
-        self.cluster_labels = kmeans.fit_predict(self.cluster_data_scaled)
+        if n_clusters in self._models and init_method == 'k-means++' and n_init == 10:
+            # Same settings as the sweep: reuse its fit instead of refitting.
+            kmeans = self._models[n_clusters]
+        else:
+            kmeans = make_kmeans(n_clusters, self.mode, init=init_method, n_init=n_init)
+            kmeans.fit(self.cluster_data_scaled.to_numpy(dtype=float))
+        self.kmeans = kmeans
+        self.cluster_labels = kmeans.labels_
         
         self.results['clustering_summary'] = {
             'n_clusters': n_clusters,
@@ -103,7 +206,9 @@ class KMeansAnalysis:
 
         if len(unique_labels) > 1:
             self.results['final_metrics'] = {
-                'silhouette': silhouette_score(self.cluster_data_scaled, self.cluster_labels),
+                'silhouette': cluster_silhouette(self.cluster_data_scaled.to_numpy(dtype=float), self.cluster_labels,
+                                                 self.silhouette_method, centers=self.kmeans.cluster_centers_),
+                'silhouette_method': self.silhouette_method,
                 'davies_bouldin': davies_bouldin_score(self.cluster_data_scaled, self.cluster_labels),
                 'calinski_harabasz': calinski_harabasz_score(self.cluster_data_scaled, self.cluster_labels),
             }
@@ -195,8 +300,12 @@ class KMeansAnalysis:
         if self.n_features >= 2:
             pca = PCA(n_components=2)
             pca_data = pca.fit_transform(self.cluster_data_scaled)
+            plot_labels = self.cluster_labels
+            if len(pca_data) > PLOT_MAX_POINTS:
+                shown = np.random.default_rng(42).choice(len(pca_data), PLOT_MAX_POINTS, replace=False)
+                pca_data, plot_labels = pca_data[shown], plot_labels[shown]
             
-            sns.scatterplot(x=pca_data[:, 0], y=pca_data[:, 1], hue=self.cluster_labels, 
+            sns.scatterplot(x=pca_data[:, 0], y=pca_data[:, 1], hue=plot_labels, 
                             palette='viridis', ax=axes[1, 0], legend='full')
             
             centroids_pca = pca.transform(self.results['clustering_summary']['centroids'])
@@ -237,27 +346,38 @@ class KMeansAnalysis:
         buf.seek(0)
         return f"data:image/png;base64,{base64.b64encode(buf.read()).decode('utf-8')}"
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        data = payload.get('data')
-        items = payload.get('items')
-        n_clusters = payload.get('nClusters')
+def run_kmeans_analysis(payload):
+    data = load_frame(payload)
+    items = payload.get('items')
+    n_clusters = payload.get('nClusters')
 
-        if not data or not items or n_clusters is None:
-            raise ValueError("Missing 'data', 'items', or 'nClusters'")
+    if not has_data(payload) or not items or n_clusters is None:
+        raise ValueError("Missing 'data', 'items', or 'nClusters'")
 
-        kma = KMeansAnalysis(data=data, feature_cols=items)
-        kma.find_optimal_k() # Always run this to provide suggestions
-        kma.perform_clustering(n_clusters=n_clusters)
-        
+    kma = KMeansAnalysis(
+        data=data, feature_cols=items,
+        mode=payload.get('mode', 'auto'),
+        silhouette_method=payload.get('silhouetteMethod', 'auto')
+    )
+    kma.find_optimal_k(n_jobs=payload.get('nJobs')) # Always run this to provide suggestions
+    kma.perform_clustering(n_clusters=n_clusters)
+
+    # Charts are skipped for plotMode 'none' (API / batch callers).
+    plot_image = None
+    if chart_service.resolve_plot_mode(payload.get('plotMode')) != 'none':
         plot_image = kma.plot_results()
 
-        response = {
-            'results': kma.results,
-            'plot': plot_image
-        }
-        
+    response = {
+        'results': kma.results,
+        'plot': plot_image
+    }
+    return response
+
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_kmeans_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
@@ -12,6 +12,7 @@ from sklearn_extra.cluster import KMedoids
 import warnings
 import io
 import base64
+from dataset_io import load_frame, has_data
 
 warnings.filterwarnings('ignore')
 
@@ -192,26 +193,30 @@ class KMedoidsAnalysis:
         buf.seek(0)
         return f"data:image/png;base64,{base64.b64encode(buf.read()).decode('utf-8')}"
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        data = payload.get('data')
-        items = payload.get('items')
-        n_clusters = payload.get('nClusters')
+def run_kmedoids_analysis(payload):
+    data = load_frame(payload)
+    items = payload.get('items')
+    n_clusters = payload.get('nClusters')
 
-        if not data or not items or n_clusters is None:
-            raise ValueError("Missing 'data', 'items', or 'nClusters'")
+    if not has_data(payload) or not items or n_clusters is None:
+        raise ValueError("Missing 'data', 'items', or 'nClusters'")
 
-        kma = KMedoidsAnalysis(data=data, feature_cols=items)
-        kma.perform_clustering(n_clusters=n_clusters)
-        
-        plot_image = kma.plot_results()
+    kma = KMedoidsAnalysis(data=data, feature_cols=items)
+    kma.perform_clustering(n_clusters=n_clusters)
 
-        response = {
-            'results': kma.results,
-            'plot': plot_image
-        }
-        
+    plot_image = kma.plot_results()
+
+    response = {
+        'results': kma.results,
+        'plot': plot_image
+    }
+    return response
+
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_kmedoids_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
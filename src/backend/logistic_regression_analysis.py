@@ -12,6 +12,7 @@ import base64
 import warnings
 import statsmodels.api as sm
 from statsmodels.stats.outliers_influence import variance_inflation_factor
+from dataset_io import load_frame
 
 warnings.filterwarnings('ignore')
 
@@ -298,27 +299,31 @@ class LogisticRegressionAnalysis:
         buf.seek(0)
         return f"data:image/png;base64,{base64.b64encode(buf.read()).decode('utf-8')}"
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        data = pd.DataFrame(payload.get('data'))
-        dependent_var = payload.get('dependentVar')
-        independent_vars = payload.get('independentVars')
-        standardize = payload.get('standardize', False)  # 기본값: False
+def run_logistic_regression_analysis(payload):
+    data = load_frame(payload)
+    dependent_var = payload.get('dependentVar')
+    independent_vars = payload.get('independentVars')
+    standardize = payload.get('standardize', False)  # 기본값: False
 
-        if not all([not data.empty, dependent_var, independent_vars]):
-            raise ValueError("Missing data, dependentVar, or independentVars")
+    if not all([not data.empty, dependent_var, independent_vars]):
+        raise ValueError("Missing data, dependentVar, or independentVars")
 
-        analysis = LogisticRegressionAnalysis(data, dependent_var, independent_vars, standardize=standardize)
-        analysis.run_analysis()
-        
-        plot_image = analysis.plot_results()
+    analysis = LogisticRegressionAnalysis(data, dependent_var, independent_vars, standardize=standardize)
+    analysis.run_analysis()
 
-        response = {
-            'results': analysis.results,
-            'plot': plot_image
-        }
-        
+    plot_image = analysis.plot_results()
+
+    response = {
+        'results': analysis.results,
+        'plot': plot_image
+    }
+    return response
+
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_logistic_regression_analysis(payload)
         print(json.dumps(response, default=_to_native_type, indent=2))
 
     except Exception as e:
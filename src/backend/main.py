@@ -1,15 +1,38 @@
 
-from fastapi import FastAPI, HTTPException
+import asyncio
+import base64
+import json
+import os
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 
+from worker_pool import (
+    WorkerPool, SCRIPT_REGISTRY, HANDLER_REGISTRY, CACHEABLE_SCRIPTS, PoolSaturatedError,
+    preload_libraries, server_timing,
+)
+from result_cache import ResultCache, cache_key, bytes_digest
+from chart_service import ChartRenderer
+import dataset_io
+from dataset_registry import get_registry, DatasetNotFoundError
+
 # Import analysis functions
 from effectiveness_analysis import run_effectiveness_analysis
-from simple_test_analysis import run_simple_test_analysis
 from descriptive_stats_analysis import run_descriptive_stats_analysis
+try:
+    from simple_test_analysis import run_simple_test_analysis
+except ImportError:
+    # simple_test_analysis.py is not part of this backend yet.
+    run_simple_test_analysis = None
 
 app = FastAPI()
+worker_pool = WorkerPool()
+chart_renderer = ChartRenderer()
+result_cache = ResultCache()
+# Result-cache key -> Future of a run in progress, shared by identical requests.
+_inflight = {}
 
 # CORS 설정
 origins = [
@@ -29,7 +52,8 @@ app.add_middleware(
 )
 
 class EffectivenessPayload(BaseModel):
-    data: List[Dict[str, Any]]
+    data: Optional[List[Dict[str, Any]]] = None
+    datasetId: Optional[str] = None
     outcome: str
     time: Optional[str] = None
     group: Optional[str] = None
@@ -39,9 +63,25 @@ class SimpleTestPayload(BaseModel):
     numbers: List[float]
 
 class DescriptiveStatsPayload(BaseModel):
-    data: List[Dict[str, Any]]
+    data: Optional[List[Dict[str, Any]]] = None
+    datasetId: Optional[str] = None
     variables: List[str]
     groupBy: Optional[str] = None
+    plotMode: Optional[str] = None
+
+class ChartBatchPayload(BaseModel):
+    specs: List[Dict[str, Any]]
+
+@app.on_event("startup")
+def start_worker_pool():
+    preload_libraries()
+    worker_pool.start()
+    chart_renderer.start()
+
+@app.on_event("shutdown")
+def stop_worker_pool():
+    worker_pool.shutdown()
+    chart_renderer.shutdown()
 
 @app.get("/")
 def read_root():
@@ -51,11 +91,40 @@ def read_root():
 def health_check():
     return {"status": "ok"}
 
+def _query_params(request: Request):
+    """Analysis parameters sent alongside a binary dataset: ?params=<json> or plain query fields."""
+    if 'params' in request.query_params:
+        return json.loads(request.query_params['params'])
+    return dict(request.query_params)
+
+async def _read_dataset_request(request: Request, model):
+    """
+    (parameters, data) for the in-process endpoints. JSON bodies are
+    validated against `model` as before (data inline or a registered
+    datasetId); Arrow/Parquet bodies are read straight into a DataFrame with
+    the parameters taken from the query string.
+    """
+    fmt = dataset_io.binary_format(request.headers.get('content-type'))
+    if fmt is None:
+        params = model(**(await request.json()))
+        if params.datasetId:
+            return params, get_registry().load(params.datasetId)
+        if not params.data:
+            raise ValueError("Missing 'data' or 'datasetId'")
+        return params, params.data
+    path = dataset_io.spool(await request.body(), fmt)
+    try:
+        frame = dataset_io.read_frame(path)
+    finally:
+        os.remove(path)
+    return model(**_query_params(request), data=[]), frame
+
 @app.post("/api/analysis/effectiveness")
-async def analyze_effectiveness(payload: EffectivenessPayload):
+async def analyze_effectiveness(request: Request):
     try:
+        payload, data = await _read_dataset_request(request, EffectivenessPayload)
         results = run_effectiveness_analysis(
-            data=payload.data,
+            data=data,
             outcome_var=payload.outcome,
             time_var=payload.time,
             group_var=payload.group,
@@ -69,6 +138,8 @@ async def analyze_effectiveness(payload: EffectivenessPayload):
 
 @app.post("/api/analysis/simple-test")
 async def analyze_simple_test(payload: SimpleTestPayload):
+    if run_simple_test_analysis is None:
+        raise HTTPException(status_code=501, detail="Simple test analysis is not available")
     try:
         results = run_simple_test_analysis(payload.numbers)
         return {"results": results}
@@ -76,12 +147,14 @@ async def analyze_simple_test(payload: SimpleTestPayload):
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/analysis/descriptive")
-async def analyze_descriptive_stats(payload: DescriptiveStatsPayload):
+async def analyze_descriptive_stats(request: Request):
     try:
+        payload, data = await _read_dataset_request(request, DescriptiveStatsPayload)
         results = run_descriptive_stats_analysis(
-            data=payload.data,
+            data=data,
             variables=payload.variables,
-            group_by_var=payload.groupBy
+            group_by_var=payload.groupBy,
+            plot_mode=payload.plotMode
         )
         return results
     except Exception as e:
@@ -89,6 +162,184 @@ async def analyze_descriptive_stats(payload: DescriptiveStatsPayload):
         traceback.print_exc()
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/api/datasets")
+async def register_dataset(request: Request):
+    """
+    Store a dataset once (CSV, Arrow/Parquet, or JSON as {headers, rows,
+    columnTypes} or records) and return its datasetId and typed columns.
+    Analyses then take {'datasetId': ...} instead of 'data'.
+    """
+    body = await request.body()
+    try:
+        return await asyncio.to_thread(
+            get_registry().register, body, request.headers.get('content-type'),
+            request.query_params.get('filename'),
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/datasets/{dataset_id}")
+def dataset_info(dataset_id: str):
+    try:
+        return get_registry().info(dataset_id)
+    except DatasetNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.delete("/api/datasets/{dataset_id}")
+def delete_dataset(dataset_id: str):
+    try:
+        if get_registry().delete(dataset_id):
+            return {"deleted": dataset_id}
+    except DatasetNotFoundError:
+        pass
+    raise HTTPException(status_code=404, detail=f"Dataset '{dataset_id}' not found")
+
+@app.get("/api/run")
+def list_scripts():
+    return {"scripts": sorted(SCRIPT_REGISTRY)}
+
+@app.post("/api/run/{script}")
+async def run_script(script: str, request: Request):
+    """Run a stdin/stdout analysis script on the warm worker pool."""
+    if script not in SCRIPT_REGISTRY:
+        raise HTTPException(status_code=404, detail=f"Unknown analysis script '{script}'")
+    return await _run_on_pool(script, request, worker_pool.submit, 'main')
+
+def _discard(path):
+    if path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _result_key(script: str, entry: str, request: Request, body: bytes, fmt):
+    """Result-cache key for a CACHEABLE script's request, or None when it must not be cached."""
+    version = CACHEABLE_SCRIPTS.get(script)
+    if version is None:
+        return None
+    if fmt is not None:
+        return cache_key(f"{script}:{entry}", version, _query_params(request), bytes_digest(body))
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(payload, dict) or payload.get('dataPath'):
+        # A server-side file may change under the same path.
+        return None
+    return cache_key(f"{script}:{entry}", version, payload)
+
+async def _run_on_pool(script: str, request: Request, submit, entry: str):
+    """
+    Run a request on the worker pool. Results of CACHEABLE scripts are served
+    from / stored in the result cache, and identical requests already in
+    flight share one run. An Arrow/Parquet body is spooled to a file the
+    worker memory-maps (payload 'dataPath').
+    """
+    body = await request.body()
+    fmt = dataset_io.binary_format(request.headers.get('content-type'))
+    key = _result_key(script, entry, request, body, fmt)
+    future = None
+    if key is not None:
+        if request.headers.get('cache-control') != 'no-cache':
+            cached = result_cache.get(key, script)
+            if cached is not None:
+                return Response(content=cached, media_type="application/json", headers={"X-Cache": "HIT"})
+        future = _inflight.get(key)
+
+    spooled = None
+    owner = future is None
+    if owner:
+        if fmt is None:
+            text = body.decode('utf-8')
+        else:
+            spooled = dataset_io.spool(body, fmt)
+            text = json.dumps({**_query_params(request), 'dataPath': spooled})
+        try:
+            future = submit(script, text)
+        except PoolSaturatedError as e:
+            _discard(spooled)
+            raise HTTPException(status_code=503, detail=str(e))
+        if key is not None:
+            _inflight[key] = future
+            future.add_done_callback(lambda _: _inflight.pop(key, None))
+
+    try:
+        result = await asyncio.wrap_future(future)
+    finally:
+        _discard(spooled)
+    if not result['ok']:
+        raise HTTPException(status_code=400, detail=result['error'])
+    headers = {"Server-Timing": server_timing(result['timings'])}
+    if key is not None:
+        if owner:
+            result_cache.put(key, result['output'], script)
+        headers["X-Cache"] = "MISS"
+    return Response(content=result['output'], media_type="application/json", headers=headers)
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    """Result-cache hit/miss counters (overall and per script) and size."""
+    return {**result_cache.stats(), "cacheable": sorted(CACHEABLE_SCRIPTS)}
+
+@app.delete("/api/cache")
+def clear_cache():
+    result_cache.clear()
+    return {"cleared": True}
+
+def _png_response(chart_id: str, png: bytes):
+    # Chart ids are content hashes, so a rendered chart never changes.
+    return Response(
+        content=png,
+        media_type="image/png",
+        headers={"ETag": f'"{chart_id}"', "Cache-Control": "public, max-age=31536000, immutable"},
+    )
+
+@app.post("/api/charts/render")
+async def render_chart(spec: Dict[str, Any]):
+    """Render a chart spec returned by an analysis in plotMode 'spec' to PNG."""
+    chart_id, future = chart_renderer.submit(spec)
+    try:
+        png = await asyncio.wrap_future(future)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _png_response(chart_id, png)
+
+@app.post("/api/charts/render-batch")
+async def render_charts(payload: ChartBatchPayload):
+    """Render several specs concurrently; returns {chartId: data URI}."""
+    submitted = [chart_renderer.submit(spec) for spec in payload.specs]
+    try:
+        pngs = await asyncio.gather(*(asyncio.wrap_future(future) for _, future in submitted))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"charts": {
+        chart_id: "data:image/png;base64," + base64.b64encode(png).decode('utf-8')
+        for (chart_id, _), png in zip(submitted, pngs)
+    }}
+
+@app.get("/api/charts/{chart_id}")
+def get_chart(chart_id: str):
+    """A chart that has already been rendered, by id."""
+    png = chart_renderer.cached(chart_id)
+    if png is None:
+        raise HTTPException(status_code=404, detail=f"Chart '{chart_id}' has not been rendered")
+    return _png_response(chart_id, png)
+
+def _make_analysis_route(script: str):
+    async def analyze(request: Request):
+        return await _run_on_pool(script, request, worker_pool.submit_handler, 'handler')
+    return analyze
+
+def register_analysis_routes():
+    """Expose every module's run_<name>(payload) as POST /api/analysis/<slug>."""
+    taken = {route.path for route in app.routes}
+    for slug, script in sorted(HANDLER_REGISTRY.items()):
+        path = f"/api/analysis/{slug}"
+        if path in taken:
+            continue
+        app.add_api_route(path, _make_analysis_route(script), methods=["POST"], name=f"analyze_{script}")
+
+register_analysis_routes()
 
 if __name__ == "__main__":
     import uvicorn
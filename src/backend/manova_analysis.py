@@ -1,7 +1,6 @@
 import sys
 import json
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy import stats
@@ -14,6 +13,7 @@ from scipy.linalg import inv, det
 import warnings
 import io
 import base64
+from dataset_io import load_frame
 
 warnings.filterwarnings('ignore')
 
@@ -257,21 +257,26 @@ class MultivariateANOVA:
         buf.seek(0)
         return f"data:image/png;base64,{base64.b64encode(buf.read()).decode('utf-8')}"
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        data = pd.DataFrame(payload.get('data'))
-        dependent_vars = payload.get('dependentVars')
-        factor_vars = payload.get('factorVars')
+def run_manova_analysis(payload):
+    data = load_frame(payload)
+    dependent_vars = payload.get('dependentVars')
+    factor_vars = payload.get('factorVars')
+
+    if not all([not data.empty, dependent_vars, factor_vars]):
+        raise ValueError("Missing data, dependentVars, or factorVars")
 
-        if not all([not data.empty, dependent_vars, factor_vars]):
-            raise ValueError("Missing data, dependentVars, or factorVars")
+    manova = MultivariateANOVA(data, dependent_vars, factor_vars)
+    result = manova.one_way_manova()
+    plot_image = manova.plot_results(result)
 
-        manova = MultivariateANOVA(data, dependent_vars, factor_vars)
-        result = manova.one_way_manova()
-        plot_image = manova.plot_results(result)
+    response = {'results': result, 'plot': plot_image}
+    return response
 
-        response = {'results': result, 'plot': plot_image}
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_manova_analysis(payload)
         print(json.dumps(response, default=_to_native_type, indent=2))
 
     except Exception as e:
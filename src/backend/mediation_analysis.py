@@ -3,7 +3,6 @@
 import sys
 import json
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy import stats
@@ -12,8 +11,98 @@ from sklearn.preprocessing import StandardScaler
 import io
 import base64
 import warnings
+from dataset_io import load_frame, has_data
 warnings.filterwarnings('ignore')
 
+# Bootstrap draws use random_state=42, so results can be cached.
+CACHEABLE = True
+
+# Upper bound on (resamples x observations) elements drawn in one bootstrap chunk.
+BOOTSTRAP_CHUNK_ELEMENTS = 4_000_000
+
+# Largest nBootstrap a request may ask for.
+MAX_BOOTSTRAP = 100_000
+
+# The bootstrap distribution is returned as a histogram with this many bins
+# rather than as the raw draws.
+BOOTSTRAP_HISTOGRAM_BINS = 50
+
+
+def _indirect_from_moments(n, sx, sm, sy, sxx, sxm, sxy, smm, smy):
+    """
+    Closed-form a*b from (weighted) sums and cross-products.
+
+    a: slope of M ~ X, b: coefficient of M in Y ~ X + M. All arguments may be
+    arrays (one entry per resample), so a whole batch is solved at once.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cxx = sxx - sx * sx / n
+        cxm = sxm - sx * sm / n
+        cxy = sxy - sx * sy / n
+        cmm = smm - sm * sm / n
+        cmy = smy - sm * sy / n
+        a = cxm / cxx
+        b = (cxx * cmy - cxm * cxy) / (cxx * cmm - cxm * cxm)
+    return a * b
+
+
+def batched_indirect_effects(X, M, Y, n_bootstrap, random_state=42, chunk_size=None):
+    """
+    Bootstrap distribution of the indirect effect a*b without per-resample fits.
+
+    Each chunk of resamples is represented as a matrix of draw counts
+    (chunk x n); a single matmul against the per-observation moment columns
+    gives every resample's sums, from which a and b follow in closed form.
+    """
+    n = len(X)
+    rng = np.random.default_rng(random_state)
+    if chunk_size is None:
+        chunk_size = max(1, BOOTSTRAP_CHUNK_ELEMENTS // max(n, 1))
+    moments = np.column_stack([
+        np.ones(n), X, M, Y, X * X, X * M, X * Y, M * M, M * Y
+    ])
+
+    effects = np.empty(n_bootstrap)
+    for start in range(0, n_bootstrap, chunk_size):
+        size = min(chunk_size, n_bootstrap - start)
+        draws = rng.integers(0, n, size=(size, n))
+        offsets = (np.arange(size) * n)[:, None]
+        counts = np.bincount((draws + offsets).ravel(), minlength=size * n).reshape(size, n)
+        sums = counts @ moments
+        effects[start:start + size] = _indirect_from_moments(*sums.T)
+    return effects
+
+
+def jackknife_indirect_effects(X, M, Y):
+    """Leave-one-out indirect effects (n values), used for the BCa acceleration."""
+    moments = np.column_stack([
+        np.ones(len(X)), X, M, Y, X * X, X * M, X * Y, M * M, M * Y
+    ])
+    loo = moments.sum(axis=0) - moments
+    return _indirect_from_moments(*loo.T)
+
+
+def bca_interval(boot, estimate, jackknife, confidence_level=0.95):
+    """Bias-corrected and accelerated bootstrap interval."""
+    boot = boot[np.isfinite(boot)]
+    jackknife = jackknife[np.isfinite(jackknife)]
+    if len(boot) == 0:
+        return np.nan, np.nan
+
+    prop_below = np.mean(boot < estimate)
+    prop_below = np.clip(prop_below, 1.0 / (len(boot) + 1), len(boot) / (len(boot) + 1))
+    z0 = stats.norm.ppf(prop_below)
+
+    diffs = jackknife.mean() - jackknife
+    denom = 6.0 * np.sum(diffs ** 2) ** 1.5
+    accel = np.sum(diffs ** 3) / denom if denom > 0 else 0.0
+
+    alpha = 1 - confidence_level
+    z = stats.norm.ppf([alpha / 2, 1 - alpha / 2])
+    adjusted = stats.norm.cdf(z0 + (z0 + z) / (1 - accel * (z0 + z)))
+    lower, upper = np.percentile(boot, 100 * adjusted)
+    return lower, upper
+
 class MediationAnalysis:
     """
     매개분석을 수행하는 클래스
@@ -128,41 +217,50 @@ class MediationAnalysis:
         }
         return self.results['baron_kenny']
 
-    def bootstrap_analysis(self, n_bootstrap=5000, confidence_level=0.95):
-        np.random.seed(42)
-        indirect_effects = []
-        for _ in range(n_bootstrap):
-            indices = np.random.choice(self.n, self.n, replace=True)
-            X_boot, M_boot, Y_boot = self.X[indices], self.M[indices], self.Y[indices]
-            
-            path_a_boot = self._simple_regression(X_boot, M_boot)
-            path_bc_boot = self._multiple_regression(X_boot, M_boot, Y_boot)
-            
-            indirect_effect_boot = path_a_boot['coef'] * path_bc_boot['coef2']
-            indirect_effects.append(indirect_effect_boot)
-            
-        indirect_effects = np.array(indirect_effects)
+    def bootstrap_analysis(self, n_bootstrap=5000, confidence_level=0.95, ci_method='percentile', chunk_size=None):
+        indirect_effects = batched_indirect_effects(
+            self.X, self.M, self.Y, n_bootstrap, random_state=42, chunk_size=chunk_size
+        )
+        finite_effects = indirect_effects[np.isfinite(indirect_effects)]
+
         alpha = 1 - confidence_level
-        ci_lower = np.percentile(indirect_effects, 100 * alpha / 2)
-        ci_upper = np.percentile(indirect_effects, 100 * (1 - alpha / 2))
-        
+        ci_lower = np.percentile(finite_effects, 100 * alpha / 2)
+        ci_upper = np.percentile(finite_effects, 100 * (1 - alpha / 2))
+
+        jackknife = jackknife_indirect_effects(self.X, self.M, self.Y)
+        point_estimate = _indirect_from_moments(
+            self.n, self.X.sum(), self.M.sum(), self.Y.sum(),
+            self.X @ self.X, self.X @ self.M, self.X @ self.Y, self.M @ self.M, self.M @ self.Y
+        )
+        bca_lower, bca_upper = bca_interval(indirect_effects, point_estimate, jackknife, confidence_level)
+
+        if ci_method == 'bca':
+            sig_lower, sig_upper = bca_lower, bca_upper
+        else:
+            sig_lower, sig_upper = ci_lower, ci_upper
+
+        counts, edges = np.histogram(finite_effects, bins=BOOTSTRAP_HISTOGRAM_BINS)
         self.results['bootstrap'] = {
-            'indirect_effects': indirect_effects.tolist(),
-            'mean_effect': np.mean(indirect_effects),
-            'se': np.std(indirect_effects),
+            'histogram': {'counts': counts.tolist(), 'bin_edges': edges.tolist()},
+            'n_failed': int(indirect_effects.size - finite_effects.size),
+            'mean_effect': np.mean(finite_effects),
+            'se': np.std(finite_effects),
             'ci_lower': ci_lower,
             'ci_upper': ci_upper,
+            'bca_ci_lower': bca_lower,
+            'bca_ci_upper': bca_upper,
+            'ci_method': ci_method,
             'n_bootstrap': n_bootstrap,
             'confidence_level': confidence_level,
-            'significant': not (ci_lower <= 0 <= ci_upper)
+            'significant': not (sig_lower <= 0 <= sig_upper)
         }
         return self.results['bootstrap']
     
-    def analyze(self, method='both', n_bootstrap=1000):
+    def analyze(self, method='both', n_bootstrap=1000, ci_method='percentile'):
         if method in ['baron_kenny', 'both']:
             self.baron_kenny_analysis()
         if method in ['bootstrap', 'both']:
-            self.bootstrap_analysis(n_bootstrap=n_bootstrap)
+            self.bootstrap_analysis(n_bootstrap=n_bootstrap, ci_method=ci_method)
 
         self._determine_mediation_type()
         self._generate_interpretation()
@@ -211,9 +309,13 @@ class MediationAnalysis:
         if boot:
             sig_text = "significant" if boot['significant'] else "not significant"
             ci_text = f"does not contain zero" if boot['significant'] else f"contains zero"
+            if boot.get('ci_method') == 'bca':
+                ci_label, ci_lower, ci_upper = "95% BCa CI", boot['bca_ci_lower'], boot['bca_ci_upper']
+            else:
+                ci_label, ci_lower, ci_upper = "95% CI", boot['ci_lower'], boot['ci_upper']
             interp += (
                 f"A bootstrap analysis with {boot.get('n_bootstrap', 'N/A')} samples revealed a {sig_text} indirect effect of {self.X_name} on {self.Y_name} through {self.M_name} "
-                f"(Indirect Effect = {boot['mean_effect']:.3f}, 95% CI [{boot['ci_lower']:.3f}, {boot['ci_upper']:.3f}]). "
+                f"(Indirect Effect = {boot['mean_effect']:.3f}, {ci_label} [{ci_lower:.3f}, {ci_upper:.3f}]). "
                 f"Because the confidence interval {ci_text}, the mediation effect is statistically {sig_text}.\n"
             )
         else: # Fallback to Sobel
@@ -279,44 +381,59 @@ class MediationAnalysis:
         image_base64 = base64.b64encode(buf.read()).decode('utf-8')
         return f"data:image/png;base64,{image_base64}"
 
-def main():
+# Custom JSON encoder to handle numpy types
+class NpEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, np.integer):
+            return int(obj)
+        if isinstance(obj, np.floating):
+            if np.isnan(obj) or np.isinf(obj):
+                return None
+            return float(obj)
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        return super(NpEncoder, self).default(obj)
+
+def run_mediation_analysis(payload):
+    x_var = payload.get('xVar')
+    m_var = payload.get('mVar')
+    y_var = payload.get('yVar')
+
+    if not all([has_data(payload), x_var, m_var, y_var]):
+        raise ValueError("Missing 'data', 'xVar', 'mVar' or 'yVar'")
+
     try:
-        payload = json.load(sys.stdin)
-        data = payload.get('data')
-        x_var = payload.get('xVar')
-        m_var = payload.get('mVar')
-        y_var = payload.get('yVar')
+        n_bootstrap = int(payload.get('nBootstrap', 1000))
+    except (TypeError, ValueError):
+        raise ValueError("'nBootstrap' must be an integer.")
+    if not 1 <= n_bootstrap <= MAX_BOOTSTRAP:
+        raise ValueError(f"'nBootstrap' must be between 1 and {MAX_BOOTSTRAP}.")
 
-        if not all([data, x_var, m_var, y_var]):
-            raise ValueError("Missing 'data', 'xVar', 'mVar' or 'yVar'")
+    df = load_frame(payload)
 
-        df = pd.DataFrame(data)
-        
-        # Always standardize for mediation analysis as it's best practice
-        ma = MediationAnalysis(df, X=x_var, M=m_var, Y=y_var, standardize=True)
-        ma.analyze(method='both', n_bootstrap=1000)
-        
-        results = ma.results
-        plot_image = ma.plot_results()
+    # Always standardize for mediation analysis as it's best practice
+    ma = MediationAnalysis(df, X=x_var, M=m_var, Y=y_var, standardize=True)
+    ma.analyze(
+        method='both',
+        n_bootstrap=n_bootstrap,
+        ci_method=payload.get('ciMethod', 'percentile')
+    )
 
-        response = {
-            'results': results,
-            'plot': plot_image
-        }
-        
-        # Custom JSON encoder to handle numpy types
-        class NpEncoder(json.JSONEncoder):
-            def default(self, obj):
-                if isinstance(obj, np.integer):
-                    return int(obj)
-                if isinstance(obj, np.floating):
-                    if np.isnan(obj) or np.isinf(obj):
-                        return None
-                    return float(obj)
-                if isinstance(obj, np.ndarray):
-                    return obj.tolist()
-                return super(NpEncoder, self).default(obj)
+    results = ma.results
+    plot_image = ma.plot_results()
 
+    response = {
+        'results': results,
+        'plot': plot_image
+    }
+
+    return response
+
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_mediation_analysis(payload)
         print(json.dumps(response, cls=NpEncoder))
 
     except Exception as e:
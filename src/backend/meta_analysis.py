@@ -8,6 +8,9 @@ import warnings
 
 warnings.filterwarnings('ignore')
 
+# Closed-form pooling, no randomness: results can be cached.
+CACHEABLE = True
+
 def _to_native_type(obj):
     if isinstance(obj, np.integer):
         return int(obj)
@@ -109,27 +112,31 @@ def perform_meta_analysis(studies):
 
     return results
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        studies = payload.get('studies')
+def run_meta_analysis(payload):
+    studies = payload.get('studies')
 
-        if not studies or len(studies) < 2:
-            raise ValueError("At least two studies are required for meta-analysis.")
+    if not studies or len(studies) < 2:
+        raise ValueError("At least two studies are required for meta-analysis.")
 
-        analysis_results = perform_meta_analysis(studies)
-        
-        # Add studies with calculated weights to the final output
-        analysis_results['studies'] = studies
+    analysis_results = perform_meta_analysis(studies)
 
-        response = {
-            'results': analysis_results
-        }
-        
-        # Clean the final result of any non-compliant JSON values before dumping
-        cleaned_result = json.loads(json.dumps(response, default=_to_native_type))
-        
-        print(json.dumps(cleaned_result))
+    # Add studies with calculated weights to the final output
+    analysis_results['studies'] = studies
+
+    response = {
+        'results': analysis_results
+    }
+
+    # Clean the final result of any non-compliant JSON values before dumping
+    cleaned_result = json.loads(json.dumps(response, default=_to_native_type))
+    return cleaned_result
+
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_meta_analysis(payload)
+        print(json.dumps(response))
 
     except Exception as e:
         error_response = {"error": str(e)}
@@ -0,0 +1,169 @@
+"""
+Offline NLP resources shared by the text-analysis scripts
+(sentiment_analyzer, wordcloud_analysis).
+
+Lexicons, stopword lists and fonts are read from a local bundle directory
+(NLP_RESOURCE_DIR, default <backend>/resources/nlp) and loaded once per
+process. Nothing here ever touches the network at import or request time:
+
+    <NLP_RESOURCE_DIR>/
+        nltk_data/sentiment/vader_lexicon.zip   VADER lexicon
+        stopwords/<language>.txt                one word per line, merged
+                                                into the built-in lists
+        fonts/*.ttf|*.ttc|*.otf                 preferred plotting fonts
+
+Populate the bundle on a connected machine and ship it with the workers:
+
+    python nlp_resources.py --fetch
+
+Call warm_up() (done by worker_pool for every worker) or run
+``python nlp_resources.py --warm-up`` so the first request does not pay
+the loading cost.
+"""
+
+import os
+import re
+import sys
+import json
+import platform
+import warnings
+from functools import lru_cache
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+RESOURCE_DIR = os.environ.get('NLP_RESOURCE_DIR', os.path.join(BACKEND_DIR, 'resources', 'nlp'))
+NLTK_DATA_DIR = os.path.join(RESOURCE_DIR, 'nltk_data')
+STOPWORDS_DIR = os.path.join(RESOURCE_DIR, 'stopwords')
+FONTS_DIR = os.path.join(RESOURCE_DIR, 'fonts')
+
+VADER_RESOURCE = 'sentiment/vader_lexicon.zip'
+
+# Hangul syllables.
+KOREAN_PATTERN = re.compile('[\uac00-\ud7a3]')
+
+FONT_EXTENSIONS = ('.ttf', '.ttc', '.otf')
+FONT_KEYWORDS = ('nanum', 'malgun', 'gothic')
+
+# Well-known Korean-capable fonts per platform.
+SYSTEM_FONT_PATHS = {
+    'Windows': ['C:/Windows/Fonts/malgun.ttf'],
+    'Darwin': ['/System/Library/Fonts/Apple SD Gothic Neo.ttc'],
+    'Linux': ['/usr/share/fonts/truetype/nanum/NanumGothic.ttf'],
+}
+
+try:
+    import nltk
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+    NLTK_AVAILABLE = True
+except ImportError:
+    NLTK_AVAILABLE = False
+
+try:
+    from konlpy.tag import Okt
+    KONLPY_AVAILABLE = True
+except ImportError:
+    KONLPY_AVAILABLE = False
+
+try:
+    from wordcloud import STOPWORDS as WORDCLOUD_STOPWORDS
+except ImportError:
+    WORDCLOUD_STOPWORDS = set()
+
+
+@lru_cache(maxsize=1)
+def get_vader():
+    """VADER analyzer from the local lexicon, or None if it is not installed."""
+    if not NLTK_AVAILABLE:
+        return None
+    try:
+        nltk.data.find(VADER_RESOURCE)
+    except LookupError:
+        warnings.warn(f"VADER lexicon not found under {NLTK_DATA_DIR}; run 'python nlp_resources.py --fetch'.")
+        return None
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
+
+@lru_cache(maxsize=1)
+def get_okt():
+    """Shared Okt tokenizer (starts the JVM once per process), or None."""
+    return Okt() if KONLPY_AVAILABLE else None
+
+
+@lru_cache(maxsize=None)
+def get_stopwords(language='english'):
+    """Built-in stopwords for the language merged with <RESOURCE_DIR>/stopwords/<language>.txt."""
+    words = set(WORDCLOUD_STOPWORDS) if language == 'english' else set()
+    path = os.path.join(STOPWORDS_DIR, f'{language}.txt')
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            words.update(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    return frozenset(words)
+
+
+def _bundled_font():
+    if not os.path.isdir(FONTS_DIR):
+        return None
+    fonts = sorted(f for f in os.listdir(FONTS_DIR) if f.lower().endswith(FONT_EXTENSIONS))
+    preferred = [f for f in fonts if any(keyword in f.lower() for keyword in FONT_KEYWORDS)]
+    chosen = (preferred or fonts or [None])[0]
+    return os.path.join(FONTS_DIR, chosen) if chosen else None
+
+
+@lru_cache(maxsize=1)
+def get_font_path():
+    """
+    Korean-capable font: NLP_FONT_PATH, then the bundled fonts directory,
+    then well-known system paths, then matplotlib's already-built font list.
+    """
+    explicit = os.environ.get('NLP_FONT_PATH')
+    if explicit and os.path.exists(explicit):
+        return explicit
+
+    bundled = _bundled_font()
+    if bundled:
+        return bundled
+
+    for path in SYSTEM_FONT_PATHS.get(platform.system(), []):
+        if os.path.exists(path):
+            return path
+
+    # fontManager is matplotlib's cached font index, so this does not rescan disks.
+    try:
+        import matplotlib.font_manager as fm
+        for font in fm.fontManager.ttflist:
+            if any(keyword in font.name.lower() for keyword in FONT_KEYWORDS):
+                return font.fname
+    except Exception:
+        pass
+    return None
+
+
+def warm_up(korean=True):
+    """Load every resource into this process now; returns what was found."""
+    status = {
+        'resource_dir': RESOURCE_DIR,
+        'vader': get_vader() is not None,
+        'stopwords': len(get_stopwords('english')),
+        'font_path': get_font_path(),
+    }
+    if korean:
+        status['okt'] = get_okt() is not None
+    return status
+
+
+def fetch_resources():
+    """Download the NLTK data into the bundle directory (needs network; run once at build time)."""
+    if not NLTK_AVAILABLE:
+        raise ImportError("nltk is required to fetch the VADER lexicon.")
+    os.makedirs(NLTK_DATA_DIR, exist_ok=True)
+    os.makedirs(STOPWORDS_DIR, exist_ok=True)
+    os.makedirs(FONTS_DIR, exist_ok=True)
+    return nltk.download('vader_lexicon', download_dir=NLTK_DATA_DIR, quiet=True)
+
+
+if __name__ == '__main__':
+    if '--fetch' in sys.argv:
+        print(json.dumps({'fetched': bool(fetch_resources()), 'resource_dir': RESOURCE_DIR}))
+    else:
+        print(json.dumps(warm_up(korean='--no-korean' not in sys.argv)))
@@ -12,6 +12,7 @@ from typing import Dict, List, Tuple, Optional, Union
 import io
 import base64
 import math
+from dataset_io import load_frame, has_data
 
 warnings.filterwarnings('ignore')
 
@@ -700,36 +701,41 @@ class NonParametricTests:
         image_base64 = base64.b64encode(buf.read()).decode('utf-8')
         return f"data:image/png;base64,{image_base64}"
 
+def run_nonparametric_analysis(payload):
+    data = load_frame(payload)
+    test_type = payload.get('testType')
+    params = payload.get('params')
+
+    if not has_data(payload) or not test_type or not params:
+        raise ValueError("Missing data, testType, or params")
+
+    tester = NonParametricTests(data)
+    result = {}
+
+    if test_type == 'mann_whitney':
+        result = tester.mann_whitney_u_test(**params)
+    elif test_type == 'wilcoxon':
+        result = tester.wilcoxon_signed_rank_test(**params)
+    elif test_type == 'kruskal_wallis':
+        result = tester.kruskal_wallis_test(**params)
+    elif test_type == 'friedman':
+        result = tester.friedman_test(**params)
+    elif test_type == 'mcnemar':
+        result = tester.mcnemar_test(**params)
+    else:
+        raise ValueError(f"Unknown test type: {test_type}")
+
+    tester.results[test_type] = result
+    plot_image = tester.plot_results(test_type)
+
+    response = { 'results': result, 'plot': plot_image }
+    return response
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        data = payload.get('data')
-        test_type = payload.get('testType')
-        params = payload.get('params')
-
-        if data is None or not test_type or not params:
-            raise ValueError("Missing data, testType, or params")
-
-        tester = NonParametricTests(data)
-        result = {}
-        
-        if test_type == 'mann_whitney':
-            result = tester.mann_whitney_u_test(**params)
-        elif test_type == 'wilcoxon':
-            result = tester.wilcoxon_signed_rank_test(**params)
-        elif test_type == 'kruskal_wallis':
-            result = tester.kruskal_wallis_test(**params)
-        elif test_type == 'friedman':
-            result = tester.friedman_test(**params)
-        elif test_type == 'mcnemar':
-            result = tester.mcnemar_test(**params)
-        else:
-            raise ValueError(f"Unknown test type: {test_type}")
-        
-        tester.results[test_type] = result
-        plot_image = tester.plot_results(test_type)
-        
-        response = { 'results': result, 'plot': plot_image }
+        response = run_nonparametric_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
@@ -74,17 +74,22 @@ def calculate_nps(scores):
         "interpretation": get_nps_interpretation(nps_score, promoters, passives, detractors, total)
     }
 
+def run_nps_analysis(payload):
+    scores = payload.get('scores')
+
+    if scores is None:
+        raise ValueError("Missing 'scores' data")
+
+    results = calculate_nps(scores)
+
+    response = { "results": results }
+    return response
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        scores = payload.get('scores')
-
-        if scores is None:
-            raise ValueError("Missing 'scores' data")
-
-        results = calculate_nps(scores)
-        
-        response = { "results": results }
+        response = run_nps_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
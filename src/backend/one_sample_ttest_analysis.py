@@ -89,27 +89,31 @@ def create_plot(data_series, test_mean, variable_name):
     
     return {'distribution_plot': plot_base64}
 
+def run_one_sample_ttest_analysis(input_data):
+    df = pd.DataFrame(input_data['data'])
+    variable = input_data['variable']
+    test_mean = float(input_data['test_mean'])
+
+    if variable not in df.columns:
+        raise ValueError(f"Variable '{variable}' not found in data.")
+
+    data_series = df[variable].dropna()
+
+    if len(data_series) < 2:
+        raise ValueError("Not enough data points to perform the test.")
+
+    results = one_sample_ttest(data_series, test_mean)
+    plots = create_plot(data_series, test_mean, variable)
+
+    output = {'results': results, 'plots': plots}
+    return output
+
+
 def main():
     try:
         input_data = json.loads(sys.stdin.read())
-        
-        df = pd.DataFrame(input_data['data'])
-        variable = input_data['variable']
-        test_mean = float(input_data['test_mean'])
-        
-        if variable not in df.columns:
-            raise ValueError(f"Variable '{variable}' not found in data.")
-            
-        data_series = df[variable].dropna()
-        
-        if len(data_series) < 2:
-            raise ValueError("Not enough data points to perform the test.")
-
-        results = one_sample_ttest(data_series, test_mean)
-        plots = create_plot(data_series, test_mean, variable)
-        
-        output = {'results': results, 'plots': plots}
-        print(json.dumps(output, allow_nan=True))
+        response = run_one_sample_ttest_analysis(input_data)
+        print(json.dumps(response, allow_nan=True))
 
     except Exception as e:
         print(json.dumps({'error': str(e)}))
@@ -7,6 +7,7 @@ from linearmodels.panel import PanelOLS, RandomEffects
 import statsmodels.api as sm
 from scipy import stats
 import warnings
+from dataset_io import load_frame
 
 warnings.filterwarnings('ignore')
 
@@ -101,102 +102,106 @@ def manual_hausman_test(fe_model, re_model):
         raise ValueError("Could not compute Hausman test. The difference in covariance matrices is singular. This can happen with robust standard errors or if models are too similar.")
 
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        data = pd.DataFrame(payload.get('data'))
-        dependent = payload.get('dependent')
-        exog = payload.get('exog_cols') or payload.get('exog') # Handles both names
-        entity_col = payload.get('entity_col')
-        time_col = payload.get('time_col')
-
-        if not all([data is not None, dependent, exog, entity_col, time_col]):
-            raise ValueError("Missing required parameters.")
-            
-        df = data.copy()
-        
-        for col in [dependent] + exog:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        df = df.dropna(subset=[dependent] + exog + [entity_col, time_col])
-        
-        if df.empty:
-            raise ValueError("No valid data for panel analysis after cleaning.")
+def run_panel_data_regression_analysis(payload):
+    data = load_frame(payload)
+    dependent = payload.get('dependent')
+    exog = payload.get('exog_cols') or payload.get('exog') # Handles both names
+    entity_col = payload.get('entity_col')
+    time_col = payload.get('time_col')
 
-        df[time_col] = pd.to_datetime(df[time_col])
-        df = df.set_index([entity_col, time_col])
-        
-        y = df[dependent]
-        X = sm.add_constant(df[exog])
+    if not all([data is not None, dependent, exog, entity_col, time_col]):
+        raise ValueError("Missing required parameters.")
 
-        # --- Pooled OLS ---
-        pooled_ols = PanelOLS(y, X).fit(cov_type='robust')
-        
-        # --- Fixed Effects ---
-        fe_model = PanelOLS(y, X, entity_effects=True).fit(cov_type='robust')
-        
-        # --- Random Effects ---
-        re_model = RandomEffects(y, X).fit(cov_type='robust')
+    df = data.copy()
+
+    for col in [dependent] + exog:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    df = df.dropna(subset=[dependent] + exog + [entity_col, time_col])
+
+    if df.empty:
+        raise ValueError("No valid data for panel analysis after cleaning.")
+
+    df[time_col] = pd.to_datetime(df[time_col])
+    df = df.set_index([entity_col, time_col])
+
+    y = df[dependent]
+    X = sm.add_constant(df[exog])
+
+    # --- Pooled OLS ---
+    pooled_ols = PanelOLS(y, X).fit(cov_type='robust')
+
+    # --- Fixed Effects ---
+    fe_model = PanelOLS(y, X, entity_effects=True).fit(cov_type='robust')
 
-        # --- F-test for entity effects ---
-        f_test_results = {}
+    # --- Random Effects ---
+    re_model = RandomEffects(y, X).fit(cov_type='robust')
+
+    # --- F-test for entity effects ---
+    f_test_results = {}
+    try:
+        f_test_entity = fe_model.f_statistic_robust
+        f_test_results = {
+            'statistic': f_test_entity.stat, 'p_value': f_test_entity.pval, 'df': f_test_entity.df, 'df_resid': f_test_entity.df_resid,
+            'interpretation': 'Fixed effects are significant (use FE over OLS)' if f_test_entity.pval < 0.05 else 'Fixed effects are not significant (OLS may be sufficient)'
+        }
+    except Exception as e:
+        f_test_results = {'statistic': None, 'p_value': None, 'interpretation': f'F-test could not be computed: {e}'}
+
+    # --- Hausman Test ---
+    hausman_results = {}
+    try:
+        fe_nonrobust = PanelOLS(y, X, entity_effects=True).fit()
+        re_nonrobust = RandomEffects(y, X).fit()
+        chi2_stat, p_value, df_hausman = manual_hausman_test(fe_nonrobust, re_nonrobust)
+        hausman_results = {
+            'statistic': chi2_stat, 'p_value': p_value, 'df': df_hausman,
+            'interpretation': 'Fixed Effects Recommended' if p_value < 0.05 else 'Random Effects Recommended'
+        }
+    except Exception as e:
+        hausman_results = {'error': str(e), 'p_value': None, 'interpretation': f'Test failed: {e}'}
+
+    def format_summary(model_fit, name):
+        summary = {
+            'name': name,
+            'params': model_fit.params.to_dict(),
+            'pvalues': model_fit.pvalues.to_dict(),
+            'tstats': model_fit.tstats.to_dict(),
+            'rsquared': None,
+            'rsquared_within': None
+        }
         try:
-            f_test_entity = fe_model.f_statistic_robust
-            f_test_results = {
-                'statistic': f_test_entity.stat, 'p_value': f_test_entity.pval, 'df': f_test_entity.df, 'df_resid': f_test_entity.df_resid,
-                'interpretation': 'Fixed effects are significant (use FE over OLS)' if f_test_entity.pval < 0.05 else 'Fixed effects are not significant (OLS may be sufficient)'
-            }
-        except Exception as e:
-            f_test_results = {'statistic': None, 'p_value': None, 'interpretation': f'F-test could not be computed: {e}'}
-
-        # --- Hausman Test ---
-        hausman_results = {}
+            summary['rsquared'] = getattr(model_fit, 'rsquared_overall', getattr(model_fit, 'rsquared', None))
+        except Exception: pass
         try:
-            fe_nonrobust = PanelOLS(y, X, entity_effects=True).fit()
-            re_nonrobust = RandomEffects(y, X).fit()
-            chi2_stat, p_value, df_hausman = manual_hausman_test(fe_nonrobust, re_nonrobust)
-            hausman_results = {
-                'statistic': chi2_stat, 'p_value': p_value, 'df': df_hausman,
-                'interpretation': 'Fixed Effects Recommended' if p_value < 0.05 else 'Random Effects Recommended'
-            }
-        except Exception as e:
-            hausman_results = {'error': str(e), 'p_value': None, 'interpretation': f'Test failed: {e}'}
-            
-        def format_summary(model_fit, name):
-            summary = {
-                'name': name,
-                'params': model_fit.params.to_dict(),
-                'pvalues': model_fit.pvalues.to_dict(),
-                'tstats': model_fit.tstats.to_dict(),
-                'rsquared': None,
-                'rsquared_within': None
-            }
-            try:
-                summary['rsquared'] = getattr(model_fit, 'rsquared_overall', getattr(model_fit, 'rsquared', None))
-            except Exception: pass
-            try:
-                summary['rsquared_within'] = getattr(model_fit, 'rsquared_within', None)
-            except Exception: pass
-            return summary
-
-        pooled_res = format_summary(pooled_ols, 'Pooled OLS')
-        fe_res = format_summary(fe_model, 'Fixed Effects')
-        re_res = format_summary(re_model, 'Random Effects')
-        
-        interpretation = generate_interpretation(fe_res, re_res, hausman_results, f_test_results)
-
-        response = {
-            'results': {
-                'pooled_ols': pooled_res,
-                'fixed_effects': fe_res,
-                'random_effects': re_res,
-                'f_test_entity': f_test_results,
-                'hausman_test': hausman_results,
-                'interpretation': interpretation
-            }
+            summary['rsquared_within'] = getattr(model_fit, 'rsquared_within', None)
+        except Exception: pass
+        return summary
+
+    pooled_res = format_summary(pooled_ols, 'Pooled OLS')
+    fe_res = format_summary(fe_model, 'Fixed Effects')
+    re_res = format_summary(re_model, 'Random Effects')
+
+    interpretation = generate_interpretation(fe_res, re_res, hausman_results, f_test_results)
+
+    response = {
+        'results': {
+            'pooled_ols': pooled_res,
+            'fixed_effects': fe_res,
+            'random_effects': re_res,
+            'f_test_entity': f_test_results,
+            'hausman_test': hausman_results,
+            'interpretation': interpretation
         }
-        
+    }
+    return response
+
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_panel_data_regression_analysis(payload)
         print(json.dumps(response, default=_to_native_type, ensure_ascii=False))
 
     except Exception as e:
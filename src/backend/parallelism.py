@@ -0,0 +1,57 @@
+"""
+Sizing and start method for process pools an analysis opens itself
+(bootstrap resamples, per-DMU LPs, model fits).
+
+The analysis server already runs ANALYSIS_WORKERS warm interpreters, so a
+nested pool competes with them for the same CPUs. Inside a pool worker an
+analysis therefore runs serially unless ANALYSIS_NESTED_JOBS says otherwise;
+elsewhere (one-off script runs) it gets cpu_count // ANALYSIS_WORKERS
+processes. Nested pools use spawn: forking a warm worker would copy its
+BLAS/JVM threads and any locks they hold.
+"""
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_MAX_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+# Set by worker_pool in every analysis pool worker.
+IN_WORKER_ENV = 'ANALYSIS_IN_WORKER'
+
+# Processes one analysis may start; overrides the default sizing below.
+NESTED_JOBS_ENV = 'ANALYSIS_NESTED_JOBS'
+
+
+def in_pool_worker():
+    return os.environ.get(IN_WORKER_ENV) == '1'
+
+
+def max_nested_jobs():
+    """Processes a single analysis may use for its own pool."""
+    if os.environ.get(NESTED_JOBS_ENV):
+        return max(1, int(os.environ[NESTED_JOBS_ENV]))
+    if in_pool_worker():
+        return 1
+    workers = int(os.environ.get('ANALYSIS_WORKERS', DEFAULT_MAX_WORKERS))
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def nested_jobs(n_jobs=None, worthwhile=True):
+    """
+    Pool size for an analysis: an explicit n_jobs is capped at
+    max_nested_jobs(), and None means 1 unless the work is worth a pool.
+    """
+    limit = max_nested_jobs()
+    if n_jobs is None:
+        return limit if worthwhile else 1
+    if int(n_jobs) < 0:
+        # joblib's -1: every CPU this analysis is allowed
+        return limit
+    return max(1, min(int(n_jobs), limit))
+
+
+def process_pool(n_jobs, initializer=None):
+    """ProcessPoolExecutor using the spawn start method."""
+    return ProcessPoolExecutor(max_workers=n_jobs, initializer=initializer,
+                               mp_context=multiprocessing.get_context('spawn'))
@@ -10,6 +10,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import io
 import base64
+from dataset_io import load_frame, has_data
 
 def _to_native_type(obj):
     if isinstance(obj, np.integer):
@@ -24,66 +25,69 @@ def _to_native_type(obj):
         return bool(obj)
     return obj
 
+def run_partial_correlation_analysis(payload):
+    variables = payload.get('variables')
+    control_vars = payload.get('controlVars')
+    method = payload.get('method', 'pearson')
+
+    if not has_data(payload) or not variables:
+        raise ValueError("Missing 'data' or 'variables'")
+
+    df = load_frame(payload)
+
+    all_cols = list(set(variables + (control_vars or [])))
+    df_clean = df[all_cols].copy()
+    for col in df_clean.columns:
+        df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
+
+    df_clean.dropna(inplace=True)
+
+    if df_clean.shape[0] < 2:
+        raise ValueError("Not enough valid data points for analysis.")
+
+    # Perform partial correlation
+    pcorr_matrix = pg.pcorr(df_clean, method=method, x=variables, y=variables, covar=control_vars).set_index('X')
+
+    # Since pcorr gives a matrix of X vs Y, we need to reformat it into a square matrix
+    # and extract the p-values and other stats if needed.
+    # For simplicity, we will just return the main correlation matrix for now.
+
+    # We'll re-run for p-values (this is not efficient but simpler to implement)
+    p_values = pcorr_matrix.copy()
+    for x in variables:
+        for y in variables:
+            if x == y:
+                p_values.loc[x, y] = 1.0
+            else:
+                res = pg.pcorr(df_clean, x=x, y=y, covar=control_vars, method=method)
+                p_values.loc[x, y] = res['p-val'].iloc[0]
+
+    # Generate Heatmap
+    plt.figure(figsize=(10, 8))
+    sns.heatmap(pcorr_matrix, annot=True, cmap='coolwarm', fmt=".2f", vmin=-1, vmax=1)
+    plt.title(f'Partial Correlation Matrix ({method.capitalize()})', fontsize=16)
+    plt.xticks(rotation=45, ha='right')
+    plt.yticks(rotation=0)
+    plt.tight_layout()
+
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png')
+    plt.close()
+    buf.seek(0)
+    heatmap_plot_img = base64.b64encode(buf.read()).decode('utf-8')
+
+    response = {
+        "correlation_matrix": pcorr_matrix.to_dict(),
+        "p_value_matrix": p_values.to_dict(),
+        "heatmap_plot": f"data:image/png;base64,{heatmap_plot_img}",
+    }
+    return response
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        data = payload.get('data')
-        variables = payload.get('variables')
-        control_vars = payload.get('controlVars')
-        method = payload.get('method', 'pearson')
-
-        if not data or not variables:
-            raise ValueError("Missing 'data' or 'variables'")
-
-        df = pd.DataFrame(data)
-        
-        all_cols = list(set(variables + (control_vars or [])))
-        df_clean = df[all_cols].copy()
-        for col in df_clean.columns:
-            df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
-        
-        df_clean.dropna(inplace=True)
-        
-        if df_clean.shape[0] < 2:
-            raise ValueError("Not enough valid data points for analysis.")
-
-        # Perform partial correlation
-        pcorr_matrix = pg.pcorr(df_clean, method=method, x=variables, y=variables, covar=control_vars).set_index('X')
-
-        # Since pcorr gives a matrix of X vs Y, we need to reformat it into a square matrix
-        # and extract the p-values and other stats if needed.
-        # For simplicity, we will just return the main correlation matrix for now.
-        
-        # We'll re-run for p-values (this is not efficient but simpler to implement)
-        p_values = pcorr_matrix.copy()
-        for x in variables:
-            for y in variables:
-                if x == y:
-                    p_values.loc[x, y] = 1.0
-                else:
-                    res = pg.pcorr(df_clean, x=x, y=y, covar=control_vars, method=method)
-                    p_values.loc[x, y] = res['p-val'].iloc[0]
-
-        # Generate Heatmap
-        plt.figure(figsize=(10, 8))
-        sns.heatmap(pcorr_matrix, annot=True, cmap='coolwarm', fmt=".2f", vmin=-1, vmax=1)
-        plt.title(f'Partial Correlation Matrix ({method.capitalize()})', fontsize=16)
-        plt.xticks(rotation=45, ha='right')
-        plt.yticks(rotation=0)
-        plt.tight_layout()
-        
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png')
-        plt.close()
-        buf.seek(0)
-        heatmap_plot_img = base64.b64encode(buf.read()).decode('utf-8')
-
-        response = {
-            "correlation_matrix": pcorr_matrix.to_dict(),
-            "p_value_matrix": p_values.to_dict(),
-            "heatmap_plot": f"data:image/png;base64,{heatmap_plot_img}",
-        }
-
+        response = run_partial_correlation_analysis(payload)
         print(json.dumps(response, default=_to_native_type, ensure_ascii=False))
 
     except Exception as e:
@@ -10,9 +10,13 @@ import seaborn as sns
 import io
 import base64
 import warnings
+from dataset_io import load_frame, has_data
 
 warnings.filterwarnings('ignore')
 
+# Deterministic for a given payload (served from the result cache).
+CACHEABLE = True
+
 def _to_native_type(obj):
     if isinstance(obj, np.integer):
         return int(obj)
@@ -96,25 +100,29 @@ class PcaAnalysis:
         buf.seek(0)
         return f"data:image/png;base64,{base64.b64encode(buf.read()).decode('utf-8')}"
 
+def run_pca_analysis(payload):
+    data = load_frame(payload)
+    variables = payload.get('variables')
+    n_components = payload.get('nComponents') 
+
+    if not has_data(payload) or not variables:
+        raise ValueError("Missing 'data' or 'variables'")
+
+    pca_analysis = PcaAnalysis(data, variables, n_components)
+    pca_analysis.run_analysis()
+    plot_image = pca_analysis.plot_results()
+
+    response = {
+        'results': pca_analysis.results,
+        'plot': plot_image
+    }
+    return response
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        data = payload.get('data')
-        variables = payload.get('variables')
-        n_components = payload.get('nComponents') 
-
-        if not data or not variables:
-            raise ValueError("Missing 'data' or 'variables'")
-
-        pca_analysis = PcaAnalysis(data, variables, n_components)
-        pca_analysis.run_analysis()
-        plot_image = pca_analysis.plot_results()
-        
-        response = {
-            'results': pca_analysis.results,
-            'plot': plot_image
-        }
-        
+        response = run_pca_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
@@ -2,15 +2,16 @@
 import sys
 import json
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
 from scipy import stats
+from scipy.optimize import linear_sum_assignment
 import warnings
 import io
 import base64
+from dataset_io import load_frame
 
 warnings.filterwarnings('ignore')
 
@@ -25,6 +26,10 @@ except:
 
 sns.set_palette("husl")
 
+# Optimal matching solves a dense n_treated*ratio x n_control assignment;
+# above this many cells nearest-neighbour matching should be used instead.
+OPTIMAL_MAX_CELLS = 25_000_000
+
 def _to_native_type(obj):
     if isinstance(obj, np.integer): return int(obj)
     if isinstance(obj, (np.floating, float)):
@@ -33,6 +38,146 @@ def _to_native_type(obj):
     if isinstance(obj, np.ndarray): return obj.tolist()
     return obj
 
+class SortedScoreIndex:
+    """
+    Control propensity scores sorted once, with nearest-available lookup by
+    binary search. Removed controls are skipped through two path-compressed
+    "next available" pointer arrays, so matching without replacement costs
+    O(log n) per pick instead of a scan over every control.
+    """
+
+    def __init__(self, scores, ids):
+        order = np.lexsort((ids, scores))
+        self.scores = np.asarray(scores, dtype=float)[order]
+        self.ids = np.asarray(ids)[order]
+        n = len(self.scores)
+        # Start of the run of equal scores each position belongs to.
+        new_run = np.ones(n, dtype=bool)
+        new_run[1:] = self.scores[1:] != self.scores[:-1]
+        self.run_start = np.maximum.accumulate(np.where(new_run, np.arange(n), 0))
+        # _right[i]: first available position >= i (n = none);
+        # _left[i + 1]: last available position <= i (0 = none).
+        self._right = list(range(n + 1))
+        self._left = list(range(n + 1))
+        self._score_list = self.scores.tolist()
+
+    @staticmethod
+    def _find(parent, i):
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    def _first_available(self, i):
+        return self._find(self._right, i)
+
+    def _last_available(self, i):
+        return self._find(self._left, i + 1) - 1
+
+    def _remove(self, pos):
+        self._right[pos] = pos + 1
+        self._left[pos + 1] = pos
+
+    def _nearest_available(self, score):
+        n = len(self._score_list)
+        pos = int(np.searchsorted(self.scores, score))
+        right = self._first_available(pos) if pos < n else n
+        left = self._last_available(pos - 1) if pos > 0 else -1
+        best, best_dist = -1, np.inf
+        if left >= 0:
+            # Lowest-index control among the equal scores on the left.
+            left = self._first_available(self.run_start[left])
+            best, best_dist = left, abs(self._score_list[left] - score)
+        if right < n:
+            d = abs(self._score_list[right] - score)
+            if d < best_dist or (d == best_dist and self.ids[right] < self.ids[best]):
+                best, best_dist = right, d
+        return best, best_dist
+
+    def nearest(self, scores, caliper):
+        """Vectorised nearest control id per score (with replacement); -1 if none within caliper."""
+        scores = np.asarray(scores, dtype=float)
+        n = len(self.scores)
+        out = np.full(len(scores), -1, dtype=int)
+        if n == 0:
+            return out
+        pos = np.searchsorted(self.scores, scores)
+        left = self.run_start[np.clip(pos - 1, 0, n - 1)]
+        right = np.clip(pos, 0, n - 1)
+        d_left = np.where(pos > 0, np.abs(self.scores[left] - scores), np.inf)
+        d_right = np.where(pos < n, np.abs(self.scores[right] - scores), np.inf)
+        take_right = (d_right < d_left) | ((d_right == d_left) & (self.ids[right] < self.ids[left]))
+        best = np.where(take_right, right, left)
+        dist = np.minimum(d_left, d_right)
+        ok = dist <= caliper
+        out[ok] = self.ids[best[ok]]
+        return out
+
+    def take(self, score, k, caliper):
+        """Remove and return up to k nearest available control ids within the caliper."""
+        picked = []
+        for _ in range(k):
+            pos, dist = self._nearest_available(score)
+            if pos < 0 or dist > caliper:
+                break
+            picked.append(int(self.ids[pos]))
+            self._remove(pos)
+        return picked
+
+    def peek(self, score, k, caliper):
+        """Up to k nearest control ids within the caliper, nothing removed."""
+        n = len(self._score_list)
+        right = int(np.searchsorted(self.scores, score))
+        left = right - 1
+        picked = []
+        while len(picked) < k:
+            d_left = score - self._score_list[left] if left >= 0 else np.inf
+            d_right = self._score_list[right] - score if right < n else np.inf
+            if min(d_left, d_right) > caliper:
+                break
+            if d_right < d_left:
+                picked.append(int(self.ids[right]))
+                right += 1
+            else:
+                picked.append(int(self.ids[left]))
+                left -= 1
+        return picked
+
+
+def standardized_mean_differences(X, treated_rows, control_rows, control_weights=None):
+    """
+    SMD per column: weighted mean difference over the pooled standard deviation
+    (ddof=1 variances; control weights let k:1 matches count once per treated).
+    """
+    X = np.asarray(X, dtype=float)
+    treated = X[treated_rows]
+    control = X[control_rows]
+    w = np.ones(len(control)) if control_weights is None else np.asarray(control_weights, dtype=float)
+
+    def _mean_var(values, weights):
+        total = weights.sum()
+        mean = weights @ values / total
+        var = weights @ (values - mean) ** 2 / (total - 1) if total > 1 else np.full(values.shape[1], np.nan)
+        return mean, var
+
+    mean_t, var_t = _mean_var(treated, np.ones(len(treated)))
+    mean_c, var_c = _mean_var(control, w)
+    pooled = np.sqrt((var_t + var_c) / 2)
+    smd = np.zeros(X.shape[1])
+    np.divide(mean_t - mean_c, pooled, out=smd, where=pooled > 0)
+    return smd
+
+
+def _pair_arrays(matched_pairs):
+    """Treated rows, control rows and 1/k control weights for k:1 pairs."""
+    pairs = np.asarray(matched_pairs, dtype=int).reshape(-1, 2)
+    treated, control = pairs[:, 0], pairs[:, 1]
+    _, inverse, counts = np.unique(treated, return_inverse=True, return_counts=True)
+    return treated, control, 1.0 / counts[inverse]
+
+
 class AdvancedPSM:
     def __init__(self, caliper=0.2, replacement=False, estimator='logistic'):
         self.caliper = caliper
@@ -63,39 +208,69 @@ class AdvancedPSM:
 
         return prop_scores
 
-    def nearest_neighbor_matching(self, prop_scores, treatment):
+    def nearest_neighbor_matching(self, prop_scores, treatment, ratio=1):
+        """
+        Greedy nearest-neighbour matching in treated order, up to `ratio`
+        controls per treated unit within the caliper. Ties go to the control
+        with the lowest row index.
+        """
+        prop_scores = np.asarray(prop_scores, dtype=float)
+        treatment = np.asarray(treatment)
         treated_idx = np.where(treatment == 1)[0]
         control_idx = np.where(treatment == 0)[0]
-        
+
+        index = SortedScoreIndex(prop_scores[control_idx], control_idx)
+        if self.replacement and ratio == 1:
+            matches = index.nearest(prop_scores[treated_idx], self.caliper_val)
+            found = matches >= 0
+            return list(zip(treated_idx[found].tolist(), matches[found].tolist()))
+
         matched_pairs = []
-        used_controls = set()
-        
         for t_idx in treated_idx:
-            t_score = prop_scores[t_idx]
-            
-            available_controls = [c for c in control_idx if self.replacement or c not in used_controls]
-            if not available_controls: continue
-
-            distances = np.abs(prop_scores[available_controls] - t_score)
-            
-            valid_mask = distances <= self.caliper_val
-            if not np.any(valid_mask): continue
-            
-            valid_distances = distances[valid_mask]
-            valid_indices = np.array(available_controls)[valid_mask]
-            
-            best_match_local_idx = np.argmin(valid_distances)
-            best_match_global_idx = valid_indices[best_match_local_idx]
-
-            matched_pairs.append((t_idx, best_match_global_idx))
-            if not self.replacement:
-                used_controls.add(best_match_global_idx)
-        
+            if self.replacement:
+                matches = index.peek(prop_scores[t_idx], ratio, self.caliper_val)
+            else:
+                matches = index.take(prop_scores[t_idx], ratio, self.caliper_val)
+            matched_pairs.extend((int(t_idx), c_idx) for c_idx in matches)
         return matched_pairs
-    
-    def match(self, X, treatment):
+
+    def optimal_matching(self, prop_scores, treatment, ratio=1):
+        """
+        Minimum total |score difference| matching (Hungarian algorithm).
+        Each treated unit is repeated `ratio` times; pairs outside the caliper
+        are dropped afterwards. Controls are never reused.
+        """
+        prop_scores = np.asarray(prop_scores, dtype=float)
+        treatment = np.asarray(treatment)
+        treated_idx = np.where(treatment == 1)[0]
+        control_idx = np.where(treatment == 0)[0]
+        if len(treated_idx) == 0 or len(control_idx) == 0:
+            return []
+
+        rows = np.repeat(treated_idx, ratio)
+        if len(rows) * len(control_idx) > OPTIMAL_MAX_CELLS:
+            raise ValueError(
+                f"Optimal matching of {len(treated_idx)} treated and {len(control_idx)} control units "
+                "is too large; use nearest-neighbour matching"
+            )
+        cost = np.abs(prop_scores[rows][:, None] - prop_scores[control_idx][None, :])
+        # Out-of-caliper pairs get a prohibitive cost so they are only used
+        # when nothing else is left, and are then discarded.
+        penalty = cost.max() * len(rows) + 1.0
+        cost[cost > self.caliper_val] = penalty
+        row_ind, col_ind = linear_sum_assignment(cost)
+        keep = cost[row_ind, col_ind] < penalty
+        pairs = sorted(zip(rows[row_ind[keep]].tolist(), control_idx[col_ind[keep]].tolist()))
+        return pairs
+
+    def match(self, X, treatment, method='nearest', ratio=1):
         prop_scores = self.estimate_propensity_scores(X, treatment)
-        matched_pairs = self.nearest_neighbor_matching(prop_scores, treatment)
+        if method == 'optimal':
+            matched_pairs = self.optimal_matching(prop_scores, treatment, ratio)
+        elif method == 'nearest':
+            matched_pairs = self.nearest_neighbor_matching(prop_scores, treatment, ratio)
+        else:
+            raise ValueError(f"Unsupported matching method: {method}")
         return matched_pairs, prop_scores
 
     def visualize(self, X, prop_scores, treatment, matched_pairs):
@@ -108,21 +283,17 @@ class AdvancedPSM:
         axes[0, 0].legend()
 
         # Plot 2: SMD Plot
-        smd_before, smd_after = [], []
-        for i in range(X.shape[1]):
-            treated = X[treatment == 1, i]
-            control = X[treatment == 0, i]
-            smd_before.append((treated.mean() - control.mean()) / np.sqrt((treated.var() + control.var()) / 2))
-
-            if matched_pairs:
-                matched_treated = X[[p[0] for p in matched_pairs], i]
-                matched_control = X[[p[1] for p in matched_pairs], i]
-                smd_after.append((matched_treated.mean() - matched_control.mean()) / np.sqrt((matched_treated.var() + matched_control.var()) / 2))
+        treatment = np.asarray(treatment)
+        smd_before = standardized_mean_differences(X, treatment == 1, treatment == 0)
+        smd_after = []
+        if matched_pairs:
+            treated_rows, control_rows, weights = _pair_arrays(matched_pairs)
+            smd_after = standardized_mean_differences(X, np.unique(treated_rows), control_rows, weights)
         
         ax = axes[0, 1]
         y_pos = np.arange(len(X.columns))
         ax.scatter(np.abs(smd_before), y_pos, color='red', label='Before')
-        if smd_after:
+        if len(smd_after):
             ax.scatter(np.abs(smd_after), y_pos, color='blue', label='After')
         ax.axvline(0.1, color='gray', linestyle='--')
         ax.set_yticks(y_pos); ax.set_yticklabels(X.columns)
@@ -131,8 +302,8 @@ class AdvancedPSM:
         # Plot 3: Q-Q Plot
         ax = axes[1,0]
         if matched_pairs:
-            ps_treated = prop_scores[[p[0] for p in matched_pairs]]
-            ps_control = prop_scores[[p[1] for p in matched_pairs]]
+            ps_treated = prop_scores[np.unique(treated_rows)]
+            ps_control = prop_scores[control_rows]
             stats.probplot(ps_treated, dist="norm", plot=ax)
             stats.probplot(ps_control, dist="norm", plot=ax)
             ax.get_lines()[0].set_color('red')
@@ -144,8 +315,8 @@ class AdvancedPSM:
         # Plot 4: Matched PS Distribution
         ax = axes[1, 1]
         if matched_pairs:
-            sns.histplot(prop_scores[[p[0] for p in matched_pairs]], ax=ax, color="red", label='Treated (Matched)', kde=True, stat='density')
-            sns.histplot(prop_scores[[p[1] for p in matched_pairs]], ax=ax, color="blue", label='Control (Matched)', kde=True, stat='density')
+            sns.histplot(ps_treated, ax=ax, color="red", label='Treated (Matched)', kde=True, stat='density')
+            sns.histplot(ps_control, ax=ax, color="blue", label='Control (Matched)', kde=True, stat='density')
         ax.set_title("Propensity Score Distribution (After Matching)")
         ax.legend()
         
@@ -155,51 +326,75 @@ class AdvancedPSM:
         plt.close(fig)
         return base64.b64encode(buf.getvalue()).decode('utf-8')
 
+def run_psm_analysis(payload):
+    data = load_frame(payload)
+    treatment_col = payload.get('treatment_col')
+    outcome_col = payload.get('outcome_col')
+    covariate_cols = payload.get('covariate_cols')
+
+    df = data[[treatment_col, outcome_col] + covariate_cols].dropna()
+
+    X = df[covariate_cols]
+    treatment = df[treatment_col]
+    y = df[outcome_col]
+
+    method = payload.get('matching_method', 'nearest')
+    ratio = int(payload.get('ratio', 1))
+    if ratio < 1:
+        raise ValueError("'ratio' must be at least 1")
+
+    psm = AdvancedPSM(caliper=payload.get('caliper', 0.2), replacement=bool(payload.get('replacement', False)))
+    matched_pairs, prop_scores = psm.match(X, treatment, method=method, ratio=ratio)
+    if not matched_pairs:
+        raise ValueError("No treated unit could be matched within the caliper")
+
+    treated_rows, control_rows, weights = _pair_arrays(matched_pairs)
+    matched_treated = np.unique(treated_rows)
+
+    # Each treated unit against the mean outcome of its matched controls.
+    y_values = y.to_numpy(dtype=float)
+    control_sum = np.bincount(np.searchsorted(matched_treated, treated_rows),
+                              weights=y_values[control_rows] * weights, minlength=len(matched_treated))
+    y_treated = y_values[matched_treated]
+    y_control = control_sum
+
+    att = y_treated.mean() - y_control.mean()
+    ttest = stats.ttest_ind(y_treated, y_control)
+
+    X_values = X.to_numpy(dtype=float)
+    treatment_values = treatment.to_numpy()
+    smd_before_values = standardized_mean_differences(X_values, treatment_values == 1, treatment_values == 0)
+    smd_after_values = standardized_mean_differences(X_values, matched_treated, control_rows, weights)
+    smd = [{'variable': col, 'smd': value} for col, value in zip(covariate_cols, smd_after_values)]
+    smd_before = [{'variable': col, 'smd': value} for col, value in zip(covariate_cols, smd_before_values)]
+
+    plot_base64 = psm.visualize(X, prop_scores, treatment, matched_pairs)
+
+    response = {
+        'results': {
+            'att': att,
+            't_statistic': ttest.statistic,
+            'p_value': ttest.pvalue,
+            'n_matched': len(matched_pairs),
+            'n_treated_matched': len(matched_treated),
+            'n_treated': int((treatment_values == 1).sum()),
+            'n_control': int((treatment_values == 0).sum()),
+            'matching_method': method,
+            'ratio': ratio,
+            'replacement': psm.replacement,
+            'caliper': psm.caliper_val,
+            'smd_before': smd_before,
+            'smd_after': smd
+        },
+        'plot': plot_base64
+    }
+    return response
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        data = pd.DataFrame(payload.get('data'))
-        treatment_col = payload.get('treatment_col')
-        outcome_col = payload.get('outcome_col')
-        covariate_cols = payload.get('covariate_cols')
-        
-        df = data[[treatment_col, outcome_col] + covariate_cols].dropna()
-        
-        X = df[covariate_cols]
-        treatment = df[treatment_col]
-        y = df[outcome_col]
-        
-        psm = AdvancedPSM()
-        matched_pairs, prop_scores = psm.match(X, treatment)
-        
-        treated_idx = [p[0] for p in matched_pairs]
-        control_idx = [p[1] for p in matched_pairs]
-        
-        y_treated = y.iloc[treated_idx]
-        y_control = y.iloc[control_idx]
-        
-        att = y_treated.mean() - y_control.mean()
-        ttest = stats.ttest_ind(y_treated, y_control)
-        
-        smd = []
-        for col in covariate_cols:
-            mean_diff = X.iloc[treated_idx][col].mean() - X.iloc[control_idx][col].mean()
-            pooled_std = np.sqrt((X.iloc[treated_idx][col].var() + X.iloc[control_idx][col].var())/2)
-            smd.append({'variable': col, 'smd': mean_diff / pooled_std if pooled_std > 0 else 0})
-
-        plot_base64 = psm.visualize(X, prop_scores, treatment, matched_pairs)
-        
-        response = {
-            'results': {
-                'att': att,
-                't_statistic': ttest.statistic,
-                'p_value': ttest.pvalue,
-                'n_matched': len(matched_pairs),
-                'smd_after': smd
-            },
-            'plot': plot_base64
-        }
-        
+        response = run_psm_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
         
     except Exception as e:
@@ -4,7 +4,6 @@ import json
 import numpy as np
 import pandas as pd
 from scipy.optimize import minimize
-from scipy.special import softmax
 import matplotlib.pyplot as plt
 import seaborn as sns
 from typing import Dict, List, Tuple, Optional
@@ -13,6 +12,7 @@ import os
 from itertools import combinations, product
 import io
 import base64
+from dataset_io import load_frame
 
 warnings.filterwarnings('ignore')
 sns.set_style("whitegrid")
@@ -51,67 +51,91 @@ class RankingConjointAnalyzer:
         self.level_names = {}
         self.baselines = {attr: levels[0] for attr, levels in attributes.items()}
         
-        exploded_data = []
-        
         # Ensure 'respondent_id' exists
         if 'respondent_id' not in ranking_data.columns:
             ranking_data['respondent_id'] = 'resp_1'
 
-        for resp_id in ranking_data['respondent_id'].unique():
-            resp_data = ranking_data[ranking_data['respondent_id'] == resp_id].copy()
-            resp_data = resp_data.sort_values('rank')
-            
-            n_profiles = len(resp_data)
-            for i in range(n_profiles - 1):
-                chosen = resp_data.iloc[i]
-                remaining = resp_data.iloc[i:].copy()
-                
-                for _, profile in remaining.iterrows():
-                    row = profile.to_dict()
-                    row['respondent_id'] = resp_id
-                    row['choice_set_id'] = f"{resp_id}_rank{i+1}"
-                    row['choice'] = 1 if profile['profile_id'] == chosen['profile_id'] else 0
-                    exploded_data.append(row)
-        
-        exploded_df = pd.DataFrame(exploded_data)
-        
+        # Rank-ordered ("exploded") logit: a ranking of m profiles becomes m-1
+        # choice sets, where stage i offers ranks i..m and the rank-i profile
+        # is chosen. Built with index arithmetic instead of per-row dicts.
+        resp_codes = pd.factorize(ranking_data['respondent_id'])[0]
+        order = np.lexsort((ranking_data['rank'].values, resp_codes))
+        resp_sorted = resp_codes[order]
+
+        block_start = np.r_[0, np.flatnonzero(np.diff(resp_sorted)) + 1]
+        block_size = np.diff(np.r_[block_start, len(order)])
+        position = np.arange(len(order)) - np.repeat(block_start, block_size)
+        size_per_row = np.repeat(block_size, block_size)
+
+        # A row at position p (0-based) appears in stages 0..min(p, m-2).
+        n_stages = np.maximum(block_size - 1, 0)
+        stage_offset = np.r_[0, np.cumsum(n_stages)[:-1]]
+        repeats = np.where(size_per_row > 1, np.minimum(position, size_per_row - 2) + 1, 0)
+
+        row_index = np.repeat(order, repeats)
+        rep_start = np.repeat(np.cumsum(repeats) - repeats, repeats)
+        stage = np.arange(repeats.sum()) - rep_start
+        set_id = np.repeat(np.repeat(stage_offset, block_size), repeats) + stage
+        choice = (np.repeat(position, repeats) == stage).astype(int)
+
+        # Make every choice set a contiguous segment.
+        seg_order = np.argsort(set_id, kind='stable')
+        row_index, set_id, choice = row_index[seg_order], set_id[seg_order], choice[seg_order]
+
+        exploded_df = ranking_data.iloc[row_index].reset_index(drop=True)
+        exploded_df['choice_set_id'] = set_id
+        exploded_df['choice'] = choice
+
         X_list = []
         self.feature_names = []
         for attr_name, levels in attributes.items():
             self.level_names[attr_name] = levels[1:]
+            column = ranking_data[attr_name].values
             for level in levels[1:]:
-                dummy = (exploded_df[attr_name] == level).astype(int)
-                X_list.append(dummy.values)
+                X_list.append((column == level).astype(float))
                 self.feature_names.append(f"{attr_name}_{level}")
         
-        X = np.column_stack(X_list)
-        y = exploded_df['choice'].values
+        X = np.column_stack(X_list)[row_index]
+        y = choice
         
         return X, y, exploded_df
 
-    def log_likelihood(self, beta: np.ndarray, X: np.ndarray, y: np.ndarray, 
-                       exploded_data: pd.DataFrame) -> float:
+    @staticmethod
+    def _segments(choice_set_ids):
+        """Dense set index per row and segment starts for contiguous choice sets."""
+        _, set_idx = np.unique(choice_set_ids, return_inverse=True)
+        starts = np.r_[0, np.flatnonzero(np.diff(set_idx)) + 1]
+        return set_idx, starts
+
+    def _neg_log_likelihood_and_gradient(self, beta, X, y, set_idx, starts):
+        """Segmented softmax over all choice sets plus the analytic gradient."""
         V = X @ beta
-        exploded_data['utility'] = V
-        exploded_data['exp_utility'] = np.exp(V)
-        denom = exploded_data.groupby('choice_set_id')['exp_utility'].transform('sum')
-        prob = exploded_data['exp_utility'] / denom
-        ll = np.sum(y * np.log(prob + 1e-10))
-        return -ll
+        V = V - np.maximum.reduceat(V, starts)[set_idx]
+        exp_v = np.exp(V)
+        denom = np.add.reduceat(exp_v, starts)
+        prob = exp_v / denom[set_idx]
+        log_prob = V - np.log(denom)[set_idx]
+        return -np.dot(y, log_prob), -(X.T @ (y - prob))
+
+    def log_likelihood(self, beta: np.ndarray, X: np.ndarray, y: np.ndarray,
+                       set_idx: np.ndarray, starts: np.ndarray) -> float:
+        return self._neg_log_likelihood_and_gradient(beta, X, y, set_idx, starts)[0]
 
     def fit(self, X: np.ndarray, y: np.ndarray, exploded_data: pd.DataFrame):
         self.X = X
         self.y = y
-        self.exploded_data = exploded_data.copy()
+        self.exploded_data = exploded_data
         
         n_params = X.shape[1]
         beta_init = np.zeros(n_params)
+        set_idx, starts = self._segments(exploded_data['choice_set_id'].values)
         
         result = minimize(
-            fun=self.log_likelihood,
+            fun=self._neg_log_likelihood_and_gradient,
             x0=beta_init,
-            args=(X, y, exploded_data.copy()),
+            args=(X, y, set_idx, starts),
             method='BFGS',
+            jac=True,
             options={'disp': self.verbose, 'maxiter': 1000}
         )
         
@@ -289,34 +313,38 @@ class RankingConjointAnalyzer:
             }
         }
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        ranking_data = pd.DataFrame(payload.get('data'))
-        attributes = payload.get('attributes')
+def run_ranking_conjoint_analysis(payload):
+    ranking_data = load_frame(payload)
+    attributes = payload.get('attributes')
 
-        if ranking_data.empty or not attributes:
-            raise ValueError("Missing 'data' or 'attributes' in request payload.")
+    if ranking_data.empty or not attributes:
+        raise ValueError("Missing 'data' or 'attributes' in request payload.")
 
-        analyzer = RankingConjointAnalyzer()
-        X, y, exploded_data = analyzer.prepare_data(ranking_data, attributes)
-        analyzer.fit(X, y, exploded_data)
-        
-        results = analyzer.get_results()
-        
-        example_products = []
-        top_profiles = analyzer.get_top_profiles(3)
-        if len(top_profiles) >= 2:
-             example_products = [p['configuration'] for p in top_profiles]
-        
-        if example_products:
-            market_shares = analyzer.predict_market_share(example_products)
-            results['market_simulation'] = {
-                'products': example_products,
-                'market_shares': market_shares
-            }
+    analyzer = RankingConjointAnalyzer()
+    X, y, exploded_data = analyzer.prepare_data(ranking_data, attributes)
+    analyzer.fit(X, y, exploded_data)
+
+    results = analyzer.get_results()
+
+    example_products = []
+    top_profiles = analyzer.get_top_profiles(3)
+    if len(top_profiles) >= 2:
+         example_products = [p['configuration'] for p in top_profiles]
 
-        print(json.dumps({'results': results}, default=_to_native_type))
+    if example_products:
+        market_shares = analyzer.predict_market_share(example_products)
+        results['market_simulation'] = {
+            'products': example_products,
+            'market_shares': market_shares
+        }
+    return {'results': results}
+
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_ranking_conjoint_analysis(payload)
+        print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
         print(json.dumps({"error": str(e)}), file=sys.stderr)
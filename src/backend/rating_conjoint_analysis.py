@@ -9,6 +9,7 @@ from sklearn.metrics import r2_score
 from itertools import product
 import warnings
 from typing import Dict, List
+from dataset_io import load_frame
 
 warnings.filterwarnings('ignore')
 
@@ -81,81 +82,84 @@ def predict_market_share(products: List[Dict[str, str]], part_worths: Dict, inte
     return {f"Scenario {i+1}": float(share) for i, share in enumerate(shares)}
 
 
+def run_rating_conjoint_analysis(payload):
+    attributes = payload.get('attributes')
+    target_variable = payload.get('targetVariable')
+    scenarios = payload.get('scenarios')
+
+    df = load_frame(payload)
+
+    y = df[target_variable]
+
+    X_df = pd.DataFrame()
+
+    for attr, props in attributes.items():
+        if props.get('includeInAnalysis', True) and props['type'] == 'categorical':
+            df[attr] = df[attr].astype('category')
+            dummies = pd.get_dummies(df[attr], prefix=attr, dtype=float)
+            X_df = pd.concat([X_df, dummies], axis=1)
+
+    model = LinearRegression()
+    model.fit(X_df, y)
+
+    y_pred = model.predict(X_df)
+    r_squared = r2_score(y, y_pred)
+    n = len(y)
+    p = X_df.shape[1]
+    adj_r_squared = 1 - (1 - r_squared) * (n - 1) / (n - p - 1) if n - p - 1 > 0 else r_squared
+
+    part_worths = {}
+    coeff_map = dict(zip(X_df.columns, model.coef_))
+
+    for attr, props in attributes.items():
+         if props.get('includeInAnalysis', True) and props['type'] == 'categorical':
+            part_worths[attr] = {}
+            for level in props['levels']:
+                feature_name = f"{attr}_{level}"
+                part_worths[attr][level] = coeff_map.get(feature_name, 0)
+
+    # Zero-center part-worths for better interpretation
+    for attr in part_worths:
+        levels = part_worths[attr]
+        mean_utility = np.mean(list(levels.values()))
+        for level in levels:
+            levels[level] -= mean_utility
+
+    importance = calculate_importance(part_worths)
+
+    optimal_config, optimal_utility = calculate_optimal_product(part_worths)
+    optimal_utility += model.intercept_
+
+    simulation_results = None
+    if scenarios:
+        market_shares = predict_market_share(scenarios, part_worths, model.intercept_)
+        simulation_results = [{'name': scenario.get('name', f'Scenario {i+1}'), 'preferenceShare': share} for i, (scenario, share) in enumerate(zip(scenarios, market_shares.values()))]
+
+    final_results = {
+        'partWorths': [{'attribute': attr, 'level': level, 'value': value} for attr, levels in part_worths.items() for level, value in levels.items()],
+        'importance': importance,
+        'regression': {
+            'rSquared': r_squared,
+            'adjustedRSquared': adj_r_squared,
+            'predictions': y_pred.tolist(),
+            'intercept': model.intercept_,
+            'coefficients': coeff_map,
+        },
+        'targetVariable': target_variable,
+        'optimalProduct': {
+            'config': optimal_config,
+            'totalUtility': optimal_utility
+        },
+        'simulation': simulation_results
+    }
+    return {'results': final_results}
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        data = payload.get('data')
-        attributes = payload.get('attributes')
-        target_variable = payload.get('targetVariable')
-        scenarios = payload.get('scenarios')
-        
-        df = pd.DataFrame(data)
-        
-        y = df[target_variable]
-        
-        X_df = pd.DataFrame()
-        
-        for attr, props in attributes.items():
-            if props.get('includeInAnalysis', True) and props['type'] == 'categorical':
-                df[attr] = df[attr].astype('category')
-                dummies = pd.get_dummies(df[attr], prefix=attr, dtype=float)
-                X_df = pd.concat([X_df, dummies], axis=1)
-        
-        model = LinearRegression()
-        model.fit(X_df, y)
-        
-        y_pred = model.predict(X_df)
-        r_squared = r2_score(y, y_pred)
-        n = len(y)
-        p = X_df.shape[1]
-        adj_r_squared = 1 - (1 - r_squared) * (n - 1) / (n - p - 1) if n - p - 1 > 0 else r_squared
-
-        part_worths = {}
-        coeff_map = dict(zip(X_df.columns, model.coef_))
-        
-        for attr, props in attributes.items():
-             if props.get('includeInAnalysis', True) and props['type'] == 'categorical':
-                part_worths[attr] = {}
-                for level in props['levels']:
-                    feature_name = f"{attr}_{level}"
-                    part_worths[attr][level] = coeff_map.get(feature_name, 0)
-
-        # Zero-center part-worths for better interpretation
-        for attr in part_worths:
-            levels = part_worths[attr]
-            mean_utility = np.mean(list(levels.values()))
-            for level in levels:
-                levels[level] -= mean_utility
-        
-        importance = calculate_importance(part_worths)
-        
-        optimal_config, optimal_utility = calculate_optimal_product(part_worths)
-        optimal_utility += model.intercept_
-
-        simulation_results = None
-        if scenarios:
-            market_shares = predict_market_share(scenarios, part_worths, model.intercept_)
-            simulation_results = [{'name': scenario.get('name', f'Scenario {i+1}'), 'preferenceShare': share} for i, (scenario, share) in enumerate(zip(scenarios, market_shares.values()))]
-
-        final_results = {
-            'partWorths': [{'attribute': attr, 'level': level, 'value': value} for attr, levels in part_worths.items() for level, value in levels.items()],
-            'importance': importance,
-            'regression': {
-                'rSquared': r_squared,
-                'adjustedRSquared': adj_r_squared,
-                'predictions': y_pred.tolist(),
-                'intercept': model.intercept_,
-                'coefficients': coeff_map,
-            },
-            'targetVariable': target_variable,
-            'optimalProduct': {
-                'config': optimal_config,
-                'totalUtility': optimal_utility
-            },
-            'simulation': simulation_results
-        }
-        
-        print(json.dumps({'results': final_results}, default=_to_native_type))
+        response = run_rating_conjoint_analysis(payload)
+        print(json.dumps(response, default=_to_native_type))
         
     except Exception as e:
         print(json.dumps({'error': str(e)}), file=sys.stderr)
@@ -11,6 +11,7 @@ import statsmodels.formula.api as smf
 import warnings
 import io
 import base64
+from dataset_io import load_frame
 
 warnings.filterwarnings('ignore')
 
@@ -151,28 +152,32 @@ class RegressionDiscontinuity:
         plot_base64 = base64.b64encode(buf.read()).decode('utf-8'); plt.close(fig)
         return plot_base64
 
+def run_rdd_analysis(payload):
+    data = load_frame(payload)
+    running_var = payload.get('running_var')
+    outcome_var = payload.get('outcome_var')
+    cutoff = float(payload.get('cutoff'))
+
+    df = data[[running_var, outcome_var]].dropna()
+    X = df[running_var].values
+    y = df[outcome_var].values
+
+    rdd = RegressionDiscontinuity(cutoff=cutoff, polynomial=int(payload.get('polynomial', 1)), kernel=payload.get('kernel', 'triangular'))
+    results = rdd.estimate_sharp_rdd(X, y)
+    plot_base64 = rdd.plot_rdd(X, y)
+    mccrary = rdd.mccrary_test(X)
+
+    response = {
+        'results': {**results, 'mccrary_test': mccrary},
+        'plot': plot_base64
+    }
+    return response
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        data = pd.DataFrame(payload.get('data'))
-        running_var = payload.get('running_var')
-        outcome_var = payload.get('outcome_var')
-        cutoff = float(payload.get('cutoff'))
-        
-        df = data[[running_var, outcome_var]].dropna()
-        X = df[running_var].values
-        y = df[outcome_var].values
-        
-        rdd = RegressionDiscontinuity(cutoff=cutoff, polynomial=int(payload.get('polynomial', 1)), kernel=payload.get('kernel', 'triangular'))
-        results = rdd.estimate_sharp_rdd(X, y)
-        plot_base64 = rdd.plot_rdd(X, y)
-        mccrary = rdd.mccrary_test(X)
-
-        response = {
-            'results': {**results, 'mccrary_test': mccrary},
-            'plot': plot_base64
-        }
-        
+        response = run_rdd_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
         
     except Exception as e:
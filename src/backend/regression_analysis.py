@@ -19,6 +19,7 @@ try:
     from statsmodels.stats.outliers_influence import variance_inflation_factor
     from statsmodels.stats.diagnostic import het_breuschpagan, linear_reset
     from statsmodels.stats.stattools import durbin_watson, jarque_bera
+    from robust_covariance import robust_results
     HAS_STATSMODELS = True
 except ImportError:
     HAS_STATSMODELS = False
@@ -33,95 +34,168 @@ def _to_native_type(obj):
     elif isinstance(obj, np.bool_): return bool(obj)
     return obj
     
-def perform_stepwise_selection(X, y, method='stepwise', p_enter=0.05, p_remove=0.1):
+def _sweep(A, k, reverse=False):
+    """Goodnight sweep (reverse=False) or reverse sweep of symmetric A on pivot k, in place."""
+    d = A[k, k]
+    col = A[:, k].copy()
+    row = A[k, :].copy()
+    A -= np.outer(col, row) / d
+    sign = -1.0 if reverse else 1.0
+    A[k, :] = sign * row / d
+    A[:, k] = sign * col / d
+    A[k, k] = -1.0 / d
+
+
+class StepwiseOLS:
+    """
+    Incremental OLS for stepwise selection.
+
+    Keeps the centered, scaled cross-product matrix of [X y] swept on the
+    included columns. After the sweep the last column holds the coefficients
+    and residual sums of squares of every column given the included set, so
+    all add/remove candidates are scored at once and each step costs one
+    O(p^2) rank-one update instead of a full refit per candidate. The
+    intercept is handled by centering; p-values equal the OLS t-test p-values
+    (t^2 = partial F).
+    """
+
+    def __init__(self, X, y, tol=1e-10):
+        Z = np.column_stack([np.asarray(X, dtype=float), np.asarray(y, dtype=float)])
+        Z -= Z.mean(axis=0)
+        scale = np.sqrt(np.einsum('ij,ij->j', Z, Z))
+        scale[scale == 0] = 1.0
+        Z /= scale
+        self.A = Z.T @ Z
+        self.n, self.p = Z.shape[0], Z.shape[1] - 1
+        self.y_scale = scale[-1]
+        self.tol = tol
+        self.included = np.zeros(self.p, dtype=bool)
+
+    @property
+    def k(self):
+        return int(self.included.sum())
+
+    def sse(self, reduction=0.0):
+        return (self.A[-1, -1] - reduction) * self.y_scale ** 2
+
+    def information_criterion(self, sse, k, criterion):
+        """statsmodels-compatible AIC/BIC for an OLS fit with k slopes plus a constant."""
+        llf = -0.5 * self.n * (np.log(2 * np.pi * sse / self.n) + 1)
+        penalty = 2 if criterion == 'aic' else np.log(self.n)
+        return -2 * llf + penalty * (k + 1)
+
+    def add_scores(self):
+        """(candidate indices, p-values, SSE after adding) for every excluded column."""
+        diag = np.diag(self.A)[:-1]
+        candidates = np.flatnonzero(~self.included & (diag > self.tol))
+        reduction = self.A[candidates, -1] ** 2 / diag[candidates]
+        sse_new = self.sse(reduction)
+        df = self.n - self.k - 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            F = reduction * self.y_scale ** 2 / (sse_new / df)
+        pvalues = stats.f.sf(F, 1, df) if df > 0 else np.ones(len(candidates))
+        return candidates, np.nan_to_num(pvalues, nan=1.0), sse_new
+
+    def remove_scores(self):
+        """(included indices, p-values, SSE after removing) for every included column."""
+        members = np.flatnonzero(self.included)
+        increase = self.A[members, -1] ** 2 / -self.A[members, members]
+        sse_new = self.sse(-increase)
+        df = self.n - self.k - 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            F = increase * self.y_scale ** 2 / (self.sse() / df)
+        pvalues = stats.f.sf(F, 1, df) if df > 0 else np.ones(len(members))
+        return members, np.nan_to_num(pvalues, nan=1.0), sse_new
+
+    def add(self, j):
+        _sweep(self.A, j)
+        self.included[j] = True
+
+    def remove(self, j):
+        _sweep(self.A, j, reverse=True)
+        self.included[j] = False
+
+
+def perform_stepwise_selection(X, y, method='stepwise', p_enter=0.05, p_remove=0.1, criterion='pvalue'):
+    """
+    Forward / backward / stepwise selection.
+
+    criterion='pvalue' enters the lowest p-value below p_enter and removes the
+    highest above p_remove; 'aic' / 'bic' add or drop the column that lowers
+    the information criterion most, while it keeps improving.
+    """
     initial_cols = X.columns.tolist()
+    engine = StepwiseOLS(X.values, np.asarray(y))
     included = []
     log = []
 
+    def try_add():
+        candidates, pvalues, sse_new = engine.add_scores()
+        if len(candidates) == 0:
+            return False
+        if criterion == 'pvalue':
+            best = int(np.argmin(pvalues))
+            if not pvalues[best] < p_enter:
+                return False
+            note = f"p={pvalues[best]:.4f}"
+        else:
+            scores = engine.information_criterion(sse_new, engine.k + 1, criterion)
+            best = int(np.argmin(scores))
+            if not scores[best] < engine.information_criterion(engine.sse(), engine.k, criterion):
+                return False
+            note = f"{criterion.upper()}={scores[best]:.2f}"
+        feature = candidates[best]
+        engine.add(feature)
+        included.append(initial_cols[feature])
+        log.append(f"Add '{initial_cols[feature]}' ({note})")
+        return True
+
+    def try_remove():
+        members, pvalues, sse_new = engine.remove_scores()
+        if len(members) == 0:
+            return False
+        if criterion == 'pvalue':
+            worst = int(np.argmax(pvalues))
+            if not pvalues[worst] > p_remove:
+                return False
+            note = f"p={pvalues[worst]:.4f}"
+        else:
+            scores = engine.information_criterion(sse_new, engine.k - 1, criterion)
+            worst = int(np.argmin(scores))
+            if not scores[worst] < engine.information_criterion(engine.sse(), engine.k, criterion):
+                return False
+            note = f"{criterion.upper()}={scores[worst]:.2f}"
+        feature = members[worst]
+        engine.remove(feature)
+        included.remove(initial_cols[feature])
+        log.append(f"Remove '{initial_cols[feature]}' ({note})")
+        return True
+
+    if criterion not in ('pvalue', 'aic', 'bic'):
+        raise ValueError(f"Unknown selection criterion: {criterion}")
+
     if method == 'forward':
-        while True:
-            changed = False
-            excluded = list(set(initial_cols) - set(included))
-            best_pvalue = p_enter
-            best_feature = None
-            for new_column in excluded:
-                model = sm.OLS(y, sm.add_constant(X[included + [new_column]])).fit()
-                pvalues = model.pvalues.drop('const')
-                new_pvalue = pvalues.get(new_column, 1.0)
-                if new_pvalue < best_pvalue:
-                    best_pvalue = new_pvalue
-                    best_feature = new_column
-            if best_feature:
-                included.append(best_feature)
-                changed = True
-                log.append(f"Add '{best_feature}' (p={best_pvalue:.4f})")
-            if not changed:
-                break
+        while try_add():
+            pass
     elif method == 'backward':
-        included = initial_cols.copy()
-        while True:
-            changed = False
-            model = sm.OLS(y, sm.add_constant(X[included])).fit()
-            pvalues = model.pvalues.drop('const')
-            worst_pvalue = p_remove
-            worst_feature = None
-            for feature, pvalue in pvalues.items():
-                if pvalue > worst_pvalue:
-                    worst_pvalue = pvalue
-                    worst_feature = feature
-            if worst_feature:
-                included.remove(worst_feature)
-                changed = True
-                log.append(f"Remove '{worst_feature}' (p={worst_pvalue:.4f})")
-            if not changed:
-                break
+        for j in range(engine.p):
+            if engine.A[j, j] > engine.tol:
+                engine.add(j)
+                included.append(initial_cols[j])
+        while try_remove():
+            pass
     elif method == 'stepwise':
-        included = []
-        while True:
-            changed = False
-            # Forward step
-            excluded = list(set(initial_cols) - set(included))
-            best_pvalue = p_enter
-            best_feature = None
-            for new_column in excluded:
-                try:
-                    model = sm.OLS(y, sm.add_constant(X[included + [new_column]])).fit()
-                    pvalues = model.pvalues.drop('const')
-                    new_pvalue = pvalues.get(new_column, 1.0)
-                    if new_pvalue < best_pvalue:
-                        best_pvalue = new_pvalue
-                        best_feature = new_column
-                except Exception:
-                    continue
-            if best_feature:
-                included.append(best_feature)
-                changed = True
-                log.append(f"Add '{best_feature}' (p={best_pvalue:.4f})")
-            
-            # Backward step
-            if not included: break
-            try:
-                model = sm.OLS(y, sm.add_constant(X[included])).fit()
-                pvalues = model.pvalues.drop('const')
-                worst_pvalue = p_remove
-                worst_feature = None
-                for feature, pvalue in pvalues.items():
-                     if pvalue > worst_pvalue:
-                        worst_pvalue = pvalue
-                        worst_feature = feature
-                if worst_feature:
-                    included.remove(worst_feature)
-                    changed = True
-                    log.append(f"Remove '{worst_feature}' (p={worst_pvalue:.4f})")
-            except Exception:
-                pass
-
-            if not changed:
+        # Guard against add/remove cycles when p_enter >= p_remove.
+        for _ in range(4 * engine.p + 1):
+            added = try_add()
+            removed = try_remove() if engine.k else False
+            if not (added or removed):
                 break
-    
+
     return included, log
 
 
+
 class RegressionAnalysis:
     def __init__(self, data, target_variable, alpha=0.05):
         self.data = pd.DataFrame(data).copy()
@@ -205,6 +279,7 @@ class RegressionAnalysis:
             summary_data.append({'caption': getattr(table, 'title', None), 'data': table_data})
         diagnostics['model_summary_data'] = summary_data
 
+        diagnostics['cov_type'] = sm_model.cov_type
         diagnostics['f_statistic'] = sm_model.fvalue
         diagnostics['f_pvalue'] = sm_model.f_pvalue
         
@@ -343,7 +418,10 @@ class RegressionAnalysis:
 
         stepwise_log = []
         if selection_method != 'none' and selection_method != 'enter':
-            final_features, stepwise_log = perform_stepwise_selection(X_selected, y_aligned, method=selection_method)
+            final_features, stepwise_log = perform_stepwise_selection(
+                X_selected, y_aligned, method=selection_method,
+                criterion=kwargs.get('selectionCriterion', 'pvalue')
+            )
             if not final_features: raise ValueError("No features were selected by the stepwise method.")
             X_selected = X_selected[final_features]
 
@@ -364,6 +442,13 @@ class RegressionAnalysis:
         # Fit unstandardized model
         X_with_const = sm.add_constant(X_unstandardized)
         sm_model = sm.OLS(y_aligned, X_with_const).fit()
+
+        # Optional robust standard errors: covType HC0-HC3, cluster (clusterVar) or HAC (maxLags)
+        cluster_var = kwargs.get('clusterVar')
+        groups = None
+        if cluster_var:
+            groups = self.data.loc[y_aligned.index, self.sanitized_cols.get(cluster_var, cluster_var)].values
+        sm_model = robust_results(sm_model, kwargs.get('covType'), groups=groups, maxlags=kwargs.get('maxLags'))
         
         # Calculate standardized coefficients using original X (before polynomial)
         # Standardize X and y (excluding polynomial features)
@@ -484,30 +569,33 @@ class RegressionAnalysis:
         buf.seek(0)
         return f"data:image/png;base64,{base64.b64encode(buf.read()).decode('utf-8')}"
 
+def run_regression_analysis(payload):
+    if not HAS_STATSMODELS:
+         raise ImportError("Statsmodels library is required for this analysis but is not installed in the environment.")
+
+    reg_analysis = RegressionAnalysis(payload['data'], payload['targetVar'])
+    results = reg_analysis.run(payload['modelType'], **payload)
+
+    response = {
+        'results': results,
+        'model_name': payload['modelType'],
+        'model_type': 'regression',
+        'plot': reg_analysis.plot_statsmodels(payload['modelType'])
+    }
+
+    # Debug output
+    print("="*50, file=sys.stderr)
+    print("DEBUG: standardized_coefficients_debug in results:", file=sys.stderr)
+    print(results.get('standardized_coefficients_debug'), file=sys.stderr)
+    print("DEBUG: diagnostics keys:", list(results.get('diagnostics', {}).keys()), file=sys.stderr)
+    print("="*50, file=sys.stderr)
+    return response
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        
-        if not HAS_STATSMODELS:
-             raise ImportError("Statsmodels library is required for this analysis but is not installed in the environment.")
-
-        reg_analysis = RegressionAnalysis(payload['data'], payload['targetVar'])
-        results = reg_analysis.run(payload['modelType'], **payload)
-
-        response = {
-            'results': results,
-            'model_name': payload['modelType'],
-            'model_type': 'regression',
-            'plot': reg_analysis.plot_statsmodels(payload['modelType'])
-        }
-        
-        # Debug output
-        print("="*50, file=sys.stderr)
-        print("DEBUG: standardized_coefficients_debug in results:", file=sys.stderr)
-        print(results.get('standardized_coefficients_debug'), file=sys.stderr)
-        print("DEBUG: diagnostics keys:", list(results.get('diagnostics', {}).keys()), file=sys.stderr)
-        print("="*50, file=sys.stderr)
-        
+        response = run_regression_analysis(payload)
         print(json.dumps(response, default=_to_native_type, indent=2))
 
     except Exception as e:
@@ -6,6 +6,7 @@ import pandas as pd
 import statsmodels.api as sm
 from sklearn.preprocessing import StandardScaler
 import warnings
+from dataset_io import load_frame
 
 warnings.filterwarnings('ignore')
 
@@ -17,7 +18,7 @@ def _to_native_type(obj):
     if isinstance(obj, np.bool_): return bool(obj)
     return obj
 
-def run_relative_importance_analysis(df: pd.DataFrame, y_col: str, x_cols: list):
+def _compute_relative_importance(df: pd.DataFrame, y_col: str, x_cols: list):
     
     # 1. Standardize all variables
     scaler = StandardScaler()
@@ -68,22 +69,26 @@ def run_relative_importance_analysis(df: pd.DataFrame, y_col: str, x_cols: list)
     return results_df.to_dict('records')
 
 
+def run_relative_importance_analysis(payload):
+    data = load_frame(payload)
+    dependent_var = payload.get('dependent_var')
+    independent_vars = payload.get('independent_vars')
+
+    if not all([not data.empty, dependent_var, independent_vars]):
+        raise ValueError("Missing data, dependent_var, or independent_vars")
+
+    analysis_results = _compute_relative_importance(data, dependent_var, independent_vars)
+
+    response = {
+        'results': analysis_results,
+    }
+    return response
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        data = pd.DataFrame(payload.get('data'))
-        dependent_var = payload.get('dependent_var')
-        independent_vars = payload.get('independent_vars')
-
-        if not all([not data.empty, dependent_var, independent_vars]):
-            raise ValueError("Missing data, dependent_var, or independent_vars")
-
-        analysis_results = run_relative_importance_analysis(data, dependent_var, independent_vars)
-        
-        response = {
-            'results': analysis_results,
-        }
-        
+        response = run_relative_importance_analysis(payload)
         print(json.dumps(response, default=_to_native_type, ensure_ascii=False))
 
     except Exception as e:
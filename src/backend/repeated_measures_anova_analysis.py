@@ -9,6 +9,7 @@ import io
 import base64
 import pingouin as pg
 import math
+from dataset_io import load_frame, has_data
 
 warnings.filterwarnings('ignore')
 
@@ -282,31 +283,35 @@ class RepeatedMeasuresAnova:
             return None
 
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        data = payload.get('data')
-        subject_col = payload.get('subjectCol')
-        within_cols = payload.get('withinCols')
-        dependent_var = payload.get('dependentVar', 'measurement')
-        between_col = payload.get('betweenCol')
+def run_repeated_measures_anova_analysis(payload):
+    data = load_frame(payload)
+    subject_col = payload.get('subjectCol')
+    within_cols = payload.get('withinCols')
+    dependent_var = payload.get('dependentVar', 'measurement')
+    between_col = payload.get('betweenCol')
 
-        if not all([data, subject_col, within_cols]):
-            raise ValueError("Missing required parameters: data, subjectCol, withinCols")
+    if not all([has_data(payload), subject_col, within_cols]):
+        raise ValueError("Missing required parameters: data, subjectCol, withinCols")
 
-        if len(within_cols) < 2:
-            raise ValueError("At least 2 within-subject columns are required")
+    if len(within_cols) < 2:
+        raise ValueError("At least 2 within-subject columns are required")
 
-        analysis = RepeatedMeasuresAnova(data, subject_col, within_cols, dependent_var, between_col)
-        analysis.run_analysis()
-        
-        plot_image = analysis.plot_results()
+    analysis = RepeatedMeasuresAnova(data, subject_col, within_cols, dependent_var, between_col)
+    analysis.run_analysis()
 
-        response = {
-            'results': analysis.results,
-            'plot': plot_image
-        }
-        
+    plot_image = analysis.plot_results()
+
+    response = {
+        'results': analysis.results,
+        'plot': plot_image
+    }
+    return response
+
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_repeated_measures_anova_analysis(payload)
         sys.stdout.write(json.dumps(response, default=_to_native_type, ensure_ascii=False))
 
     except Exception as e:
@@ -316,5 +321,3 @@ def main():
 
 if __name__ == '__main__':
     main()
-
-    
\ No newline at end of file
@@ -0,0 +1,201 @@
+"""
+Content-addressed cache of analysis results.
+
+Analyses that always return the same output for the same input declare it
+with a module-level ``CACHEABLE = True``. For those, the JSON result is
+stored under a hash of (script, script source, canonical payload, dataset
+bytes), so repeated requests - dashboards reloading the same charts - are
+answered without touching the worker pool.
+
+Two tiers:
+- memory: LRU bounded by RESULT_CACHE_BYTES
+- disk:   RESULT_CACHE_DIR (optional), shared by processes and restarts
+
+Entries older than RESULT_CACHE_TTL seconds are treated as misses.
+"""
+
+import os
+import ast
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict, Counter
+
+RESULT_CACHE_BYTES = int(os.environ.get('RESULT_CACHE_BYTES', 256 * 1024 * 1024))
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR')
+RESULT_CACHE_TTL = float(os.environ.get('RESULT_CACHE_TTL', 24 * 3600))
+
+# Bump to invalidate every cached result (e.g. after a library upgrade).
+RESULT_CACHE_EPOCH = os.environ.get('RESULT_CACHE_EPOCH', '')
+
+
+def local_imports(path):
+    """
+    Sibling modules a script imports (dataset_io, chart_service, ...), followed
+    transitively; returns the paths including the script itself, sorted.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    seen, pending = set(), [os.path.abspath(path)]
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        with open(current, 'rb') as f:
+            tree = ast.parse(f.read(), filename=current)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                candidate = os.path.join(directory, name.split('.')[0] + '.py')
+                if os.path.isfile(candidate):
+                    pending.append(candidate)
+    return sorted(seen)
+
+
+def source_digest(path):
+    """
+    Hash of a script's source, the local helper modules it imports and
+    RESULT_CACHE_EPOCH, so editing an analysis or a shared helper invalidates its results.
+    """
+    digest = hashlib.blake2b(RESULT_CACHE_EPOCH.encode('utf-8'), digest_size=16)
+    for module in local_imports(path):
+        digest.update(os.path.basename(module).encode('utf-8'))
+        with open(module, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def cache_key(name, version, payload, data_digest=None):
+    """
+    Canonical key: key order and whitespace in the payload do not matter.
+    data_digest covers a dataset sent outside the payload (binary body).
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    digest = hashlib.blake2b(digest_size=20)
+    for part in (name, version or '', canonical, data_digest or ''):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def bytes_digest(body):
+    return hashlib.blake2b(body, digest_size=20).hexdigest()
+
+
+class ResultCache:
+    """Memory LRU + optional disk tier of JSON result texts, with TTL and hit/miss counters."""
+
+    def __init__(self, max_bytes=RESULT_CACHE_BYTES, directory=RESULT_CACHE_DIR, ttl=RESULT_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.ttl = ttl
+        self._items = OrderedDict()  # key -> (stored_at, text)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.metrics = Counter()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.json')
+
+    def _fresh(self, stored_at):
+        return self.ttl <= 0 or time.time() - stored_at < self.ttl
+
+    def get(self, key, name=None):
+        """Cached result text, or None. Hits and misses are counted per script."""
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None and not self._fresh(entry[0]):
+                self._drop(key)
+                self.metrics['expired'] += 1
+                entry = None
+            if entry is not None:
+                self._items.move_to_end(key)
+                self._count('memory_hits', name)
+                return entry[1]
+
+        if self.directory:
+            path = self._path(key)
+            try:
+                stored_at = os.path.getmtime(path)
+                if self._fresh(stored_at):
+                    with open(path, encoding='utf-8') as f:
+                        text = f.read()
+                    self._remember(key, text, stored_at)
+                    self._count('disk_hits', name)
+                    return text
+                os.remove(path)
+                self.metrics['expired'] += 1
+            except OSError:
+                pass
+
+        self._count('misses', name)
+        return None
+
+    def put(self, key, text, name=None):
+        self._remember(key, text, time.time())
+        self._count('stores', name)
+        if self.directory:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp, path)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+        if self.directory and os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for filename in files:
+                    if filename.endswith('.json'):
+                        os.remove(os.path.join(root, filename))
+
+    def stats(self):
+        with self._lock:
+            entries, size = len(self._items), self._bytes
+        totals = {k: v for k, v in self.metrics.items() if ':' not in k}
+        lookups = totals.get('memory_hits', 0) + totals.get('disk_hits', 0) + totals.get('misses', 0)
+        per_script = {}
+        for k, v in self.metrics.items():
+            if ':' in k:
+                metric, script = k.split(':', 1)
+                per_script.setdefault(script, {})[metric] = v
+        return {
+            **totals,
+            'hit_rate': (lookups - totals.get('misses', 0)) / lookups if lookups else None,
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'scripts': per_script,
+        }
+
+    def _count(self, metric, name):
+        self.metrics[metric] += 1
+        if name:
+            self.metrics[f'{metric}:{name}'] += 1
+
+    def _drop(self, key):
+        _, text = self._items.pop(key)
+        self._bytes -= len(text)
+
+    def _remember(self, key, text, stored_at):
+        if len(text) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+            self._items[key] = (stored_at, text)
+            self._bytes += len(text)
+            while self._bytes > self.max_bytes:
+                evicted = next(iter(self._items))
+                self._drop(evicted)
+                self.metrics['evictions'] += 1
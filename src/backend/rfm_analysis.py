@@ -5,12 +5,48 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import io
+import os
+import re
 import base64
 import warnings
 from datetime import datetime
 
+import dataset_io
+
+try:
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 warnings.filterwarnings('ignore')
 
+# Transactions read per chunk from CSV / Parquet files.
+INGEST_CHUNK_ROWS = 1_000_000
+
+# Customer rows returned inline for file-based runs; the full table can be
+# written to outputPath instead. Transaction files must lie in the dataset
+# directories (dataset_io.resolve_path); statePath and outputPath in
+# dataset_io.WORK_DIR.
+FILE_PREVIEW_ROWS = 10000
+
+NANOSECONDS_PER_DAY = 86_400 * 10**9
+
+# Standard segmentation based on quintiles of R, F, and M scores; later
+# patterns take precedence over earlier ones.
+SEGMENT_MAP = {
+    r'555': 'Champions',
+    r'[4-5][4-5][1-5]': 'Loyal Customers',
+    r'[3-5]3[1-5]': 'Potential Loyalists',
+    r'5[1-2][1-5]': 'New Customers',
+    r'4[1-2][1-5]': 'Promising',
+    r'3[1-2][1-5]': 'Needs Attention',
+    r'2[1-5][1-5]': 'At Risk',
+    r'1[3-5][1-5]': "Can't Lose Them",
+    r'1[1-2][1-5]': 'Hibernating',
+    r'111': 'Lost'
+}
+
 def _to_native_type(obj):
     if isinstance(obj, np.integer):
         return int(obj)
@@ -26,192 +62,286 @@ def _to_native_type(obj):
         return int(obj)
     return obj
 
+def _segment_lookup():
+    """Segment name for every RFM code R*100 + F*10 + M (1..5 each)."""
+    lookup = np.full(556, 'Others', dtype=object)
+    for code in range(111, 556):
+        for pattern, segment in SEGMENT_MAP.items():
+            if re.match(pattern, str(code)):
+                lookup[code] = segment
+    return lookup
+
+
+SEGMENT_LOOKUP = _segment_lookup()
+
+
 def get_rfm_segments(df):
-    # Standard segmentation based on quintiles of R, F, and M scores
-    segment_map = {
-        r'555': 'Champions',
-        r'[4-5][4-5][1-5]': 'Loyal Customers',
-        r'[3-5]3[1-5]': 'Potential Loyalists',
-        r'5[1-2][1-5]': 'New Customers',
-        r'4[1-2][1-5]': 'Promising',
-        r'3[1-2][1-5]': 'Needs Attention',
-        r'2[1-5][1-5]': 'At Risk',
-        r'1[3-5][1-5]': "Can't Lose Them",
-        r'1[1-2][1-5]': 'Hibernating',
-        r'111': 'Lost'
-    }
-    
-    df['Segment'] = 'Others'
-    for pattern, segment in segment_map.items():
-        mask = df['RFM_Score'].str.match(pattern)
-        df.loc[mask, 'Segment'] = segment
-        
+    codes = df['R_Score'].to_numpy() * 100 + df['F_Score'].to_numpy() * 10 + df['M_Score'].to_numpy()
+    df['Segment'] = SEGMENT_LOOKUP[codes]
     return df
 
+
+def quintile_scores(values):
+    """
+    1-5 scores from quintiles of the values' ranks, ties broken by order of
+    appearance (rank(method='first') + qcut(q=5), vectorized).
+    """
+    values = np.asarray(values)
+    n = len(values)
+    if n < 2:
+        return np.full(n, 3, dtype=int)
+    ranks = np.empty(n)
+    ranks[np.argsort(values, kind='stable')] = np.arange(1, n + 1)
+    edges = np.quantile(ranks, [0, 0.2, 0.4, 0.6, 0.8, 1.0])
+    return np.clip(np.searchsorted(edges, ranks, side='left'), 1, 5)
+
+
+class RFMAggregates:
+    """
+    Running per-customer aggregates (last purchase date, purchase count,
+    amount sum) held in one compact array each. Transactions are merged
+    chunk by chunk, and a saved state can later be extended with new
+    transactions without re-reading history.
+    """
+
+    def __init__(self, string_ids=False):
+        self.string_ids = string_ids
+        self.index = pd.Index([], dtype=object)
+        self.last_date = np.empty(0, dtype=np.int64)
+        self.frequency = np.empty(0, dtype=np.int64)
+        self.monetary = np.empty(0, dtype=float)
+        self.n_transactions = 0
+
+    def __len__(self):
+        return len(self.index)
+
+    def update(self, customers, dates, amounts):
+        """Merge cleaned transactions: customer ids, datetime64 dates, positive amounts."""
+        customers = np.asarray(customers, dtype=object)
+        if len(customers) == 0:
+            return self
+        if self.string_ids:
+            customers = customers.astype(str).astype(object)
+        dates = np.asarray(dates, dtype='datetime64[ns]').view(np.int64)
+        amounts = np.asarray(amounts, dtype=float)
+
+        codes, uniques = pd.factorize(customers)
+        k = len(uniques)
+        chunk_last = np.full(k, np.iinfo(np.int64).min)
+        np.maximum.at(chunk_last, codes, dates)
+
+        positions = self.index.get_indexer(uniques)
+        new = positions < 0
+        n_new = int(new.sum())
+        if n_new:
+            positions[new] = np.arange(len(self.index), len(self.index) + n_new)
+            self.index = self.index.append(pd.Index(uniques[new], dtype=object))
+            self.last_date = np.concatenate([self.last_date, np.full(n_new, np.iinfo(np.int64).min)])
+            self.frequency = np.concatenate([self.frequency, np.zeros(n_new, dtype=np.int64)])
+            self.monetary = np.concatenate([self.monetary, np.zeros(n_new)])
+
+        self.frequency[positions] += np.bincount(codes, minlength=k)
+        self.monetary[positions] += np.bincount(codes, weights=amounts, minlength=k)
+        self.last_date[positions] = np.maximum(self.last_date[positions], chunk_last)
+        self.n_transactions += len(codes)
+        return self
+
+    def update_frame(self, df, customer_id_col, invoice_date_col, unit_price_col, quantity_col):
+        """Clean one chunk of raw transactions and merge it."""
+        dates = pd.to_datetime(df[invoice_date_col], errors='coerce')
+        total = pd.to_numeric(df[unit_price_col], errors='coerce') * pd.to_numeric(df[quantity_col], errors='coerce')
+        keep = (df[customer_id_col].notna() & dates.notna() & (total > 0)).to_numpy()
+        return self.update(df[customer_id_col].to_numpy()[keep], dates.to_numpy()[keep], total.to_numpy()[keep])
+
+    def table(self, snapshot_date=None):
+        """Recency (days), Frequency and Monetary per customer; snapshot defaults to the last date + 1 day."""
+        if snapshot_date is None:
+            snapshot = self.last_date.max() + NANOSECONDS_PER_DAY
+        else:
+            snapshot = pd.Timestamp(snapshot_date).value
+        return pd.DataFrame({
+            'Recency': (snapshot - self.last_date) // NANOSECONDS_PER_DAY,
+            'Frequency': self.frequency,
+            'Monetary': self.monetary,
+        }, index=self.index)
+
+    def save(self, path):
+        np.savez(path, index=self.index.to_numpy().astype(str), last_date=self.last_date,
+                 frequency=self.frequency, monetary=self.monetary, n_transactions=self.n_transactions)
+
+    @classmethod
+    def load(cls, path):
+        aggregates = cls(string_ids=True)
+        with np.load(path) as state:
+            aggregates.index = pd.Index(state['index'].astype(object), dtype=object)
+            aggregates.last_date = state['last_date']
+            aggregates.frequency = state['frequency']
+            aggregates.monetary = state['monetary']
+            aggregates.n_transactions = int(state['n_transactions'])
+        return aggregates
+
+
+def iter_transaction_files(paths, columns, chunk_rows=INGEST_CHUNK_ROWS, id_col=None):
+    """Yield DataFrame chunks of `columns` from CSV, Parquet and Arrow files, never loading a whole file."""
+    for path in paths:
+        if path.lower().endswith(('.arrow', '.feather', '.ipc')):
+            # Memory-mapped; batches are converted one at a time.
+            for batch in dataset_io.read_arrow(path, columns).to_batches(max_chunksize=chunk_rows):
+                yield batch.to_pandas()
+        elif path.lower().endswith(('.parquet', '.pq')):
+            if not PYARROW_AVAILABLE:
+                raise ImportError("pyarrow is required to read Parquet transaction files.")
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+                yield batch.to_pandas()
+        else:
+            dtype = {id_col: str} if id_col else None
+            yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows, dtype=dtype)
+
+
+def score_rfm(rfm):
+    """Add R/F/M quintile scores, the RFM_Score string and the segment."""
+    rfm['R_Score'] = 6 - quintile_scores(rfm['Recency'].to_numpy())  # Lower recency = better
+    rfm['F_Score'] = quintile_scores(rfm['Frequency'].to_numpy())
+    rfm['M_Score'] = quintile_scores(rfm['Monetary'].to_numpy())
+    rfm['RFM_Score'] = (rfm['R_Score'] * 100 + rfm['F_Score'] * 10 + rfm['M_Score']).astype(str)
+    return get_rfm_segments(rfm)
+
+
+def resolve_state_path(path):
+    """statePath inside the work directory, with the .npz suffix np.savez adds."""
+    if not path:
+        return None
+    if not path.lower().endswith('.npz'):
+        path += '.npz'
+    return dataset_io.resolve_work_path(path)
+
+
+def build_aggregates(payload, columns):
+    """
+    Aggregates from inline JSON rows or a registered dataset (datasetId),
+    or from transaction files (files / file / dataPath) merged into the
+    state saved at statePath, which is then updated.
+    """
+    files = payload.get('files') or ([payload['file']] if payload.get('file') else [])
+    if payload.get('dataPath'):
+        files = files + [payload['dataPath']]
+    files = [dataset_io.resolve_path(path) for path in files]
+    state_path = resolve_state_path(payload.get('statePath'))
+
+    if not files and not state_path:
+        return RFMAggregates().update_frame(dataset_io.load_frame(payload, columns, zero_copy=True), *columns)
+
+    if state_path and os.path.exists(state_path):
+        aggregates = RFMAggregates.load(state_path)
+    else:
+        aggregates = RFMAggregates(string_ids=True)
+    if payload.get('data') or payload.get('datasetId'):
+        aggregates.update_frame(dataset_io.load_frame(payload, columns, zero_copy=True), *columns)
+    chunk_rows = int(payload.get('chunkRows', INGEST_CHUNK_ROWS))
+    for chunk in iter_transaction_files(files, columns, chunk_rows, id_col=columns[0]):
+        aggregates.update_frame(chunk, *columns)
+    if state_path:
+        aggregates.save(state_path)
+    return aggregates
+
+
+def _records(df):
+    """JSON-ready rows: NaN/inf -> None, numpy scalars -> Python scalars."""
+    df = df.replace([np.inf, -np.inf], np.nan).astype(object)
+    return df.where(df.notna(), None).to_dict('records')
+
+
+def run_rfm_analysis(payload):
+    customer_id_col = payload.get('customer_id_col')
+    invoice_date_col = payload.get('invoice_date_col')
+    unit_price_col = payload.get('unit_price_col')
+    quantity_col = payload.get('quantity_col')
+    file_based = bool(payload.get('files') or payload.get('file') or payload.get('dataPath') or payload.get('statePath'))
+
+    if not all([dataset_io.has_data(payload) or file_based, customer_id_col, invoice_date_col, unit_price_col, quantity_col]):
+        raise ValueError("Missing data or required column names.")
+
+    # --- Running aggregates (last date, count, sum per customer) ---
+    columns = [customer_id_col, invoice_date_col, unit_price_col, quantity_col]
+    aggregates = build_aggregates(payload, columns)
+
+    if len(aggregates) == 0:
+        raise ValueError("No valid data for RFM analysis after cleaning.")
+
+    # --- RFM Calculation and Scoring ---
+    rfm = aggregates.table(payload.get('snapshotDate')).sort_index(kind='stable')
+    rfm.index.name = customer_id_col
+    rfm = score_rfm(rfm)
+
+    segment_counts = rfm['Segment'].value_counts().reset_index()
+    segment_counts.columns = ['Segment', 'Count']
+
+    # --- Plotting ---
+    fig, axes = plt.subplots(1, 2, figsize=(15, 6))
+
+    # Segment Distribution Bar Chart
+    sns.barplot(data=segment_counts, y='Segment', x='Count', ax=axes[0], palette='viridis')
+    axes[0].set_title('Customer Segment Distribution', fontsize=14, fontweight='bold')
+    axes[0].set_xlabel('Number of Customers')
+    axes[0].set_ylabel('Segment')
+
+    # RFM Treemap
+    squarify_df = rfm.groupby('Segment')['Monetary'].sum().reset_index()
+    squarify_df = squarify_df[squarify_df['Monetary'] > 0]  # Remove zero values
+
+    if not squarify_df.empty:
+        import squarify
+        sizes = squarify_df['Monetary'].values
+        labels = [f'{row.Segment}\n${row.Monetary:,.0f}' for _, row in squarify_df.iterrows()]
+        colors = [plt.cm.viridis(i/float(len(sizes))) for i in range(len(sizes))]
+
+        squarify.plot(sizes=sizes, label=labels, ax=axes[1], alpha=0.8, color=colors, text_kwargs={'fontsize': 9})
+        axes[1].set_title('Segment Value (Monetary)', fontsize=14, fontweight='bold')
+        axes[1].axis('off')
+    else:
+        axes[1].text(0.5, 0.5, 'No data to display', ha='center', va='center', fontsize=12)
+        axes[1].axis('off')
+
+    plt.tight_layout()
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
+    buf.seek(0)
+    plot_image = base64.b64encode(buf.read()).decode('utf-8')
+    plt.close(fig)
+
+    # --- Final Results ---
+    output_path = payload.get('outputPath')
+    if output_path:
+        output_path = dataset_io.resolve_work_path(output_path)
+        if output_path.lower().endswith(('.parquet', '.pq')):
+            rfm.to_parquet(output_path)
+        else:
+            rfm.to_csv(output_path)
+
+    max_rows = payload.get('maxRows', FILE_PREVIEW_ROWS if file_based else None)
+    rfm_reset = (rfm if max_rows is None else rfm.iloc[:int(max_rows)]).reset_index()
+
+    results = {
+        'rfm_data': _records(rfm_reset),
+        'segment_distribution': [
+            {'Segment': str(segment), 'Count': int(count)}
+            for segment, count in zip(segment_counts['Segment'], segment_counts['Count'])
+        ],
+        'plot': f"data:image/png;base64,{plot_image}",
+        'customer_id_col': customer_id_col,
+        'n_customers': len(rfm),
+        'n_transactions': aggregates.n_transactions,
+    }
+    if output_path:
+        results['output_path'] = output_path
+    return results
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        data = payload.get('data')
-        customer_id_col = payload.get('customer_id_col')
-        invoice_date_col = payload.get('invoice_date_col')
-        unit_price_col = payload.get('unit_price_col')
-        quantity_col = payload.get('quantity_col')
-
-        if not all([data, customer_id_col, invoice_date_col, unit_price_col, quantity_col]):
-            raise ValueError("Missing data or required column names.")
-
-        df = pd.DataFrame(data)
-
-        # --- Data Cleaning and Preparation ---
-        df[invoice_date_col] = pd.to_datetime(df[invoice_date_col], errors='coerce')
-        df[unit_price_col] = pd.to_numeric(df[unit_price_col], errors='coerce')
-        df[quantity_col] = pd.to_numeric(df[quantity_col], errors='coerce')
-        
-        # Calculate total amount
-        df['total_amount'] = df[unit_price_col] * df[quantity_col]
-        
-        df.dropna(subset=[customer_id_col, invoice_date_col, 'total_amount'], inplace=True)
-        df = df[df['total_amount'] > 0]
-
-        if df.empty:
-            raise ValueError("No valid data for RFM analysis after cleaning.")
-
-        # --- RFM Calculation ---
-        snapshot_date = df[invoice_date_col].max() + pd.DateOffset(days=1)
-        
-        rfm = df.groupby(customer_id_col).agg({
-            invoice_date_col: lambda date: (snapshot_date - date.max()).days,
-            customer_id_col: 'count',
-            'total_amount': 'sum'
-        })
-        
-        rfm.rename(columns={
-            invoice_date_col: 'Recency', 
-            customer_id_col: 'Frequency', 
-            'total_amount': 'Monetary'
-        }, inplace=True)
-        
-        # --- RFM Scoring - SIMPLIFIED AND ROBUST ---
-        def score_rfm_column(series, ascending=True):
-            """Create 1-5 scores using rank-based approach"""
-            try:
-                # Use rank to handle duplicates
-                ranked = series.rank(method='first', ascending=ascending)
-                # Use qcut on ranks
-                scores = pd.qcut(ranked, q=5, labels=[1, 2, 3, 4, 5], duplicates='drop')
-                # Convert categorical to int
-                return scores.astype(int)
-            except Exception as e:
-                # Fallback: use percentile-based binning
-                percentiles = [0, 20, 40, 60, 80, 100]
-                bins = np.percentile(series, percentiles)
-                bins = np.unique(bins)  # Remove duplicates
-                if len(bins) < 2:
-                    return pd.Series([3] * len(series), index=series.index)
-                scores = pd.cut(series, bins=bins, labels=False, include_lowest=True, duplicates='drop')
-                if scores is None or scores.isna().all():
-                    return pd.Series([3] * len(series), index=series.index)
-                # Normalize to 1-5 scale
-                min_score = scores.min()
-                max_score = scores.max()
-                if max_score == min_score:
-                    return pd.Series([3] * len(series), index=series.index)
-                normalized = ((scores - min_score) / (max_score - min_score) * 4 + 1).round()
-                if not ascending:
-                    normalized = 6 - normalized
-                return normalized.astype(int)
-        
-        # Score each metric
-        rfm['R_Score'] = score_rfm_column(rfm['Recency'], ascending=True)  # Lower recency = better
-        rfm['R_Score'] = 6 - rfm['R_Score']  # Invert so 5 is best
-        rfm['F_Score'] = score_rfm_column(rfm['Frequency'], ascending=True)
-        rfm['M_Score'] = score_rfm_column(rfm['Monetary'], ascending=True)
-        
-        # Ensure all scores are in 1-5 range
-        rfm['R_Score'] = rfm['R_Score'].clip(1, 5).astype(int)
-        rfm['F_Score'] = rfm['F_Score'].clip(1, 5).astype(int)
-        rfm['M_Score'] = rfm['M_Score'].clip(1, 5).astype(int)
-        
-        rfm['RFM_Score'] = rfm['R_Score'].astype(str) + rfm['F_Score'].astype(str) + rfm['M_Score'].astype(str)
-        
-        # --- Segmentation ---
-        rfm = get_rfm_segments(rfm)
-        
-        segment_counts = rfm['Segment'].value_counts().reset_index()
-        segment_counts.columns = ['Segment', 'Count']
-        
-        # --- Plotting ---
-        fig, axes = plt.subplots(1, 2, figsize=(15, 6))
-        
-        # Segment Distribution Bar Chart
-        sns.barplot(data=segment_counts, y='Segment', x='Count', ax=axes[0], palette='viridis')
-        axes[0].set_title('Customer Segment Distribution', fontsize=14, fontweight='bold')
-        axes[0].set_xlabel('Number of Customers')
-        axes[0].set_ylabel('Segment')
-
-        # RFM Treemap
-        squarify_df = rfm.groupby('Segment')['Monetary'].sum().reset_index()
-        squarify_df = squarify_df[squarify_df['Monetary'] > 0]  # Remove zero values
-        
-        if not squarify_df.empty:
-            import squarify
-            sizes = squarify_df['Monetary'].values
-            labels = [f'{row.Segment}\n${row.Monetary:,.0f}' for _, row in squarify_df.iterrows()]
-            colors = [plt.cm.viridis(i/float(len(sizes))) for i in range(len(sizes))]
-            
-            squarify.plot(sizes=sizes, label=labels, ax=axes[1], alpha=0.8, color=colors, text_kwargs={'fontsize': 9})
-            axes[1].set_title('Segment Value (Monetary)', fontsize=14, fontweight='bold')
-            axes[1].axis('off')
-        else:
-            axes[1].text(0.5, 0.5, 'No data to display', ha='center', va='center', fontsize=12)
-            axes[1].axis('off')
-        
-        plt.tight_layout()
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-        buf.seek(0)
-        plot_image = base64.b64encode(buf.read()).decode('utf-8')
-        plt.close(fig)
-
-        # --- Final Results ---
-        rfm_reset = rfm.reset_index()
-        
-        # Convert all data to JSON-serializable types
-        rfm_data_clean = []
-        for _, row in rfm_reset.iterrows():
-            row_dict = {}
-            for col in rfm_reset.columns:
-                val = row[col]
-                if pd.isna(val):
-                    row_dict[col] = None
-                elif isinstance(val, (np.integer, np.int64, np.int32)):
-                    row_dict[col] = int(val)
-                elif isinstance(val, (np.floating, np.float64, np.float32, float)):
-                    if np.isnan(val) or np.isinf(val):
-                        row_dict[col] = None
-                    else:
-                        row_dict[col] = float(val)
-                elif isinstance(val, pd.Timestamp):
-                    row_dict[col] = val.isoformat()
-                else:
-                    row_dict[col] = str(val)
-            rfm_data_clean.append(row_dict)
-        
-        segment_dist_clean = []
-        for _, row in segment_counts.iterrows():
-            segment_dist_clean.append({
-                'Segment': str(row['Segment']),
-                'Count': int(row['Count'])
-            })
-        
-        results = {
-            'rfm_data': rfm_data_clean,
-            'segment_distribution': segment_dist_clean,
-            'plot': f"data:image/png;base64,{plot_image}",
-            'customer_id_col': customer_id_col
-        }
-        
-        print(json.dumps(results))
+        response = run_rfm_analysis(payload)
+        print(json.dumps(response))
 
     except Exception as e:
         error_msg = str(e)
@@ -224,7 +354,5 @@ if __name__ == '__main__':
     except ImportError:
         import subprocess
         subprocess.check_call([sys.executable, "-m", "pip", "install", "squarify", "--break-system-packages"])
-    
-    main()
 
-    
\ No newline at end of file
+    main()
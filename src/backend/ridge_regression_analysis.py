@@ -12,6 +12,7 @@ import seaborn as sns
 import io
 import base64
 import warnings
+from dataset_io import load_frame, has_data
 
 warnings.filterwarnings('ignore')
 
@@ -49,146 +50,149 @@ def _generate_interpretation(train_r2, test_r2):
     return interpretation.strip()
 
 
+def run_ridge_regression_analysis(payload):
+    target = payload.get('target')
+    features = payload.get('features')
+    alpha = float(payload.get('alpha', 1.0))
+    test_size = float(payload.get('test_size', 0.2))
+
+    if not all([has_data(payload), target, features]):
+        raise ValueError("Missing data, target, or features")
+
+    df = load_frame(payload)
+
+    X = df[features]
+    y = df[target]
+
+    X = pd.get_dummies(X, drop_first=True)
+    final_features = X.columns.tolist()
+
+    y = pd.to_numeric(y, errors='coerce')
+
+    combined = pd.concat([X, y], axis=1).dropna()
+    X = combined[final_features]
+    y = combined[target]
+
+    if X.empty or y.empty:
+        raise ValueError("Not enough valid data after cleaning.")
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    model = Ridge(alpha=alpha, random_state=42)
+    model.fit(X_train_scaled, y_train)
+
+    y_pred_test = model.predict(X_test_scaled)
+    y_pred_train = model.predict(X_train_scaled)
+
+    test_metrics = {
+        'r2_score': r2_score(y_test, y_pred_test),
+        'rmse': np.sqrt(mean_squared_error(y_test, y_pred_test)),
+        'mae': mean_absolute_error(y_test, y_pred_test)
+    }
+
+    train_metrics = {
+        'r2_score': r2_score(y_train, y_pred_train),
+        'rmse': np.sqrt(mean_squared_error(y_train, y_pred_train)),
+        'mae': mean_absolute_error(y_train, y_pred_train)
+    }
+
+    interpretation = _generate_interpretation(train_metrics['r2_score'], test_metrics['r2_score'])
+
+    results = {
+        'metrics': {
+            'test': test_metrics,
+            'train': train_metrics,
+        },
+        'coefficients': dict(zip(final_features, model.coef_)),
+        'intercept': model.intercept_,
+        'alpha': alpha,
+        'interpretation': interpretation,
+    }
+
+    fig_main, axes = plt.subplots(2, 1, figsize=(8, 12))
+    fig_main.suptitle(f'Ridge Regression Performance (alpha={alpha})', fontsize=16)
+
+    axes[0].scatter(y_train, y_pred_train, alpha=0.5, label='(Actual, Predicted)')
+    axes[0].plot([y_train.min(), y_train.max()], [y_train.min(), y_train.max()], 'r--', lw=2, label='45° Line (Perfect Fit)')
+    axes[0].set_xlabel('Actual Values')
+    axes[0].set_ylabel('Predicted Values')
+    axes[0].set_title('Train Set Performance')
+    axes[0].legend()
+    axes[0].grid(True)
+    train_text = (
+        f"Train R²: {train_metrics['r2_score']:.4f}\n"
+        f"Train RMSE: {train_metrics['rmse']:.4f}"
+    )
+    axes[0].text(0.05, 0.95, train_text, transform=axes[0].transAxes, fontsize=10,
+                 verticalalignment='top', bbox=dict(boxstyle='round,pad=0.5', fc='wheat', alpha=0.5))
+
+
+    axes[1].scatter(y_test, y_pred_test, alpha=0.5, label='(Actual, Predicted)')
+    axes[1].plot([y_test.min(), y_test.max()], [y_test.min(), y_test.max()], 'r--', lw=2, label='45° Line (Perfect Fit)')
+    axes[1].set_xlabel('Actual Values')
+    axes[1].set_ylabel('Predicted Values')
+    axes[1].set_title('Test Set Performance')
+    axes[1].legend()
+    axes[1].grid(True)
+    test_text = (
+        f"Test R²: {test_metrics['r2_score']:.4f}\n"
+        f"Test RMSE: {test_metrics['rmse']:.4f}"
+    )
+    axes[1].text(0.05, 0.95, test_text, transform=axes[1].transAxes, fontsize=10,
+                 verticalalignment='top', bbox=dict(boxstyle='round,pad=0.5', fc='wheat', alpha=0.5))
+
+    plt.tight_layout(rect=[0, 0.03, 1, 0.95])
+    plot_image = fig_to_base64(fig_main)
+
+    alpha_list = np.logspace(-4, 4, 200)
+    coefs = []
+    train_scores, test_scores = [], []
+
+    for a in alpha_list:
+        ridge_iter = Ridge(alpha=a, random_state=42)
+        ridge_iter.fit(X_train_scaled, y_train)
+        coefs.append(ridge_iter.coef_)
+        train_scores.append(ridge_iter.score(X_train_scaled, y_train))
+        test_scores.append(ridge_iter.score(X_test_scaled, y_test))
+
+    fig_path, axes_path = plt.subplots(2, 1, figsize=(8, 12))
+    fig_path.suptitle('Ridge Model Behavior vs. Alpha', fontsize=16)
+
+    axes_path[0].plot(alpha_list, train_scores, label='Train R²')
+    axes_path[0].plot(alpha_list, test_scores, label='Test R²')
+    axes_path[0].set_xlabel('Alpha')
+    axes_path[0].set_ylabel('R-squared')
+    axes_path[0].set_xscale('log')
+    axes_path[0].set_title('R-squared vs. Regularization Strength (alpha)')
+    axes_path[0].legend()
+    axes_path[0].grid(True)
+
+    axes_path[1].plot(alpha_list, coefs)
+    axes_path[1].set_xscale('log')
+    axes_path[1].set_xlabel('Alpha')
+    axes_path[1].set_ylabel('Coefficients')
+    axes_path[1].set_title('Ridge Coefficients Path')
+    axes_path[1].grid(True)
+
+    plt.tight_layout(rect=[0, 0.03, 1, 0.95])
+    path_plot_image = fig_to_base64(fig_path)
+
+    response = {
+        'results': results,
+        'plot': plot_image,
+        'path_plot': path_plot_image
+    }
+    return response
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        data = payload.get('data')
-        target = payload.get('target')
-        features = payload.get('features')
-        alpha = float(payload.get('alpha', 1.0))
-        test_size = float(payload.get('test_size', 0.2))
-
-        if not all([data, target, features]):
-            raise ValueError("Missing data, target, or features")
-
-        df = pd.DataFrame(data)
-        
-        X = df[features]
-        y = df[target]
-        
-        X = pd.get_dummies(X, drop_first=True)
-        final_features = X.columns.tolist()
-
-        y = pd.to_numeric(y, errors='coerce')
-        
-        combined = pd.concat([X, y], axis=1).dropna()
-        X = combined[final_features]
-        y = combined[target]
-        
-        if X.empty or y.empty:
-            raise ValueError("Not enough valid data after cleaning.")
-
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
-        
-        scaler = StandardScaler()
-        X_train_scaled = scaler.fit_transform(X_train)
-        X_test_scaled = scaler.transform(X_test)
-        
-        model = Ridge(alpha=alpha, random_state=42)
-        model.fit(X_train_scaled, y_train)
-        
-        y_pred_test = model.predict(X_test_scaled)
-        y_pred_train = model.predict(X_train_scaled)
-        
-        test_metrics = {
-            'r2_score': r2_score(y_test, y_pred_test),
-            'rmse': np.sqrt(mean_squared_error(y_test, y_pred_test)),
-            'mae': mean_absolute_error(y_test, y_pred_test)
-        }
-        
-        train_metrics = {
-            'r2_score': r2_score(y_train, y_pred_train),
-            'rmse': np.sqrt(mean_squared_error(y_train, y_pred_train)),
-            'mae': mean_absolute_error(y_train, y_pred_train)
-        }
-        
-        interpretation = _generate_interpretation(train_metrics['r2_score'], test_metrics['r2_score'])
-        
-        results = {
-            'metrics': {
-                'test': test_metrics,
-                'train': train_metrics,
-            },
-            'coefficients': dict(zip(final_features, model.coef_)),
-            'intercept': model.intercept_,
-            'alpha': alpha,
-            'interpretation': interpretation,
-        }
-        
-        fig_main, axes = plt.subplots(2, 1, figsize=(8, 12))
-        fig_main.suptitle(f'Ridge Regression Performance (alpha={alpha})', fontsize=16)
-
-        axes[0].scatter(y_train, y_pred_train, alpha=0.5, label='(Actual, Predicted)')
-        axes[0].plot([y_train.min(), y_train.max()], [y_train.min(), y_train.max()], 'r--', lw=2, label='45° Line (Perfect Fit)')
-        axes[0].set_xlabel('Actual Values')
-        axes[0].set_ylabel('Predicted Values')
-        axes[0].set_title('Train Set Performance')
-        axes[0].legend()
-        axes[0].grid(True)
-        train_text = (
-            f"Train R²: {train_metrics['r2_score']:.4f}\n"
-            f"Train RMSE: {train_metrics['rmse']:.4f}"
-        )
-        axes[0].text(0.05, 0.95, train_text, transform=axes[0].transAxes, fontsize=10,
-                     verticalalignment='top', bbox=dict(boxstyle='round,pad=0.5', fc='wheat', alpha=0.5))
-
-
-        axes[1].scatter(y_test, y_pred_test, alpha=0.5, label='(Actual, Predicted)')
-        axes[1].plot([y_test.min(), y_test.max()], [y_test.min(), y_test.max()], 'r--', lw=2, label='45° Line (Perfect Fit)')
-        axes[1].set_xlabel('Actual Values')
-        axes[1].set_ylabel('Predicted Values')
-        axes[1].set_title('Test Set Performance')
-        axes[1].legend()
-        axes[1].grid(True)
-        test_text = (
-            f"Test R²: {test_metrics['r2_score']:.4f}\n"
-            f"Test RMSE: {test_metrics['rmse']:.4f}"
-        )
-        axes[1].text(0.05, 0.95, test_text, transform=axes[1].transAxes, fontsize=10,
-                     verticalalignment='top', bbox=dict(boxstyle='round,pad=0.5', fc='wheat', alpha=0.5))
-
-        plt.tight_layout(rect=[0, 0.03, 1, 0.95])
-        plot_image = fig_to_base64(fig_main)
-
-        alpha_list = np.logspace(-4, 4, 200)
-        coefs = []
-        train_scores, test_scores = [], []
-
-        for a in alpha_list:
-            ridge_iter = Ridge(alpha=a, random_state=42)
-            ridge_iter.fit(X_train_scaled, y_train)
-            coefs.append(ridge_iter.coef_)
-            train_scores.append(ridge_iter.score(X_train_scaled, y_train))
-            test_scores.append(ridge_iter.score(X_test_scaled, y_test))
-        
-        fig_path, axes_path = plt.subplots(2, 1, figsize=(8, 12))
-        fig_path.suptitle('Ridge Model Behavior vs. Alpha', fontsize=16)
-
-        axes_path[0].plot(alpha_list, train_scores, label='Train R²')
-        axes_path[0].plot(alpha_list, test_scores, label='Test R²')
-        axes_path[0].set_xlabel('Alpha')
-        axes_path[0].set_ylabel('R-squared')
-        axes_path[0].set_xscale('log')
-        axes_path[0].set_title('R-squared vs. Regularization Strength (alpha)')
-        axes_path[0].legend()
-        axes_path[0].grid(True)
-
-        axes_path[1].plot(alpha_list, coefs)
-        axes_path[1].set_xscale('log')
-        axes_path[1].set_xlabel('Alpha')
-        axes_path[1].set_ylabel('Coefficients')
-        axes_path[1].set_title('Ridge Coefficients Path')
-        axes_path[1].grid(True)
-
-        plt.tight_layout(rect=[0, 0.03, 1, 0.95])
-        path_plot_image = fig_to_base64(fig_path)
-
-        response = {
-            'results': results,
-            'plot': plot_image,
-            'path_plot': path_plot_image
-        }
-        
+        response = run_ridge_regression_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
@@ -0,0 +1,183 @@
+"""
+Sandwich covariance estimators for linear models.
+
+    cov = (X'X)^-1 M (X'X)^-1,   M = sum of outer products of the scores x_i u_i
+
+Everything is built from a thin QR factorization X = QR (n x k, k x k) and
+the n x k score matrix X * u, so memory is O(nk) and time O(nk^2): no n x n
+matrix (diag(u^2), the hat matrix) is formed and X'X is never inverted
+directly.
+
+cov_type:
+    nonrobust   s^2 (X'X)^-1
+    HC0 - HC3   White; HC1 scales by n/(n-k), HC2/HC3 divide u^2 by (1-h), (1-h)^2
+    cluster     one-way cluster-robust, G/(G-1) * (n-1)/(n-k) small-sample factor
+    HAC         Newey-West with Bartlett weights up to maxlags (rows in time order)
+
+Corrections follow statsmodels' get_robustcov_results defaults, so results
+agree with sm.OLS(...).fit(cov_type=...).
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import solve_triangular
+
+COV_TYPES = ('nonrobust', 'HC0', 'HC1', 'HC2', 'HC3', 'cluster', 'HAC')
+
+DESCRIPTIONS = {
+    'nonrobust': 'Standard Errors assume that the covariance matrix of the errors is correctly specified.',
+    'HC0': 'Standard Errors are heteroscedasticity robust (HC0)',
+    'HC1': 'Standard Errors are heteroscedasticity robust (HC1)',
+    'HC2': 'Standard Errors are heteroscedasticity robust (HC2)',
+    'HC3': 'Standard Errors are heteroscedasticity robust (HC3)',
+    'cluster': 'Standard Errors are robust to cluster correlation (cluster)',
+    'HAC': 'Standard Errors are heteroscedasticity and autocorrelation robust (HAC) using {maxlags} lags',
+}
+
+# Relative size of a diagonal element of R below which X is treated as rank deficient.
+RANK_TOL = 1e-10
+
+
+def normalize_cov_type(cov_type):
+    """Canonical spelling of a cov_type ('hc1' -> 'HC1', None -> 'nonrobust')."""
+    if not cov_type:
+        return 'nonrobust'
+    for name in COV_TYPES:
+        if str(cov_type).lower() == name.lower():
+            return name
+    raise ValueError(f"Unknown covariance type '{cov_type}'. Use one of: {', '.join(COV_TYPES)}.")
+
+
+def default_maxlags(n):
+    """Newey-West rule of thumb floor(4 (n/100)^(2/9))."""
+    return int(np.floor(4 * (n / 100.0) ** (2.0 / 9.0)))
+
+
+class QRFactor:
+    """Thin QR factorization of a design matrix, shared by the fit, projections and covariances."""
+
+    def __init__(self, X):
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(-1, 1)
+        self.n, self.k = X.shape
+        self.Q, self.R = np.linalg.qr(X, mode='reduced')
+        diag = np.abs(np.diag(self.R))
+        if self.k > self.n or diag.size == 0 or diag.min() <= RANK_TOL * diag.max():
+            raise np.linalg.LinAlgError("Design matrix is rank deficient.")
+        self._bread = None
+
+    def coef(self, y):
+        """Least-squares coefficients R^-1 Q'y."""
+        return solve_triangular(self.R, self.Q.T @ y)
+
+    def project(self, A, columns=None):
+        """Projection of A onto the column space of X (or of its first `columns` columns)."""
+        Q = self.Q if columns is None else self.Q[:, :columns]
+        return Q @ (Q.T @ A)
+
+    def explained_ss(self, A, start=0, stop=None):
+        """Column sums of squares of A explained by columns start:stop of Q (Q is orthonormal)."""
+        QtA = self.Q[:, start:stop].T @ A
+        return np.sum(QtA ** 2, axis=0)
+
+    def bread(self):
+        """(X'X)^-1 = R^-1 R^-T."""
+        if self._bread is None:
+            R_inv = solve_triangular(self.R, np.eye(self.k))
+            self._bread = R_inv @ R_inv.T
+        return self._bread
+
+    def leverage(self):
+        """Diagonal of the hat matrix, as row sums of Q**2."""
+        return np.einsum('ij,ij->i', self.Q, self.Q)
+
+
+def _cluster_meat(scores, groups):
+    codes, _ = pd.factorize(np.asarray(groups), sort=False)
+    if (codes < 0).any():
+        raise ValueError("Cluster variable contains missing values.")
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    sums = np.add.reduceat(scores[order], starts, axis=0)
+    return sums.T @ sums, len(starts)
+
+
+def _hac_meat(scores, maxlags):
+    meat = scores.T @ scores
+    for lag in range(1, maxlags + 1):
+        weight = 1.0 - lag / (maxlags + 1.0)
+        gamma = scores[lag:].T @ scores[:-lag]
+        meat += weight * (gamma + gamma.T)
+    return meat
+
+
+def covariance(X, resid, cov_type='HC1', factor=None, groups=None, maxlags=None, df_resid=None):
+    """
+    Covariance of least-squares coefficients for design X and residuals resid.
+
+    factor: a QRFactor of X, to reuse one already computed for the fit.
+    groups: cluster labels per row (cluster). maxlags: HAC lags (default by rule of thumb).
+    df_resid: residual degrees of freedom (default n - k).
+    Returns (cov, info) where info holds cov_type and n_groups / maxlags.
+    """
+    cov_type = normalize_cov_type(cov_type)
+    X = np.asarray(X, dtype=float)
+    resid = np.asarray(resid, dtype=float).ravel()
+    factor = factor or QRFactor(X)
+    n, k = factor.n, factor.k
+    df_resid = n - k if df_resid is None else df_resid
+    bread = factor.bread()
+    info = {'cov_type': cov_type}
+
+    if cov_type == 'nonrobust':
+        return (resid @ resid / df_resid) * bread, info
+
+    if cov_type in ('HC2', 'HC3'):
+        one_minus_h = 1.0 - factor.leverage()
+        power = 0.5 if cov_type == 'HC2' else 1.0
+        scores = X * (resid / one_minus_h ** power)[:, None]
+    else:
+        scores = X * resid[:, None]
+
+    if cov_type == 'cluster':
+        if groups is None:
+            raise ValueError("Cluster-robust covariance requires a cluster variable.")
+        meat, n_groups = _cluster_meat(scores, groups)
+        if n_groups < 2:
+            raise ValueError("Cluster-robust covariance requires at least two clusters.")
+        meat *= n_groups / (n_groups - 1.0) * (n - 1.0) / df_resid
+        info['n_groups'] = n_groups
+    elif cov_type == 'HAC':
+        maxlags = default_maxlags(n) if maxlags is None else int(maxlags)
+        meat = _hac_meat(scores, maxlags)
+        info['maxlags'] = maxlags
+    else:
+        meat = scores.T @ scores
+        if cov_type == 'HC1':
+            meat *= n / df_resid
+
+    return bread @ meat @ bread, info
+
+
+def robust_results(results, cov_type, groups=None, maxlags=None):
+    """
+    statsmodels OLS results whose bse, t/p-values, F-test and summary use
+    covariance(cov_type). The original results are returned for 'nonrobust'.
+    """
+    cov_type = normalize_cov_type(cov_type)
+    if cov_type == 'nonrobust':
+        return results
+    cov, info = covariance(results.model.wexog, results.wresid, cov_type,
+                           groups=groups, maxlags=maxlags, df_resid=results.df_resid)
+    # get_robustcov_results returns the bare results; re-wrap to keep pandas labels
+    wrapper = type(results) if hasattr(results, '_results') else None
+    robust = getattr(results, '_results', results).get_robustcov_results(cov_type='fixed scale', scale=results.scale)
+    robust.cov_params_default = cov
+    robust.cov_type = cov_type
+    robust.cov_kwds = {'use_t': robust.use_t, 'description': DESCRIPTIONS[cov_type].format(**info), **info}
+    if 'n_groups' in info:
+        # t-tests on G-1 degrees of freedom, as statsmodels does for clusters
+        robust.df_resid_inference = info['n_groups'] - 1
+    return wrapper(robust) if wrapper else robust
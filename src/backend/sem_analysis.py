@@ -2,21 +2,24 @@
 import sys
 import json
 
+def run_sem_analysis(payload):
+    response = {
+        "results": {
+            "message": "SEM analysis is not fully implemented in this backend yet.",
+            "model_summary_data": [],
+            "fit_indices": {}
+        },
+        "plot": None
+    }
+    return response
+
+
 def main():
     try:
         # This is a placeholder script.
         # A full SEM implementation is complex and requires a library like semopy or lavaan.
         payload = json.load(sys.stdin)
-        
-        response = {
-            "results": {
-                "message": "SEM analysis is not fully implemented in this backend yet.",
-                "model_summary_data": [],
-                "fit_indices": {}
-            },
-            "plot": None
-        }
-        
+        response = run_sem_analysis(payload)
         print(json.dumps(response))
 
     except Exception as e:
@@ -1,6 +1,9 @@
 
 import sys
 import json
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -10,28 +13,35 @@ import string
 import io
 import base64
 import warnings
-import platform
 import matplotlib.font_manager as fm
-from pathlib import Path
-
-# NLTK for English sentiment
-try:
-    import nltk
-    from nltk.sentiment.vader import SentimentIntensityAnalyzer
-    nltk.download('vader_lexicon', quiet=True)
-    NLTK_AVAILABLE = True
-except ImportError:
-    NLTK_AVAILABLE = False
-
-# Konlpy for Korean sentiment
-try:
-    from konlpy.tag import Okt
-    KONLPY_AVAILABLE = True
-except ImportError:
-    KONLPY_AVAILABLE = False
+
+# Lexicons, tokenizer and fonts come from the local bundle; nothing is downloaded.
+from nlp_resources import KOREAN_PATTERN, get_vader, get_okt, get_font_path
+from parallelism import nested_jobs, process_pool
 
 warnings.filterwarnings('ignore')
 
+# Simple Korean sentiment dictionary
+KOREAN_SENTIMENT_DICT = {
+    '좋다': 1, '최고': 2, '만족': 1.5, '추천': 1.5, '훌륭하다': 2, '친절하다': 1,
+    '나쁘지 않다': 0.5, '괜찮다': 0.5,
+    '별로': -1, '실망': -1.5, '최악': -2, '불편하다': -1, '아쉽다': -0.5, '늦다': -1,
+}
+
+# Scored texts kept per process, keyed by a hash of the text.
+RESULT_CACHE_SIZE = 200_000
+
+# Uncached texts above this count are scored in chunks on a process pool.
+PARALLEL_MIN_TEXTS = 5000
+SCORE_CHUNK_SIZE = 2000
+
+# Texts per chunk when streaming results.
+STREAM_CHUNK_SIZE = 10000
+
+_result_cache = OrderedDict()
+_scoring_pool = None
+_scoring_pool_size = 0
+
 def _to_native_type(obj):
     if isinstance(obj, np.integer): return int(obj)
     elif isinstance(obj, np.floating):
@@ -42,33 +52,77 @@ def _to_native_type(obj):
     elif isinstance(obj, np.bool_): return bool(obj)
     return obj
 
-def get_font_path():
-    """Find a suitable font on the system, prioritizing Korean fonts."""
-    system = platform.system()
-    
-    font_paths_to_check = {
-        'Windows': ['C:/Windows/Fonts/malgun.ttf'],
-        'Darwin': ['/System/Library/Fonts/Apple SD Gothic Neo.ttc'],
-        'Linux': ['/usr/share/fonts/truetype/nanum/NanumGothic.ttf']
-    }
-    
-    if system in font_paths_to_check:
-        for path in font_paths_to_check[system]:
-            if Path(path).exists():
-                return path
+@lru_cache(maxsize=1)
+def get_scorers():
+    """VADER and Okt instances, built once per process and reused."""
+    return get_vader(), get_okt()
 
-    # Fallback to matplotlib font manager
-    try:
-        font_list = fm.findSystemFonts(fontpaths=None, fontext='ttf')
-        korean_fonts = [f for f in font_list if any(keyword in f.lower() for keyword in ['nanum', 'malgun', 'gothic'])]
-        if korean_fonts:
-            return korean_fonts[0]
-    except Exception:
-        pass
-        
+
+def detect_korean(texts):
+    """Boolean array: does each text contain a Hangul syllable."""
+    return pd.Series(texts, dtype=object).str.contains(KOREAN_PATTERN, na=False).to_numpy()
+
+
+def score_text(text, is_korean):
+    """(sentiment, confidence, score) for one text, or None if the library is missing."""
+    vader, okt = get_scorers()
+    if is_korean and okt is not None:
+        tokens = okt.morphs(text, stem=True)
+        score = 0
+        for token in tokens:
+            if token in KOREAN_SENTIMENT_DICT:
+                score += KOREAN_SENTIMENT_DICT[token]
+        score = score / (len(tokens)**0.5) if tokens else 0 # Normalize by root of token count
+        if score > 0.3: sentiment = 'positive'
+        elif score < -0.3: sentiment = 'negative'
+        else: sentiment = 'neutral'
+        return sentiment, min(1.0, abs(score)), score
+    if not is_korean and vader is not None:
+        score = vader.polarity_scores(text)['compound']
+        if score >= 0.05: sentiment = 'positive'
+        elif score <= -0.05: sentiment = 'negative'
+        else: sentiment = 'neutral'
+        return sentiment, abs(score), score
     return None
 
 
+def _score_chunk(texts, korean_flags):
+    return [score_text(text, is_korean) for text, is_korean in zip(texts, korean_flags)]
+
+
+def _warm_scorer():
+    get_scorers()
+
+
+def _get_scoring_pool(n_jobs):
+    """Process pool kept alive across requests so each worker loads Okt/VADER once."""
+    global _scoring_pool, _scoring_pool_size
+    if _scoring_pool is None or _scoring_pool_size != n_jobs:
+        if _scoring_pool is not None:
+            _scoring_pool.shutdown(wait=False)
+        _scoring_pool_size = n_jobs
+        # spawn: Okt runs on a JVM, which does not survive fork.
+        _scoring_pool = process_pool(n_jobs, initializer=_warm_scorer)
+    return _scoring_pool
+
+
+def _text_key(text):
+    return hashlib.blake2b(str(text).encode('utf-8'), digest_size=16).digest()
+
+
+def _cache_get(key):
+    value = _result_cache.get(key)
+    if value is not None:
+        _result_cache.move_to_end(key)
+    return value
+
+
+def _cache_put(key, value):
+    _result_cache[key] = value
+    if len(_result_cache) > RESULT_CACHE_SIZE:
+        _result_cache.popitem(last=False)
+
+
 class SentimentAnalyzer:
     def __init__(self):
         self.font_path = get_font_path()
@@ -79,67 +133,87 @@ class SentimentAnalyzer:
         
         plt.rcParams['axes.unicode_minus'] = False
         
-        if NLTK_AVAILABLE:
-            self.vader = SentimentIntensityAnalyzer()
-        
-        if KONLPY_AVAILABLE:
-            self.okt = Okt()
-        
-        # Simple Korean sentiment dictionary
-        self.korean_sentiment_dict = {
-            '좋다': 1, '최고': 2, '만족': 1.5, '추천': 1.5, '훌륭하다': 2, '친절하다': 1,
-            '나쁘지 않다': 0.5, '괜찮다': 0.5,
-            '별로': -1, '실망': -1.5, '최악': -2, '불편하다': -1, '아쉽다': -0.5, '늦다': -1,
-        }
+        self.vader, self.okt = get_scorers()
+        self.korean_sentiment_dict = KOREAN_SENTIMENT_DICT
 
     def analyze_english(self, text):
         scores = self.vader.polarity_scores(text)
         return scores['compound']
 
     def analyze_korean(self, text):
-        tokens = self.okt.morphs(text, stem=True)
-        score = 0
-        for token in tokens:
-            if token in self.korean_sentiment_dict:
-                score += self.korean_sentiment_dict[token]
-        return score / (len(tokens)**0.5) if tokens else 0 # Normalize by root of token count
+        return score_text(text, True)[2]
 
     def analyze_comprehensive(self, text):
-        is_korean = any('\uac00' <= char <= '\ud7a3' for char in text)
-        
-        if is_korean and KONLPY_AVAILABLE:
-            score = self.analyze_korean(text)
-            if score > 0.3: sentiment = 'positive'
-            elif score < -0.3: sentiment = 'negative'
-            else: sentiment = 'neutral'
-            confidence = min(1.0, abs(score))
-        elif not is_korean and NLTK_AVAILABLE:
-            score = self.analyze_english(text)
-            if score >= 0.05: sentiment = 'positive'
-            elif score <= -0.05: sentiment = 'negative'
-            else: sentiment = 'neutral'
-            confidence = abs(score)
-        else:
-            return {"error": "Required library (NLTK or Konlpy) not available."}
-            
-        return {
-            'text': text,
-            'consensus': {
-                'sentiment': sentiment,
-                'confidence': confidence,
-                'score': score
-            },
-        }
-
-    def analyze_batch(self, texts, show_progress=False):
-        return [self.analyze_comprehensive(text) for text in texts]
+        return self.analyze_batch([text])[0]
+
+    def _score_unique(self, texts, n_jobs=None):
+        """Score distinct uncached texts, on the process pool when there are many."""
+        korean = detect_korean(texts)
+        # Serial inside analysis workers unless ANALYSIS_NESTED_JOBS allows a pool.
+        n_jobs = nested_jobs(n_jobs, worthwhile=len(texts) >= PARALLEL_MIN_TEXTS)
+        if n_jobs <= 1 or len(texts) < SCORE_CHUNK_SIZE:
+            return _score_chunk(texts, korean)
+
+        pool = _get_scoring_pool(n_jobs)
+        starts = range(0, len(texts), SCORE_CHUNK_SIZE)
+        chunks = pool.map(_score_chunk, (texts[i:i + SCORE_CHUNK_SIZE] for i in starts),
+                          (korean[i:i + SCORE_CHUNK_SIZE] for i in starts))
+        return [scored for chunk in chunks for scored in chunk]
+
+    def analyze_batch(self, texts, show_progress=False, n_jobs=None):
+        """
+        Score a list of texts. Repeated texts are scored once and results are
+        cached across calls by text hash.
+        """
+        keys = [_text_key(text) for text in texts]
+        scored = {}
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key in scored or key in pending:
+                continue
+            cached = _cache_get(key)
+            if cached is not None:
+                scored[key] = cached
+            else:
+                pending[key] = text
+
+        if pending:
+            new_scores = self._score_unique(list(pending.values()), n_jobs)
+            for key, value in zip(pending, new_scores):
+                scored[key] = value
+                if value is not None:
+                    _cache_put(key, value)
+
+        results = []
+        for key, text in zip(keys, texts):
+            value = scored[key]
+            if value is None:
+                results.append({"error": "Required library (NLTK or Konlpy) not available."})
+                continue
+            sentiment, confidence, score = value
+            results.append({
+                'text': text,
+                'consensus': {
+                    'sentiment': sentiment,
+                    'confidence': confidence,
+                    'score': score
+                },
+            })
+        return results
+
+    def analyze_stream(self, texts, chunk_size=STREAM_CHUNK_SIZE, n_jobs=None):
+        """Yield export-format results chunk by chunk, for corpora too large to return at once."""
+        for start in range(0, len(texts), chunk_size):
+            yield self.export_results(self.analyze_batch(texts[start:start + chunk_size], n_jobs=n_jobs))
 
     def create_sentiment_report(self, results):
         if not results:
             return None
 
         df = pd.DataFrame([r['consensus'] for r in results if 'consensus' in r])
-        
+        if df.empty:
+            raise ValueError("No text could be scored: required library (NLTK or Konlpy) not available.")
+
         fig, axes = plt.subplots(2, 2, figsize=(14, 10))
         fig.suptitle('Sentiment Analysis Dashboard', fontsize=16, fontweight='bold')
 
@@ -186,7 +260,8 @@ class SentimentAnalyzer:
         plt.tight_layout(rect=[0, 0.03, 1, 0.95])
         buf = io.BytesIO()
         plt.savefig(buf, format='png')
-        plt.seek(0)
+        plt.close(fig)
+        buf.seek(0)
         return base64.b64encode(buf.read()).decode('utf-8')
     
     def export_results(self, results, format='dict'):
@@ -205,24 +280,53 @@ class SentimentAnalyzer:
         return None
 
 
+@lru_cache(maxsize=1)
+def get_analyzer():
+    """Process-wide analyzer, so the font lookup and models are reused across requests."""
+    return SentimentAnalyzer()
+
+
+def run_sentiment_analyzer(payload):
+    texts = payload.get('texts', [])
+
+    if not texts:
+        raise ValueError("Input 'texts' array is empty.")
+
+    analyzer = get_analyzer()
+
+    results = analyzer.analyze_batch(texts, n_jobs=payload.get('nJobs'))
+    report_plot = analyzer.create_sentiment_report(results)
+
+    response = {
+        "results": analyzer.export_results(results, format='dict'),
+        "plot": f"data:image/png;base64,{report_plot}"
+    }
+    return response
+
+
+def stream_sentiment_analyzer(payload, out=sys.stdout):
+    """Write one JSON line per chunk of results, then a summary line."""
+    texts = payload.get('texts', [])
+    if not texts:
+        raise ValueError("Input 'texts' array is empty.")
+
+    analyzer = get_analyzer()
+    counts = Counter()
+    chunk_size = int(payload.get('chunkSize', STREAM_CHUNK_SIZE))
+    for chunk in analyzer.analyze_stream(texts, chunk_size, n_jobs=payload.get('nJobs')):
+        counts.update(r['sentiment'] for r in chunk)
+        out.write(json.dumps({'results': chunk}, default=_to_native_type) + '\n')
+        out.flush()
+    out.write(json.dumps({'summary': {'n_texts': len(texts), 'sentiment_counts': dict(counts)}}) + '\n')
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        texts = payload.get('texts', [])
-
-        if not texts:
-            raise ValueError("Input 'texts' array is empty.")
-            
-        analyzer = SentimentAnalyzer()
-        
-        results = analyzer.analyze_batch(texts)
-        report_plot = analyzer.create_sentiment_report(results)
-        
-        response = {
-            "results": analyzer.export_results(results, format='dict'),
-            "plot": f"data:image/png;base64,{report_plot}"
-        }
-        
+        if payload.get('stream'):
+            stream_sentiment_analyzer(payload)
+            return
+        response = run_sentiment_analyzer(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
@@ -2,16 +2,36 @@
 
 import sys
 import json
-import pandas as pd
+import time
+import heapq
+import random
 import numpy as np
 import networkx as nx
+from scipy import sparse
 from networkx.algorithms import community
 import plotly.graph_objects as go
 import plotly.io as pio
 import warnings
+from dataset_io import load_frame, has_data
 
 warnings.filterwarnings('ignore')
 
+# 'auto' mode switches to the large-graph path above either size.
+LARGE_GRAPH_EDGES = 20000
+LARGE_GRAPH_NODES = 5000
+
+# Source nodes sampled for betweenness / closeness in large-graph mode.
+BETWEENNESS_PIVOTS = 200
+
+# Nodes (highest degree first) drawn in the large-graph plot.
+LAYOUT_MAX_NODES = 300
+
+# Upper bound on nodes * pivots held in memory by one unweighted pivot block.
+PIVOT_BLOCK_ELEMENTS = 4_000_000
+
+# Seconds each large-graph metric may run before returning what it has.
+DEFAULT_TIME_BUDGET = 15.0
+
 def _to_native_type(obj):
     if isinstance(obj, np.integer):
         return int(obj)
@@ -23,47 +43,371 @@ def _to_native_type(obj):
         return obj.tolist()
     return obj
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        data = payload.get('data')
-        source_col = payload.get('sourceCol')
-        target_col = payload.get('targetCol')
-        weight_col = payload.get('weightCol')
-        is_directed = payload.get('isDirected', False)
-
-        if not all([data, source_col, target_col]):
-            raise ValueError("Missing 'data', 'sourceCol', or 'targetCol'")
-
-        df = pd.DataFrame(data)
-
-        # --- Graph Creation ---
-        if is_directed:
-            G = nx.from_pandas_edgelist(df, source=source_col, target=target_col, edge_attr=weight_col, create_using=nx.DiGraph())
-        else:
-            G = nx.from_pandas_edgelist(df, source=source_col, target=target_col, edge_attr=weight_col)
-
-        # --- Basic Metrics ---
-        n_nodes = G.number_of_nodes()
-        n_edges = G.number_of_edges()
-        density = nx.density(G)
-        
-        is_connected = nx.is_connected(G) if not is_directed else nx.is_strongly_connected(G)
-        num_components = nx.number_connected_components(G) if not is_directed else nx.number_strongly_connected_components(G)
-
-        # --- Centrality Measures ---
-        degree_centrality = nx.degree_centrality(G)
+def _top_items(scores, n=5):
+    """Same as sorted(scores.items(), by value, reverse=True)[:n]."""
+    return heapq.nlargest(n, scores.items(), key=lambda x: x[1])
+
+
+def csr_adjacency(G, nodes, weight=None):
+    """CSR adjacency (row = source) in the given node order."""
+    return nx.to_scipy_sparse_array(G, nodelist=nodes, weight=weight, dtype=float, format='csr')
+
+
+def _single_source_dijkstra(indptr, indices, data, s):
+    """Brandes single-source weighted shortest paths: order S, predecessors, path counts, distances."""
+    S = []
+    P = {s: []}
+    sigma = {s: 1.0}
+    D = {s: 0}
+    seen = {s: 0}
+    heap = [(0, s, s)]
+    while heap:
+        dist, pred, v = heapq.heappop(heap)
+        if v in D and v != s:
+            continue
+        if v != s:
+            sigma[v] += sigma[pred]
+        S.append(v)
+        D[v] = dist
+        for j in range(indptr[v], indptr[v + 1]):
+            w = indices[j]
+            vw_dist = dist + data[j]
+            if w not in D and (w not in seen or vw_dist < seen[w]):
+                seen[w] = vw_dist
+                heapq.heappush(heap, (vw_dist, v, w))
+                sigma[w] = 0.0
+                P[w] = [v]
+            elif vw_dist == seen.get(w):
+                sigma[w] += sigma[v]
+                P[w].append(v)
+    return S, P, sigma, D
+
+
+def _pivot_block(A, AT, sources):
+    """
+    Unweighted Brandes for a block of sources at once: level-synchronous BFS
+    with sparse frontier products, then dependency accumulation level by
+    level. Returns per-node (dependency sum, distance sum, reach count).
+    """
+    n, b = A.shape[0], len(sources)
+    cols = np.arange(b)
+    sigma = np.zeros((n, b))
+    dist = np.full((n, b), -1, dtype=np.int32)
+    sigma[sources, cols] = 1.0
+    dist[sources, cols] = 0
+    frontier = sparse.csr_matrix((np.ones(b), (sources, cols)), shape=(n, b))
+    levels = [(np.asarray(sources), cols)]
+    depth = 0
+    while True:
+        step = (AT @ frontier).tocoo()
+        fresh = dist[step.row, step.col] < 0
+        rows, cc, counts = step.row[fresh], step.col[fresh], step.data[fresh]
+        if len(rows) == 0:
+            break
+        depth += 1
+        sigma[rows, cc] = counts
+        dist[rows, cc] = depth
+        levels.append((rows, cc))
+        frontier = sparse.csr_matrix((counts, (rows, cc)), shape=(n, b))
+
+    delta = np.zeros((n, b))
+    for depth in range(len(levels) - 1, 0, -1):
+        rows, cc = levels[depth]
+        coeff = sparse.csr_matrix(((1 + delta[rows, cc]) / sigma[rows, cc], (rows, cc)), shape=(n, b))
+        back = (A @ coeff).tocoo()
+        parent = dist[back.row, back.col] == depth - 1
+        pr, pc = back.row[parent], back.col[parent]
+        delta[pr, pc] += sigma[pr, pc] * back.data[parent]
+    delta[sources, cols] = 0.0
+
+    reached = dist >= 0
+    return delta.sum(axis=1), np.where(reached, dist, 0).sum(axis=1), reached.sum(axis=1)
+
+
+def pivot_centralities(A, pivots, weighted=False, deadline=None):
+    """
+    Betweenness and closeness estimated from shortest paths out of a sample
+    of pivot nodes (Brandes-Pich / Eppstein-Wang), normalised like networkx.
+    Stops early at `deadline` and scales by the pivots actually processed.
+
+    Returns (betweenness, closeness, pivots_done) as arrays over A's rows.
+    """
+    n = A.shape[0]
+    pivots = list(pivots)
+    betweenness = np.zeros(n)
+    dist_sum = np.zeros(n)
+    reach = np.zeros(n)
+    done = 0
+    if weighted:
+        indptr, indices, data = A.indptr.tolist(), A.indices.tolist(), A.data.tolist()
+        for s in pivots:
+            if done and deadline is not None and time.perf_counter() > deadline:
+                break
+            S, P, sigma, D = _single_source_dijkstra(indptr, indices, data, s)
+            delta = dict.fromkeys(S, 0.0)
+            while S:
+                w = S.pop()
+                coeff = (1 + delta[w]) / sigma[w]
+                for v in P[w]:
+                    delta[v] += sigma[v] * coeff
+                if w != s:
+                    betweenness[w] += delta[w]
+            reached = np.fromiter(D.keys(), dtype=int, count=len(D))
+            dist_sum[reached] += np.fromiter(D.values(), dtype=float, count=len(D))
+            reach[reached] += 1
+            done += 1
+    else:
+        pattern = A.copy()
+        pattern.data[:] = 1.0
+        AT = pattern.T.tocsr()
+        block = max(1, PIVOT_BLOCK_ELEMENTS // max(n, 1))
+        for start in range(0, len(pivots), block):
+            if done and deadline is not None and time.perf_counter() > deadline:
+                break
+            sources = pivots[start:start + block]
+            dependency, distances, reached = _pivot_block(pattern, AT, sources)
+            betweenness += dependency
+            dist_sum += distances
+            reach += reached
+            done += len(sources)
+
+    scale = n / done if done else 0.0
+    if n > 2:
+        betweenness *= scale / ((n - 1) * (n - 2))
+    else:
+        betweenness[:] = 0.0
+
+    # closeness = (r - 1)/sum(d) * (r - 1)/(n - 1) with r, sum(d) extrapolated.
+    r = np.minimum(reach * scale, n)
+    total = dist_sum * scale
+    closeness = np.zeros(n)
+    if n > 1:
+        np.divide((r - 1) ** 2, total * (n - 1), out=closeness, where=total > 0)
+    return betweenness, closeness, done
+
+
+def sparse_pagerank(A, alpha=0.85, max_iter=100, tol=1e-06, deadline=None):
+    """nx.pagerank's power iteration on a CSR matrix. Returns (scores, converged)."""
+    n = A.shape[0]
+    out_weight = np.asarray(A.sum(axis=1)).ravel()
+    inv = np.zeros(n)
+    np.divide(1.0, out_weight, out=inv, where=out_weight != 0)
+    M = sparse.diags(inv) @ A
+    dangling = out_weight == 0
+    p = np.full(n, 1.0 / n)
+    x = p.copy()
+    for _ in range(max_iter):
+        xlast = x
+        x = alpha * (M.T @ xlast + xlast[dangling].sum() * p) + (1 - alpha) * p
+        if np.abs(x - xlast).sum() < n * tol:
+            return x, True
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+    return x, False
+
+
+def sparse_eigenvector(A, max_iter=500, tol=1e-06, deadline=None):
+    """nx.eigenvector_centrality's (A^T + I) power iteration on a CSR matrix."""
+    n = A.shape[0]
+    AT = A.T.tocsr()
+    x = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        xlast = x
+        x = xlast + AT @ xlast
+        norm = np.linalg.norm(x) or 1.0
+        x = x / norm
+        if np.abs(x - xlast).sum() < n * tol:
+            return x, True
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+    return x, False
+
+
+def _modularity(A, comm, k, m2, resolution):
+    n = A.shape[0]
+    rows = np.repeat(np.arange(n), np.diff(A.indptr))
+    same = comm[rows] == comm[A.indices]
+    total = np.bincount(comm, weights=k, minlength=n)
+    return float(A.data[same].sum() / m2 - resolution * np.sum((total / m2) ** 2))
+
+
+def louvain_csr(A, resolution=1.0, seed=42, threshold=1e-07, level_tolerance=1e-4,
+                max_sweeps=100, deadline=None):
+    """
+    Louvain on a symmetric CSR adjacency. Each sweep scores every node's move
+    to each neighbouring community with one sparse product and applies the
+    best moves together (a random subset if all of them together lower
+    modularity); levels are aggregated with P^T A P. Stops at `deadline`
+    with the best partition so far.
+
+    Returns (community label per row, complete).
+    """
+    rng = np.random.default_rng(seed)
+    A = sparse.csr_matrix(A, dtype=float)
+    # Self-loops count twice in a node's degree, as in networkx.
+    A = (A + sparse.diags(A.diagonal())).tocsr()
+    labels = np.arange(A.shape[0])
+    m2 = A.sum()
+    if m2 == 0:
+        return labels, True
+
+    complete = True
+    while True:
+        n = A.shape[0]
+        k = np.asarray(A.sum(axis=1)).ravel()
+        self_weight = A.diagonal()
+        comm = np.arange(n)
+        q = _modularity(A, comm, k, m2, resolution)
+        moved = False
+        for _ in range(max_sweeps):
+            if deadline is not None and time.perf_counter() > deadline:
+                complete = False
+                break
+            total = np.bincount(comm, weights=k, minlength=n)
+            size = np.bincount(comm, minlength=n)
+            P = sparse.csr_matrix((np.ones(n), comm, np.arange(n + 1)), shape=(n, n))
+            # M[i, C]: edge weight from node i into community C.
+            M = A @ P
+            M.sum_duplicates()
+            rows = np.repeat(np.arange(n), np.diff(M.indptr))
+            cand, w = M.indices, M.data
+            own = comm[rows] == cand
+            to_own = np.bincount(rows[own], weights=w[own], minlength=n) - self_weight
+            leave = to_own - resolution * k * (total[comm] - k) / m2
+            gain = w - resolution * k[rows] * total[cand] / m2 - leave[rows]
+            gain[own] = 0.0
+            # Two singletons never swap into each other: the lower label absorbs.
+            gain[(size[comm[rows]] == 1) & (size[cand] == 1) & (cand > comm[rows])] = 0.0
+
+            starts = M.indptr[:-1][np.diff(M.indptr) > 0]
+            row_best = np.maximum.reduceat(gain, starts)
+            best = (gain > 0) & (gain == row_best[np.searchsorted(starts, np.arange(len(gain)), side='right') - 1])
+            best = np.flatnonzero(best)
+            if len(best) == 0:
+                break
+            best = best[np.r_[True, rows[best][1:] != rows[best][:-1]]]
+
+            gained = None
+            for fraction in (1.0, 0.5, 0.25, 0.1):
+                pick = best if fraction == 1.0 else best[rng.random(len(best)) < fraction]
+                if len(pick) == 0:
+                    continue
+                trial = comm.copy()
+                trial[rows[pick]] = cand[pick]
+                q_trial = _modularity(A, trial, k, m2, resolution)
+                if q_trial > q + threshold:
+                    gained = q_trial - q
+                    comm, q = trial, q_trial
+                    break
+            if gained is None:
+                break
+            moved = True
+            if gained < level_tolerance:
+                break
+
+        _, comm = np.unique(comm, return_inverse=True)
+        labels = comm[labels]
+        if not moved or not complete or comm.max() + 1 == n:
+            break
+        P = sparse.csr_matrix((np.ones(n), comm, np.arange(n + 1)), shape=(n, comm.max() + 1))
+        A = (P.T @ A @ P).tocsr()
+    return labels, complete
+
+
+def large_graph_centralities(G, weight_col=None, pivots=BETWEENNESS_PIVOTS, time_budget=DEFAULT_TIME_BUDGET):
+    """
+    Scalable replacements for the exact centralities: sampled betweenness /
+    closeness, sparse PageRank / eigenvector and CSR Louvain, each limited to
+    `time_budget` seconds. The second return value reports how complete
+    each metric is.
+    """
+    nodes = list(G.nodes())
+    n = len(nodes)
+    A = csr_adjacency(G, nodes, weight_col)
+    status = {}
+
+    def _deadline():
+        return time.perf_counter() + time_budget
+
+    rng = random.Random(42)
+    sample = list(range(n)) if pivots >= n else rng.sample(range(n), pivots)
+    betweenness, closeness, done = pivot_centralities(A, sample, weighted=weight_col is not None, deadline=_deadline())
+    status['betweenness'] = status['closeness'] = {
+        'method': 'exact' if done == n else 'sampled', 'pivots': done, 'requested_pivots': len(sample),
+        'complete': done == len(sample)
+    }
+
+    eigenvector, converged = sparse_eigenvector(A, deadline=_deadline())
+    status['eigenvector'] = {'method': 'sparse_power_iteration', 'complete': converged}
+    pagerank, converged = sparse_pagerank(A, deadline=_deadline())
+    status['pagerank'] = {'method': 'sparse_power_iteration', 'complete': converged}
+
+    centrality = {
+        'betweenness': dict(zip(nodes, betweenness.tolist())),
+        'closeness': dict(zip(nodes, closeness.tolist())),
+        'eigenvector': dict(zip(nodes, eigenvector.tolist())),
+        'pagerank': dict(zip(nodes, pagerank.tolist())),
+    }
+
+    communities = []
+    if not G.is_directed() and n > 0:
+        labels, complete = louvain_csr(A, deadline=_deadline())
+        order = np.argsort(labels, kind='stable')
+        groups = np.split(np.asarray(nodes, dtype=object)[order], np.cumsum(np.bincount(labels))[:-1])
+        communities = [group.tolist() for group in groups]
+        status['communities'] = {'method': 'louvain_csr', 'complete': complete}
+    return centrality, communities, status
+
+
+def run_sna_analysis(payload):
+    source_col = payload.get('sourceCol')
+    target_col = payload.get('targetCol')
+    weight_col = payload.get('weightCol')
+    is_directed = payload.get('isDirected', False)
+
+    if not all([has_data(payload), source_col, target_col]):
+        raise ValueError("Missing 'data', 'sourceCol', or 'targetCol'")
+
+    df = load_frame(payload)
+
+    # --- Graph Creation ---
+    if is_directed:
+        G = nx.from_pandas_edgelist(df, source=source_col, target=target_col, edge_attr=weight_col, create_using=nx.DiGraph())
+    else:
+        G = nx.from_pandas_edgelist(df, source=source_col, target=target_col, edge_attr=weight_col)
+
+    # --- Basic Metrics ---
+    n_nodes = G.number_of_nodes()
+    n_edges = G.number_of_edges()
+    density = nx.density(G)
+
+    is_connected = nx.is_connected(G) if not is_directed else nx.is_strongly_connected(G)
+    num_components = nx.number_connected_components(G) if not is_directed else nx.number_strongly_connected_components(G)
+
+    mode = payload.get('mode', 'auto')
+    if mode == 'auto':
+        mode = 'large' if n_edges > LARGE_GRAPH_EDGES or n_nodes > LARGE_GRAPH_NODES else 'exact'
+
+    # --- Centrality Measures ---
+    degree_centrality = nx.degree_centrality(G)
+    computation = {'mode': mode}
+    if mode == 'large':
+        centrality, communities, status = large_graph_centralities(
+            G, weight_col,
+            pivots=int(payload.get('pivots', BETWEENNESS_PIVOTS)),
+            time_budget=float(payload.get('timeBudget', DEFAULT_TIME_BUDGET))
+        )
+        betweenness_centrality = centrality['betweenness']
+        closeness_centrality = centrality['closeness']
+        eigenvector_centrality = centrality['eigenvector']
+        pagerank = centrality['pagerank']
+        computation.update(status)
+    else:
         betweenness_centrality = nx.betweenness_centrality(G, weight=weight_col)
         closeness_centrality = nx.closeness_centrality(G, distance=weight_col)
         eigenvector_centrality = nx.eigenvector_centrality(G, weight=weight_col, max_iter=500, tol=1e-06) if n_nodes > 0 else {}
         pagerank = nx.pagerank(G, weight=weight_col)
 
-        # --- Top Nodes ---
-        top_degree = sorted(degree_centrality.items(), key=lambda x: x[1], reverse=True)[:5]
-        top_betweenness = sorted(betweenness_centrality.items(), key=lambda x: x[1], reverse=True)[:5]
-        top_closeness = sorted(closeness_centrality.items(), key=lambda x: x[1], reverse=True)[:5]
-        top_eigenvector = sorted(eigenvector_centrality.items(), key=lambda x: x[1], reverse=True)[:5]
-
         # --- Community Detection (Louvain) ---
         communities = []
         if not is_directed and n_nodes > 0:
@@ -72,55 +416,75 @@ def main():
                 communities = [list(c) for c in detected_communities]
             except Exception:
                 communities = []
-                
-        # --- Interactive Plotly Visualization ---
-        pos = nx.spring_layout(G, k=0.8, iterations=50, seed=42)
-        
-        edge_x, edge_y = [], []
-        for edge in G.edges():
-            x0, y0 = pos[edge[0]]
-            x1, y1 = pos[edge[1]]
-            edge_x.extend([x0, x1, None])
-            edge_y.extend([y0, y1, None])
-
-        edge_trace = go.Scatter(x=edge_x, y=edge_y, line=dict(width=0.5, color='#b5a888'), hoverinfo='none', mode='lines')
-
-        node_x, node_y, node_text, node_info, node_size, node_color = [], [], [], [], [], []
-        for node in G.nodes():
-            x, y = pos[node]
-            node_x.append(x)
-            node_y.append(y)
-            node_text.append(node)
-            node_info.append(f'Node: {node}<br>Degree: {G.degree(node)}')
-            node_size.append(degree_centrality.get(node, 0) * 50 + 10)
-            node_color.append(degree_centrality.get(node, 0))
-
-        node_trace = go.Scatter(x=node_x, y=node_y, mode='markers+text', text=node_text, textposition='top center',
-                                hoverinfo='text', hovertext=node_info,
-                                marker=dict(showscale=True, colorscale=[[0, '#d4c4a8'], [1, '#a67b70']], reversescale=True,
-                                            color=node_color, size=node_size,
-                                            colorbar=dict(thickness=15, title=dict(text='Node Connections', side='right'), xanchor='left'),
-                                            line_width=2))
-
-        fig = go.Figure(data=[edge_trace, node_trace],
-                        layout=go.Layout(title='Interactive Social Network', showlegend=False, hovermode='closest',
-                                         margin=dict(b=20, l=5, r=5, t=40),
-                                         xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-                                         yaxis=dict(showgrid=False, zeroline=False, showticklabels=False)))
-
-        plot_json = pio.to_json(fig)
-
-        # --- Response ---
-        response = {
-            'results': {
-                'metrics': { 'nodes': n_nodes, 'edges': n_edges, 'density': density, 'is_connected': is_connected, 'components': num_components },
-                'centrality': { 'degree': degree_centrality, 'betweenness': betweenness_centrality, 'closeness': closeness_centrality, 'eigenvector': eigenvector_centrality },
-                'top_nodes': { 'degree': top_degree, 'betweenness': top_betweenness, 'closeness': top_closeness, 'eigenvector': top_eigenvector },
-                'communities': communities
-            },
-            'plot': plot_json
-        }
 
+    # --- Top Nodes ---
+    top_degree = _top_items(degree_centrality)
+    top_betweenness = _top_items(betweenness_centrality)
+    top_closeness = _top_items(closeness_centrality)
+    top_eigenvector = _top_items(eigenvector_centrality)
+
+    # --- Interactive Plotly Visualization ---
+    G_plot = G
+    plot_title = 'Interactive Social Network'
+    if mode == 'large' and n_nodes > LAYOUT_MAX_NODES:
+        # Layout and draw only the best-connected nodes.
+        top_nodes = [node for node, _ in heapq.nlargest(LAYOUT_MAX_NODES, G.degree(), key=lambda x: x[1])]
+        G_plot = G.subgraph(top_nodes)
+        plot_title = f'Interactive Social Network (top {LAYOUT_MAX_NODES} nodes by degree)'
+    pos = nx.spring_layout(G_plot, k=0.8, iterations=50, seed=42)
+
+    edge_x, edge_y = [], []
+    for edge in G_plot.edges():
+        x0, y0 = pos[edge[0]]
+        x1, y1 = pos[edge[1]]
+        edge_x.extend([x0, x1, None])
+        edge_y.extend([y0, y1, None])
+
+    edge_trace = go.Scatter(x=edge_x, y=edge_y, line=dict(width=0.5, color='#b5a888'), hoverinfo='none', mode='lines')
+
+    node_x, node_y, node_text, node_info, node_size, node_color = [], [], [], [], [], []
+    for node in G_plot.nodes():
+        x, y = pos[node]
+        node_x.append(x)
+        node_y.append(y)
+        node_text.append(node)
+        node_info.append(f'Node: {node}<br>Degree: {G.degree(node)}')
+        node_size.append(degree_centrality.get(node, 0) * 50 + 10)
+        node_color.append(degree_centrality.get(node, 0))
+
+    node_trace = go.Scatter(x=node_x, y=node_y, mode='markers+text', text=node_text, textposition='top center',
+                            hoverinfo='text', hovertext=node_info,
+                            marker=dict(showscale=True, colorscale=[[0, '#d4c4a8'], [1, '#a67b70']], reversescale=True,
+                                        color=node_color, size=node_size,
+                                        colorbar=dict(thickness=15, title=dict(text='Node Connections', side='right'), xanchor='left'),
+                                        line_width=2))
+
+    fig = go.Figure(data=[edge_trace, node_trace],
+                    layout=go.Layout(title=plot_title, showlegend=False, hovermode='closest',
+                                     margin=dict(b=20, l=5, r=5, t=40),
+                                     xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+                                     yaxis=dict(showgrid=False, zeroline=False, showticklabels=False)))
+
+    plot_json = pio.to_json(fig)
+
+    # --- Response ---
+    response = {
+        'results': {
+            'metrics': { 'nodes': n_nodes, 'edges': n_edges, 'density': density, 'is_connected': is_connected, 'components': num_components },
+            'centrality': { 'degree': degree_centrality, 'betweenness': betweenness_centrality, 'closeness': closeness_centrality, 'eigenvector': eigenvector_centrality, 'pagerank': pagerank },
+            'top_nodes': { 'degree': top_degree, 'betweenness': top_betweenness, 'closeness': top_closeness, 'eigenvector': top_eigenvector },
+            'communities': communities,
+            'computation': computation
+        },
+        'plot': plot_json
+    }
+    return response
+
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_sna_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
@@ -8,6 +8,7 @@ from statsmodels.tsa.stattools import adfuller, kpss
 import io
 import base64
 import warnings
+from dataset_io import load_frame, has_data
 
 warnings.filterwarnings('ignore')
 
@@ -58,56 +59,59 @@ def create_plot(series, title):
     buf.seek(0)
     return f"data:image/png;base64,{base64.b64encode(buf.read()).decode('utf-8')}"
 
+def run_stationarity_analysis(payload):
+    time_col = payload.get('timeCol')
+    value_col = payload.get('valueCol')
+    period = int(payload.get('period', 1))
+
+    if not all([has_data(payload), time_col, value_col]):
+        raise ValueError("Missing required parameters: data, timeCol, or valueCol")
+
+    df = load_frame(payload)
+
+    df[time_col] = pd.to_datetime(df[time_col], errors='coerce')
+    df[value_col] = pd.to_numeric(df[value_col], errors='coerce')
+    df = df.dropna(subset=[time_col, value_col]).set_index(time_col).sort_index()
+
+    series = df[value_col]
+
+    if len(series) < 4:
+        raise ValueError("Series must have at least 4 observations for the tests.")
+
+    # --- Analysis for Original, First Difference, and Seasonal Difference ---
+    series_diff1 = series.diff().dropna()
+    series_seasonal_diff = series.diff(periods=period).dropna()
+
+    original_results = run_stationarity_tests(series)
+    diff1_results = run_stationarity_tests(series_diff1) if len(series_diff1) >= 4 else None
+    seasonal_diff_results = run_stationarity_tests(series_seasonal_diff) if len(series_seasonal_diff) >= 4 and period > 1 else None
+
+    # --- Plotting ---
+    original_plot = create_plot(series, "Original Time Series")
+    diff1_plot = create_plot(series_diff1, "First-Differenced Series") if diff1_results else None
+    seasonal_diff_plot = create_plot(series_seasonal_diff, f"Seasonally-Differenced Series (Period={period})") if seasonal_diff_results else None
+
+    response = {
+        'original': {
+            'test_results': original_results,
+            'plot': original_plot
+        },
+        'first_difference': {
+            'test_results': diff1_results,
+            'plot': diff1_plot
+        } if diff1_results else None,
+        'seasonal_difference': {
+            'test_results': seasonal_diff_results,
+            'plot': seasonal_diff_plot
+        } if seasonal_diff_results else None,
+    }
+    return response
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        data = payload.get('data')
-        time_col = payload.get('timeCol')
-        value_col = payload.get('valueCol')
-        period = int(payload.get('period', 1))
-
-        if not all([data, time_col, value_col]):
-            raise ValueError("Missing required parameters: data, timeCol, or valueCol")
-
-        df = pd.DataFrame(data)
-        
-        df[time_col] = pd.to_datetime(df[time_col], errors='coerce')
-        df[value_col] = pd.to_numeric(df[value_col], errors='coerce')
-        df = df.dropna(subset=[time_col, value_col]).set_index(time_col).sort_index()
-
-        series = df[value_col]
-        
-        if len(series) < 4:
-            raise ValueError("Series must have at least 4 observations for the tests.")
-
-        # --- Analysis for Original, First Difference, and Seasonal Difference ---
-        series_diff1 = series.diff().dropna()
-        series_seasonal_diff = series.diff(periods=period).dropna()
-        
-        original_results = run_stationarity_tests(series)
-        diff1_results = run_stationarity_tests(series_diff1) if len(series_diff1) >= 4 else None
-        seasonal_diff_results = run_stationarity_tests(series_seasonal_diff) if len(series_seasonal_diff) >= 4 and period > 1 else None
-
-        # --- Plotting ---
-        original_plot = create_plot(series, "Original Time Series")
-        diff1_plot = create_plot(series_diff1, "First-Differenced Series") if diff1_results else None
-        seasonal_diff_plot = create_plot(series_seasonal_diff, f"Seasonally-Differenced Series (Period={period})") if seasonal_diff_results else None
-        
-        response = {
-            'original': {
-                'test_results': original_results,
-                'plot': original_plot
-            },
-            'first_difference': {
-                'test_results': diff1_results,
-                'plot': diff1_plot
-            } if diff1_results else None,
-            'seasonal_difference': {
-                'test_results': seasonal_diff_results,
-                'plot': seasonal_diff_plot
-            } if seasonal_diff_results else None,
-        }
-
+        response = run_stationarity_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
@@ -10,13 +10,14 @@ from scipy.optimize import minimize
 import warnings
 import io
 import base64
+from dataset_io import load_frame
 
 warnings.filterwarnings('ignore')
 
 # Try to import lifelines (professional survival analysis library)
 try:
-    from lifelines import KaplanMeierFitter, CoxPHFitter, LogNormalAFTFitter, WeibullAFTFitter, NelsonAalenFitter
-    from lifelines.statistics import logrank_test, multivariate_logrank_test
+    from lifelines import CoxPHFitter, LogNormalAFTFitter, WeibullAFTFitter
+    from lifelines.statistics import logrank_test, proportional_hazard_test
     from lifelines.plotting import plot_lifetimes
     LIFELINES_AVAILABLE = True
 except ImportError:
@@ -31,12 +32,130 @@ def _to_native_type(obj):
     elif isinstance(obj, pd.Timestamp): return obj.isoformat()
     return obj
 
+# Survival curves in the response are thinned to at most this many points
+# (payload 'maxCurvePoints'; 0 or None keeps every point).
+DEFAULT_MAX_CURVE_POINTS = 1000
+
+# The proportional-hazards test (opt-in, payload 'checkAssumptions') runs on a
+# random subsample above this many rows.
+PH_TEST_MAX_ROWS = 5000
+
+
+def survival_tables(durations, events, groups=None):
+    """
+    Sort once and tabulate removals / deaths / at-risk counts for every
+    distinct time (with a leading t=0 row, as lifelines does) and group.
+
+    Returns (timeline, group_labels, removed, deaths, at_risk) where the
+    last three are (n_times, n_groups) arrays.
+    """
+    durations = np.asarray(durations, dtype=float)
+    events = np.asarray(events, dtype=float)
+    if groups is None:
+        codes, labels = np.zeros(len(durations), dtype=int), np.array(['all'], dtype=object)
+    else:
+        codes, labels = pd.factorize(pd.Series(groups), sort=True)
+        labels = np.asarray(labels, dtype=object)
+        # Rows without a group take no part in grouped curves.
+        durations, events, codes = durations[codes >= 0], events[codes >= 0], codes[codes >= 0]
+    times, time_index = np.unique(np.concatenate([[0.0], durations]), return_inverse=True)
+    time_index = time_index[1:]
+
+    n_times, n_groups = len(times), len(labels)
+    cell = time_index * n_groups + codes
+    removed = np.bincount(cell, minlength=n_times * n_groups).reshape(n_times, n_groups).astype(float)
+    deaths = np.bincount(cell, weights=events, minlength=n_times * n_groups).reshape(n_times, n_groups)
+    # At risk just before each time: everyone minus those removed earlier.
+    at_risk = removed.sum(axis=0) - np.vstack([np.zeros(n_groups), np.cumsum(removed, axis=0)[:-1]])
+    return times, labels, removed, deaths, at_risk
+
+
+def kaplan_meier_estimate(deaths, at_risk, alpha=0.05):
+    """
+    Kaplan-Meier survival, Greenwood variance sum and exponential-Greenwood
+    bounds, column by column (same formulas as lifelines).
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        survival = np.exp(np.cumsum(np.log(at_risk - deaths) - np.log(at_risk), axis=0))
+        increments = deaths / (at_risk * (at_risk - deaths))
+        # The step that empties the risk set adds nothing (lifelines convention).
+        increments[~np.isfinite(increments)] = 0.0
+        cumulative_sq = np.cumsum(increments, axis=0)
+        z = stats.norm.ppf(1 - alpha / 2)
+        v = np.log(survival)
+        lower = np.exp(-np.exp(np.log(-v) - z * np.sqrt(cumulative_sq) / v))
+        upper = np.exp(-np.exp(np.log(-v) + z * np.sqrt(cumulative_sq) / v))
+    lower[np.isnan(lower)] = 1.0
+    upper[np.isnan(upper)] = 1.0
+    return survival, lower, upper
+
+
+def median_survival(times, survival):
+    """First time the curve reaches 0.5 or below; inf if it never does."""
+    if survival[-1] > 0.5:
+        return np.inf
+    return times[np.searchsorted(-survival, -0.5)]
+
+
+def nelson_aalen_estimate(deaths, at_risk):
+    """Cumulative hazard sum(d/n) and its variance sum(d/n^2)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hazard = np.where(at_risk > 0, deaths / at_risk, 0.0)
+        variance = np.where(at_risk > 0, deaths / at_risk ** 2, 0.0)
+    return np.cumsum(hazard, axis=0), np.cumsum(variance, axis=0)
+
+
+def multivariate_logrank(deaths, at_risk):
+    """
+    Log-rank chi-square across all groups from the tabulated counts
+    (same statistic as lifelines.statistics.multivariate_logrank_test).
+    """
+    n_groups = deaths.shape[1]
+    d = deaths.sum(axis=1)
+    n = at_risk.sum(axis=1)
+    live = n > 0
+    d, n, n_ij, d_ij = d[live], n[live], at_risk[live], deaths[live]
+
+    expected = n_ij * (d / n)[:, None]
+    z = d_ij.sum(axis=0) - expected.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ties = (n - d) / (n - 1)
+    ties[~np.isfinite(ties)] = 1.0
+    factor = ties * d / n ** 2
+    weighted = n_ij * factor[:, None]
+    # V_ab = sum f * n_a * (n * delta_ab - n_b)
+    V = np.diag((weighted * n[:, None]).sum(axis=0)) - weighted.T @ n_ij
+    V = V[:-1, :-1]
+    statistic = float(z[:-1] @ np.linalg.pinv(V) @ z[:-1])
+    p_value = float(stats.chi2.sf(statistic, n_groups - 1))
+    return statistic, p_value
+
+
+def thin_indices(n_points, max_points=DEFAULT_MAX_CURVE_POINTS):
+    """Evenly spaced indices (first and last kept) to draw at most max_points."""
+    if not max_points or n_points <= max_points:
+        return np.arange(n_points)
+    return np.unique(np.linspace(0, n_points - 1, int(max_points)).round().astype(int))
+
+
+def _plot_step(ax, times, values, label, lower=None, upper=None, max_points=2000):
+    """Step curve (and optional band) drawn from at most max_points points."""
+    keep = thin_indices(len(times), max_points)
+    ax.step(times[keep], values[keep], where='post', label=label)
+    if lower is not None:
+        ax.fill_between(times[keep], lower[keep], upper[keep], step='post', alpha=0.25)
+    ax.set_xlabel('timeline')
+
+
 class SurvivalAnalyzer:
     """
     A comprehensive survival analysis toolkit
     """
     
-    def __init__(self):
+    def __init__(self, max_curve_points=DEFAULT_MAX_CURVE_POINTS, check_assumptions=False):
+        self.max_curve_points = max_curve_points
+        self.check_assumptions = check_assumptions
+        self.curves = {}
         self.data = None
         self.kmf = None
         self.cox_model = None
@@ -53,10 +172,9 @@ class SurvivalAnalyzer:
         # Basic data validation
         assert duration_col in self.data.columns, f"Duration column '{duration_col}' not found"
         assert event_col in self.data.columns, f"Event column '{event_col}' not found"
-        if not self.data[duration_col].apply(lambda x: isinstance(x, (int, float)) and x > 0).all():
-             self.data[duration_col] = pd.to_numeric(self.data[duration_col], errors='coerce')
-             self.data = self.data.dropna(subset=[duration_col])
-             self.data = self.data[self.data[duration_col] > 0]
+        durations = pd.to_numeric(self.data[duration_col], errors='coerce')
+        valid = durations > 0
+        self.data = self.data[valid].assign(**{duration_col: durations[valid]})
         
         if not self.data[event_col].isin([0, 1]).all():
             self.data[event_col] = pd.to_numeric(self.data[event_col], errors='coerce')
@@ -65,18 +183,39 @@ class SurvivalAnalyzer:
 
         return self
     
+    def _curve(self, groups=None, alpha=0.05):
+        """KM / Greenwood curves for all groups from one sorted pass."""
+        times, labels, removed, deaths, at_risk = survival_tables(
+            self.data[self.duration_col], self.data[self.event_col], groups
+        )
+        survival, lower, upper = kaplan_meier_estimate(deaths, at_risk, alpha)
+        return {'times': times, 'labels': labels, 'removed': removed, 'deaths': deaths,
+                'at_risk': at_risk, 'survival': survival, 'lower': lower, 'upper': upper}
+
+    def _records(self, times, columns, time_key='timeline'):
+        keep = thin_indices(len(times), self.max_curve_points)
+        table = pd.DataFrame({name: values[keep] for name, values in columns.items()})
+        table.insert(0, time_key, times[keep])
+        return table
+
     def kaplan_meier(self, confidence_interval=0.95):
-        if not LIFELINES_AVAILABLE: raise ImportError("lifelines library not found.")
-        
-        kmf = KaplanMeierFitter()
-        kmf.fit(self.data[self.duration_col], self.data[self.event_col], alpha=1-confidence_interval)
-        
-        self.kmf = kmf
+        alpha = 1 - confidence_interval
+        curve = self._curve(alpha=alpha)
+        self.curves['overall'] = curve
+        times = curve['times']
+        level = f"{1 - alpha:g}"
+
+        survival_table = self._records(times, {'Survival Probability': curve['survival'][:, 0]}, time_key='Time')
+        ci_table = self._records(times, {
+            f'KM_estimate_lower_{level}': curve['lower'][:, 0],
+            f'KM_estimate_upper_{level}': curve['upper'][:, 0],
+        }, time_key='index')
         self.results['kaplan_meier'] = {
-            'survival_table': kmf.survival_function_.reset_index().rename(columns={'timeline': 'Time', 'KM_estimate': 'Survival Probability'}).to_dict('records'),
-            'confidence_interval': kmf.confidence_interval_.reset_index().to_dict('records'),
-            'median_survival_time': kmf.median_survival_time_,
-            'timeline': kmf.timeline.tolist()
+            'survival_table': survival_table.to_dict('records'),
+            'confidence_interval': ci_table.to_dict('records'),
+            'median_survival_time': median_survival(times, curve['survival'][:, 0]),
+            'timeline': survival_table['Time'].tolist(),
+            'n_timepoints': len(times)
         }
         
         if self.group_col:
@@ -85,33 +224,45 @@ class SurvivalAnalyzer:
         return self
     
     def _kaplan_meier_by_group(self, confidence_interval=0.95):
-        groups = self.data[self.group_col].unique()
+        alpha = 1 - confidence_interval
+        curve = self._curve(self.data[self.group_col], alpha=alpha)
+        self.curves['groups'] = curve
+        level = f"{1 - alpha:g}"
         group_results = {}
-        
-        for i, group in enumerate(groups):
-            group_data = self.data[self.data[self.group_col] == group]
-            kmf_group = KaplanMeierFitter()
-            kmf_group.fit(group_data[self.duration_col], group_data[self.event_col], alpha=1-confidence_interval, label=f"{self.group_col}={group}")
+
+        # Report groups in order of first appearance, like Series.unique().
+        order = pd.unique(self.data[self.group_col])
+        position = {label: i for i, label in enumerate(curve['labels'])}
+        for group in order:
+            g = position[group]
+            label = f"{self.group_col}={group}"
+            # Each group's own event/censoring times (plus t=0).
+            rows = np.flatnonzero(curve['removed'][:, g] > 0)
+            rows = np.concatenate([[0], rows[rows > 0]])
+            times = curve['times'][rows]
+            survival = curve['survival'][rows, g]
             group_results[str(group)] = {
-                'survival_function': kmf_group.survival_function_.reset_index().to_dict('records'),
-                'confidence_interval': kmf_group.confidence_interval_.reset_index().to_dict('records'),
-                'median_survival': kmf_group.median_survival_time_,
-                'n_events': int(group_data[self.event_col].sum()),
-                'n_subjects': len(group_data)
+                'survival_function': self._records(times, {label: survival}).to_dict('records'),
+                'confidence_interval': self._records(times, {
+                    f'{label}_lower_{level}': curve['lower'][rows, g],
+                    f'{label}_upper_{level}': curve['upper'][rows, g],
+                }, time_key='index').to_dict('records'),
+                'median_survival': median_survival(times, survival),
+                'n_events': int(curve['deaths'][:, g].sum()),
+                'n_subjects': int(curve['removed'][:, g].sum())
             }
         self.results['kaplan_meier_grouped'] = group_results
         
-        if len(groups) >= 2:
+        if len(order) >= 2:
             self.log_rank_test()
     
     def log_rank_test(self):
-        if not self.group_col or not LIFELINES_AVAILABLE: return self
+        if not self.group_col: return self
         
-        groups = self.data[self.group_col].unique()
-        
-        if len(groups) >= 2:
-            results = multivariate_logrank_test(self.data[self.duration_col], self.data[self.group_col], self.data[self.event_col])
-            self.results['log_rank_test'] = { 'test_statistic': results.test_statistic, 'p_value': results.p_value, 'is_significant': results.p_value < 0.05 }
+        curve = self.curves.get('groups') or self._curve(self.data[self.group_col])
+        if len(curve['labels']) >= 2:
+            statistic, p_value = multivariate_logrank(curve['deaths'], curve['at_risk'])
+            self.results['log_rank_test'] = { 'test_statistic': statistic, 'p_value': p_value, 'is_significant': p_value < 0.05 }
         
         return self
     
@@ -131,23 +282,33 @@ class SurvivalAnalyzer:
         
         self.cox_model = cph
         summary_df = cph.summary.reset_index()
-        
-        proportional_hazard_test = cph.check_assumptions(cox_data, show_plots=False, p_value_threshold=0.05)
+        likelihood_ratio = cph.log_likelihood_ratio_test()
         
         self.results['cox_ph'] = {
             'summary': summary_df.to_dict('records'),
             'concordance': cph.concordance_index_,
             'log_likelihood_ratio_test': {
-                'test_statistic': cph.log_likelihood_ratio_test.test_statistic,
-                'p_value': cph.log_likelihood_ratio_test.p_value
-            },
-            'proportional_hazard_assumption': {
-                'passed': all(p > 0.05 for p in proportional_hazard_test.p),
-                'details': proportional_hazard_test.to_dict('index')
+                'test_statistic': likelihood_ratio.test_statistic,
+                'p_value': likelihood_ratio.p_value
             }
         }
+        if self.check_assumptions:
+            self.results['cox_ph']['proportional_hazard_assumption'] = self._proportional_hazard_test(cph, cox_data)
         return self
 
+    def _proportional_hazard_test(self, cph, cox_data):
+        """Schoenfeld-residual test (rank time transform), on a subsample for large data."""
+        sample = cox_data
+        if len(cox_data) > PH_TEST_MAX_ROWS:
+            sample = cox_data.sample(PH_TEST_MAX_ROWS, random_state=42)
+        result = proportional_hazard_test(cph, sample, time_transform='rank')
+        return {
+            'passed': bool((result.summary['p'] > 0.05).all()),
+            'details': result.summary.to_dict('index'),
+            'n_used': len(sample),
+            'sampled': len(sample) < len(cox_data)
+        }
+
     def aft_regression(self, model_type='weibull'):
         if not LIFELINES_AVAILABLE or not self.covariates: return self
         
@@ -177,25 +338,32 @@ class SurvivalAnalyzer:
         fig, axes = plt.subplots(2, 2, figsize=(14, 10))
         fig.suptitle('Survival Analysis Overview', fontsize=16, fontweight='bold')
         
-        if self.kmf:
-            self.kmf.plot_survival_function(ax=axes[0, 0], ci_show=True)
+        if 'overall' in self.curves:
+            curve = self.curves['overall']
+            _plot_step(axes[0, 0], curve['times'], curve['survival'][:, 0], 'KM_estimate',
+                       curve['lower'][:, 0], curve['upper'][:, 0])
             axes[0, 0].set_title('Kaplan-Meier Survival Curve')
-            median_survival = self.kmf.median_survival_time_
-            if not np.isnan(median_survival):
-                axes[0, 0].axvline(median_survival, color='red', linestyle='--', alpha=0.7, label=f'Median: {median_survival:.2f}')
+            median_time = self.results['kaplan_meier']['median_survival_time']
+            if np.isfinite(median_time):
+                axes[0, 0].axvline(median_time, color='red', linestyle='--', alpha=0.7, label=f'Median: {median_time:.2f}')
             axes[0,0].legend()
         
-        naf = NelsonAalenFitter()
-        naf.fit(self.data[self.duration_col], event_observed=self.data[self.event_col])
-        naf.plot_cumulative_hazard(ax=axes[0, 1], ci_show=True)
+        times, _, _, deaths, at_risk = survival_tables(self.data[self.duration_col], self.data[self.event_col])
+        hazard, variance = nelson_aalen_estimate(deaths[:, 0], at_risk[:, 0])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            spread = np.exp(stats.norm.ppf(0.975) * np.sqrt(variance) / hazard)
+        spread[~np.isfinite(spread)] = 1.0
+        _plot_step(axes[0, 1], times, hazard, 'NA_estimate', hazard / spread, hazard * spread)
+        axes[0, 1].legend()
         axes[0, 1].set_title('Cumulative Hazard Function')
 
-        if self.group_col and 'kaplan_meier_grouped' in self.results:
-            for group in self.data[self.group_col].unique():
-                group_data = self.data[self.data[self.group_col] == group]
-                kmf_group = KaplanMeierFitter()
-                kmf_group.fit(group_data[self.duration_col], event_observed=group_data[self.event_col], label=str(group))
-                kmf_group.plot_survival_function(ax=axes[1, 0])
+        if self.group_col and 'groups' in self.curves:
+            curve = self.curves['groups']
+            position = {label: i for i, label in enumerate(curve['labels'])}
+            for group in pd.unique(self.data[self.group_col]):
+                g = position[group]
+                rows = np.flatnonzero((curve['removed'][:, g] > 0) | (np.arange(len(curve['times'])) == 0))
+                _plot_step(axes[1, 0], curve['times'][rows], curve['survival'][rows, g], str(group))
             axes[1, 0].set_title(f'Survival Curves by {self.group_col}')
             axes[1, 0].legend()
         else:
@@ -210,13 +378,15 @@ class SurvivalAnalyzer:
             
             risk_scores = self.cox_model.predict_partial_hazard(cox_data[self.used_covariates_cox])
             risk_groups = pd.qcut(risk_scores, q=[0, .33, .66, 1], labels=['Low', 'Medium', 'High'])
-            cox_data['risk_group'] = risk_groups
-            
+            times, labels, removed, deaths, at_risk = survival_tables(
+                cox_data[self.duration_col], cox_data[self.event_col], risk_groups.astype(str)
+            )
+            survival, _, _ = kaplan_meier_estimate(deaths, at_risk)
             for group in ['Low', 'Medium', 'High']:
-                group_df = cox_data[cox_data['risk_group'] == group]
-                if not group_df.empty:
-                    kmf_risk = KaplanMeierFitter().fit(group_df[self.duration_col], group_df[self.event_col], label=group)
-                    kmf_risk.plot_survival_function(ax=axes[1, 1])
+                g = np.flatnonzero(labels == group)
+                if len(g):
+                    rows = np.flatnonzero((removed[:, g[0]] > 0) | (np.arange(len(times)) == 0))
+                    _plot_step(axes[1, 1], times[rows], survival[rows, g[0]], group)
             axes[1, 1].set_title('Survival by Risk Group (Cox Model)')
             axes[1, 1].legend()
         else:
@@ -234,41 +404,48 @@ class SurvivalAnalyzer:
         buf.seek(0)
         return f"data:image/png;base64,{base64.b64encode(buf.read()).decode('utf-8')}"
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        data = pd.DataFrame(payload.get('data'))
-        duration_col = payload.get('durationCol')
-        event_col = payload.get('eventCol')
-        group_col = payload.get('groupCol')
-        covariates = payload.get('covariates', [])
-        model_type = payload.get('modelType', 'km')
-
-        analyzer = SurvivalAnalyzer()
-        analyzer.load_data(data, duration_col, event_col, group_col, covariates)
-
-        if model_type == 'km':
-            analyzer.kaplan_meier()
-        elif model_type == 'cox':
+def run_survival_analysis(payload):
+    data = load_frame(payload)
+    duration_col = payload.get('durationCol')
+    event_col = payload.get('eventCol')
+    group_col = payload.get('groupCol')
+    covariates = payload.get('covariates', [])
+    model_type = payload.get('modelType', 'km')
+
+    analyzer = SurvivalAnalyzer(
+        max_curve_points=payload.get('maxCurvePoints', DEFAULT_MAX_CURVE_POINTS),
+        check_assumptions=bool(payload.get('checkAssumptions', False))
+    )
+    analyzer.load_data(data, duration_col, event_col, group_col, covariates)
+
+    if model_type == 'km':
+        analyzer.kaplan_meier()
+    elif model_type == 'cox':
+        analyzer.cox_regression()
+    elif model_type.startswith('aft_'):
+        aft_model = model_type.split('_')[1]
+        analyzer.aft_regression(model_type=aft_model)
+    else:
+        # Default to running all for general overview
+        analyzer.kaplan_meier()
+        if covariates:
             analyzer.cox_regression()
-        elif model_type.startswith('aft_'):
-            aft_model = model_type.split('_')[1]
-            analyzer.aft_regression(model_type=aft_model)
-        else:
-            # Default to running all for general overview
-            analyzer.kaplan_meier()
-            if covariates:
-                analyzer.cox_regression()
-                analyzer.aft_regression('weibull')
-                analyzer.aft_regression('lognormal')
-        
-        plot_image = analyzer.plot_all()
+            analyzer.aft_regression('weibull')
+            analyzer.aft_regression('lognormal')
+
+    plot_image = analyzer.plot_all()
+
+    response = {
+        'results': analyzer.results,
+        'plot': plot_image
+    }
+    return response
 
-        response = {
-            'results': analyzer.results,
-            'plot': plot_image
-        }
 
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_survival_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
@@ -2,13 +2,14 @@
 import sys
 import json
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy import stats
 import io
 import base64
 import warnings
+from dataset_io import load_frame
+from robust_covariance import QRFactor, covariance, normalize_cov_type
 
 warnings.filterwarnings('ignore')
 
@@ -46,8 +47,12 @@ class TwoSLS:
         self.stage1_results = None
         self.n_obs = None
         self.n_params = None
+        self.sargan = None
+        self.cov_type = None
+        self.cov_info = None
         
-    def fit(self, y, X, Z, add_constant=True, robust_se=False):
+    def fit(self, y, X, Z, add_constant=True, robust_se=False, n_exog=0, cov_type=None,
+            groups=None, maxlags=None):
         """
         Fit the 2SLS model
         
@@ -62,7 +67,14 @@ class TwoSLS:
         add_constant : bool
             Whether to add intercept
         robust_se : bool
-            Whether to use heteroskedasticity-robust standard errors
+            Whether to use heteroskedasticity-robust (HC1) standard errors
+        n_exog : int
+            Number of exogenous regressors at the end of X, which must also be
+            the first columns of Z (after the constant); the rest of Z are the
+            excluded instruments used for the weak-instrument F and Sargan tests
+        cov_type : str
+            Covariance type, overrides robust_se: 'nonrobust', 'HC0'-'HC3',
+            'cluster' (with groups) or 'HAC' (with maxlags, rows in time order)
             
         Returns:
         --------
@@ -107,9 +119,9 @@ class TwoSLS:
                 f"Number of instruments must be >= number of parameters."
             )
         
-        # Stage 1: Project X onto Z
+        # Stage 1: Project X onto Z through a thin QR of Z (no n x n projection matrix)
         try:
-            ZtZ_inv = np.linalg.inv(Z.T @ Z)
+            z_factor = QRFactor(Z)
         except np.linalg.LinAlgError:
             raise ValueError(
                 "Instrument matrix (Z'Z) is singular. "
@@ -117,18 +129,20 @@ class TwoSLS:
                 "Check for duplicate or linearly dependent instrumental variables."
             )
 
-        P_Z = Z @ ZtZ_inv @ Z.T  # Projection matrix
-        self.X_hat = P_Z @ X
+        self.X_hat = z_factor.project(X)
         
         # Calculate first-stage statistics
         self.stage1_results = {
             'first_stage_R2': [],
-            'first_stage_F': []
+            'first_stage_F': [],
+            'partial_F': [],
+            'partial_F_pvalue': [],
         }
         
         # Calculate R² and F-statistic for each endogenous variable
         # Skip constant term
         start_idx = 1 if add_constant else 0
+        k = Z.shape[1]
         
         for j in range(start_idx, X.shape[1]):
             # R-squared
@@ -139,38 +153,56 @@ class TwoSLS:
             
             # F-statistic for first stage
             # F = (R²/(k-1)) / ((1-R²)/(n-k))
-            k = Z.shape[1]
             if r2 < 0.9999:  # Avoid division issues when R² ≈ 1
                 f_stat = (r2 / (k - 1)) / ((1 - r2) / (n - k))
             else:
                 f_stat = np.inf
             self.stage1_results['first_stage_F'].append(f_stat)
 
+        # Weak-instrument F: joint test of the excluded instruments in each endogenous
+        # first stage. Z = [const, exogenous X, excluded instruments], so the restricted
+        # regression on [const, exogenous X] uses the leading columns of the same Q.
+        n_included = start_idx + n_exog
+        n_excluded = k - n_included
+        n_endog = X.shape[1] - start_idx - n_exog
+        x_endog = X[:, start_idx:start_idx + n_endog]
+        if n_excluded > 0 and n_endog > 0:
+            ss_excluded = z_factor.explained_ss(x_endog, n_included)
+            ss_resid = np.sum(x_endog ** 2, axis=0) - z_factor.explained_ss(x_endog)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                partial_f = (ss_excluded / n_excluded) / (ss_resid / (n - k))
+            self.stage1_results['partial_F'] = list(partial_f)
+            self.stage1_results['partial_F_pvalue'] = list(stats.f.sf(partial_f, n_excluded, n - k))
+
         # Stage 2: Regress y on X_hat
         try:
-            XhatX_inv = np.linalg.inv(self.X_hat.T @ self.X_hat)
+            xhat_factor = QRFactor(self.X_hat)
         except np.linalg.LinAlgError:
             raise ValueError(
                 "X_hat'X_hat is singular. This can happen when instruments are "
                 "not relevant (weak instruments) or perfectly collinear."
             )
             
-        self.beta_2sls = XhatX_inv @ self.X_hat.T @ y
+        self.beta_2sls = xhat_factor.coef(y)
         
         # Calculate fitted values and residuals using ORIGINAL X (not X_hat)
         # This is the correct approach for 2SLS
         self.fitted_values = X @ self.beta_2sls
         self.residuals = y - self.fitted_values
+
+        # Sargan over-identification test: n * uncentered R² of the 2SLS residuals on Z
+        self.sargan = None
+        overid = n_excluded - n_endog
+        if overid > 0:
+            u_ss = self.residuals @ self.residuals
+            sargan = n * z_factor.explained_ss(self.residuals) / u_ss if u_ss > 0 else np.nan
+            self.sargan = {'statistic': sargan, 'df': overid, 'p_value': stats.chi2.sf(sargan, overid)}
         
         # Calculate standard errors
-        if robust_se:
-            # Heteroskedasticity-robust (White) standard errors
-            self.se_2sls = self._robust_se(self.X_hat, self.residuals)
-        else:
-            # Homoskedastic standard errors
-            sigma2 = np.sum(self.residuals**2) / (n - X.shape[1])
-            var_beta = sigma2 * XhatX_inv
-            self.se_2sls = np.sqrt(np.diag(var_beta))
+        self.cov_type = normalize_cov_type(cov_type or ('HC1' if robust_se else 'nonrobust'))
+        cov, self.cov_info = covariance(self.X_hat, self.residuals, self.cov_type, factor=xhat_factor,
+                                        groups=groups, maxlags=maxlags)
+        self.se_2sls = np.sqrt(np.diag(cov))
         
         # Handle potential numerical issues
         self.se_2sls = np.where(self.se_2sls < 1e-10, np.nan, self.se_2sls)
@@ -186,17 +218,14 @@ class TwoSLS:
         
         # Also calculate OLS for comparison
         try:
-            XtX_inv = np.linalg.inv(X.T @ X)
-            self.beta_ols = XtX_inv @ X.T @ y
+            x_factor = QRFactor(X)
+            self.beta_ols = x_factor.coef(y)
             
             # OLS standard errors
             residuals_ols = y - X @ self.beta_ols
-            if robust_se:
-                self.se_ols = self._robust_se(X, residuals_ols)
-            else:
-                sigma2_ols = np.sum(residuals_ols**2) / (n - X.shape[1])
-                var_beta_ols = sigma2_ols * XtX_inv
-                self.se_ols = np.sqrt(np.diag(var_beta_ols))
+            cov_ols, _ = covariance(X, residuals_ols, self.cov_type, factor=x_factor,
+                                    groups=groups, maxlags=maxlags)
+            self.se_ols = np.sqrt(np.diag(cov_ols))
         except np.linalg.LinAlgError:
             self.beta_ols = np.full(X.shape[1], np.nan)
             self.se_ols = np.full(X.shape[1], np.nan)
@@ -205,7 +234,7 @@ class TwoSLS:
     
     def _robust_se(self, X, residuals):
         """
-        Calculate heteroskedasticity-robust standard errors (White/Huber-White)
+        Calculate heteroskedasticity-robust standard errors (White/Huber-White, HC1)
         
         Parameters:
         -----------
@@ -219,25 +248,11 @@ class TwoSLS:
         se : array
             Robust standard errors
         """
-        n = len(residuals)
-        k = X.shape[1]
-        
-        # Bread: (X'X)^(-1)
         try:
-            bread = np.linalg.inv(X.T @ X)
+            cov, _ = covariance(X, residuals, 'HC1')
         except np.linalg.LinAlgError:
-            return np.full(k, np.nan)
-        
-        # Meat: X' diag(e²) X
-        meat = X.T @ np.diag(residuals**2) @ X
-        
-        # Sandwich: (X'X)^(-1) [X' diag(e²) X] (X'X)^(-1)
-        sandwich = bread @ meat @ bread
-        
-        # Standard errors with small sample correction
-        se = np.sqrt(np.diag(sandwich) * n / (n - k))
-        
-        return se
+            return np.full(np.asarray(X).shape[1], np.nan)
+        return np.sqrt(np.diag(cov))
     
     def summary(self):
         """Print summary of estimation results"""
@@ -246,6 +261,7 @@ class TwoSLS:
         print("=" * 80)
         print(f"Number of observations: {self.n_obs}")
         print(f"Number of parameters: {self.n_params}")
+        print(f"Covariance type: {self.cov_type}")
         
         if self.stage1_results['first_stage_R2']:
             print("\nFirst-Stage Statistics:")
@@ -263,6 +279,11 @@ class TwoSLS:
                         print(" (Strong instrument)")
                 else:
                     print(f"    F-statistic = Inf (Perfect fit)")
+            for i, f_stat in enumerate(self.stage1_results['partial_F']):
+                print(f"  Excluded-instrument F (endogenous variable {i+1}) = {f_stat:.2f}")
+        if self.sargan:
+            print(f"Sargan test: chi2({self.sargan['df']}) = {self.sargan['statistic']:.4f}, "
+                  f"p = {self.sargan['p_value']:.4f}")
         
         print("\n" + "-" * 80)
         print(f"{'Variable':<15} {'2SLS Coef':<13} {'Std Err':<13} {'t-stat':<11} {'P>|t|':<11}")
@@ -322,6 +343,87 @@ class TwoSLS:
         return X_new @ self.beta_2sls
 
 
+def run_two_stage_least_squares_analysis(payload):
+    data = load_frame(payload)
+    y_col = payload.get('y_col')
+    x_endog_cols = payload.get('x_endog_cols', [])
+    x_exog_cols = payload.get('x_exog_cols', [])
+    z_cols = payload.get('z_cols', [])
+    robust_se = payload.get('robust_se', False)
+    cov_type = payload.get('cov_type')
+    cluster_col = payload.get('cluster_col')
+    maxlags = payload.get('maxlags')
+
+    # Validation
+    if not y_col:
+        raise ValueError("Dependent variable (y_col) is required.")
+    if not x_endog_cols:
+        raise ValueError("At least one endogenous variable (x_endog_cols) is required.")
+    if not z_cols:
+        raise ValueError("At least one instrumental variable (z_cols) is required.")
+
+    # Prepare data
+    all_cols = [y_col] + x_endog_cols + x_exog_cols + z_cols
+    if cluster_col:
+        all_cols.append(cluster_col)
+    df = data[list(dict.fromkeys(all_cols))].dropna()
+
+    if len(df) == 0:
+        raise ValueError("No valid observations after removing missing values.")
+
+    y = df[y_col].values
+
+    # X includes both endogenous and exogenous variables
+    X = df[x_endog_cols + x_exog_cols].values
+
+    # Z includes exogenous variables AND external instruments
+    # This is the correct specification for 2SLS
+    Z = df[x_exog_cols + z_cols].values if x_exog_cols else df[z_cols].values
+
+    # Fit model
+    model = TwoSLS()
+    groups = df[cluster_col].values if cluster_col else None
+    model.fit(y, X, Z, add_constant=True, robust_se=robust_se, n_exog=len(x_exog_cols),
+              cov_type=cov_type, groups=groups, maxlags=maxlags)
+
+    # Variable names for output
+    var_names = ['const'] + x_endog_cols + x_exog_cols
+
+    # Prepare results
+    results = {
+        'ols_results': {
+            'model': 'OLS (Naive)',
+            'coefficients': [_to_native_type(x) for x in model.beta_ols],
+            'std_errors': [_to_native_type(x) for x in model.se_ols],
+            'variable_names': var_names,
+        },
+        'tsls_results': {
+            'model': '2SLS (IV)',
+            'coefficients': [_to_native_type(x) for x in model.beta_2sls],
+            'std_errors': [_to_native_type(x) for x in model.se_2sls],
+            't_statistics': [_to_native_type(x) for x in model.t_stats],
+            'p_values': [_to_native_type(x) for x in model.p_values],
+            'variable_names': var_names,
+        },
+        'first_stage': {
+            'r_squared': [_to_native_type(x) for x in model.stage1_results['first_stage_R2']],
+            'f_statistics': [_to_native_type(x) for x in model.stage1_results['first_stage_F']],
+            'partial_f_statistics': [_to_native_type(x) for x in model.stage1_results['partial_F']],
+            'partial_f_pvalues': [_to_native_type(x) for x in model.stage1_results['partial_F_pvalue']],
+            'endogenous_variables': x_endog_cols,
+        },
+        'sargan': {k: _to_native_type(v) for k, v in model.sargan.items()} if model.sargan else None,
+        'diagnostics': {
+            'n_observations': int(model.n_obs),
+            'n_parameters': int(model.n_params),
+            'n_instruments': int(Z.shape[1] + 1),  # +1 for constant
+            'cov_type': model.cov_type,
+            **{k: _to_native_type(v) for k, v in model.cov_info.items() if k != 'cov_type'},
+        }
+    }
+    return results
+
+
 def main():
     """
     Main function for API endpoint
@@ -329,72 +431,8 @@ def main():
     """
     try:
         payload = json.load(sys.stdin)
-        data = pd.DataFrame(payload.get('data'))
-        y_col = payload.get('y_col')
-        x_endog_cols = payload.get('x_endog_cols', [])
-        x_exog_cols = payload.get('x_exog_cols', [])
-        z_cols = payload.get('z_cols', [])
-        robust_se = payload.get('robust_se', False)
-
-        # Validation
-        if not y_col:
-            raise ValueError("Dependent variable (y_col) is required.")
-        if not x_endog_cols:
-            raise ValueError("At least one endogenous variable (x_endog_cols) is required.")
-        if not z_cols:
-            raise ValueError("At least one instrumental variable (z_cols) is required.")
-        
-        # Prepare data
-        all_cols = [y_col] + x_endog_cols + x_exog_cols + z_cols
-        df = data[all_cols].dropna()
-        
-        if len(df) == 0:
-            raise ValueError("No valid observations after removing missing values.")
-        
-        y = df[y_col].values
-        
-        # X includes both endogenous and exogenous variables
-        X = df[x_endog_cols + x_exog_cols].values
-        
-        # Z includes exogenous variables AND external instruments
-        # This is the correct specification for 2SLS
-        Z = df[x_exog_cols + z_cols].values if x_exog_cols else df[z_cols].values
-        
-        # Fit model
-        model = TwoSLS()
-        model.fit(y, X, Z, add_constant=True, robust_se=robust_se)
-        
-        # Variable names for output
-        var_names = ['const'] + x_endog_cols + x_exog_cols
-        
-        # Prepare results
-        results = {
-            'ols_results': {
-                'model': 'OLS (Naive)',
-                'coefficients': [_to_native_type(x) for x in model.beta_ols],
-                'std_errors': [_to_native_type(x) for x in model.se_ols],
-                'variable_names': var_names,
-            },
-            'tsls_results': {
-                'model': '2SLS (IV)',
-                'coefficients': [_to_native_type(x) for x in model.beta_2sls],
-                'std_errors': [_to_native_type(x) for x in model.se_2sls],
-                't_statistics': [_to_native_type(x) for x in model.t_stats],
-                'p_values': [_to_native_type(x) for x in model.p_values],
-                'variable_names': var_names,
-            },
-            'first_stage': {
-                'r_squared': [_to_native_type(x) for x in model.stage1_results['first_stage_R2']],
-                'f_statistics': [_to_native_type(x) for x in model.stage1_results['first_stage_F']],
-            },
-            'diagnostics': {
-                'n_observations': int(model.n_obs),
-                'n_parameters': int(model.n_params),
-                'n_instruments': int(Z.shape[1] + 1),  # +1 for constant
-            }
-        }
-        
-        print(json.dumps(results, default=_to_native_type))
+        response = run_two_stage_least_squares_analysis(payload)
+        print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
         error_result = {"error": str(e)}
@@ -16,6 +16,7 @@ import io
 import base64
 import math
 import re
+from dataset_io import load_frame, has_data
 
 warnings.filterwarnings('ignore')
 
@@ -260,27 +261,31 @@ class TwoWayAnovaAnalysis:
         buf.seek(0)
         return f"data:image/png;base64,{base64.b64encode(buf.read()).decode('utf-8')}"
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        data = payload.get('data')
-        dependent_var = payload.get('dependentVar')
-        factor_a = payload.get('factorA')
-        factor_b = payload.get('factorB')
+def run_two_way_anova_analysis(payload):
+    data = load_frame(payload)
+    dependent_var = payload.get('dependentVar')
+    factor_a = payload.get('factorA')
+    factor_b = payload.get('factorB')
 
-        if not all([data, dependent_var, factor_a, factor_b]):
-            raise ValueError("Missing required parameters: data, dependentVar, factorA, factorB")
+    if not all([has_data(payload), dependent_var, factor_a, factor_b]):
+        raise ValueError("Missing required parameters: data, dependentVar, factorA, factorB")
 
-        analysis = TwoWayAnovaAnalysis(data, dependent_var, factor_a, factor_b)
-        analysis.run_analysis()
-        
-        plot_image = analysis.plot_results()
+    analysis = TwoWayAnovaAnalysis(data, dependent_var, factor_a, factor_b)
+    analysis.run_analysis()
 
-        response = {
-            'results': analysis.results,
-            'plot': plot_image
-        }
-        
+    plot_image = analysis.plot_results()
+
+    response = {
+        'results': analysis.results,
+        'plot': plot_image
+    }
+    return response
+
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_two_way_anova_analysis(payload)
         print(json.dumps(response, default=_to_native_type, indent=2))
 
     except Exception as e:
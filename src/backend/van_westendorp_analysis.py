@@ -8,6 +8,7 @@ from scipy import interpolate
 import io
 import base64
 import warnings
+from dataset_io import load_frame, has_data
 
 warnings.filterwarnings('ignore')
 
@@ -220,54 +221,57 @@ def generate_interpretation(results):
     )
     return interpretation.strip()
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        data = payload.get('data')
-        too_cheap_col = payload.get('too_cheap_col', 'Too Cheap')
-        cheap_col = payload.get('cheap_col', 'Cheap')
-        expensive_col = payload.get('expensive_col', 'Expensive')
-        too_expensive_col = payload.get('too_expensive_col', 'Too Expensive')
+def run_van_westendorp_analysis(payload):
+    too_cheap_col = payload.get('too_cheap_col', 'Too Cheap')
+    cheap_col = payload.get('cheap_col', 'Cheap')
+    expensive_col = payload.get('expensive_col', 'Expensive')
+    too_expensive_col = payload.get('too_expensive_col', 'Too Expensive')
 
-        if not data: raise ValueError("Missing required data.")
+    if not has_data(payload): raise ValueError("Missing required data.")
 
-        df = pd.DataFrame(data)
-        price_cols = [too_cheap_col, cheap_col, expensive_col, too_expensive_col]
-        
-        for col in price_cols:
-            if col not in df.columns: raise ValueError(f"Required column '{col}' not found.")
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        df_clean = df[price_cols].dropna()
-        if len(df_clean) < 10: raise ValueError(f"Need at least 10 complete responses, found {len(df_clean)}.")
-        
-        price_min = df_clean[price_cols].min().min()
-        price_max = df_clean[price_cols].max().max()
-        price_range = np.linspace(price_min, price_max, 500)
-            
-        curves = calculate_vw_curves(df_clean, price_cols, price_range)
-        if curves is None: raise ValueError("Could not calculate VW curves.")
+    df = load_frame(payload)
+    price_cols = [too_cheap_col, cheap_col, expensive_col, too_expensive_col]
 
-        results = calculate_price_points(price_range, curves)
-        results['interpretation'] = generate_interpretation(results)
+    for col in price_cols:
+        if col not in df.columns: raise ValueError(f"Required column '{col}' not found.")
+        df[col] = pd.to_numeric(df[col], errors='coerce')
 
-        plots = {
-            'psm_plot': create_psm_plot(price_range, curves, results),
-            'acceptance_plot': create_acceptance_plot(price_range, curves)
-        }
-        
-        response = {
-            'results': results,
-            'plots': plots,
-            'summary': {
-                'total_responses': len(df_clean),
-                'price_range': {
-                    'min': float(price_min),
-                    'max': float(price_max)
-                }
+    df_clean = df[price_cols].dropna()
+    if len(df_clean) < 10: raise ValueError(f"Need at least 10 complete responses, found {len(df_clean)}.")
+
+    price_min = df_clean[price_cols].min().min()
+    price_max = df_clean[price_cols].max().max()
+    price_range = np.linspace(price_min, price_max, 500)
+
+    curves = calculate_vw_curves(df_clean, price_cols, price_range)
+    if curves is None: raise ValueError("Could not calculate VW curves.")
+
+    results = calculate_price_points(price_range, curves)
+    results['interpretation'] = generate_interpretation(results)
+
+    plots = {
+        'psm_plot': create_psm_plot(price_range, curves, results),
+        'acceptance_plot': create_acceptance_plot(price_range, curves)
+    }
+
+    response = {
+        'results': results,
+        'plots': plots,
+        'summary': {
+            'total_responses': len(df_clean),
+            'price_range': {
+                'min': float(price_min),
+                'max': float(price_max)
             }
         }
-        
+    }
+    return response
+
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_van_westendorp_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
         
     except Exception as e:
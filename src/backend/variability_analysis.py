@@ -5,6 +5,7 @@ import numpy as np
 import pandas as pd
 from scipy.stats import iqr
 import warnings
+from dataset_io import load_frame, has_data
 
 warnings.filterwarnings("ignore")
 
@@ -37,51 +38,54 @@ def get_interpretation(results):
     )
     return interpretation
 
+def run_variability_analysis(payload):
+    variables = payload.get('variables')
+
+    if not has_data(payload) or not variables:
+        raise ValueError("Missing 'data' or 'variables'")
+
+    df = load_frame(payload)
+
+    analysis_results = []
+
+    for var in variables:
+        if var not in df.columns:
+            continue
+
+        series = pd.to_numeric(df[var], errors="coerce").dropna()
+
+        if len(series) < 2:
+            continue
+
+        range_val = float(series.max() - series.min())
+        iqr_val = float(iqr(series))
+        mean_val = float(series.mean())
+        std_val = float(series.std())
+
+        cv_val = (std_val / mean_val) * 100 if mean_val != 0 else 0
+
+        analysis_results.append({
+            "variable": var,
+            "range": range_val,
+            "iqr": iqr_val,
+            "cv": cv_val,
+            "mean": mean_val,
+            "std_dev": std_val
+        })
+
+    interpretation = get_interpretation(analysis_results)
+
+    response = {
+        "results": analysis_results,
+        "interpretation": interpretation
+    }
+    return response
+
+
 def main():
     try:
         payload = json.load(sys.stdin)
-        data = payload.get('data')
-        variables = payload.get('variables')
-
-        if not data or not variables:
-            raise ValueError("Missing 'data' or 'variables'")
-
-        df = pd.DataFrame(data)
-        
-        analysis_results = []
-
-        for var in variables:
-            if var not in df.columns:
-                continue
-
-            series = pd.to_numeric(df[var], errors="coerce").dropna()
-            
-            if len(series) < 2:
-                continue
-                
-            range_val = float(series.max() - series.min())
-            iqr_val = float(iqr(series))
-            mean_val = float(series.mean())
-            std_val = float(series.std())
-            
-            cv_val = (std_val / mean_val) * 100 if mean_val != 0 else 0
-            
-            analysis_results.append({
-                "variable": var,
-                "range": range_val,
-                "iqr": iqr_val,
-                "cv": cv_val,
-                "mean": mean_val,
-                "std_dev": std_val
-            })
-
-        interpretation = get_interpretation(analysis_results)
-        
-        response = {
-            "results": analysis_results,
-            "interpretation": interpretation
-        }
-
+        response = run_variability_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
@@ -10,33 +10,17 @@ import string
 import io
 import base64
 import warnings
-import os
-import platform
 import matplotlib.font_manager as fm
-from pathlib import Path
 import plotly.express as px
 import plotly.io as pio
 
-# NLTK for English sentiment
-try:
-    import nltk
-    from nltk.sentiment.vader import SentimentIntensityAnalyzer
-    nltk.download('vader_lexicon', quiet=True)
-    NLTK_AVAILABLE = True
-except ImportError:
-    NLTK_AVAILABLE = False
-
-# Konlpy for Korean sentiment
-try:
-    from konlpy.tag import Okt
-    KONLPY_AVAILABLE = True
-except ImportError:
-    KONLPY_AVAILABLE = False
+# Stopwords, tokenizer and fonts come from the local bundle; nothing is downloaded.
+from nlp_resources import KONLPY_AVAILABLE, KOREAN_PATTERN, get_okt, get_stopwords, get_font_path
 
 warnings.filterwarnings('ignore')
 
 try:
-    from wordcloud import WordCloud, STOPWORDS
+    from wordcloud import WordCloud
     WORDCLOUD_AVAILABLE = True
 except ImportError:
     WORDCLOUD_AVAILABLE = False
@@ -54,45 +38,9 @@ def _to_native_type(obj):
         return bool(obj)
     return obj
 
-def get_font_path():
-    """Find a suitable font on the system."""
-    system = platform.system()
-    
-    if system == 'Windows':
-        font_paths = ['C:/Windows/Fonts/malgun.ttf']
-        for path in font_paths:
-            if os.path.exists(path):
-                return path
-
-    elif system == 'Darwin': # macOS
-        font_paths = ['/System/Library/Fonts/Apple SD Gothic Neo.ttc']
-        for path in font_paths:
-            if os.path.exists(path):
-                return path
-
-    elif system == 'Linux':
-        # Check matplotlib's font cache first
-        try:
-            font_list = fm.findSystemFonts(fontpaths=None, fontext='ttf')
-            nanum_fonts = [f for f in font_list if 'NanumGothic' in f]
-            if nanum_fonts:
-                return nanum_fonts[0]
-        except:
-            pass
-
-    # Fallback to any font that might support CJK characters
-    try:
-        for font in fm.fontManager.ttflist:
-            if 'Gothic' in font.name or 'Malgun' in font.name:
-                return font.fname
-    except:
-        pass
-            
-    return None
-
 class WordCloudGenerator:
     def __init__(self):
-        self.default_stopwords = set(STOPWORDS) if WORDCLOUD_AVAILABLE else set()
+        self.default_stopwords = set(get_stopwords('english'))
         self.font_path = get_font_path()
         if self.font_path:
             plt.rcParams['font.family'] = fm.FontProperties(fname=self.font_path).get_name()
@@ -102,17 +50,18 @@ class WordCloudGenerator:
 
 
     def preprocess_text(self, text, custom_stopwords, min_word_length):
-        is_korean = any('\uac00' <= char <= '\ud7a3' for char in text)
+        is_korean = KOREAN_PATTERN.search(text) is not None
 
         text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
         text = text.translate(str.maketrans('', '', string.punctuation))
         text = re.sub(r'\d+', '', text)
         
         all_stopwords = self.default_stopwords.union(set(custom_stopwords))
+        if is_korean:
+            all_stopwords |= get_stopwords('korean')
 
         if is_korean and KONLPY_AVAILABLE:
-            okt = Okt()
-            nouns = okt.nouns(text)
+            nouns = get_okt().nouns(text)
             processed_words = [word for word in nouns if len(word) >= min_word_length and word not in all_stopwords]
         else:
             text = text.lower()
@@ -188,47 +137,51 @@ class WordCloudGenerator:
         return base64.b64encode(buf.read()).decode('utf-8')
 
 
-def main():
-    try:
-        payload = json.load(sys.stdin)
-        text_data = payload.get('text', '')
-        custom_stopwords_str = payload.get('customStopwords', '')
-        min_word_length = payload.get('minWordLength', 2)
-        max_words = payload.get('maxWords', 100)
-        colormap = payload.get('colormap', 'viridis')
-        
-        if not text_data:
-            raise ValueError("Text data is required.")
+def run_wordcloud_analysis(payload):
+    text_data = payload.get('text', '')
+    custom_stopwords_str = payload.get('customStopwords', '')
+    min_word_length = payload.get('minWordLength', 2)
+    max_words = payload.get('maxWords', 100)
+    colormap = payload.get('colormap', 'viridis')
 
-        generator = WordCloudGenerator()
-        
-        custom_stopwords = [word.strip() for word in custom_stopwords_str.split(',') if word.strip()]
+    if not text_data:
+        raise ValueError("Text data is required.")
 
-        processed_text, processed_words = generator.preprocess_text(text_data, custom_stopwords, min_word_length)
-        
-        if not processed_text.strip():
-             raise ValueError("No valid words found after preprocessing.")
+    generator = WordCloudGenerator()
 
-        frequencies = generator.calculate_word_frequencies(processed_words, top_n=max_words)
-        statistics = generator.analyze_text_statistics(text_data, processed_words)
+    custom_stopwords = [word.strip() for word in custom_stopwords_str.split(',') if word.strip()]
 
-        settings = {
-            'width': 800, 'height': 400, 'background_color': 'white',
-            'colormap': colormap, 'max_words': max_words
-        }
+    processed_text, processed_words = generator.preprocess_text(text_data, custom_stopwords, min_word_length)
 
-        wordcloud_json = generator.generate_wordcloud_image(processed_text, settings)
-        frequency_plot_img = generator.generate_frequency_plot(frequencies)
+    if not processed_text.strip():
+         raise ValueError("No valid words found after preprocessing.")
 
-        response = {
-            "plots": {
-                "wordcloud": wordcloud_json,
-                "frequency_bar": f"data:image/png;base64,{frequency_plot_img}",
-            },
-            "frequencies": frequencies,
-            "statistics": statistics
-        }
+    frequencies = generator.calculate_word_frequencies(processed_words, top_n=max_words)
+    statistics = generator.analyze_text_statistics(text_data, processed_words)
+
+    settings = {
+        'width': 800, 'height': 400, 'background_color': 'white',
+        'colormap': colormap, 'max_words': max_words
+    }
+
+    wordcloud_json = generator.generate_wordcloud_image(processed_text, settings)
+    frequency_plot_img = generator.generate_frequency_plot(frequencies)
 
+    response = {
+        "plots": {
+            "wordcloud": wordcloud_json,
+            "frequency_bar": f"data:image/png;base64,{frequency_plot_img}",
+        },
+        "frequencies": frequencies,
+        "statistics": statistics
+    }
+    return response
+
+
+def main():
+    try:
+        payload = json.load(sys.stdin)
+        response = run_wordcloud_analysis(payload)
         print(json.dumps(response, default=_to_native_type))
 
     except Exception as e:
@@ -0,0 +1,369 @@
+import os
+import io
+import sys
+import json
+import time
+import importlib.util
+import multiprocessing
+from contextlib import redirect_stdout, redirect_stderr
+from concurrent.futures import ProcessPoolExecutor
+import threading
+import numpy as np
+
+from parallelism import DEFAULT_MAX_WORKERS, IN_WORKER_ENV
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BACKEND_DIR, '..', '..'))
+
+# Directories scanned for stdin/stdout analysis scripts (files defining main()).
+SCRIPT_DIRS = [
+    BACKEND_DIR,
+    os.path.join(PROJECT_ROOT, 'backend', 'finance'),
+]
+
+# Files that live next to the scripts but are not analyses.
+EXCLUDED_SCRIPTS = {'main', 'worker_pool', 'worker_shim', 'cfa_analysis'}
+
+# Modules whose run_* entry points take keyword arguments and are wired up
+# explicitly in main.py.
+EXCLUDED_HANDLERS = {'effectiveness_analysis', 'descriptive_stats_analysis'}
+
+# Heavy libraries imported once per worker instead of once per request.
+PRELOAD_MODULES = [
+    'numpy',
+    'pandas',
+    'scipy.stats',
+    'scipy.optimize',
+    'statsmodels.api',
+    'statsmodels.formula.api',
+    'sklearn.linear_model',
+    'sklearn.preprocessing',
+    'matplotlib.pyplot',
+    'seaborn',
+]
+
+DEFAULT_MAX_PENDING = 32
+DEFAULT_MAX_TASKS_PER_CHILD = 200
+
+
+class ScriptError(Exception):
+    """Raised when an analysis script reports an error (stderr JSON + exit 1)."""
+
+
+class PoolSaturatedError(Exception):
+    """Raised when the pool already has max_pending requests in flight."""
+
+
+def discover_scripts(dirs=None):
+    """Map script name -> file path for every module that defines main()."""
+    registry = {}
+    for directory in dirs or SCRIPT_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        for filename in sorted(os.listdir(directory)):
+            name, ext = os.path.splitext(filename)
+            if ext != '.py' or name.startswith('_') or name in EXCLUDED_SCRIPTS:
+                continue
+            path = os.path.join(directory, filename)
+            try:
+                with open(path, encoding='utf-8') as f:
+                    source = f.read()
+            except OSError:
+                continue
+            # A cheap text check keeps discovery free of heavy imports.
+            if '\ndef main(' in source and name not in registry:
+                registry[name] = path
+    return registry
+
+
+def discover_handlers(scripts=None):
+    """Map route slug -> script name for modules exposing run_<name>(payload)."""
+    handlers = {}
+    for name, path in (scripts or SCRIPT_REGISTRY).items():
+        if name in EXCLUDED_HANDLERS:
+            continue
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        if f'\ndef run_{name}(' in source:
+            slug = name[:-len('_analysis')] if name.endswith('_analysis') else name
+            handlers[slug.replace('_', '-')] = name
+    return handlers
+
+
+def discover_cacheable(scripts=None):
+    """
+    Map script name -> version for modules declaring CACHEABLE = True
+    (deterministic results): a hash of the script and the helper modules it imports.
+    """
+    from result_cache import source_digest
+    cacheable = {}
+    for name, path in (scripts or SCRIPT_REGISTRY).items():
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        if '\nCACHEABLE = True' in source:
+            cacheable[name] = source_digest(path)
+    return cacheable
+
+
+SCRIPT_REGISTRY = discover_scripts()
+HANDLER_REGISTRY = discover_handlers()
+CACHEABLE_SCRIPTS = discover_cacheable()
+
+_loaded_modules = {}
+
+
+def _ensure_backend_on_path():
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+
+def preload_libraries(modules=None):
+    """Import the heavy scientific stack so later script imports are cheap."""
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    _ensure_backend_on_path()
+    loaded = []
+    for name in modules or PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+            loaded.append(name)
+        except Exception:
+            # Optional dependency missing in this environment; scripts that
+            # need it will report the ImportError themselves.
+            pass
+    return loaded
+
+
+def load_script(name):
+    """Import (once) and return the module registered under `name`."""
+    if name in _loaded_modules:
+        return _loaded_modules[name]
+    path = SCRIPT_REGISTRY.get(name)
+    if path is None:
+        raise KeyError(f"Unknown analysis script '{name}'")
+    _ensure_backend_on_path()
+    # Scripts may import helpers that sit next to them (e.g. finance/holdings.py).
+    script_dir = os.path.dirname(path)
+    if script_dir not in sys.path:
+        sys.path.append(script_dir)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    _loaded_modules[name] = module
+    return module
+
+
+def _native_default(obj):
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return None if (np.isnan(obj) or np.isinf(obj)) else float(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_options(module):
+    """
+    json.dumps keywords matching the module's own main(): its JSONEncoder
+    subclass when it defines one (e.g. NpEncoder), else its _to_native_type.
+    """
+    for value in vars(module).values():
+        if (isinstance(value, type) and issubclass(value, json.JSONEncoder)
+                and value.__module__ == module.__name__):
+            return {'cls': value}
+    return {'default': getattr(module, '_to_native_type', _native_default)}
+
+
+def _close_figures():
+    try:
+        import matplotlib.pyplot as plt
+        plt.close('all')
+    except Exception:
+        pass
+
+
+def call_handler(name, raw_body):
+    """
+    Run run_<name>(payload) directly, bypassing the stdin/stdout wrapper.
+
+    Returns (json_text, timings) where timings holds the seconds spent
+    parsing the request, computing the analysis and serializing the result.
+    """
+    start = time.perf_counter()
+    payload = json.loads(raw_body) if isinstance(raw_body, (str, bytes)) else raw_body
+    parsed = time.perf_counter()
+
+    module = load_script(name)
+    handler = getattr(module, f'run_{name}')
+    try:
+        result = handler(payload)
+    finally:
+        _close_figures()
+    computed = time.perf_counter()
+
+    # Serialize the way the module's main() does so NaN/inf handling matches.
+    output = json.dumps(result, **_json_options(module))
+    serialized = time.perf_counter()
+
+    return output, {
+        'parse': parsed - start,
+        'compute': computed - parsed,
+        'serialize': serialized - computed,
+    }
+
+
+def call_main(name, payload):
+    """
+    Run a script's main() in-process with the payload fed through stdin.
+
+    Returns the JSON text the script printed to stdout. A non-zero exit is
+    turned into ScriptError carrying the script's own error message.
+    """
+    module = load_script(name)
+    raw = payload if isinstance(payload, str) else json.dumps(payload)
+    out, err = io.StringIO(), io.StringIO()
+    saved_stdin = sys.stdin
+    exit_code = 0
+    sys.stdin = io.StringIO(raw)
+    try:
+        with redirect_stdout(out), redirect_stderr(err):
+            try:
+                module.main()
+            except SystemExit as e:
+                exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    finally:
+        sys.stdin = saved_stdin
+        _close_figures()
+
+    if exit_code != 0:
+        message = err.getvalue().strip()
+        try:
+            message = json.loads(message.splitlines()[-1]).get('error', message)
+        except (ValueError, IndexError, AttributeError):
+            pass
+        raise ScriptError(message or f"Script '{name}' exited with code {exit_code}")
+
+    text = out.getvalue().strip()
+    if not text:
+        raise ScriptError(f"Script '{name}' produced no output")
+    if text[0] not in '{[':
+        # Progress lines printed before the result; keep the final JSON document
+        # (which may itself span several lines when dumped with indent=2).
+        start = max(text.rfind('\n{'), text.rfind('\n['))
+        if start >= 0:
+            text = text[start + 1:]
+    return text
+
+
+def _run_in_worker(name, payload):
+    start = time.perf_counter()
+    try:
+        output = call_main(name, payload)
+        return {'ok': True, 'output': output, 'timings': {'compute': time.perf_counter() - start}}
+    except ScriptError as e:
+        return {'ok': False, 'error': str(e), 'timings': {'compute': time.perf_counter() - start}}
+
+
+def _run_handler_in_worker(name, raw_body):
+    try:
+        output, timings = call_handler(name, raw_body)
+        return {'ok': True, 'output': output, 'timings': timings}
+    except Exception as e:
+        return {'ok': False, 'error': str(e), 'timings': {}}
+
+
+def server_timing(timings):
+    """Format a timings dict (seconds) as a Server-Timing header value."""
+    return ', '.join(f"{key};dur={value * 1000:.1f}" for key, value in timings.items())
+
+
+def warm_resources(korean=None):
+    """
+    Load the bundled NLP lexicons, stopwords and fonts (never downloads).
+    Okt starts a JVM, so general workers only warm it with NLP_WARM_KOREAN=1;
+    the sentiment scoring pool and the NLP scripts load it themselves on first use.
+    """
+    _ensure_backend_on_path()
+    if korean is None:
+        korean = os.environ.get('NLP_WARM_KOREAN', '0') == '1'
+    try:
+        import nlp_resources
+        return nlp_resources.warm_up(korean=korean)
+    except Exception:
+        return {}
+
+
+def _warm_worker():
+    # Analyses size their own nested pools by this (see parallelism.py).
+    os.environ[IN_WORKER_ENV] = '1'
+    preload_libraries()
+    warm_resources()
+
+
+class WorkerPool:
+    """Bounded process pool of warm interpreters that run analysis scripts."""
+
+    def __init__(self, max_workers=None, max_pending=None, max_tasks_per_child=None):
+        self.max_workers = max_workers or int(os.environ.get('ANALYSIS_WORKERS', DEFAULT_MAX_WORKERS))
+        self.max_pending = max_pending or int(os.environ.get('ANALYSIS_MAX_PENDING', DEFAULT_MAX_PENDING))
+        self.max_tasks_per_child = max_tasks_per_child or DEFAULT_MAX_TASKS_PER_CHILD
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+
+    def start(self):
+        if self._executor is not None:
+            return self
+        kwargs = {
+            'max_workers': self.max_workers,
+            'initializer': _warm_worker,
+            'mp_context': multiprocessing.get_context('spawn'),
+        }
+        if sys.version_info >= (3, 11):
+            # Recycle workers periodically so leaked figures/caches cannot pile up.
+            kwargs['max_tasks_per_child'] = self.max_tasks_per_child
+        self._executor = ProcessPoolExecutor(**kwargs)
+        # Force every worker to spawn now rather than on first request; the
+        # initializer does the preloading, so the task itself is a no-op.
+        for future in [self._executor.submit(os.getpid) for _ in range(self.max_workers)]:
+            future.result()
+        return self
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def submit(self, name, payload):
+        """Queue a script run through main(); returns a concurrent.futures.Future."""
+        return self._submit(_run_in_worker, name, payload)
+
+    def submit_handler(self, name, raw_body):
+        """Queue a direct run_<name>(payload) call; returns a Future."""
+        return self._submit(_run_handler_in_worker, name, raw_body)
+
+    def _submit(self, target, name, payload):
+        if name not in SCRIPT_REGISTRY:
+            raise KeyError(f"Unknown analysis script '{name}'")
+        if not self._slots.acquire(blocking=False):
+            raise PoolSaturatedError('Analysis worker pool is busy, retry later')
+        if self._executor is None:
+            self.start()
+        try:
+            future = self._executor.submit(target, name, payload)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, name, payload, timeout=None):
+        """Blocking helper: run a script and return its JSON text."""
+        result = self.submit(name, payload).result(timeout=timeout)
+        if not result['ok']:
+            raise ScriptError(result['error'])
+        return result['output']
@@ -0,0 +1,70 @@
+"""
+Drop-in stdin/stdout shim for the analysis scripts.
+
+    python worker_shim.py anova_analysis < payload.json
+
+behaves exactly like ``python anova_analysis.py < payload.json`` (JSON on
+stdout, ``{"error": ...}`` on stderr with exit code 1) but forwards the
+request to the warm worker pool in main.py, so the caller does not pay the
+numpy/pandas/scipy import cost. Only the standard library is imported here.
+If the server is unreachable the script is run in-process as before.
+"""
+import os
+import sys
+import json
+import urllib.request
+import urllib.error
+
+WORKER_URL = os.environ.get('PYTHON_API_URL', 'http://127.0.0.1:8000')
+CONNECT_TIMEOUT = float(os.environ.get('WORKER_SHIM_TIMEOUT', '600'))
+
+
+def _forward(script, raw_payload):
+    request = urllib.request.Request(
+        f"{WORKER_URL}/api/run/{script}",
+        data=raw_payload.encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST',
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=CONNECT_TIMEOUT) as response:
+            return response.read().decode('utf-8'), None
+    except urllib.error.HTTPError as e:
+        body = e.read().decode('utf-8')
+        try:
+            detail = json.loads(body).get('detail', body)
+        except ValueError:
+            detail = body
+        return None, detail
+
+
+def _run_local(script, raw_payload):
+    from worker_pool import call_main, ScriptError
+    try:
+        return call_main(script, raw_payload), None
+    except ScriptError as e:
+        return None, str(e)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(json.dumps({"error": "Usage: worker_shim.py <script_name>"}), file=sys.stderr)
+        sys.exit(1)
+
+    script = os.path.splitext(os.path.basename(sys.argv[1]))[0]
+    raw_payload = sys.stdin.read()
+
+    try:
+        output, error = _forward(script, raw_payload)
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        output, error = _run_local(script, raw_payload)
+
+    if error is not None:
+        print(json.dumps({"error": error}), file=sys.stderr)
+        sys.exit(1)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()